@@ -30,18 +30,25 @@ _metis_incs = [
 _metis_src = []
 _metis_src += glob.glob(join("mgmetis", "src", "metis", "libmetis", "*.c"))
 _metis_src += glob.glob(join("mgmetis", "src", "metis", "GKlib", "*.c"))
+# NOTE: use the thread-local random number generator of GKlib instead of the
+# global state of rand(), so that threaded calls are reproducible; this changes
+# the results compared to upstream METIS with the same seed, set
+# MGMETIS_SYSTEM_RAND=1 to build with rand() instead
+_flag = os.environ.get("MGMETIS_SYSTEM_RAND", "0").lower()
+_metis_macros = [] if _flag not in ("0", "no", "off", "false") else [("USE_GKRAND", None)]
 exts = []
 exts += [
     Extension(
         "mgmetis._cython.metis",
         [join("mgmetis", "_cython", "metis.pyx")] + _metis_src,
         include_dirs=_metis_incs,
+        define_macros=_metis_macros,
     ),
     Extension(
         "mgmetis._cython.metis64",
         [join("mgmetis", "_cython", "metis64.pyx")] + _metis_src,
         include_dirs=_metis_incs,
-        define_macros=[("IDXTYPEWIDTH", "64")],
+        define_macros=_metis_macros + [("IDXTYPEWIDTH", "64")],
     ),
 ]
 
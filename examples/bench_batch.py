@@ -0,0 +1,54 @@
+# -*- coding: utf-8 -*-
+"""Benchmark of partitioning many small graphs
+
+Compares a Python loop over ``part_graph_kway`` with the packed
+``part_graph_batch``, serial and threaded, on random grid patches of 20 to 500
+vertices by default.
+
+Usage::
+
+    python bench_batch.py [npatches] [nthreads] [min_size] [max_size]
+"""
+
+import sys
+import time
+
+import numpy as np
+
+from mgmetis import metis
+from mgmetis.utils import pack_graphs
+
+
+def create_grid(nx, ny):
+    idx = np.arange(nx * ny).reshape(nx, ny)
+    rows = np.concatenate((idx[:, :-1].ravel(), idx[:, 1:].ravel(), idx[:-1].ravel(), idx[1:].ravel()))
+    cols = np.concatenate((idx[:, 1:].ravel(), idx[:, :-1].ravel(), idx[1:].ravel(), idx[:-1].ravel()))
+    order = np.lexsort((cols, rows))
+    xadj = np.zeros(nx * ny + 1, dtype=np.int32)
+    np.cumsum(np.bincount(rows, minlength=nx * ny), out=xadj[1:])
+    return xadj, np.asarray(cols[order], dtype=np.int32)
+
+
+def main(npatches=10000, nthreads=4, lo=20, hi=500):
+    rng = np.random.default_rng(0)
+    graphs = []
+    while len(graphs) < npatches:
+        nx, ny = rng.integers(4, 23, size=2)
+        if lo <= nx * ny <= hi:
+            graphs.append(create_grid(nx, ny))
+    offsets, xadj, adjncy = pack_graphs(graphs)
+    print("{} patches, {} vertices in total".format(npatches, xadj.size - 1))
+    tic = time.perf_counter()
+    for x, a in graphs:
+        metis.part_graph_kway(4, x, a)
+    print("  loop:              {:.3f}s".format(time.perf_counter() - tic))
+    tic = time.perf_counter()
+    metis.part_graph_batch(4, offsets, xadj, adjncy)
+    print("  batch:             {:.3f}s".format(time.perf_counter() - tic))
+    tic = time.perf_counter()
+    metis.part_graph_batch(4, offsets, xadj, adjncy, nthreads=nthreads)
+    print("  batch, {} threads: {:.3f}s".format(nthreads, time.perf_counter() - tic))
+
+
+if __name__ == "__main__":
+    main(*[int(x) for x in sys.argv[1:5]])
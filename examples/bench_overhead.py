@@ -0,0 +1,53 @@
+# -*- coding: utf-8 -*-
+"""Benchmark of the per-call overhead of the Python interface
+
+For tiny graphs, the time of a call is dominated by the interface overhead.
+This script compares the Cython fast paths (default) with the ctypes
+dispatch, and both with the raw compiled entry point.
+
+Usage::
+
+    python bench_overhead.py [repeat]
+"""
+
+import sys
+import timeit
+
+import numpy as np
+
+from mgmetis import metis
+from mgmetis._cython import metis as fast
+
+
+def best(func, number=5000, repeat=7):
+    return min(timeit.repeat(func, number=number, repeat=repeat)) / number * 1e6
+
+
+def main(repeat=7):
+    xadj = np.asarray(
+        [int(x) for x in "0 2 5 8 11 13 16 20 24 28 31 33 36 39 42 44".split()],
+        dtype=np.int32,
+    )
+    adjncy = np.asarray(
+        [
+            int(x)
+            for x in "1 5 0 2 6 1 3 7 2 4 8 3 9 0 6 10 1 5 7 11 2 6 8 12 3 7 9 13 4 8 14 5 11 6 10 12 7 11 13 8 12 14 9 13".split()
+        ],
+        dtype=np.int32,
+    )
+    opts = metis.get_default_options()
+    perm, iperm = np.empty(15, dtype=np.int32), np.empty(15, dtype=np.int32)
+    raw = best(lambda: fast.node_nd(xadj, adjncy, None, opts, perm, iperm), repeat=repeat)
+    timings = {}
+    for use_fast in (True, False):
+        metis._USE_FAST = use_fast  # pylint: disable=protected-access
+        timings[use_fast] = best(lambda: metis.node_nd(xadj, adjncy), repeat=repeat)
+    metis._USE_FAST = True  # pylint: disable=protected-access
+    print("node_nd on the 15-vertex graph (microseconds per call)")
+    print("  raw Cython entry: {:8.2f}".format(raw))
+    print("  fast path:        {:8.2f} (overhead {:.2f})".format(timings[True], timings[True] - raw))
+    print("  ctypes:           {:8.2f} (overhead {:.2f})".format(timings[False], timings[False] - raw))
+
+
+if __name__ == "__main__":
+    main(*[int(x) for x in sys.argv[1:2]])
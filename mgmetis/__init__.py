@@ -1,4 +1,18 @@
 # -*- coding: utf-8 -*-
 
 __version__ = "0.1.1"
-__all__ = ["metis"]
+__all__ = [
+    "metis",
+    "block",
+    "hierarchy",
+    "geom",
+    "reorder",
+    "cache",
+    "aio",
+    "mesh",
+    "symbolic",
+    "elastic",
+    "quality",
+    "balance",
+    "topology",
+]
@@ -0,0 +1,8 @@
+# -*- coding: utf-8 -*-
+"""Run the command-line partitioner with ``python -m mgmetis``"""
+
+import sys
+
+from .cli import main
+
+sys.exit(main())
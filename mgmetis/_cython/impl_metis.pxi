@@ -1,5 +1,8 @@
 # -*- coding: utf-8 -*-
 
+cimport cython
+from libc.stdlib cimport malloc, free
+
 # NOTE: we enforce include from src/ so that we know we include the METIS
 # comes with mgmetis
 
@@ -36,6 +39,15 @@ cdef extern from "src/metis/include/metis.h" nogil:
 
     int METIS_SetDefaultOptions(idx_t *options)
 
+    int METIS_GetMemoryUsage(size_t *cur, size_t *max)
+
+    int METIS_Coarsen(idx_t *nvtxs, idx_t *xadj, idx_t *adjncy, idx_t *vwgt,
+                  idx_t *adjwgt, idx_t *nlevels, idx_t *coarsento, idx_t *options,
+                  idx_t **r_hierarchy)
+
+    int METIS_NodeMMD(idx_t *nvtxs, idx_t *xadj, idx_t *adjncy, idx_t *numflag,
+                  idx_t *perm, idx_t *iperm)
+
     int METIS_NodeNDP(idx_t nvtxs, idx_t *xadj, idx_t *adjncy, idx_t *vwgt,
                    idx_t npes, idx_t *options, idx_t *perm, idx_t *iperm, 
                    idx_t *sizes)
@@ -102,6 +114,22 @@ cdef int SetDefaultOptions(idx_t *options) nogil:
     return METIS_SetDefaultOptions(options)
 
 
+cdef int GetMemoryUsage(size_t *cur, size_t *max) nogil:
+    return METIS_GetMemoryUsage(cur, max)
+
+
+cdef int Coarsen(idx_t *nvtxs, idx_t *xadj, idx_t *adjncy, idx_t *vwgt,
+                  idx_t *adjwgt, idx_t *nlevels, idx_t *coarsento, idx_t *options,
+                  idx_t **r_hierarchy) nogil:
+    return METIS_Coarsen(nvtxs, xadj, adjncy, vwgt, adjwgt, nlevels, coarsento,
+        options, r_hierarchy)
+
+
+cdef int NodeMMD(idx_t *nvtxs, idx_t *xadj, idx_t *adjncy, idx_t *numflag,
+                  idx_t *perm, idx_t *iperm) nogil:
+    return METIS_NodeMMD(nvtxs, xadj, adjncy, numflag, perm, iperm)
+
+
 cdef int NodeNDP(idx_t nvtxs, idx_t *xadj, idx_t *adjncy, idx_t *vwgt,
                    idx_t npes, idx_t *options, idx_t *perm, idx_t *iperm,
                    idx_t *sizes) nogil:
@@ -117,3 +145,363 @@ cdef int ComputeVertexSeparator(idx_t *nvtxs, idx_t *xadj, idx_t *adjncy,
 cdef int NodeRefine(idx_t nvtxs, idx_t *xadj, idx_t *vwgt, idx_t *adjncy,
                    idx_t *where, idx_t *hmarker, real_t ubfactor) nogil:
     return METIS_NodeRefine(nvtxs, xadj, vwgt, adjncy, where, hmarker, ubfactor)
+
+
+# Python fast paths
+#
+# The following def-level functions are dispatched by mgmetis.metis in place of
+# the ctypes calls. They take C-contiguous arrays of idx_t (real_t for tpwgts
+# and ubvec), where None indicates NULL, and return the METIS status so that
+# the error handling stays in Python.
+
+
+@cython.boundscheck(False)
+cdef inline idx_t *_iptr(const idx_t[::1] a) noexcept nogil:
+    # NOTE: also valid for empty arrays, as bounds are not checked
+    return NULL if a is None else <idx_t *>&a[0]
+
+
+@cython.boundscheck(False)
+cdef inline real_t *_rptr(const real_t[::1] a) noexcept nogil:
+    return NULL if a is None else <real_t *>&a[0]
+
+
+def part_graph(bint kway, idx_t nparts, const idx_t[::1] xadj,
+        const idx_t[::1] adjncy, const idx_t[::1] vwgt, const idx_t[::1] vsize,
+        const idx_t[::1] adjwgt, const real_t[::1] tpwgts,
+        const real_t[::1] ubvec, idx_t[::1] options, idx_t[::1] part,
+        idx_t ncon=1):
+    """Fast path of PartGraphKway (kway) or PartGraphRecursive
+
+    Returns
+    -------
+    ret : int
+        METIS status
+    objval : int
+        The objective value
+    """
+    cdef idx_t nv = xadj.shape[0] - 1
+    cdef idx_t objval = 0
+    cdef int ret
+    with nogil:
+        if kway:
+            ret = METIS_PartGraphKway(&nv, &ncon, _iptr(xadj), _iptr(adjncy),
+                _iptr(vwgt), _iptr(vsize), _iptr(adjwgt), &nparts,
+                _rptr(tpwgts), _rptr(ubvec), _iptr(options), &objval,
+                _iptr(part))
+        else:
+            ret = METIS_PartGraphRecursive(&nv, &ncon, _iptr(xadj),
+                _iptr(adjncy), _iptr(vwgt), _iptr(vsize), _iptr(adjwgt),
+                &nparts, _rptr(tpwgts), _rptr(ubvec), _iptr(options), &objval,
+                _iptr(part))
+    return ret, objval
+
+
+def part_mesh(bint dual, idx_t nparts, idx_t nn, const idx_t[::1] eptr,
+        const idx_t[::1] eind, const idx_t[::1] vwgt, const idx_t[::1] vsize,
+        idx_t ncommon, const real_t[::1] tpwgts, idx_t[::1] options,
+        idx_t[::1] epart, idx_t[::1] npart):
+    """Fast path of PartMeshDual (dual) or PartMeshNodal
+
+    Returns
+    -------
+    ret : int
+        METIS status
+    objval : int
+        The objective value
+    """
+    cdef idx_t ne = eptr.shape[0] - 1
+    cdef idx_t objval = 0
+    cdef int ret
+    with nogil:
+        if dual:
+            ret = METIS_PartMeshDual(&ne, &nn, _iptr(eptr), _iptr(eind),
+                _iptr(vwgt), _iptr(vsize), &ncommon, &nparts, _rptr(tpwgts),
+                _iptr(options), &objval, _iptr(epart), _iptr(npart))
+        else:
+            ret = METIS_PartMeshNodal(&ne, &nn, _iptr(eptr), _iptr(eind),
+                _iptr(vwgt), _iptr(vsize), &nparts, _rptr(tpwgts),
+                _iptr(options), &objval, _iptr(epart), _iptr(npart))
+    return ret, objval
+
+
+def node_nd(const idx_t[::1] xadj, const idx_t[::1] adjncy,
+        const idx_t[::1] vwgt, idx_t[::1] options, idx_t[::1] perm,
+        idx_t[::1] iperm):
+    """Fast path of NodeND
+
+    Returns
+    -------
+    int
+        METIS status
+    """
+    cdef idx_t nv = xadj.shape[0] - 1
+    cdef int ret
+    with nogil:
+        ret = METIS_NodeND(&nv, _iptr(xadj), _iptr(adjncy), _iptr(vwgt),
+            _iptr(options), _iptr(perm), _iptr(iperm))
+    return ret
+
+
+
+def node_mmd(const idx_t[::1] xadj, const idx_t[::1] adjncy, idx_t numflag,
+        idx_t[::1] perm, idx_t[::1] iperm):
+    """Fast path of NodeMMD
+
+    Returns
+    -------
+    int
+        METIS status
+    """
+    cdef idx_t nv = xadj.shape[0] - 1
+    cdef int ret
+    with nogil:
+        ret = METIS_NodeMMD(&nv, _iptr(xadj), _iptr(adjncy), &numflag,
+            _iptr(perm), _iptr(iperm))
+    return ret
+
+
+@cython.boundscheck(False)
+@cython.wraparound(False)
+def node_mmd_batch(Py_ssize_t g0, Py_ssize_t g1, const idx_t[::1] offsets,
+        const idx_t[::1] xadj, const idx_t[::1] adjncy, idx_t[::1] perm,
+        idx_t[::1] iperm):
+    """Fast path of ordering the packed graphs g0 to g1-1 with NodeMMD
+
+    See :func:`part_graph_batch` for the packed graphs, the outputs are the
+    local orderings of the graphs.
+
+    Returns
+    -------
+    ret : int
+        METIS status of the first failed graph, or 1 (OK)
+    g : int
+        The failed graph, or g1
+    """
+    cdef Py_ssize_t g
+    cdef idx_t i, s, e, n, a, b, maxnv = 0, maxnnz = 0
+    cdef idx_t numflag = 0
+    cdef int ret = 1
+    cdef idx_t *lxadj
+    cdef idx_t *ladjncy
+    for g in range(g0, g1):
+        maxnv = max(maxnv, offsets[g + 1] - offsets[g])
+        maxnnz = max(maxnnz, xadj[offsets[g + 1]] - xadj[offsets[g]])
+    lxadj = <idx_t *>malloc((maxnv + 1) * sizeof(idx_t))
+    ladjncy = <idx_t *>malloc((maxnnz + 1) * sizeof(idx_t))
+    if lxadj == NULL or ladjncy == NULL:
+        free(lxadj)
+        free(ladjncy)
+        raise MemoryError
+    with nogil:
+        for g in range(g0, g1):
+            s, e = offsets[g], offsets[g + 1]
+            n = e - s
+            a, b = xadj[s], xadj[e]
+            if n == 0:
+                continue
+            for i in range(n + 1):
+                lxadj[i] = xadj[s + i] - a
+            for i in range(b - a):
+                ladjncy[i] = adjncy[a + i] - s
+            ret = METIS_NodeMMD(&n, lxadj, ladjncy, &numflag, &perm[s], &iperm[s])
+            if ret != 1:
+                break
+    free(lxadj)
+    free(ladjncy)
+    return ret, g if ret != 1 else g1
+
+
+@cython.boundscheck(False)
+@cython.wraparound(False)
+def part_graph_batch(bint kway, Py_ssize_t g0, Py_ssize_t g1,
+        const idx_t[::1] offsets, const idx_t[::1] nparts,
+        const idx_t[::1] xadj, const idx_t[::1] adjncy, const idx_t[::1] vwgt,
+        const idx_t[::1] adjwgt, const real_t[::1] ubvec,
+        idx_t[::1] options, idx_t[::1] part, idx_t[::1] objval,
+        idx_t ncon=1):
+    """Fast path of partitioning the packed graphs g0 to g1-1
+
+    Graph ``g`` consists of the vertices ``offsets[g]`` to
+    ``offsets[g+1]-1`` of the block-diagonal graph (xadj, adjncy), which must
+    be in C index. The local adjacency of each graph is built in scratch
+    buffers, and all METIS calls are made without the GIL.
+
+    Returns
+    -------
+    ret : int
+        METIS status of the first failed graph, or 1 (OK)
+    g : int
+        The failed graph, or g1
+    """
+    cdef Py_ssize_t g
+    cdef idx_t i, s, e, n, a, b, maxnv = 0, maxnnz = 0
+    cdef idx_t k
+    cdef int ret = 1
+    cdef idx_t *lxadj
+    cdef idx_t *ladjncy
+    for g in range(g0, g1):
+        maxnv = max(maxnv, offsets[g + 1] - offsets[g])
+        maxnnz = max(maxnnz, xadj[offsets[g + 1]] - xadj[offsets[g]])
+    lxadj = <idx_t *>malloc((maxnv + 1) * sizeof(idx_t))
+    ladjncy = <idx_t *>malloc((maxnnz + 1) * sizeof(idx_t))
+    if lxadj == NULL or ladjncy == NULL:
+        free(lxadj)
+        free(ladjncy)
+        raise MemoryError
+    with nogil:
+        for g in range(g0, g1):
+            s, e = offsets[g], offsets[g + 1]
+            n, k = e - s, nparts[g]
+            a, b = xadj[s], xadj[e]
+            objval[g] = 0
+            if n == 0:
+                continue
+            if k == 1:
+                for i in range(s, e):
+                    part[i] = 0
+                continue
+            # NOTE: localize the adjacency of the graph
+            for i in range(n + 1):
+                lxadj[i] = xadj[s + i] - a
+            for i in range(b - a):
+                ladjncy[i] = adjncy[a + i] - s
+            if kway:
+                ret = METIS_PartGraphKway(&n, &ncon, lxadj, ladjncy,
+                    NULL if vwgt is None else &vwgt[s * ncon], NULL,
+                    NULL if adjwgt is None else &adjwgt[a], &k,
+                    NULL, _rptr(ubvec), _iptr(options), &objval[g], &part[s])
+            else:
+                ret = METIS_PartGraphRecursive(&n, &ncon, lxadj, ladjncy,
+                    NULL if vwgt is None else &vwgt[s * ncon], NULL,
+                    NULL if adjwgt is None else &adjwgt[a], &k,
+                    NULL, _rptr(ubvec), _iptr(options), &objval[g], &part[s])
+            if ret != 1:
+                break
+    free(lxadj)
+    free(ladjncy)
+    return ret, g if ret != 1 else g1
+
+
+cdef inline idx_t _leaf(idx_t i, idx_t j, idx_t *first, idx_t *maxfirst,
+        idx_t *prevleaf, idx_t *ancestor, int *jleaf) noexcept nogil:
+    # determine if j is a leaf of the i-th row subtree, and return the least
+    # common ancestor of j and the previous leaf (or i for the first leaf)
+    cdef idx_t q, s, sparent, jprev
+    jleaf[0] = 0
+    if i <= j or first[j] <= maxfirst[i]:
+        return -1
+    maxfirst[i] = first[j]
+    jprev = prevleaf[i]
+    prevleaf[i] = j
+    if jprev == -1:
+        jleaf[0] = 1
+        return i
+    jleaf[0] = 2
+    q = jprev
+    while q != ancestor[q]:
+        q = ancestor[q]
+    s = jprev
+    while s != q:
+        # NOTE: path compression
+        sparent = ancestor[s]
+        ancestor[s] = q
+        s = sparent
+    return q
+
+
+@cython.boundscheck(False)
+@cython.wraparound(False)
+def symbolic(const idx_t[::1] xadj, const idx_t[::1] adjncy,
+        const idx_t[::1] perm, const idx_t[::1] iperm, idx_t[::1] parent,
+        idx_t[::1] post, idx_t[::1] colcount):
+    """Symbolic Cholesky analysis of the permuted graph
+
+    Computes the elimination tree (Liu's algorithm with path compression),
+    its postorder and the column counts of the factor including the diagonal
+    (Gilbert, Ng and Peyton), all in :math:`O(nnz\\,\\alpha(nnz, n))` time.
+    All inputs and outputs are in C index, and the outputs are in the new
+    numbering.
+    """
+    cdef idx_t n = xadj.shape[0] - 1
+    cdef idx_t i, j, k, p, q, v, top, inext, pj
+    cdef int jleaf
+    cdef idx_t *w = <idx_t *>malloc((7 * n + 1) * sizeof(idx_t))
+    if w == NULL:
+        raise MemoryError
+    cdef idx_t *ancestor = w
+    cdef idx_t *first = w + n
+    cdef idx_t *maxfirst = w + 2 * n
+    cdef idx_t *prevleaf = w + 3 * n
+    cdef idx_t *head = w + 4 * n
+    cdef idx_t *nxt = w + 5 * n
+    cdef idx_t *stack = w + 6 * n
+    with nogil:
+        # elimination tree
+        for k in range(n):
+            parent[k] = -1
+            ancestor[k] = -1
+            v = perm[k]
+            for p in range(xadj[v], xadj[v + 1]):
+                i = iperm[adjncy[p]]
+                while i != -1 and i < k:
+                    inext = ancestor[i]
+                    ancestor[i] = k
+                    if inext == -1:
+                        parent[i] = k
+                    i = inext
+        # postorder by depth-first search of the forest
+        for j in range(n):
+            head[j] = -1
+        for j in range(n - 1, -1, -1):
+            if parent[j] != -1:
+                nxt[j] = head[parent[j]]
+                head[parent[j]] = j
+        k = 0
+        for j in range(n):
+            if parent[j] != -1:
+                continue
+            top = 0
+            stack[0] = j
+            while top >= 0:
+                p = stack[top]
+                i = head[p]
+                if i == -1:
+                    top -= 1
+                    post[k] = p
+                    k += 1
+                else:
+                    head[p] = nxt[i]
+                    top += 1
+                    stack[top] = i
+        # column counts, where colcount holds the deltas first
+        for j in range(n):
+            first[j] = -1
+            ancestor[j] = j
+            maxfirst[j] = -1
+            prevleaf[j] = -1
+        for k in range(n):
+            j = post[k]
+            colcount[j] = 1 if first[j] == -1 else 0
+            while j != -1 and first[j] == -1:
+                first[j] = k
+                j = parent[j]
+        for k in range(n):
+            j = post[k]
+            pj = parent[j]
+            if pj != -1:
+                colcount[pj] -= 1
+            v = perm[j]
+            for p in range(xadj[v], xadj[v + 1]):
+                q = _leaf(iperm[adjncy[p]], j, first, maxfirst, prevleaf,
+                    ancestor, &jleaf)
+                if jleaf >= 1:
+                    colcount[j] += 1
+                if jleaf == 2:
+                    colcount[q] -= 1
+            if pj != -1:
+                ancestor[j] = pj
+        for j in range(n):
+            if parent[j] != -1:
+                colcount[parent[j]] += colcount[j]
+    free(w)
@@ -33,6 +33,12 @@ cdef int NodeND(idx_t *nvtxs, idx_t *xadj, idx_t *adjncy, idx_t *vwgt,
                   idx_t *options, idx_t *perm, idx_t *iperm) nogil
 cdef int Free(void *ptr) nogil
 cdef int SetDefaultOptions(idx_t *options) nogil
+cdef int GetMemoryUsage(size_t *cur, size_t *max) nogil
+cdef int Coarsen(idx_t *nvtxs, idx_t *xadj, idx_t *adjncy, idx_t *vwgt,
+                  idx_t *adjwgt, idx_t *nlevels, idx_t *coarsento, idx_t *options,
+                  idx_t **r_hierarchy) nogil
+cdef int NodeMMD(idx_t *nvtxs, idx_t *xadj, idx_t *adjncy, idx_t *numflag,
+                  idx_t *perm, idx_t *iperm) nogil
 cdef int NodeNDP(idx_t nvtxs, idx_t *xadj, idx_t *adjncy, idx_t *vwgt,
                    idx_t npes, idx_t *options, idx_t *perm, idx_t *iperm,
                    idx_t *sizes) nogil
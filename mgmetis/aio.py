@@ -0,0 +1,353 @@
+# -*- coding: utf-8 -*-
+"""Asyncio interface of the METIS routines
+
+The routines in :mod:`mgmetis.metis` block the calling thread, which stalls an
+event loop for the whole partitioning. This module provides awaitable
+versions of them, which are executed by a :class:`Partitioner`, i.e., a
+bounded pool of threads or processes with
+
+- a limit of concurrently running calls,
+- an optional limit of queued calls (backpressure),
+- per-call timeouts, where process workers are killed and replaced, and
+- cancellation of both queued and running calls, and
+- counters of the queue depth and the outcomes, see
+  :meth:`Partitioner.metrics`.
+
+Threads are cheap and work well as the compiled METIS calls release the GIL,
+but a running call can't be stopped, i.e., it keeps occupying its slot after
+a timeout or cancellation until it finishes. Processes can be killed.
+
+.. module:: mgmetis.aio
+.. moduleauthor:: Qiao Chen, <benechiao@gmail.com>
+"""
+
+import os
+import asyncio
+import multiprocessing
+from concurrent.futures import ThreadPoolExecutor
+
+from . import metis
+
+__all__ = [
+    "Partitioner",
+    "get_default_partitioner",
+    "part_graph_recursize",
+    "part_graph_kway",
+    "part_mesh_nodal",
+    "part_mesh_dual",
+    "node_nd",
+]
+
+_KERNELS = (
+    "part_graph_recursize",
+    "part_graph_kway",
+    "part_mesh_nodal",
+    "part_mesh_dual",
+    "node_nd",
+)
+
+# NOTE: output buffers are not shared with worker processes
+_OUTPUT_KW = ("part", "epart", "npart", "perm", "iperm", "memory_report")
+
+
+def _worker_main(conn):
+    # main loop of a worker process, which receives (kernel, args, kw) and
+    # sends back (True, result) or (False, exception)
+    while True:
+        try:
+            kernel, args, kw = conn.recv()
+        except (EOFError, OSError):
+            return
+        try:
+            res = (True, getattr(metis, kernel)(*args, **kw))
+        except Exception as e:  # pylint: disable=broad-except
+            res = (False, e)
+        conn.send(res)
+
+
+class _Worker:
+    # a worker process with its pipe
+    def __init__(self, ctx):
+        self.conn, child = ctx.Pipe()
+        self.process = ctx.Process(target=_worker_main, args=(child,), daemon=True)
+        self.process.start()
+        child.close()
+
+    def kill(self, reader=None):
+        # NOTE: the pipe is closed after the reader thread (if any) is done,
+        # otherwise its file descriptor may be reused while being read
+        self.process.kill()
+        self.process.join()
+        if reader is None:
+            self.conn.close()
+        else:
+            reader.add_done_callback(lambda _: self.conn.close())
+
+
+class Partitioner:
+    """Bounded pool that runs METIS routines for coroutines
+
+    Parameters
+    ----------
+    max_workers : int, optional
+        Maximum number of concurrently running calls, default is the number of
+        CPUs.
+    mode : {"thread", "process"}, optional
+        Execute the calls in threads (default) or worker processes.
+    max_pending : int, optional
+        Maximum number of calls waiting for a free worker, beyond which new
+        calls raise :class:`asyncio.QueueFull`. Default is None, i.e.,
+        unbounded.
+    timeout : float, optional
+        Default per-call timeout in seconds, None (default) means no timeout.
+    mp_context : str, optional
+        Start method of the worker processes, default is ``"spawn"``.
+
+    Examples
+    --------
+    >>> from mgmetis.aio import Partitioner
+    >>> async with Partitioner(4, mode="process", max_pending=64) as pool:
+    ...     objval, part = await pool.part_graph_kway(8, xadj, adjncy, timeout=30)
+
+    Notes
+    -----
+    In process mode, the inputs and results are pickled, and the output
+    buffers (e.g., `part`) and `memory_report` keyword inputs are ignored.
+    """
+
+    def __init__(
+        self, max_workers=None, mode="thread", max_pending=None, timeout=None, mp_context="spawn"
+    ):
+        if mode not in ("thread", "process"):
+            raise ValueError("unknown mode {}".format(mode))
+        self.max_workers = int(max_workers or os.cpu_count() or 1)
+        if self.max_workers <= 0:
+            raise ValueError("invalid max_workers")
+        self.mode = mode
+        self.max_pending = max_pending
+        self.timeout = timeout
+        self._ctx = multiprocessing.get_context(mp_context) if mode == "process" else None
+        self._slots = None
+        self._threads = None
+        self._idle = []
+        self._closed = False
+        self._pending = 0
+        self._running = 0
+        self._counts = dict.fromkeys(
+            ("completed", "failed", "timeouts", "cancelled", "rejected"), 0
+        )
+
+    def metrics(self):
+        """Get the queue depth and the counters of outcomes
+
+        Returns
+        -------
+        dict
+            ``"pending"`` (calls waiting for a worker), ``"running"``, and the
+            numbers of ``"completed"``, ``"failed"``, ``"timeouts"``,
+            ``"cancelled"`` and ``"rejected"`` calls.
+        """
+        return dict(pending=self._pending, running=self._running, **self._counts)
+
+    def _get_slots(self):
+        # helper to create the semaphore lazily, i.e., within the event loop
+        if self._slots is None:
+            self._slots = asyncio.Semaphore(self.max_workers)
+        return self._slots
+
+    def _get_threads(self):
+        # helper to create the thread pool lazily, which runs the calls in
+        # thread mode and waits for the results of the processes otherwise
+        if self._threads is None:
+            self._threads = ThreadPoolExecutor(self.max_workers, thread_name_prefix="mgmetis-aio")
+        return self._threads
+
+    def _release(self):
+        # helper to free a slot
+        self._running -= 1
+        self._slots.release()
+
+    async def run(self, kernel, *args, timeout=None, **kw):
+        """Run a routine of :mod:`mgmetis.metis`
+
+        Parameters
+        ----------
+        kernel : str
+            Name of the routine, e.g., ``"part_graph_kway"``
+        *args, **kw
+            Inputs of the routine
+        timeout : float, optional
+            Timeout in seconds, default is the one of the partitioner.
+
+        Returns
+        -------
+        tuple
+            The results of the routine
+
+        Raises
+        ------
+        asyncio.QueueFull
+            If `max_pending` calls are already waiting.
+        asyncio.TimeoutError
+            If the call doesn't finish within `timeout`.
+        """
+        if self._closed:
+            raise RuntimeError("partitioner is closed")
+        if kernel not in _KERNELS:
+            raise ValueError("unknown kernel {}".format(kernel))
+        if self.max_pending is not None and self._pending >= self.max_pending:
+            self._counts["rejected"] += 1
+            raise asyncio.QueueFull("too many pending calls")
+        timeout = self.timeout if timeout is None else timeout
+        self._pending += 1
+        try:
+            await self._get_slots().acquire()
+        except asyncio.CancelledError:
+            self._counts["cancelled"] += 1
+            raise
+        finally:
+            self._pending -= 1
+        self._running += 1
+        run = self._run_process if self.mode == "process" else self._run_thread
+        try:
+            res = await run(kernel, args, kw, timeout)
+        except asyncio.TimeoutError:
+            self._counts["timeouts"] += 1
+            raise
+        except asyncio.CancelledError:
+            self._counts["cancelled"] += 1
+            raise
+        except Exception:
+            self._counts["failed"] += 1
+            raise
+        self._counts["completed"] += 1
+        return res
+
+    async def _run_thread(self, kernel, args, kw, timeout):
+        # helper to run a call in the thread pool, whose slot is released when
+        # the thread finishes, which may be after a timeout
+        loop = asyncio.get_running_loop()
+        fut = self._get_threads().submit(getattr(metis, kernel), *args, **kw)
+
+        def done(_):
+            try:
+                loop.call_soon_threadsafe(self._release)
+            except RuntimeError:
+                # NOTE: the loop is closed
+                pass
+
+        fut.add_done_callback(done)
+        return await asyncio.wait_for(asyncio.wrap_future(fut), timeout)
+
+    async def _run_process(self, kernel, args, kw, timeout):
+        # helper to run a call in an idle worker process, which is killed upon
+        # timeout and cancellation
+        worker = self._idle.pop() if self._idle else _Worker(self._ctx)
+        kw = {k: v for k, v in kw.items() if k not in _OUTPUT_KW}
+        reader = None
+        try:
+            worker.conn.send((kernel, args, kw))
+            reader = self._get_threads().submit(worker.conn.recv)
+            ok, res = await asyncio.wait_for(asyncio.wrap_future(reader), timeout)
+        except asyncio.TimeoutError:
+            # NOTE: TimeoutError is also an OSError since Python 3.10
+            worker.kill(reader)
+            worker = None
+            raise
+        except (EOFError, OSError) as e:
+            worker.kill(reader)
+            worker = None
+            raise RuntimeError("worker process died while running {}".format(kernel)) from e
+        except BaseException:
+            worker.kill(reader)
+            worker = None
+            raise
+        finally:
+            if worker is not None:
+                self._idle.append(worker)
+            self._release()
+        if not ok:
+            raise res
+        return res
+
+    def close(self):
+        """Shut down the workers, running threads are not waited for"""
+        self._closed = True
+        for worker in self._idle:
+            worker.kill()
+        self._idle = []
+        if self._threads is not None:
+            self._threads.shutdown(wait=False)
+            self._threads = None
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *args):
+        self.close()
+
+    async def part_graph_recursize(self, nparts, xadj, adjncy, **kw):
+        """Awaitable :func:`mgmetis.metis.part_graph_recursize`"""
+        return await self.run("part_graph_recursize", nparts, xadj, adjncy, **kw)
+
+    async def part_graph_kway(self, nparts, xadj, adjncy, **kw):
+        """Awaitable :func:`mgmetis.metis.part_graph_kway`"""
+        return await self.run("part_graph_kway", nparts, xadj, adjncy, **kw)
+
+    async def part_mesh_nodal(self, nparts, *cells, **kw):
+        """Awaitable :func:`mgmetis.metis.part_mesh_nodal`"""
+        return await self.run("part_mesh_nodal", nparts, *cells, **kw)
+
+    async def part_mesh_dual(self, nparts, *cells, **kw):
+        """Awaitable :func:`mgmetis.metis.part_mesh_dual`"""
+        return await self.run("part_mesh_dual", nparts, *cells, **kw)
+
+    async def node_nd(self, xadj, adjncy, **kw):
+        """Awaitable :func:`mgmetis.metis.node_nd`"""
+        return await self.run("node_nd", xadj, adjncy, **kw)
+
+
+_default_partitioner = None
+
+
+def get_default_partitioner():
+    """Get the partitioner used by the module-level functions
+
+    The default partitioner is created upon the first use with threads and
+    default limits. Replace it by assigning the module attribute, e.g.,
+
+    >>> mgmetis.aio._default_partitioner = Partitioner(8, max_pending=100)
+
+    Returns
+    -------
+    Partitioner
+    """
+    global _default_partitioner  # pylint: disable=global-statement
+    if _default_partitioner is None or _default_partitioner._closed:
+        _default_partitioner = Partitioner()
+    return _default_partitioner
+
+
+async def part_graph_recursize(nparts, xadj, adjncy, **kw):
+    """Awaitable :func:`mgmetis.metis.part_graph_recursize`, see :class:`Partitioner`"""
+    return await get_default_partitioner().part_graph_recursize(nparts, xadj, adjncy, **kw)
+
+
+async def part_graph_kway(nparts, xadj, adjncy, **kw):
+    """Awaitable :func:`mgmetis.metis.part_graph_kway`, see :class:`Partitioner`"""
+    return await get_default_partitioner().part_graph_kway(nparts, xadj, adjncy, **kw)
+
+
+async def part_mesh_nodal(nparts, *cells, **kw):
+    """Awaitable :func:`mgmetis.metis.part_mesh_nodal`, see :class:`Partitioner`"""
+    return await get_default_partitioner().part_mesh_nodal(nparts, *cells, **kw)
+
+
+async def part_mesh_dual(nparts, *cells, **kw):
+    """Awaitable :func:`mgmetis.metis.part_mesh_dual`, see :class:`Partitioner`"""
+    return await get_default_partitioner().part_mesh_dual(nparts, *cells, **kw)
+
+
+async def node_nd(xadj, adjncy, **kw):
+    """Awaitable :func:`mgmetis.metis.node_nd`, see :class:`Partitioner`"""
+    return await get_default_partitioner().node_nd(xadj, adjncy, **kw)
@@ -0,0 +1,451 @@
+# -*- coding: utf-8 -*-
+"""Cost-model-driven dynamic load balancing
+
+:func:`mgmetis.parmetis.adaptive_repart_kway` answers *how* to repartition,
+but not *when* or with which ``itr``. :class:`LoadBalancer` makes these
+decisions from timings measured in the application:
+
+- Every time step, the per-rank compute and halo-exchange times are recorded.
+  A bulk synchronous step takes ``max(compute + halo)``, whereas a balanced
+  partition would take about ``mean(compute) + halo0``, where ``halo0`` is
+  the halo time right after the last rebalance. The difference is the time
+  lost in this step.
+- The losses are accumulated since the last rebalance, and a rebalance is
+  triggered as soon as the accumulated loss exceeds the estimated cost of
+  rebalancing, i.e., the (measured) partitioning plus migration times. This
+  is the classic rent-or-buy rule, i.e., the time lost by waiting never
+  exceeds the cost of the rebalance itself.
+- ``itr``, i.e., the ratio of communication time to redistribution time, is
+  estimated by the halo time accumulated over a typical rebalancing interval
+  divided by the migration time.
+- If the compute times are nearly balanced (e.g., only the edge cut has
+  degraded), then the cheaper :func:`mgmetis.parmetis.refine_kway` is used
+  instead of :func:`mgmetis.parmetis.adaptive_repart_kway`.
+
+The measured timings are combined with exponential moving averages, and all
+decisions and timings are exposed in :attr:`LoadBalancer.metrics`.
+
+On heterogeneous clusters, equal target part weights leave the fast ranks
+idle. :class:`ThroughputEstimator` benchmarks a short kernel on every rank
+(or takes measured throughputs), smooths the estimates over time, and turns
+them into the per-part, per-constraint ``tpwgts`` of
+:func:`mgmetis.parmetis.part_kway`, :func:`mgmetis.parmetis.part_mesh_kway`
+and :func:`mgmetis.parmetis.adaptive_repart_kway` (and the serial routines
+in :mod:`mgmetis.metis`).
+
+.. module:: mgmetis.balance
+.. moduleauthor:: Qiao Chen, <benechiao@gmail.com>
+"""
+
+import time
+from collections import namedtuple
+
+import numpy as np
+
+__all__ = ["Decision", "LoadBalancer", "ThroughputEstimator"]
+
+
+class Decision(namedtuple("Decision", ["step", "action", "itr", "loss", "cost", "imbalance"])):
+    """A decision of :class:`LoadBalancer`
+
+    Attributes
+    ----------
+    step : int
+        The time step of the decision
+    action : {"none", "refine", "repart"}
+        Whether and how to rebalance
+    itr : float
+        Estimated ratio of communication time to redistribution time
+    loss : float
+        Time lost to imbalance (and degraded cut) since the last rebalance
+    cost : float
+        Estimated time of rebalancing, i.e., partitioning plus migration
+    imbalance : float
+        Ratio of the largest to the mean compute time in the last step
+    """
+
+    __slots__ = ()
+
+
+class LoadBalancer:
+    """Decide when and how to rebalance from measured timings
+
+    Parameters
+    ----------
+    comm : MPI_Comm, optional
+        MPI communicator. If given, then the timings passed to
+        :meth:`record` are the local ones of this rank and are gathered;
+        otherwise, they are arrays of all ranks, i.e., collected by the
+        caller.
+    refine_tol : float, optional
+        Compute imbalance below which :func:`mgmetis.parmetis.refine_kway` is
+        used instead of repartitioning, default is 1.1.
+    repart_cost : float, optional
+        Initial estimate of the rebalancing cost (in seconds), until it's
+        measured, default is the duration of the first time step.
+    horizon : int, optional
+        Assumed number of steps between rebalances for estimating `itr`,
+        until it's measured, default is 100.
+    min_interval : int, optional
+        Minimum number of steps between two rebalances, default is 1.
+    smoothing : float, optional
+        Weight of the newest measurement in the moving averages, default is
+        0.5.
+
+    Examples
+    --------
+    >>> from mgmetis.balance import LoadBalancer
+    >>> lb = LoadBalancer(comm)
+    >>> for step in range(nsteps):
+    ...     lb.record(compute_time, halo_time)
+    ...     action, _, part = lb.rebalance(nparts, xadj, adjncy, part, vwgt=vwgt)
+    ...     if action != "none":
+    ...         t = time.perf_counter()
+    ...         migrate(part)
+    ...         lb.record_migration(time.perf_counter() - t)
+    >>> lb.metrics
+    """
+
+    def __init__(self, comm=None, refine_tol=1.1, repart_cost=None, horizon=100, min_interval=1, smoothing=0.5):
+        if not 0.0 < smoothing <= 1.0:
+            raise ValueError("smoothing must be in (0, 1]")
+        self.comm = comm
+        self.refine_tol = float(refine_tol)
+        self.min_interval = max(int(min_interval), 1)
+        self.smoothing = float(smoothing)
+        self.history = []
+        self._cost0 = repart_cost
+        self._horizon = float(horizon)
+        self._step = 0
+        self._last = 0  # step of the last rebalance
+        self._loss = 0.0
+        self._halo0 = None
+        self._halo = None
+        self._imbalance = 1.0
+        self._part_time = {"refine": None, "repart": None}
+        self._mig_time = None
+        self._totals = {"partition_time": 0.0, "migration_time": 0.0, "lost_time": 0.0, "step_time": 0.0}
+        self._counts = {"none": 0, "refine": 0, "repart": 0}
+
+    def _ema(self, old, new):
+        # helper to update a moving average
+        return new if old is None else (1.0 - self.smoothing) * old + self.smoothing * new
+
+    def _gather(self, value):
+        # helper to get the values of all ranks
+        if self.comm is None:
+            return np.asarray(value, dtype=np.float64).reshape(-1)
+        return np.asarray(self.comm.allgather(float(value)), dtype=np.float64)
+
+    def _max(self, value):
+        # helper to get the max of all ranks
+        return value if self.comm is None else self.comm.allreduce(value, op=_mpi_max())
+
+    def record(self, compute, halo=0.0):
+        """Record the timings of a time step
+
+        Parameters
+        ----------
+        compute : {float, array_like}
+            Compute time (of each rank)
+        halo : {float, array_like}, optional
+            Halo-exchange time (of each rank), default is zero.
+        """
+        compute = self._gather(compute)
+        halo = np.broadcast_to(self._gather(halo), compute.shape)
+        mean = float(compute.mean())
+        halo_mean = float(halo.mean())
+        if self._halo0 is None:
+            self._halo0 = halo_mean
+        step_time = float((compute + halo).max())
+        loss = max(step_time - mean - self._halo0, 0.0)
+        self._step += 1
+        self._loss += loss
+        self._halo = self._ema(self._halo, halo_mean)
+        self._imbalance = float(compute.max()) / mean if mean > 0 else 1.0
+        if self._cost0 is None:
+            self._cost0 = step_time
+        self._totals["lost_time"] += loss
+        self._totals["step_time"] += step_time
+
+    def record_migration(self, seconds):
+        """Record the time of migrating the data after a rebalance
+
+        Parameters
+        ----------
+        seconds : float
+            Migration time of this rank (or the max of all ranks)
+        """
+        seconds = self._max(float(seconds))
+        self._mig_time = self._ema(self._mig_time, seconds)
+        self._totals["migration_time"] += seconds
+
+    def _action(self):
+        # helper to determine the kind of rebalance w.r.t. the last step
+        return "refine" if self._imbalance <= self.refine_tol else "repart"
+
+    @property
+    def cost(self):
+        """float: estimated time of the next rebalance"""
+        part_time = self._part_time[self._action()]
+        if part_time is None:
+            part_time = self._part_time["repart"]
+        if part_time is None and self._mig_time is None:
+            return float(self._cost0 or 0.0)
+        return (part_time or 0.0) + (self._mig_time or 0.0)
+
+    @property
+    def itr(self):
+        """float: estimated ``itr`` of :func:`mgmetis.parmetis.adaptive_repart_kway`"""
+        if not self._mig_time or self._halo is None:
+            return 1000.0
+        return float(np.clip(self._halo * self._horizon / self._mig_time, 1e-6, 1e6))
+
+    def decide(self):
+        """Decide whether and how to rebalance after the recorded steps
+
+        Returns
+        -------
+        Decision
+            The decision, which is also appended to :attr:`history`.
+        """
+        cost = self.cost
+        action = "none"
+        if self._step - self._last >= self.min_interval and self._loss > 0.0 and self._loss >= cost:
+            action = self._action()
+        decision = Decision(self._step, action, self.itr, self._loss, cost, self._imbalance)
+        self.history.append(decision)
+        self._counts[action] += 1
+        return decision
+
+    def reset(self, action="repart", seconds=None):
+        """Start a new interval after rebalancing
+
+        This is called by :meth:`rebalance`, but needed if the partitioning
+        routine is called outside.
+
+        Parameters
+        ----------
+        action : {"refine", "repart"}, optional
+            The kind of the rebalance, default is "repart".
+        seconds : float, optional
+            Time spent in partitioning
+        """
+        if action not in self._part_time:
+            raise ValueError("unknown action {}".format(action))
+        if seconds is not None:
+            self._part_time[action] = self._ema(self._part_time[action], seconds)
+            self._totals["partition_time"] += seconds
+        if self._last:
+            self._horizon = self._ema(self._horizon, self._step - self._last)
+        self._last = self._step
+        self._loss = 0.0
+        self._halo0 = None
+
+    def rebalance(self, nparts, xadj, adjncy, part, vtxdist=None, **kw):
+        """Decide and, if it pays off, call ParMETIS
+
+        Parameters
+        ----------
+        nparts : int
+            Number of partitions
+        xadj, adjncy, part, vtxdist : np.ndarray
+            Local graph and partition as in
+            :func:`mgmetis.parmetis.adaptive_repart_kway`
+        **kw
+            Other inputs of the ParMETIS routines, e.g., ``vwgt``, ``vsize``
+            and ``tpwgts`` (see :meth:`ThroughputEstimator.as_kw`).
+
+        Returns
+        -------
+        action : {"none", "refine", "repart"}
+            The decision
+        edgecut : {int, None}
+            Edge cut, None if not rebalanced
+        part : np.ndarray
+            The new partition, or the input one if not rebalanced.
+        """
+        from . import parmetis  # pylint: disable=import-outside-toplevel
+
+        decision = self.decide()
+        if decision.action == "none":
+            return "none", None, part
+        tic = time.perf_counter()
+        if decision.action == "refine":
+            edgecut, part = parmetis.refine_kway(nparts, xadj, adjncy, part, vtxdist=vtxdist, comm=self.comm, **kw)
+        else:
+            edgecut, part = parmetis.adaptive_repart_kway(
+                nparts, xadj, adjncy, part, vtxdist=vtxdist, itr=decision.itr, comm=self.comm, **kw
+            )
+        self.reset(decision.action, self._max(time.perf_counter() - tic))
+        return decision.action, edgecut, part
+
+    @property
+    def metrics(self):
+        """dict: counts of the decisions, accumulated and estimated timings"""
+        metrics = {"steps": self._step, "decisions": dict(self._counts)}
+        metrics.update(self._totals)
+        metrics.update(
+            {
+                "loss": self._loss,
+                "cost": self.cost,
+                "itr": self.itr,
+                "imbalance": self._imbalance,
+                "halo_time": self._halo,
+                "refine_time": self._part_time["refine"],
+                "repart_time": self._part_time["repart"],
+                "avg_migration_time": self._mig_time,
+                "interval": self._horizon,
+            }
+        )
+        return metrics
+
+
+class ThroughputEstimator:
+    """Target part weights proportional to measured throughputs
+
+    Part `i` is assumed to be computed by rank `i`, and its target weight of
+    each constraint is the throughput of rank `i` (for the work measured by
+    that constraint) normalized over all parts.
+
+    Parameters
+    ----------
+    nparts : int
+        Number of parts (i.e., ranks)
+    ncon : int, optional
+        Number of balancing constraints, default is 1.
+    comm : MPI_Comm, optional
+        MPI communicator used by :meth:`benchmark`, if not specified, then
+        will use MPI_COMM_WORLD and try to initialize MPI via `mpi4py`.
+    smoothing : float, optional
+        Weight of the newest measurement in the moving average, default is
+        0.5.
+
+    Examples
+    --------
+    >>> from mgmetis import parmetis
+    >>> from mgmetis.balance import ThroughputEstimator
+    >>> est = ThroughputEstimator(comm.size, comm=comm)
+    >>> est.benchmark(kernel, block, work=block.size)
+    >>> _, part = parmetis.part_kway(comm.size, xadj, adjncy, comm=comm, **est.as_kw())
+    >>> # later, from the timings of the application
+    >>> est.update(comm.allgather(local_work / compute_time))
+    """
+
+    def __init__(self, nparts, ncon=1, comm=None, smoothing=0.5):
+        if nparts <= 0:
+            raise ValueError("invalid nparts")
+        if ncon < 1:
+            raise ValueError("invalid ncon, should be at least 1")
+        if not 0.0 < smoothing <= 1.0:
+            raise ValueError("smoothing must be in (0, 1]")
+        self.nparts = int(nparts)
+        self.ncon = int(ncon)
+        self.comm = comm
+        self.smoothing = float(smoothing)
+        self.throughput = None
+
+    @staticmethod
+    def measure(kernel, *args, work=1.0, repeat=3):
+        """Measure the throughput of a kernel on this rank
+
+        Parameters
+        ----------
+        kernel : callable
+            A short representative kernel, called as ``kernel(*args)``
+        work : {float, array_like}, optional
+            Amount of work done by a single call, or of each constraint,
+            default is 1.
+        repeat : int, optional
+            Number of runs, the fastest of which is used, default is 3.
+
+        Returns
+        -------
+        np.ndarray
+            Work per second
+        """
+        best = float("inf")
+        for _ in range(max(int(repeat), 1)):
+            tic = time.perf_counter()
+            kernel(*args)
+            best = min(best, time.perf_counter() - tic)
+        # NOTE: avoid division by zero for trivial kernels
+        return np.asarray(work, dtype=np.float64).reshape(-1) / max(best, 1e-9)
+
+    def benchmark(self, kernel, *args, work=1.0, repeat=3):
+        """Measure the throughputs of all ranks and update the estimates
+
+        This is collective, and the communicator size must be `nparts`. See
+        :meth:`measure` for the parameters.
+
+        Returns
+        -------
+        np.ndarray
+            The updated :attr:`tpwgts`
+        """
+        from .par_utils import get_comm  # pylint: disable=import-outside-toplevel
+
+        comm = get_comm(self.comm)
+        if comm.size != self.nparts:
+            raise ValueError("benchmark requires one part per rank, got {} ranks".format(comm.size))
+        local = self.measure(kernel, *args, work=work, repeat=repeat)
+        return self.update(comm.allgather(local))
+
+    def update(self, throughput):
+        """Update the estimates with new measurements
+
+        Parameters
+        ----------
+        throughput : array_like
+            Throughputs of all parts, either of size `nparts` (same for all
+            constraints) or of shape ``(nparts, ncon)``.
+
+        Returns
+        -------
+        np.ndarray
+            The updated :attr:`tpwgts`
+        """
+        thr = np.asarray(throughput, dtype=np.float64)
+        if thr.size == self.nparts:
+            thr = np.repeat(thr.reshape(-1, 1), self.ncon, axis=1)
+        elif thr.size == self.nparts * self.ncon:
+            thr = thr.reshape(self.nparts, self.ncon)
+        else:
+            raise ValueError("throughput should be size of {} or {}".format(self.nparts, self.nparts * self.ncon))
+        if not np.all(np.isfinite(thr)) or np.any(thr <= 0.0):
+            raise ValueError("throughput must be positive")
+        # NOTE: only the relative speeds matter, so the measurements are
+        # normalized first, which makes the average robust against global
+        # slowdowns, e.g., contention in a benchmark run
+        thr = thr / thr.sum(axis=0)
+        if self.throughput is None:
+            self.throughput = thr
+        else:
+            self.throughput = (1.0 - self.smoothing) * self.throughput + self.smoothing * thr
+        return self.tpwgts
+
+    @property
+    def tpwgts(self):
+        """np.ndarray: target part weights of size ``nparts*ncon``, i.e.,
+        `tpwgts[i*ncon+j]` is the fraction of constraint `j` of part `i`,
+        uniform if nothing is measured yet"""
+        if self.throughput is None:
+            return np.full(self.nparts * self.ncon, 1.0 / self.nparts, dtype=np.float32)
+        return np.asarray(self.throughput / self.throughput.sum(axis=0), dtype=np.float32).reshape(-1)
+
+    def as_kw(self):
+        """Get the keyword inputs of the partitioning routines
+
+        Returns
+        -------
+        dict
+            ``{"tpwgts": tpwgts, "ncon": ncon}``
+        """
+        return {"tpwgts": self.tpwgts, "ncon": self.ncon}
+
+
+def _mpi_max():
+    # helper to get MPI.MAX lazily
+    from mpi4py import MPI  # pylint: disable=import-outside-toplevel
+
+    return MPI.MAX
@@ -0,0 +1,226 @@
+# -*- coding: utf-8 -*-
+"""Partitioning and ordering of block (multi-DOF) sparse matrices
+
+For systems with several degrees of freedom (DOFs) per node, e.g., stiffness
+matrices with 3 to 6 DOFs per node, the scalar CSR graph is :math:`b^2` times
+larger than the node graph, where :math:`b` is the block size. This module
+contracts the matrix into its node graph, calls METIS on the node graph, and
+expands the results back to DOF level.
+
+.. module:: mgmetis.block
+.. moduleauthor:: Qiao Chen, <benechiao@gmail.com>
+"""
+
+import numpy as np
+
+from . import metis
+from .utils import process_graph
+
+__all__ = [
+    "contract_blocks",
+    "expand_part",
+    "expand_perm",
+    "part_graph_block",
+    "node_nd_block",
+]
+
+
+def _process_matrix(*mat, **kw):
+    # helper to get 0-based (row, col) node pairs, number of nodes, the
+    # DOF-to-node map and the integer type from either a BSR-like matrix, a
+    # CSR-like matrix or CSR arrays
+    bs = kw.get("blocksize", None)
+    dof_map = kw.get("dof_map", None)
+    if len(mat) == 1:
+        A = mat[0]
+        if getattr(A, "format", None) == "bsr":
+            if A.blocksize[0] != A.blocksize[1]:
+                raise ValueError("BSR matrix must have square blocks")
+            # NOTE: the block structure is the node graph
+            bs = A.blocksize[0]
+            indptr, indices, nn = process_graph(A.indptr, A.indices)
+            rows = np.repeat(np.arange(nn), np.diff(indptr))
+            cols = indices[: rows.size] - indptr[0]
+            return rows, cols, nn, np.arange(nn * bs) // bs, indptr.dtype
+        mat = (A.indptr, A.indices)
+    if len(mat) != 2:
+        raise ValueError("input matrix must be either a sparse matrix or indptr, indices")
+    indptr, indices, ndofs = process_graph(*mat)
+    if dof_map is None:
+        if bs is None or bs < 1:
+            raise ValueError("either blocksize or dof_map must be provided")
+        if ndofs % bs:
+            raise ValueError("matrix size {} is not a multiple of {}".format(ndofs, bs))
+        dof_map = np.arange(ndofs) // bs
+        nn = ndofs // bs
+    else:
+        dof_map = np.asarray(dof_map).reshape(-1)
+        if dof_map.size != ndofs:
+            raise ValueError("dof_map must be size of {}".format(ndofs))
+        nn = int(np.max(dof_map)) + 1 if ndofs else 0
+    rows = np.repeat(dof_map, np.diff(indptr))
+    cols = dof_map[indices[: rows.size] - indptr[0]]
+    return rows, cols, nn, dof_map, indptr.dtype
+
+
+def contract_blocks(*mat, **kw):
+    """Contract a block sparse matrix into its node graph
+
+    Parameters
+    ----------
+    *mat : positional arguments
+        Either a single sparse matrix (any object with attributes `indptr`
+        and `indices`, e.g., ``scipy.sparse.csr_matrix``) or the CSR arrays
+        `indptr` and `indices`. If the matrix is in BSR format (attribute
+        ``format == "bsr"``), then its block structure is used directly.
+    blocksize : int, optional
+        Number of DOFs per node, the DOFs of a node are assumed to be
+        consecutive. Required for CSR input unless `dof_map` is given.
+    dof_map : array_like, optional
+        Node ID of each DOF, used for variable number of DOFs per node.
+
+    Returns
+    -------
+    xadj, adjncy : np.ndarray
+        The node graph (CSR) with the diagonal dropped and C-based index, in
+        the same integer type as the input `indptr`.
+    dof_map : np.ndarray
+        Node ID of each DOF.
+
+    Notes
+    -----
+    METIS requires the graph to be undirected, which holds if the matrix is
+    structurally symmetric. Otherwise, use :func:`mgmetis.utils.symmetrize_graph`
+    on the returned graph.
+    """
+    rows, cols, nn, dof_map, dtype = _process_matrix(*mat, **kw)
+    # NOTE: int64 keys for unique node pairs, dropping the diagonal
+    keys = rows.astype(np.int64) * nn + cols
+    keys = np.unique(keys[rows != cols])
+    rows, cols = np.divmod(keys, nn) if nn else (keys, keys)
+    xadj = np.zeros(nn + 1, dtype=dtype)
+    np.cumsum(np.bincount(rows, minlength=nn), out=xadj[1:])
+    return xadj, np.asarray(cols, dtype=dtype), dof_map
+
+
+def expand_part(part, dof_map):
+    """Expand a node partition array to DOF level
+
+    Parameters
+    ----------
+    part : np.ndarray
+        Node partition array
+    dof_map : np.ndarray
+        Node ID of each DOF
+
+    Returns
+    -------
+    np.ndarray
+        DOF partition array
+    """
+    return np.asarray(part)[dof_map]
+
+
+def expand_perm(iperm, dof_map):
+    """Expand a node permutation to DOF level
+
+    The DOFs of each node are kept consecutive and in their original order.
+
+    Parameters
+    ----------
+    iperm : np.ndarray
+        Inverse permutation of the nodes, i.e., the new position of each node.
+    dof_map : np.ndarray
+        Node ID of each DOF
+
+    Returns
+    -------
+    perm, iperm : np.ndarray
+        Permutation and inverse permutation of the DOFs, see
+        :func:`mgmetis.metis.node_nd` for the conventions.
+    """
+    iperm = np.asarray(iperm)
+    perm = np.argsort(iperm[dof_map], kind="stable").astype(iperm.dtype, copy=False)
+    dof_iperm = np.empty_like(perm)
+    dof_iperm[perm] = np.arange(perm.size, dtype=perm.dtype)
+    return perm, dof_iperm
+
+
+def _node_vwgt(dof_map, nn, kw):
+    # helper to use number of DOFs per node as default vertex weights
+    if kw.get("vwgt", None) is not None or kw.get("ncon", 1) != 1:
+        return kw.get("vwgt", None)
+    counts = np.bincount(dof_map, minlength=nn)
+    if counts.size and np.all(counts == counts[0]):
+        return None
+    return counts
+
+
+def part_graph_block(nparts, *mat, **kw):
+    """Partition a block sparse matrix on its node graph
+
+    Parameters
+    ----------
+    nparts : int
+        Number of partitions
+    *mat : positional arguments
+        Sparse matrix, see :func:`contract_blocks`
+    blocksize : int, optional
+        Number of DOFs per node, see :func:`contract_blocks`
+    dof_map : array_like, optional
+        Node ID of each DOF, see :func:`contract_blocks`
+    recursive : bool, optional
+        If True, then use :func:`mgmetis.metis.part_graph_recursize`, otherwise
+        (default) :func:`mgmetis.metis.part_graph_kway`.
+
+    Returns
+    -------
+    objval : int
+        The objective value on the node graph
+    part : np.ndarray
+        The DOF partition array
+
+    Other Parameters
+    ----------------
+    **kw : keyword arguments
+        Passed to the METIS routine. Weights are given on node level. If
+        `vwgt` is not provided and the number of DOFs per node varies, then the
+        DOF counts are used as vertex weights.
+    """
+    xadj, adjncy, dof_map = contract_blocks(*mat, **kw)
+    kw = {k: v for k, v in kw.items() if k not in ("blocksize", "dof_map", "part")}
+    kw["vwgt"] = _node_vwgt(dof_map, xadj.size - 1, kw)
+    kernel = (
+        metis.part_graph_recursize if kw.pop("recursive", False) else metis.part_graph_kway
+    )
+    objval, part = kernel(nparts, xadj, adjncy, **kw)
+    return objval, expand_part(part, dof_map)
+
+
+def node_nd_block(*mat, **kw):
+    """Fill-reducing ordering of a block sparse matrix on its node graph
+
+    Parameters
+    ----------
+    *mat : positional arguments
+        Sparse matrix, see :func:`contract_blocks`
+    blocksize : int, optional
+        Number of DOFs per node, see :func:`contract_blocks`
+    dof_map : array_like, optional
+        Node ID of each DOF, see :func:`contract_blocks`
+
+    Returns
+    -------
+    perm, iperm : np.ndarray
+        DOF-level permutation and inverse permutation
+
+    Other Parameters
+    ----------------
+    **kw : keyword arguments
+        Passed to :func:`mgmetis.metis.node_nd`.
+    """
+    xadj, adjncy, dof_map = contract_blocks(*mat, **kw)
+    kw = {k: v for k, v in kw.items() if k not in ("blocksize", "dof_map", "perm", "iperm")}
+    kw["vwgt"] = _node_vwgt(dof_map, xadj.size - 1, kw)
+    _, iperm = metis.node_nd(xadj, adjncy, **kw)
+    return expand_perm(iperm, dof_map)
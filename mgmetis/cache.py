@@ -0,0 +1,238 @@
+# -*- coding: utf-8 -*-
+"""Content-addressed on-disk cache of partitioning results
+
+Repartitioning the same graph or mesh with the same parameters is a common
+waste in restarts and CI runs. :class:`PartitionCache` wraps the METIS
+routines; the results are keyed by a BLAKE2 hash of the input arrays, the
+parameters, the options and the version of mgmetis, and each result is stored
+as a single ``.npy`` file that is read back through ``np.memmap``.
+
+Writes go to temporary files that are atomically renamed, so that concurrent
+processes never see partial entries. The total size of the cache directory is
+bounded by evicting the least recently used entries, i.e., the ones with the
+oldest modification time (which is refreshed on every hit).
+
+.. module:: mgmetis.cache
+.. moduleauthor:: Qiao Chen, <benechiao@gmail.com>
+"""
+
+import os
+import hashlib
+import tempfile
+
+import numpy as np
+
+try:
+    import fcntl
+except ImportError:  # pragma: no cover
+    fcntl = None
+
+from . import __version__, metis
+
+__all__ = ["PartitionCache"]
+
+# NOTE: keyword inputs that don't affect the results
+_IGNORED_KW = ("part", "epart", "npart", "perm", "iperm", "validate", "memory_report")
+
+
+def _hash_value(h, value):
+    # helper to feed a (nested) input value into the hash object
+    if value is None:
+        h.update(b"N")
+    elif isinstance(value, (int, np.integer)):
+        h.update(b"I%d" % value)
+    elif isinstance(value, (list, tuple)) and value and not np.isscalar(value[0]):
+        h.update(b"L%d" % len(value))
+        for v in value:
+            _hash_value(h, v)
+    else:
+        arr = np.ascontiguousarray(value)
+        if arr.dtype.hasobject:
+            raise TypeError("cannot hash input of object dtype")
+        h.update("A{}{}".format(arr.dtype.str, arr.shape).encode())
+        h.update(memoryview(arr.reshape(-1)).cast("B"))
+
+
+class PartitionCache:
+    """On-disk cache of partitioning and ordering results
+
+    The methods mirror the corresponding routines in :mod:`mgmetis.metis`.
+
+    Parameters
+    ----------
+    path : str, optional
+        Cache directory, default is ``$MGMETIS_CACHE_DIR`` or
+        ``~/.cache/mgmetis``.
+    max_bytes : int, optional
+        Maximum total size of the cache entries, default is 1GB.
+
+    Examples
+    --------
+    >>> from mgmetis.cache import PartitionCache
+    >>> cache = PartitionCache("/tmp/parts")
+    >>> objval, part = cache.part_graph_kway(4, xadj, adjncy)
+
+    Notes
+    -----
+    On hits, the cached results are copied into the user output buffers
+    (e.g., `part`) if given, otherwise copy-on-write memory maps are
+    returned. METIS isn't called on hits, so the `memory_report` dictionary is
+    cleared and left empty.
+    """
+
+    def __init__(self, path=None, max_bytes=1 << 30):
+        if path is None:
+            path = os.environ.get(
+                "MGMETIS_CACHE_DIR", os.path.join(os.path.expanduser("~"), ".cache", "mgmetis")
+            )
+        self.path = path
+        self.max_bytes = int(max_bytes)
+        self.hits = 0
+        self.misses = 0
+        os.makedirs(path, exist_ok=True)
+
+    def key(self, kernel, *args, **kw):
+        """Compute the cache key of a call
+
+        Parameters
+        ----------
+        kernel : str
+            Name of the routine in :mod:`mgmetis.metis`
+        *args, **kw
+            Inputs of the routine
+
+        Returns
+        -------
+        str
+            Hex digest of the inputs
+        """
+        h = hashlib.blake2b(digest_size=20)
+        h.update("{}:{}".format(__version__, kernel).encode())
+        for arg in args:
+            _hash_value(h, arg)
+        for k in sorted(kw):
+            if k not in _IGNORED_KW:
+                h.update("K{}".format(k).encode())
+                _hash_value(h, kw[k])
+        return h.hexdigest()
+
+    def _file(self, key):
+        # helper to get the entry file name
+        return os.path.join(self.path, key + ".npy")
+
+    def _load(self, key):
+        # helper to load an entry, returns None on miss; the record layout is
+        # [n, size_1, ..., size_n, data_1, ..., data_n]
+        fn = self._file(key)
+        try:
+            record = np.load(fn, mmap_mode="c")
+            os.utime(fn)
+        except (OSError, ValueError):
+            return None
+        n = int(record[0])
+        bounds = np.cumsum(np.concatenate(([n + 1], record[1 : n + 1])))
+        return [record[s:e] for s, e in zip(bounds[:-1], bounds[1:])]
+
+    def _lock(self):
+        # helper to get an exclusive lock of the cache directory
+        f = open(os.path.join(self.path, ".lock"), "a")  # pylint: disable=consider-using-with
+        if fcntl is not None:
+            fcntl.flock(f, fcntl.LOCK_EX)
+        return f
+
+    def _store(self, key, items):
+        # helper to write an entry atomically and then evict old entries
+        # NOTE: the integer type of the arrays, which are the last items
+        items = [np.asarray(x).reshape(-1) for x in items]
+        dtype = items[-1].dtype
+        record = np.concatenate(
+            ([len(items)], [x.size for x in items], *items), axis=None
+        ).astype(dtype, copy=False)
+        fd, tmp = tempfile.mkstemp(dir=self.path, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                np.save(f, record)
+            os.replace(tmp, self._file(key))
+        except BaseException:
+            os.unlink(tmp)
+            raise
+        self.evict()
+
+    def evict(self, max_bytes=None):
+        """Evict the least recently used entries
+
+        Parameters
+        ----------
+        max_bytes : int, optional
+            Size bound, default is the one of the cache.
+        """
+        max_bytes = self.max_bytes if max_bytes is None else max_bytes
+        with self._lock():
+            entries = []
+            for entry in os.scandir(self.path):
+                if entry.name.endswith(".npy"):
+                    try:
+                        st = entry.stat()
+                    except OSError:
+                        continue
+                    entries.append((st.st_mtime, st.st_size, entry.path))
+            total = sum(e[1] for e in entries)
+            for _, size, fn in sorted(entries):
+                if total <= max_bytes:
+                    break
+                try:
+                    os.unlink(fn)
+                except OSError:
+                    pass
+                total -= size
+
+    def clear(self):
+        """Remove all entries"""
+        self.evict(0)
+
+    def _call(self, kernel, nscalars, outputs, args, kw):
+        # helper to run a METIS routine through the cache, the first nscalars
+        # results are integers and the rest are the arrays named by outputs
+        key = self.key(kernel, *args, **kw)
+        items = self._load(key)
+        if items is not None:
+            self.hits += 1
+            report = kw.get("memory_report", None)
+            if report is not None:
+                report.clear()
+            arrays = []
+            for name, x in zip(outputs, items[nscalars:]):
+                buf = kw.get(name, None)
+                if buf is not None:
+                    # NOTE: same as get_or_create_workspace
+                    buf = np.asarray(buf, dtype=x.dtype)
+                    if buf.size < x.size:
+                        raise ValueError("{} should be at least size of {}".format(name, x.size))
+                    buf.reshape(-1)[: x.size] = x
+                    x = buf
+                arrays.append(x)
+            return tuple(int(x[0]) for x in items[:nscalars]) + tuple(arrays)
+        self.misses += 1
+        res = getattr(metis, kernel)(*args, **kw)
+        self._store(key, res)
+        return res
+
+    def part_graph_kway(self, nparts, xadj, adjncy, **kw):
+        """Cached :func:`mgmetis.metis.part_graph_kway`"""
+        return self._call("part_graph_kway", 1, ("part",), (nparts, xadj, adjncy), kw)
+
+    def part_graph_recursize(self, nparts, xadj, adjncy, **kw):
+        """Cached :func:`mgmetis.metis.part_graph_recursize`"""
+        return self._call("part_graph_recursize", 1, ("part",), (nparts, xadj, adjncy), kw)
+
+    def part_mesh_nodal(self, nparts, *cells, **kw):
+        """Cached :func:`mgmetis.metis.part_mesh_nodal`"""
+        return self._call("part_mesh_nodal", 1, ("epart", "npart"), (nparts,) + cells, kw)
+
+    def part_mesh_dual(self, nparts, *cells, **kw):
+        """Cached :func:`mgmetis.metis.part_mesh_dual`"""
+        return self._call("part_mesh_dual", 1, ("epart", "npart"), (nparts,) + cells, kw)
+
+    def node_nd(self, xadj, adjncy, **kw):
+        """Cached :func:`mgmetis.metis.node_nd`"""
+        return self._call("node_nd", 0, ("perm", "iperm"), (xadj, adjncy), kw)
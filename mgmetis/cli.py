@@ -0,0 +1,476 @@
+# -*- coding: utf-8 -*-
+"""Command-line partitioner
+
+The ``mgmetis`` console script works like the METIS programs ``gpmetis``,
+``mpmetis`` and ``ndmetis``::
+
+    mgmetis graph GRAPHFILE NPARTS [options]
+    mgmetis mesh MESHFILE NPARTS [options]
+    mgmetis nd GRAPHFILE [options]
+
+The input files are read through memory mapping and can be
+
+- METIS text files (``.graph``, ``.mesh``, etc.), see the METIS manual,
+- GKlib binary CSR files (``.bin``) written by ``gk_csr_Write``, i.e.,
+  ``int32`` numbers of rows and columns, ``int64`` row pointers, ``int32``
+  column indices and optionally ``float32`` values, which are used as the
+  edge weights of graphs, or
+- NumPy files, i.e., a directory or an ``.npz`` archive with ``xadj.npy`` and
+  ``adjncy.npy`` (graphs) or ``eptr.npy`` and ``eind.npy`` (meshes), and
+  optionally ``vwgt.npy``, ``vsize.npy`` and ``adjwgt.npy``.
+
+Multi-constraint vertex weights of graphs are passed through; meshes take a
+single weight per element, which is only supported with ``--gtype dual``.
+
+METIS options are given with ``-O NAME=VALUE``, where ``NAME`` is a member of
+:class:`mgmetis.enums.OPTION` and ``VALUE`` is either an integer or a member of
+the corresponding enumeration, e.g., ``-O ctype=rm -O ufactor=50``.
+
+A timing breakdown of the phases (load, validate, convert, kernel, write) and
+the peak memory are printed after each run.
+
+.. module:: mgmetis.cli
+.. moduleauthor:: Qiao Chen, <benechiao@gmail.com>
+"""
+
+import os
+import sys
+import json
+import mmap
+import time
+import argparse
+
+import numpy as np
+
+from . import __version__, metis, enums
+from .utils import (
+    process_graph,
+    validate_graph,
+    MetisError,
+    MetisInputError,
+    MetisMemoryError,
+)
+
+try:
+    import resource
+except ImportError:  # pragma: no cover
+    resource = None
+
+__all__ = ["main"]
+
+# NOTE: option enums whose names differ from the option names
+_OPTION_ENUMS = {"DBGLVL": enums.DBG}
+
+
+class _Timer:
+    # accumulated wall time of the phases
+    def __init__(self):
+        self.phases = {}
+        self._phase = None
+        self._tic = None
+
+    def __call__(self, phase):
+        self._phase = phase
+        return self
+
+    def __enter__(self):
+        self._tic = time.perf_counter()
+
+    def __exit__(self, *args):
+        t = time.perf_counter() - self._tic
+        self.phases[self._phase] = self.phases.get(self._phase, 0.0) + t
+
+
+def _map_file(fn):
+    # helper to memory map a file as a read-only byte array
+    with open(fn, "rb") as f:
+        if os.fstat(f.fileno()).st_size == 0:
+            raise ValueError("{} is empty".format(fn))
+        mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    return np.frombuffer(mm, dtype=np.uint8)
+
+
+def _tokenize(buf):
+    # helper to parse the non-negative integers of a text file, lines starting
+    # with % are comments. Returns the values and the (0-based) line of each
+    # value among the non-comment lines, and the number of such lines
+    space = (buf == 32) | (buf == 9) | (buf == 13) | (buf == 10)
+    line_starts = np.concatenate(([0], np.flatnonzero(buf == 10) + 1))
+    line_starts = line_starts[line_starts < buf.size]
+    starts = np.flatnonzero(~space[1:] & space[:-1]) + 1
+    if not space[0]:
+        starts = np.concatenate(([0], starts))
+    ends = np.flatnonzero(space[1:] & ~space[:-1]) + 1
+    if not space[-1]:
+        ends = np.append(ends, buf.size)
+    del space
+    lines = np.searchsorted(line_starts, starts, side="right") - 1
+    # NOTE: drop the comment lines and renumber the others
+    comment = buf[line_starts] == ord("%")
+    keep = ~comment[lines]
+    starts, ends = starts[keep], ends[keep]
+    lines = (np.cumsum(~comment) - 1)[lines[keep]]
+    lengths = ends - starts
+    values = np.zeros(starts.size, dtype=np.int64)
+    for k in range(int(lengths.max()) if lengths.size else 0):
+        active = np.flatnonzero(lengths > k)
+        digits = buf[starts[active] + k].astype(np.int64) - ord("0")
+        if np.any((digits < 0) | (digits > 9)):
+            raise ValueError("invalid integer at line {}".format(lines[active[0]] + 1))
+        values[active] = values[active] * 10 + digits
+    return values, lines, int(np.count_nonzero(~comment))
+
+
+def _line_layout(lines, nrows):
+    # helper to get the token offsets of rows 1 to nrows (row 0 is the header)
+    counts = np.bincount(lines, minlength=nrows + 1)[: nrows + 1]
+    offsets = np.zeros(nrows + 2, dtype=np.int64)
+    np.cumsum(counts, out=offsets[1:])
+    return offsets[1:]
+
+
+def _read_metis_graph(fn):
+    # helper to read a graph in the METIS text format, i.e., a header line
+    # "nv ne [fmt [ncon]]" followed by one line per vertex with
+    # [vsize] [vwgt * ncon] (neighbor [adjwgt])*
+    values, lines, nlines = _tokenize(_map_file(fn))
+    header = values[lines == 0]
+    if header.size < 2:
+        raise ValueError("invalid header of {}".format(fn))
+    nv, ne = int(header[0]), int(header[1])
+    fmt = "{:03d}".format(int(header[2])) if header.size > 2 else "000"
+    has_vsize, has_vwgt, has_adjwgt = (x == "1" for x in fmt[-3:])
+    ncon = int(header[3]) if header.size > 3 else 1
+    if nlines - 1 < nv:
+        raise ValueError("{} has fewer than {} vertex lines".format(fn, nv))
+    lines = lines[lines <= nv]
+    offsets = _line_layout(lines, nv)
+    lead = int(has_vsize) + ncon * int(has_vwgt)
+    rows = lines[offsets[0] :] - 1
+    pos = np.arange(offsets[0], offsets[-1]) - offsets[rows]
+    data = values[offsets[0] : offsets[-1]]
+    head = pos < lead
+    vsize = vwgt = adjwgt = None
+    if lead:
+        table = data[head].reshape(nv, lead)
+        if has_vsize:
+            vsize = table[:, 0]
+        if has_vwgt:
+            vwgt = table[:, int(has_vsize) :].reshape(-1)
+    step = 2 if has_adjwgt else 1
+    body = ~head & ((pos - lead) % step == 0)
+    adjncy = data[body] - 1
+    if has_adjwgt:
+        adjwgt = data[np.flatnonzero(body) + 1]
+    xadj = np.zeros(nv + 1, dtype=np.int64)
+    np.cumsum(np.bincount(rows[body], minlength=nv), out=xadj[1:])
+    if xadj[-1] != 2 * ne:
+        raise ValueError(
+            "{} declares {} edges but has {} adjacency entries".format(fn, ne, xadj[-1])
+        )
+    return dict(xadj=xadj, adjncy=adjncy, vwgt=vwgt, vsize=vsize, adjwgt=adjwgt, ncon=ncon)
+
+
+def _read_metis_mesh(fn):
+    # helper to read a mesh in the METIS text format, i.e., a header line
+    # "ne [ncon]" followed by one line per element with [vwgt * ncon] nodes
+    values, lines, _ = _tokenize(_map_file(fn))
+    header = values[lines == 0]
+    if header.size < 1:
+        raise ValueError("invalid header of {}".format(fn))
+    ne = int(header[0])
+    ncon = int(header[1]) if header.size > 1 else 0
+    if ncon > 1:
+        # NOTE: METIS mesh partitioning takes a single weight per element
+        raise ValueError("{} has {} weights per element, only 1 is supported".format(fn, ncon))
+    lines = lines[lines <= ne]
+    offsets = _line_layout(lines, ne)
+    rows = lines[offsets[0] :] - 1
+    pos = np.arange(offsets[0], offsets[-1]) - offsets[rows]
+    data = values[offsets[0] : offsets[-1]]
+    head = pos < ncon
+    eptr = np.zeros(ne + 1, dtype=np.int64)
+    np.cumsum(np.bincount(rows[~head], minlength=ne), out=eptr[1:])
+    vwgt = data[head].copy() if ncon else None
+    return dict(eptr=eptr, eind=data[~head] - 1, vwgt=vwgt)
+
+
+def _read_binary(fn, keys):
+    # helper to read a GKlib binary CSR file (GK_CSR_FMT_BINROW), i.e., int32
+    # nrows and ncols, int64 rowptr, int32 rowind and optional float32 values,
+    # which are the edge weights of graphs (ignored for meshes)
+    buf = _map_file(fn)
+    if buf.size < 16:
+        raise ValueError("{} is not a valid binary CSR file".format(fn))
+    n = int(buf[:4].view(np.int32)[0])
+    end = 8 + 8 * (n + 1)
+    rowptr = buf[8:end].view(np.int64) if 0 <= n and end <= buf.size else None
+    if rowptr is None or rowptr.size != n + 1 or buf.size - end not in (4 * rowptr[-1], 8 * rowptr[-1]):
+        raise ValueError("{} is not a valid binary CSR file".format(fn))
+    nnz = int(rowptr[-1])
+    out = dict(zip(keys, (rowptr, buf[end : end + 4 * nnz].view(np.int32))))
+    if buf.size > end + 4 * nnz and keys[0] == "xadj":
+        values = buf[end + 4 * nnz :].view(np.float32)
+        adjwgt = values.astype(np.int64)
+        if np.any(adjwgt != values):
+            raise ValueError("{} has non-integer edge weights".format(fn))
+        out["adjwgt"] = adjwgt
+    return out
+
+
+def _read_numpy(fn, keys):
+    # helper to read arrays of a directory with .npy files (memory mapped) or
+    # of an .npz archive
+    opt = ("vwgt", "vsize", "adjwgt")
+    if os.path.isdir(fn):
+        out = {}
+        for k in keys + opt:
+            path = os.path.join(fn, k + ".npy")
+            if os.path.exists(path):
+                out[k] = np.load(path, mmap_mode="r")
+    else:
+        with np.load(fn) as f:
+            out = {k: f[k] for k in keys + opt if k in f}
+    missing = [k for k in keys if k not in out]
+    if missing:
+        raise ValueError("{} misses {}".format(fn, ", ".join(missing)))
+    return out
+
+
+def _read(fn, fmt, mesh):
+    # helper to read a graph or a mesh
+    keys = ("eptr", "eind") if mesh else ("xadj", "adjncy")
+    if fmt == "auto":
+        fmt = "metis"
+        if os.path.isdir(fn) or fn.endswith(".npz"):
+            fmt = "npy"
+        elif fn.endswith(".bin"):
+            fmt = "bin"
+    if fmt == "npy":
+        return _read_numpy(fn, keys)
+    if fmt == "bin":
+        return _read_binary(fn, keys)
+    return _read_metis_mesh(fn) if mesh else _read_metis_graph(fn)
+
+
+def _parse_options(items, dtype):
+    # helper to create the METIS options from NAME=VALUE strings
+    opts = metis.get_default_options(dtype)
+    for item in items or ():
+        name, sep, value = item.partition("=")
+        name = name.strip().upper()
+        if not sep or name not in enums.OPTION.__members__:
+            raise ValueError("invalid option {}".format(item))
+        value = value.strip()
+        try:
+            v = int(value)
+        except ValueError:
+            enum = _OPTION_ENUMS.get(name, getattr(enums, name, None))
+            try:
+                # NOTE: flags can be combined, e.g., dbglvl=info|time
+                v = sum(int(enum[x.strip().upper()]) for x in value.split("|"))
+            except (KeyError, TypeError):
+                raise ValueError("invalid value of option {}".format(item)) from None
+        opts[enums.OPTION[name]] = v
+    return opts
+
+
+def _convert(data, dtype, keys):
+    # helper to cast the arrays to the index type
+    if dtype == "auto":
+        big = max(int(np.asarray(data[keys[0]])[-1]), np.asarray(data[keys[1]]).size)
+        dtype = np.int64 if big >= 2 ** 31 - 1 else np.int32
+    dtype = np.dtype(dtype)
+    out = dict(data)
+    for k in keys + ("vwgt", "vsize", "adjwgt"):
+        if out.get(k, None) is not None:
+            out[k] = np.ascontiguousarray(out[k], dtype=dtype)
+    return out, dtype
+
+
+def _write(fn, array, fmt):
+    # helper to write an integer array as text (one entry per line) or .npy
+    if fmt == "npy":
+        np.save(fn, array)
+        return fn if fn.endswith(".npy") else fn + ".npy"
+    with open(fn, "w") as f:
+        f.write("\n".join(map(str, np.asarray(array).tolist())))
+        f.write("\n")
+    return fn
+
+
+def _peak_rss():
+    # helper to get the peak resident set size in bytes
+    if resource is None:  # pragma: no cover
+        return None
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return rss if sys.platform == "darwin" else rss * 1024
+
+
+def _run(args, timer):  # pylint: disable=too-many-locals
+    # helper to run the command, returns the report
+    mesh = args.command == "mesh"
+    keys = ("eptr", "eind") if mesh else ("xadj", "adjncy")
+    with timer("load"):
+        data = _read(args.file, args.format, mesh)
+    with timer("convert"):
+        data, dtype = _convert(data, args.dtype, keys)
+        opts = _parse_options(args.option, dtype)
+    report = {"file": args.file, "dtype": dtype.name}
+    mem = {}
+    if mesh:
+        eptr, eind = data["eptr"], data["eind"]
+        report.update(ne=eptr.size - 1, nind=int(eptr[-1]))
+        kernel = metis.part_mesh_dual if args.gtype == "dual" else metis.part_mesh_nodal
+        kw = dict(options=opts, memory_report=mem)
+        if args.gtype == "dual":
+            kw["ncommon"] = args.ncommon
+        if data.get("vwgt", None) is not None:
+            # NOTE: the nodal kernel takes node weights instead
+            if args.gtype != "dual":
+                raise ValueError("element weights require the dual graph")
+            kw["vwgt"] = data["vwgt"]
+        with timer("kernel"):
+            objval, epart, npart = kernel(args.nparts, eptr, eind, **kw)
+        report.update(nparts=args.nparts, objval=objval)
+        prefix = args.output or args.file
+        with timer("write"):
+            report["output"] = [
+                _write("{}.epart.{}".format(prefix, args.nparts), epart, args.output_format),
+                _write("{}.npart.{}".format(prefix, args.nparts), npart, args.output_format),
+            ]
+    else:
+        with timer("convert"):
+            xadj, adjncy, nv = process_graph(data["xadj"], data["adjncy"])
+        report.update(nv=nv, nedges=int(xadj[-1] - xadj[0]) // 2)
+        with timer("validate"):
+            validate_graph(xadj, adjncy, data.get("adjwgt", None), args.validate)
+        # NOTE: node_nd only takes vertex weights
+        weights = ("vwgt",) if args.command == "nd" else ("vwgt", "vsize", "adjwgt")
+        kw = {k: data[k] for k in weights if data.get(k, None) is not None}
+        kw.update(options=opts, memory_report=mem)
+        if args.command == "nd":
+            with timer("kernel"):
+                _, iperm = metis.node_nd(xadj, adjncy, **kw)
+            with timer("write"):
+                report["output"] = [
+                    _write(args.output or args.file + ".iperm", iperm, args.output_format)
+                ]
+        else:
+            kernel = metis.part_graph_kway if args.ptype == "kway" else metis.part_graph_recursize
+            with timer("kernel"):
+                objval, part = kernel(args.nparts, xadj, adjncy, ncon=data.get("ncon", 1), **kw)
+            report.update(nparts=args.nparts, objval=objval)
+            with timer("write"):
+                report["output"] = [
+                    _write(
+                        args.output or "{}.part.{}".format(args.file, args.nparts),
+                        part,
+                        args.output_format,
+                    )
+                ]
+    report["metis_peak_heap"] = mem.get("peak", None)
+    return report
+
+
+def _print_report(report, timer, out):
+    # helper to print the report in the style of the METIS programs
+    sizes = ", ".join(
+        "{}={}".format(k, report[k]) for k in ("nv", "nedges", "ne", "nind") if k in report
+    )
+    print("Input: {} ({}, {})".format(report["file"], sizes, report["dtype"]), file=out)
+    if "objval" in report:
+        print("Objective: {} ({} parts)".format(report["objval"], report["nparts"]), file=out)
+    for fn in report["output"]:
+        print("Output: {}".format(fn), file=out)
+    print("\nTiming Information " + "-" * 50, file=out)
+    for phase in ("load", "validate", "convert", "kernel", "write", "total"):
+        print("  {:<10}{:10.3f} sec".format(phase + ":", timer.phases.get(phase, 0.0)), file=out)
+    print("\nMemory Information " + "-" * 50, file=out)
+    if report["peak_rss"] is not None:
+        print("  {:<18}{:10.3f} MB".format("Peak RSS:", report["peak_rss"] / 2 ** 20), file=out)
+    if report["metis_peak_heap"] is not None:
+        print(
+            "  {:<18}{:10.3f} MB".format("METIS peak heap:", report["metis_peak_heap"] / 2 ** 20),
+            file=out,
+        )
+
+
+def _create_parser():
+    # helper to create the argument parser
+    parser = argparse.ArgumentParser(
+        prog="mgmetis", description="Partition graphs and meshes, and order sparse matrices."
+    )
+    parser.add_argument("--version", action="version", version="%(prog)s " + __version__)
+    common = argparse.ArgumentParser(add_help=False)
+    common.add_argument(
+        "--format",
+        choices=("auto", "metis", "bin", "npy"),
+        default="auto",
+        help="input format, default is detected from the file name",
+    )
+    common.add_argument(
+        "--dtype",
+        choices=("auto", "int32", "int64"),
+        default="auto",
+        help="index type, default is int32 unless the input requires int64",
+    )
+    common.add_argument(
+        "-O",
+        "--option",
+        action="append",
+        metavar="NAME=VALUE",
+        help="METIS option, e.g., ctype=rm or ufactor=50, can be repeated",
+    )
+    common.add_argument("-o", "--output", help="output file (prefix for meshes)")
+    common.add_argument(
+        "--output-format", choices=("text", "npy"), default="text", help="output format"
+    )
+    common.add_argument("--json", action="store_true", help="print the report as JSON")
+    sub = parser.add_subparsers(dest="command")
+    sub.required = True
+    p = sub.add_parser("graph", parents=[common], help="partition a graph (gpmetis)")
+    p.add_argument("file")
+    p.add_argument("nparts", type=int)
+    p.add_argument("--ptype", choices=("kway", "rb"), default="kway")
+    p.add_argument("--validate", choices=("off", "fast", "full"), default="fast")
+    p = sub.add_parser("mesh", parents=[common], help="partition a mesh (mpmetis)")
+    p.add_argument("file")
+    p.add_argument("nparts", type=int)
+    p.add_argument("--gtype", choices=("dual", "nodal"), default="dual")
+    p.add_argument("--ncommon", type=int, default=1)
+    p = sub.add_parser("nd", parents=[common], help="fill-reducing ordering (ndmetis)")
+    p.add_argument("file")
+    p.add_argument("--validate", choices=("off", "fast", "full"), default="fast")
+    return parser
+
+
+def main(argv=None):
+    """Entry point of the ``mgmetis`` console script
+
+    Parameters
+    ----------
+    argv : list of str, optional
+        Command-line arguments, default is ``sys.argv[1:]``.
+
+    Returns
+    -------
+    int
+        Exit status
+    """
+    args = _create_parser().parse_args(argv)
+    timer = _Timer()
+    tic = time.perf_counter()
+    try:
+        report = _run(args, timer)
+    except (ValueError, OSError, MetisError, MetisInputError, MetisMemoryError) as e:
+        print("mgmetis: error: {}".format(e), file=sys.stderr)
+        return 1
+    timer.phases["total"] = time.perf_counter() - tic
+    report["peak_rss"] = _peak_rss()
+    if args.json:
+        report["timing"] = timer.phases
+        print(json.dumps(report, default=int))
+    else:
+        _print_report(report, timer, sys.stdout)
+    return 0
@@ -0,0 +1,447 @@
+# -*- coding: utf-8 -*-
+"""Elastic repartitioning from k to k' parts
+
+When a job is scaled from k to k' processes, e.g., after a node failure or for
+burst scaling, partitioning from scratch moves most of the data. Instead,
+:func:`repart_graph_elastic` derives the k'-way partition from the existing
+one, keeping the part IDs (i.e., ranks) wherever possible:
+
+1. When merging (k' < k), parts ``0..k'-1`` survive, and the vertices of the
+   other parts join their nearest survivors (by BFS). When splitting (k' > k), the
+   heaviest parts are partitioned into pieces with
+   :func:`mgmetis.metis.part_graph_kway`, where one piece keeps the old ID.
+2. The loads are balanced by diffusion, i.e., the flows of least (cut
+   weighted) L2 norm between adjacent parts are computed on the quotient
+   graph, and are realized by moving the boundary vertices layer by layer,
+   preferring the vertices that go back to their old parts or have left
+   them already.
+3. A few sweeps of greedy boundary refinement reduce the edge cut under the
+   balance constraint.
+
+:func:`repart_elastic_mpi` is the distributed variant, which merges whole
+parts on the (gathered) quotient graph and balances the result with
+:func:`mgmetis.parmetis.adaptive_repart_kway`.
+
+.. module:: mgmetis.elastic
+.. moduleauthor:: Qiao Chen, <benechiao@gmail.com>
+"""
+
+import numpy as np
+
+from . import metis
+from .utils import (
+    process_graph,
+    try_get_input_array,
+    validate_graph,
+    extract_subgraph,
+    compute_edgecut,
+    quotient_graph,
+)
+
+__all__ = ["repart_graph_elastic", "repart_elastic_mpi"]
+
+
+def _get_costs(xadj, nv, kw):
+    # helper to get the (int64) vertex weights and migration costs
+    vwgt = try_get_input_array(kw, "vwgt", nv, xadj.dtype)
+    vsize = try_get_input_array(kw, "vsize", nv, xadj.dtype)
+    w = np.ones(nv, dtype=np.int64) if vwgt is None else vwgt[:nv].astype(np.int64)
+    return w, w if vsize is None else vsize[:nv].astype(np.int64)
+
+
+def _get_ub(kw):
+    # helper to get the imbalance tolerance of the single constraint
+    ub = kw.get("ubvec", None)
+    return 1.03 if ub is None else float(np.asarray(ub, dtype=np.float64).reshape(-1)[0])
+
+
+def _merge_groups(q_xadj, q_adjncy, q_vwgt, nparts):
+    # helper to assign each dissolving part (ID >= nparts) to a surviving
+    # part, layer by layer from the survivors over the quotient graph, where
+    # heavy parts go first and join the lightest adjacent survivor
+    nold = q_vwgt.size
+    group = np.full(nold, -1, dtype=np.int64)
+    group[:nparts] = np.arange(nparts)
+    load = np.asarray(q_vwgt[:nparts], dtype=np.float64)
+    rows = np.repeat(np.arange(nold), np.diff(q_xadj))
+    while True:
+        cand = np.unique(rows[(group[rows] < 0) & (group[q_adjncy] >= 0)])
+        if cand.size == 0:
+            break
+        for p in cand[np.argsort(-q_vwgt[cand], kind="stable")]:
+            nbrs = group[q_adjncy[q_xadj[p] : q_xadj[p + 1]]]
+            nbrs = nbrs[nbrs >= 0]
+            group[p] = nbrs[np.argmin(load[nbrs])]
+            load[group[p]] += q_vwgt[p]
+    # NOTE: components without survivors join the lightest ones
+    for p in np.flatnonzero(group < 0):
+        group[p] = np.argmin(load)
+        load[group[p]] += q_vwgt[p]
+    return group
+
+
+def _dissolve(old, xadj, adjncy, w, nparts):
+    # helper to assign the vertices of the dissolving parts (ID >= nparts) to
+    # the nearest surviving parts by a multi-source BFS from the survivors
+    new = np.where(old < nparts, old, -1)
+    frontier = np.flatnonzero(new >= 0)
+    while frontier.size:
+        counts = xadj[frontier + 1] - xadj[frontier]
+        offsets = np.cumsum(counts) - counts
+        idx = np.repeat(xadj[frontier] - offsets, counts) + np.arange(counts.sum())
+        src, nbrs = np.repeat(new[frontier], counts), adjncy[idx]
+        keep = new[nbrs] < 0
+        frontier, first = np.unique(nbrs[keep], return_index=True)
+        new[frontier] = src[keep][first]
+    # NOTE: components without survivors join the lightest part
+    rest = new < 0
+    if rest.any():
+        new[rest] = np.argmin(np.bincount(new[~rest], weights=w[~rest], minlength=nparts))
+    return new
+
+
+def _split_parts(nparts, xadj, adjncy, adjwgt, old, w, nold):
+    # helper to split the heaviest parts into pieces, such that there are
+    # nparts parts in total, the new pieces are numbered from nold
+    pw = np.bincount(old, weights=w, minlength=nold)
+    npieces = np.ones(nold, dtype=np.int64)
+    for _ in range(nparts - nold):
+        npieces[np.argmax(pw / npieces)] += 1
+    new = old.copy()
+    order = np.argsort(old, kind="stable")
+    groups = np.split(order, np.cumsum(np.bincount(old, minlength=nold))[:-1])
+    fresh = nold
+    for p in np.flatnonzero(npieces > 1):
+        verts, n = groups[p], int(npieces[p])
+        if verts.size <= n:
+            piece = np.arange(verts.size)
+        else:
+            sxadj, sadjncy, sadjwgt = extract_subgraph(xadj, adjncy, verts, adjwgt)
+            piece = metis.part_graph_kway(n, sxadj, sadjncy, vwgt=w[verts], adjwgt=sadjwgt)[1]
+        new[verts[piece > 0]] = piece[piece > 0] + fresh - 1
+        fresh += n - 1
+    return new
+
+
+def _components(q_xadj, q_adjncy):
+    # helper to label the connected components by min-label propagation
+    label = np.arange(q_xadj.size - 1)
+    rows = np.repeat(label, np.diff(q_xadj))
+    while True:
+        new = label.copy()
+        np.minimum.at(new, rows, label[q_adjncy])
+        new = new[new]
+        if np.array_equal(new, label):
+            return label
+        label = new
+
+
+def _diffusion_flows(q_xadj, q_adjncy, q_adjwgt, load):
+    # helper to compute the flows of least norm on the quotient graph that
+    # balance the loads (within each component), i.e., solving the weighted
+    # Laplacian system L x = load - mean with CG, the flows are a_ij(x_i-x_j)
+    n = load.size
+    rows = np.repeat(np.arange(n), np.diff(q_xadj))
+    a = np.asarray(q_adjwgt, dtype=np.float64)
+    deg = np.bincount(rows, weights=a, minlength=n)
+    comp = _components(q_xadj, q_adjncy)
+    mean = np.bincount(comp, weights=load, minlength=n) / np.maximum(np.bincount(comp, minlength=n), 1)
+    x, r = np.zeros(n), load - mean[comp]
+    p, rs = r.copy(), r @ r
+    tol = 1e-20 * max(rs, 1.0)
+    for _ in range(10 * n + 100):
+        if rs <= tol:
+            break
+        ap = deg * p - np.bincount(rows, weights=a * p[q_adjncy], minlength=n)
+        alpha = rs / (p @ ap)
+        x += alpha * p
+        r -= alpha * ap
+        rs, rs_old = r @ r, rs
+        p = r + (rs / rs_old) * p
+    flow = a * (x[rows] - x[q_adjncy])
+    keep = flow > 0
+    return rows[keep], q_adjncy[keep], flow[keep]
+
+
+def _boundary_moves(new, rows, adjncy, ew, nparts, allowed):
+    # helper to find the best target part of each boundary vertex along the
+    # allowed (source, target) pairs, returning (vertex, target, connectivity)
+    pr, pc = new[rows], new[adjncy]
+    ext = (pr != pc) & allowed(pr, pc)
+    keys, inv = np.unique(rows[ext] * nparts + pc[ext], return_inverse=True)
+    conn = np.bincount(inv, weights=ew[ext], minlength=keys.size)
+    v, t = keys // nparts, keys % nparts
+    o = np.lexsort((-conn, v))
+    o = o[np.r_[True, v[o][1:] != v[o][:-1]]] if o.size else o
+    return v[o], t[o], conn[o]
+
+
+def _group_prefix(group, wv):
+    # helper to compute the inclusive prefix sums of wv within sorted groups
+    cs = np.cumsum(wv)
+    if cs.size == 0:
+        return cs
+    start = np.r_[True, group[1:] != group[:-1]]
+    return cs - np.maximum.accumulate(np.where(start, cs - wv, 0))
+
+
+def _realize_flows(new, old, rows, adjncy, ew, w, nparts, fkeys, rem):
+    # helper to realize the flows by moving the boundary vertices layer by
+    # layer, returns False if nothing can be moved
+    def allowed(pr, pc):
+        key = pr * nparts + pc
+        pos = np.minimum(np.searchsorted(fkeys, key), fkeys.size - 1)
+        return (fkeys[pos] == key) & (rem[pos] >= 0.5)
+
+    moved = False
+    for _ in range(new.size):
+        v, t, conn = _boundary_moves(new, rows, adjncy, ew, nparts, allowed)
+        pos = np.searchsorted(fkeys, new[v] * nparts + t)
+        # NOTE: the vertices going back to their old parts go first, then the
+        # ones not in their old parts, which don't add to the migration
+        prio = np.where(t == old[v], 0, np.where(new[v] != old[v], 1, 2))
+        o = np.lexsort((-conn, prio, pos))
+        v, t, pos = v[o], t[o], pos[o]
+        accept = _group_prefix(pos, w[v]) - 0.5 * w[v] <= rem[pos]
+        if not accept.any():
+            break
+        v, t, pos = v[accept], t[accept], pos[accept]
+        rem -= np.bincount(pos, weights=w[v], minlength=rem.size)
+        new[v] = t
+        moved = True
+    return moved
+
+
+def _diffuse(new, old, xadj, adjncy, ew, w, nparts, cap, nrounds=10):
+    # helper to balance the parts by diffusion, the flows are recomputed on
+    # the current partition until the loads are within cap
+    rows = np.repeat(np.arange(new.size), np.diff(xadj))
+    for _ in range(nrounds):
+        q_xadj, q_adjncy, q_vwgt, q_adjwgt = quotient_graph(
+            xadj, adjncy, new, vwgt=w, adjwgt=ew, nparts=nparts
+        )
+        if q_vwgt.max() <= cap:
+            break
+        src, dst, flow = _diffusion_flows(q_xadj, q_adjncy, np.maximum(q_adjwgt, 1), q_vwgt.astype(np.float64))
+        if flow.size == 0 or not _realize_flows(new, old, rows, adjncy, ew, w, nparts, src * nparts + dst, flow):
+            break
+    return new
+
+
+def _refine(new, old, xadj, adjncy, ew, w, nparts, cap, niter):
+    # helper of greedy boundary refinement, moving vertices to the neighbor
+    # part of the most connectivity if it reduces the cut (or keeps the cut
+    # and moves back to the old part) and the target has room
+    nv = new.size
+    rows = np.repeat(np.arange(nv), np.diff(xadj))
+    pw = np.bincount(new, weights=w, minlength=nparts)
+    idle = 0
+    for it in range(niter):
+        same = new[rows] == new[adjncy]
+        internal = np.bincount(rows[same], weights=ew[same], minlength=nv)
+        # NOTE: alternate the directions such that neighbors never swap
+        v, t, conn = _boundary_moves(
+            new, rows, adjncy, ew, nparts, (lambda pr, pc: pc > pr) if it % 2 == 0 else (lambda pr, pc: pc < pr)
+        )
+        gain = conn - internal[v]
+        ok = (gain > 0) | ((gain == 0) & (t == old[v]))
+        v, t, gain = v[ok], t[ok], gain[ok]
+        # NOTE: accept the best moves into each part until it's full
+        o = np.lexsort((-gain, t))
+        v, t = v[o], t[o]
+        accept = _group_prefix(t, w[v]) <= cap - pw[t]
+        v, t = v[accept], t[accept]
+        if v.size == 0:
+            idle += 1
+            if idle == 2:
+                break
+            continue
+        idle = 0
+        pw -= np.bincount(new[v], weights=w[v], minlength=nparts)
+        pw += np.bincount(t, weights=w[v], minlength=nparts)
+        new[v] = t
+    return new
+
+
+def repart_graph_elastic(nparts, xadj, adjncy, part, **kw):
+    """Repartition a graph from its existing partition into `nparts` parts
+
+    Parameters
+    ----------
+    nparts : int
+        New number of parts, can be larger (split) or smaller (merge) than the
+        old one; if they are the same, then the partition is rebalanced.
+    xadj, adjncy : np.ndarray
+        The adjacency structure (CSR)
+    part : np.ndarray
+        Existing partition, in the same index system as the graph.
+
+    Returns
+    -------
+    edgecut : int
+        Edge cut of the new partition
+    part : np.ndarray
+        The new partition, in the same index system as the graph.
+    migration : int
+        Total `vsize` of the vertices whose part IDs change
+
+    Other Parameters
+    ----------------
+    vwgt, adjwgt : np.ndarray, optional
+        Vertex (single constraint) and edge weights
+    vsize : np.ndarray, optional
+        Migration costs of the vertices, default is `vwgt`.
+    ubvec : float, optional
+        Imbalance tolerance of the refinement, default is 1.03.
+    niter : int, optional
+        Maximum number of refinement sweeps, default is 10.
+    validate : {"off", "fast", "full"}, optional
+        Input graph validation level, see :func:`mgmetis.metis.part_graph_kway`.
+
+    Examples
+    --------
+    >>> from mgmetis import metis, elastic
+    >>> _, part = metis.part_graph_kway(64, xadj, adjncy)
+    >>> edgecut, part, migration = elastic.repart_graph_elastic(48, xadj, adjncy, part)
+    """
+    if nparts <= 0:
+        raise ValueError("invalid nparts")
+    xadj, adjncy, nv = process_graph(xadj, adjncy)
+    adjwgt = try_get_input_array(kw, "adjwgt", xadj[-1] - xadj[0], xadj.dtype)
+    validate_graph(xadj, adjncy, adjwgt, kw.get("validate", "off"))
+    w, cost = _get_costs(xadj, nv, kw)
+    base = int(xadj[0])
+    if base:
+        xadj, adjncy = xadj - base, adjncy - base
+    old = np.asarray(part, dtype=np.int64).reshape(-1) - base
+    if old.size != nv:
+        raise ValueError("part should be size of {}".format(nv))
+    if nv == 0:
+        return 0, np.asarray(part, dtype=xadj.dtype), 0
+    nold = int(old.max()) + 1
+    if nparts < nold:
+        new = _dissolve(old, xadj, adjncy, w, nparts)
+    else:
+        new = _split_parts(nparts, xadj, adjncy, adjwgt, old, w, nold)
+    nnz = xadj[-1]
+    ew = np.ones(nnz) if adjwgt is None else adjwgt[:nnz].astype(np.float64)
+    cap = _get_ub(kw) * w.sum() / nparts
+    new = _diffuse(new, old, xadj, adjncy[:nnz], ew, w, nparts, cap)
+    cap = max(cap, np.bincount(new, weights=w).max())
+    new = _refine(new, old, xadj, adjncy[:nnz], ew, w, nparts, cap, kw.get("niter", 10))
+    migration = int(cost[new != old].sum())
+    return compute_edgecut(xadj, adjncy, new, adjwgt), np.asarray(new + base, dtype=xadj.dtype), migration
+
+
+def _dist_quotient_graph(xadj, adjncy, old, w, vtxdist, comm):
+    # helper to build the quotient graph of a distributed partition on every
+    # process, all in C index
+    rank = comm.rank
+    lo, hi = vtxdist[rank], vtxdist[rank + 1]
+    # NOTE: request the parts of the remote neighbors from their owners
+    ghosts = np.unique(adjncy[(adjncy < lo) | (adjncy >= hi)])
+    owners = np.searchsorted(vtxdist, ghosts, side="right") - 1
+    bounds = np.searchsorted(owners, np.arange(comm.size + 1))
+    requests = comm.alltoall([ghosts[bounds[r] : bounds[r + 1]] for r in range(comm.size)])
+    replies = comm.alltoall([old[np.asarray(x, dtype=np.int64) - lo] for x in requests])
+    ghost_part = np.concatenate([np.zeros(0, dtype=np.int64)] + [np.asarray(x, dtype=np.int64) for x in replies])
+    local = (adjncy >= lo) & (adjncy < hi)
+    nbr_part = np.empty(adjncy.size, dtype=np.int64)
+    nbr_part[local] = old[adjncy[local] - lo]
+    nbr_part[~local] = ghost_part[np.searchsorted(ghosts, adjncy[~local])]
+    nold = max(comm.allgather(int(old.max()) + 1 if old.size else 0))
+    src = np.repeat(old, np.diff(xadj))
+    cut = src != nbr_part
+    keys = np.unique(np.concatenate(comm.allgather(src[cut] * nold + nbr_part[cut])))
+    q_xadj = np.zeros(nold + 1, dtype=np.int64)
+    np.cumsum(np.bincount(keys // nold, minlength=nold), out=q_xadj[1:])
+    q_vwgt = comm.allreduce(np.bincount(old, weights=w, minlength=nold))
+    return q_xadj, keys % nold, q_vwgt
+
+
+def repart_elastic_mpi(nparts, xadj, adjncy, part, vtxdist=None, comm=None, **kw):
+    """Repartition a distributed graph from its existing partition
+
+    When merging, each of the parts ``nparts`` and above joins an adjacent
+    surviving part as in :func:`repart_graph_elastic`, and the result is
+    balanced by :func:`mgmetis.parmetis.adaptive_repart_kway`.
+
+    Parameters
+    ----------
+    nparts : int
+        New number of parts
+    xadj, adjncy : np.ndarray
+        Local CSR graph with global indices, see
+        :func:`mgmetis.parmetis.part_kway`.
+    part : np.ndarray
+        Existing partition of the local vertices
+    vtxdist : np.ndarray, optional
+        Global range array, if not specified, then it's computed with MPI
+        collection.
+    comm : MPI_Comm, optional
+        MPI communicator, default is MPI_COMM_WORLD.
+
+    Returns
+    -------
+    edgecut : int
+        Edge cut of the new partition
+    part : np.ndarray
+        The new partition of the local vertices
+    migration : int
+        Global total `vsize` of the vertices whose part IDs change
+
+    Other Parameters
+    ----------------
+    vwgt, adjwgt : np.ndarray, optional
+        Weights of the local vertices and edges
+    vsize : np.ndarray, optional
+        Migration costs of the local vertices, default is `vwgt`.
+    itr : float, optional
+        Ratio of communication time to redistribution time, default is 1000.0,
+        see :func:`mgmetis.parmetis.adaptive_repart_kway`.
+    ubvec : float, optional
+        Imbalance tolerance, default is 1.03.
+    par_options : np.ndarray, optional
+        ParMETIS control parameters
+    """
+    from . import parmetis  # pylint: disable=import-outside-toplevel
+    from .par_utils import get_comm, build_proc_dist  # pylint: disable=import-outside-toplevel
+
+    if nparts <= 0:
+        raise ValueError("invalid nparts")
+    comm = get_comm(comm)
+    xadj, adjncy, nv = process_graph(xadj, adjncy)
+    w, cost = _get_costs(xadj, nv, kw)
+    base = int(xadj[0])
+    vtxdist = np.asarray(
+        vtxdist if vtxdist is not None else build_proc_dist(nv, comm, base),
+        dtype=np.int64,
+    )
+    old = np.asarray(part, dtype=np.int64).reshape(-1) - base
+    if old.size != nv:
+        raise ValueError("part should be size of {}".format(nv))
+    q_xadj, q_adjncy, q_vwgt = _dist_quotient_graph(
+        np.asarray(xadj, dtype=np.int64) - base,
+        np.asarray(adjncy[: xadj[-1] - base], dtype=np.int64) - base,
+        old,
+        w,
+        vtxdist - base,
+        comm,
+    )
+    init = old if nparts >= q_vwgt.size else _merge_groups(q_xadj, q_adjncy, q_vwgt, nparts)[old]
+    edgecut, new = parmetis.adaptive_repart_kway(
+        nparts,
+        xadj,
+        adjncy,
+        np.asarray(init + base, dtype=xadj.dtype),
+        vtxdist=np.asarray(vtxdist, dtype=xadj.dtype),
+        vsize=kw.get("vsize", None),
+        itr=kw.get("itr", 1000.0),
+        comm=comm,
+        vwgt=kw.get("vwgt", None),
+        adjwgt=kw.get("adjwgt", None),
+        ubvec=_get_ub(kw),
+        options=kw.get("par_options", None),
+    )
+    migration = comm.allreduce(int(cost[new - base != old].sum()))
+    return edgecut, new, migration
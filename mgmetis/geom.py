@@ -0,0 +1,309 @@
+# -*- coding: utf-8 -*-
+"""Serial geometric partitioning
+
+Fast partitioners based on coordinates only, i.e., recursive coordinate
+bisection (RCB) and space-filling curves (Morton and Hilbert). Unlike
+:func:`mgmetis.parmetis.part_geom`, they require neither MPI nor ParMETIS, and
+they are implemented with vectorized NumPy operations so that they are
+suitable for particle codes and quick initial distributions of large point
+sets. All routines return a `part` array like the METIS routines.
+
+.. module:: mgmetis.geom
+.. moduleauthor:: Qiao Chen, <benechiao@gmail.com>
+"""
+
+import numpy as np
+
+from .utils import get_or_create_workspace
+
+__all__ = ["morton_keys", "hilbert_keys", "part_sfc", "part_rcb"]
+
+
+def _process_xyz(xyz):
+    # helper to ensure 2D coordinates
+    xyz = np.asarray(xyz)
+    if xyz.ndim == 1:
+        xyz = xyz.reshape(-1, 1)
+    if xyz.ndim != 2:
+        raise ValueError("coordinates must be 2D array")
+    return xyz
+
+
+def _process_vwgt(vwgt, n):
+    # helper to get vertex weights as float64 array (or None)
+    if vwgt is None:
+        return None
+    vwgt = np.asarray(vwgt, dtype=np.float64).reshape(-1)
+    if vwgt.size < n:
+        raise ValueError("vwgt should be at least size of {}".format(n))
+    return vwgt[:n]
+
+
+_CHUNK = 1 << 16
+"""Number of points processed at once, so that temporaries stay in cache"""
+
+
+def _compute_keys(xyz, bits, encode):
+    # helper to compute keys chunk by chunk; points are mapped to the integer
+    # grid [0, 2**bits) with a uniform scaling in all dimensions, and then
+    # encode is called with the list of per-dimension integer coordinates
+    lo = np.min(xyz, axis=0) if xyz.shape[0] else np.zeros(xyz.shape[1])
+    extent = float(np.max(np.max(xyz, axis=0) - lo)) if xyz.shape[0] else 0.0
+    scale = ((1 << bits) - 1) / extent if extent > 0 else 0.0
+    dtype = np.uint32 if bits <= 32 else np.uint64
+    keys = np.empty(xyz.shape[0], dtype=np.uint64)
+    for start in range(0, xyz.shape[0], _CHUNK):
+        chunk = xyz[start : start + _CHUNK]
+        X = [np.asarray((chunk[:, d] - lo[d]) * scale, dtype=dtype) for d in range(xyz.shape[1])]
+        keys[start : start + _CHUNK] = encode(X, bits)
+    return keys
+
+
+# NOTE: (shift, mask) pairs of the magic-number bit spreading
+_SPREAD = {
+    1: [],
+    2: [
+        (16, 0x0000FFFF0000FFFF),
+        (8, 0x00FF00FF00FF00FF),
+        (4, 0x0F0F0F0F0F0F0F0F),
+        (2, 0x3333333333333333),
+        (1, 0x5555555555555555),
+    ],
+    3: [
+        (32, 0x001F00000000FFFF),
+        (16, 0x001F0000FF0000FF),
+        (8, 0x100F00F00F00F00F),
+        (4, 0x10C30C30C30C30C3),
+        (2, 0x1249249249249249),
+    ],
+}
+
+_MAX_BITS = {1: 32, 2: 32, 3: 21}
+
+
+def _check_bits(ndim, bits):
+    # helper to get the number of bits per dimension
+    if ndim not in _SPREAD:
+        raise ValueError("only 1D, 2D and 3D coordinates are supported")
+    if bits is None:
+        return _MAX_BITS[ndim]
+    if not 0 < bits <= _MAX_BITS[ndim]:
+        raise ValueError("bits must be in (0, {}] for {}D".format(_MAX_BITS[ndim], ndim))
+    return bits
+
+
+def _interleave(coords, bits=None):  # pylint: disable=unused-argument
+    # helper to interleave the bits of the coordinates, coords[0] is the most
+    # significant one
+    ndim = len(coords)
+    key = np.zeros(coords[0].size, dtype=np.uint64)
+    for d, x in enumerate(coords):
+        x = x.astype(np.uint64)
+        for shift, mask in _SPREAD[ndim]:
+            x |= x << np.uint64(shift)
+            x &= np.uint64(mask)
+        key |= x << np.uint64(ndim - 1 - d)
+    return key
+
+
+def morton_keys(xyz, bits=None):
+    """Compute Morton (Z-order) keys of points
+
+    Parameters
+    ----------
+    xyz : array_like
+        Coordinates of shape ``(n, ndim)`` with ``ndim`` in 1, 2 or 3
+    bits : int, optional
+        Bits per dimension of the integer grid, default is the maximum that
+        fits in 64-bit keys, i.e., 32, 32 and 21 for 1D, 2D and 3D.
+
+    Returns
+    -------
+    np.ndarray
+        Keys of type ``np.uint64``
+    """
+    xyz = _process_xyz(xyz)
+    return _compute_keys(xyz, _check_bits(xyz.shape[1], bits), _interleave)
+
+
+def _hilbert_encode(X, bits):
+    # helper to compute Hilbert keys from integer coordinates (in place); the
+    # branches are replaced by masks, i.e., 0 or all-ones of each bit
+    ndim = len(X)
+    dtype = X[0].dtype.type
+    one, ones = dtype(1), dtype(np.iinfo(dtype).max)
+    # NOTE: inverse undo excess work
+    for b in range(bits - 1, 0, -1):
+        P, shift = dtype((1 << b) - 1), dtype(b)
+        for i in range(ndim):
+            m = ((X[i] >> shift) & one) * ones
+            X[0] ^= m & P
+            if i:
+                t = (X[0] ^ X[i]) & P & ~m
+                X[0] ^= t
+                X[i] ^= t
+    # NOTE: Gray encode
+    for i in range(1, ndim):
+        X[i] ^= X[i - 1]
+    t = np.zeros_like(X[0])
+    for b in range(bits - 1, 0, -1):
+        t ^= ((X[ndim - 1] >> dtype(b)) & one) * dtype((1 << b) - 1)
+    for i in range(ndim):
+        X[i] ^= t
+    return _interleave(X)
+
+
+def hilbert_keys(xyz, bits=None):
+    """Compute Hilbert keys of points
+
+    The keys are computed with Skilling's transpose algorithm (J. Skilling,
+    *Programming the Hilbert curve*, AIP Conf. Proc. 707, 2004), which is
+    vectorized over points.
+
+    Parameters
+    ----------
+    xyz : array_like
+        Coordinates of shape ``(n, ndim)`` with ``ndim`` in 1, 2 or 3
+    bits : int, optional
+        Bits per dimension, see :func:`morton_keys`.
+
+    Returns
+    -------
+    np.ndarray
+        Keys of type ``np.uint64``
+    """
+    xyz = _process_xyz(xyz)
+    return _compute_keys(xyz, _check_bits(xyz.shape[1], bits), _hilbert_encode)
+
+
+def part_sfc(nparts, xyz, vwgt=None, curve="hilbert", **kw):
+    """Partition points by cutting a space-filling curve into pieces
+
+    Points are sorted along the curve, and the curve is cut into `nparts`
+    contiguous pieces of (approximately) equal weights.
+
+    Parameters
+    ----------
+    nparts : int
+        Number of partitions, must be positive
+    xyz : array_like
+        Coordinates of shape ``(n, ndim)`` with ``ndim`` in 1, 2 or 3
+    vwgt : array_like, optional
+        Point weights, default is None, i.e., equal weights.
+    curve : {"hilbert", "morton"}, optional
+        Space-filling curve, default is Hilbert curve, which gives better
+        locality than Morton curve.
+
+    Returns
+    -------
+    part : np.ndarray
+        Partition array
+
+    Other Parameters
+    ----------------
+    bits : int, optional
+        Bits per dimension, see :func:`morton_keys`.
+    dtype : np.dtype, optional
+        Integer type of `part`, default is int32.
+    part : np.ndarray, optional
+        User buffer for `part`.
+    """
+    if nparts <= 0:
+        raise ValueError("invalid nparts")
+    xyz = _process_xyz(xyz)
+    n = xyz.shape[0]
+    part = get_or_create_workspace(kw, "part", n, np.dtype(kw.get("dtype", np.int32)))
+    if n == 0:
+        return part
+    if curve == "hilbert":
+        keys = hilbert_keys(xyz, kw.get("bits", None))
+    elif curve == "morton":
+        keys = morton_keys(xyz, kw.get("bits", None))
+    else:
+        raise ValueError("unknown curve {}".format(curve))
+    order = np.argsort(keys, kind="stable")
+    vwgt = _process_vwgt(vwgt, n)
+    if vwgt is None:
+        part[order] = np.arange(n) * nparts // n
+        return part
+    w = vwgt[order]
+    # NOTE: assign each point by the middle of its weight interval
+    mid = np.cumsum(w) - 0.5 * w
+    total = mid[-1] + 0.5 * w[-1]
+    part[order] = np.minimum(mid * (nparts / total), nparts - 1) if total > 0 else 0
+    return part
+
+
+def _split(coords, vwgt, idx, frac):
+    # helper to split a subset of points along the given coordinates, returns
+    # the reordered subset and the number of points on the left
+    n = idx.size
+    if vwgt is None:
+        k = min(max(int(round(n * frac)), 1), n - 1)
+        return idx[np.argpartition(coords, k - 1)], k
+    order = np.argsort(coords, kind="stable")
+    cum = np.cumsum(vwgt[idx[order]])
+    k = int(np.searchsorted(cum, cum[-1] * frac))
+    # NOTE: take the closer one of the two candidate cuts
+    if k < n and (k == 0 or cum[k] - cum[-1] * frac < cum[-1] * frac - cum[k - 1]):
+        k += 1
+    return idx[order], min(max(k, 1), n - 1)
+
+
+def part_rcb(nparts, xyz, vwgt=None, **kw):
+    """Partition points with recursive coordinate bisection
+
+    Each region is split along its longest dimension such that the weights of
+    two halves are proportional to the number of parts assigned to them, i.e.,
+    `nparts` needs not be power of two. The regions are boxes that start from
+    the bounding box of all points, so only one coordinate of each point is
+    accessed per level.
+
+    Parameters
+    ----------
+    nparts : int
+        Number of partitions, must be positive
+    xyz : array_like
+        Coordinates of shape ``(n, ndim)``
+    vwgt : array_like, optional
+        Point weights, default is None, i.e., equal weights.
+
+    Returns
+    -------
+    part : np.ndarray
+        Partition array
+
+    Other Parameters
+    ----------------
+    dtype : np.dtype, optional
+        Integer type of `part`, default is int32.
+    part : np.ndarray, optional
+        User buffer for `part`.
+    """
+    if nparts <= 0:
+        raise ValueError("invalid nparts")
+    xyz = _process_xyz(xyz)
+    n = xyz.shape[0]
+    part = get_or_create_workspace(kw, "part", n, np.dtype(kw.get("dtype", np.int32)))
+    if n == 0:
+        return part
+    vwgt = _process_vwgt(vwgt, n)
+    cols = [np.ascontiguousarray(xyz[:, d]) for d in range(xyz.shape[1])]
+    box = np.array([[np.min(x), np.max(x)] for x in cols])
+    # NOTE: explicit stack of (point indices, region box, nparts, first part)
+    stack = [(np.arange(n), box, nparts, 0)]
+    while stack:
+        idx, box, k, first = stack.pop()
+        if k == 1 or idx.size <= 1:
+            part[idx] = first
+            continue
+        nleft = k // 2
+        dim = int(np.argmax(box[:, 1] - box[:, 0]))
+        coords = cols[dim][idx]
+        idx, m = _split(coords, vwgt, idx, nleft / k)
+        cut = np.max(cols[dim][idx[:m]])
+        lbox, rbox = box.copy(), box.copy()
+        lbox[dim, 1] = rbox[dim, 0] = cut
+        stack.append((idx[:m], lbox, nleft, first))
+        stack.append((idx[m:], rbox, k - nleft, first + nleft))
+    return part
@@ -0,0 +1,394 @@
+# -*- coding: utf-8 -*-
+"""Hierarchical partitioning following the machine topology
+
+On a cluster, communication between machine nodes is much more expensive than
+communication between sockets or cores inside a node. Instead of a flat k-way
+partitioning, this module partitions the graph into machine nodes first, and
+then recursively partitions the subgraph induced by each part with
+``METIS_PartGraphKway``, e.g., ``levels=[nnodes, 2, 32]`` for 2 sockets and 32
+cores per socket. Subgraphs of the same level are partitioned concurrently
+on threads, as the ctypes calls release the GIL.
+
+The same machinery computes nested partitions for several numbers of parts at
+once, see :func:`part_graph_multi`. ``METIS_PartGraphRecursive`` numbers the
+parts along its bisection tree, i.e., the first ``nparts//2`` parts come from
+the left child, so the partitions of the inner nodes of the tree are obtained
+from a single call by integer division of the part IDs.
+
+.. module:: mgmetis.hierarchy
+.. moduleauthor:: Qiao Chen, <benechiao@gmail.com>
+"""
+
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+from . import metis
+from .enums import OPTION
+from .utils import (
+    process_graph,
+    try_get_input_array,
+    validate_graph,
+    extract_subgraph,
+    compute_edgecut,
+)
+
+__all__ = [
+    "flatten_levels",
+    "part_graph_hierarchical",
+    "part_hierarchical_mpi",
+    "part_graph_multi",
+]
+
+
+def flatten_levels(part, levels):
+    """Combine per-level part IDs into global part IDs
+
+    Parameters
+    ----------
+    part : np.ndarray
+        Per-level part IDs of shape ``(nv, len(levels))``
+    levels : list of int
+        Number of parts at each level
+
+    Returns
+    -------
+    np.ndarray
+        Global part IDs in range ``[0, prod(levels))``, parts that belong to
+        the same part in upper levels are numbered contiguously.
+    """
+    part = np.asarray(part)
+    flat = np.zeros(part.shape[0], dtype=part.dtype)
+    for lvl, nparts in enumerate(levels):
+        flat = flat * nparts + part[:, lvl]
+    return flat
+
+
+def _get_sub_kw(kw):
+    # helper to extract the keyword inputs that apply to every subgraph
+    sub_kw = {k: kw[k] for k in ("ncon", "ubvec") if kw.get(k, None) is not None}
+    opts = kw.get("options", None)
+    if opts is not None:
+        # NOTE: subgraphs are always in C index
+        opts = np.array(opts)
+        opts[OPTION.NUMBERING] = 0
+        sub_kw["options"] = opts
+    return sub_kw
+
+
+def _part_sub(nparts, vertices, xadj, adjncy, weights, kw, kernel=metis.part_graph_kway):
+    # helper to partition the subgraph induced by vertices (0-based)
+    if nparts == 1 or vertices.size == 0:
+        return np.zeros(vertices.size, dtype=xadj.dtype)
+    if vertices.size <= nparts:
+        return np.arange(vertices.size, dtype=xadj.dtype)
+    vwgt, vsize, adjwgt = weights
+    sxadj, sadjncy, sadjwgt = extract_subgraph(xadj, adjncy, vertices, adjwgt)
+    if vwgt is not None:
+        kw["vwgt"] = vwgt.reshape(-1, kw.get("ncon", 1))[vertices].reshape(-1)
+    if vsize is not None:
+        kw["vsize"] = vsize[vertices]
+    return kernel(nparts, sxadj, sadjncy, adjwgt=sadjwgt, **kw)[1]
+
+
+def _part_levels(levels, xadj, adjncy, weights, key, kw, kernel=metis.part_graph_kway):
+    # core implementation; xadj and adjncy must be C index, and the vertices
+    # with the same initial key are partitioned independently
+    sub_kw = _get_sub_kw(kw)
+    part = np.zeros((xadj.size - 1, len(levels)), dtype=xadj.dtype)
+    edgecuts = []
+    with ThreadPoolExecutor(kw.get("nthreads", None)) as pool:
+        for lvl, nparts in enumerate(levels):
+            # NOTE: vertices with the same key form a subgraph of this level
+            order = np.argsort(key, kind="stable")
+            groups = np.split(order, np.flatnonzero(np.diff(key[order])) + 1)
+            futures = [
+                pool.submit(_part_sub, nparts, g, xadj, adjncy, weights, dict(sub_kw), kernel)
+                for g in groups
+            ]
+            for g, fut in zip(groups, futures):
+                part[g, lvl] = fut.result()
+            key = key * nparts + part[:, lvl]
+            edgecuts.append(compute_edgecut(xadj, adjncy, key, weights[2]))
+    return edgecuts, part
+
+
+def _check_levels(levels):
+    # helper to check the levels input
+    levels = [int(k) for k in levels]
+    if not levels or min(levels) <= 0:
+        raise ValueError("invalid levels {}".format(levels))
+    return levels
+
+
+def _get_weights(xadj, nv, kw):
+    # helper to get the (vwgt, vsize, adjwgt) inputs
+    return (
+        try_get_input_array(kw, "vwgt", nv * kw.get("ncon", 1), xadj.dtype),
+        try_get_input_array(kw, "vsize", nv, xadj.dtype),
+        try_get_input_array(kw, "adjwgt", xadj[-1] - xadj[0], xadj.dtype),
+    )
+
+
+def part_graph_hierarchical(levels, xadj, adjncy, **kw):
+    """Partition a graph hierarchically, level by level
+
+    The graph is first partitioned into ``levels[0]`` parts, then the subgraph
+    induced by each of the parts is partitioned into ``levels[1]`` parts, and
+    so on. Each partitioning is done by :func:`mgmetis.metis.part_graph_kway`.
+
+    Parameters
+    ----------
+    levels : list of int
+        Number of parts at each level, e.g., ``[nnodes, nsockets, ncores]``.
+    xadj, adjncy : np.ndarray
+        The adjacency structure (CSR)
+    nthreads : int, optional
+        Maximum number of threads for partitioning subgraphs concurrently,
+        default is the default of ``concurrent.futures.ThreadPoolExecutor``.
+
+    Returns
+    -------
+    edgecuts : list of int
+        Edge cut of the (flattened) partition at each level
+    part : np.ndarray
+        Per-level part IDs of shape ``(nv, len(levels))``, use
+        :func:`flatten_levels` to get the global part IDs.
+
+    Other Parameters
+    ----------------
+    vwgt, vsize, adjwgt : np.ndarray, optional
+        Weights, which are restricted to each of the subgraphs.
+    ncon, ubvec, options : optional
+        Passed to every call of :func:`mgmetis.metis.part_graph_kway`.
+    validate : {"off", "fast", "full"}, optional
+        Input graph validation level, see :func:`mgmetis.metis.part_graph_kway`.
+    """
+    levels = _check_levels(levels)
+    xadj, adjncy, nv = process_graph(xadj, adjncy)
+    weights = _get_weights(xadj, nv, kw)
+    validate_graph(xadj, adjncy, weights[2], kw.get("validate", "off"))
+    if xadj[0] == 1:
+        xadj, adjncy = xadj - 1, adjncy - 1
+    return _part_levels(levels, xadj, adjncy, weights, np.zeros(nv, dtype=np.int64), kw)
+
+
+def _bisection_ranges(nparts):
+    # helper to get the part ranges of all nodes in the bisection tree of
+    # METIS_PartGraphRecursive, which assigns the first nparts>>1 parts to the
+    # left child
+    ranges, stack = set(), [(0, nparts)]
+    while stack:
+        a, b = stack.pop()
+        ranges.add((a, b))
+        if b - a > 1:
+            m = a + (b - a) // 2
+            stack.extend(((a, m), (m, b)))
+    return ranges
+
+
+def _is_nested(ratios):
+    # helper to check if the partitions of a chain of ratios are all nodes of
+    # the bisection tree of prod(ratios) parts
+    nparts = int(np.prod(ratios))
+    ranges = _bisection_ranges(nparts)
+    size = nparts
+    for r in ratios[:-1]:
+        size //= r
+        if any((a, a + size) not in ranges for a in range(0, nparts, size)):
+            return False
+    return True
+
+
+def part_graph_multi(ks, xadj, adjncy, **kw):
+    """Compute nested partitions for several numbers of parts at once
+
+    The recursive bisection is run once for the largest number of parts, and
+    the partitions for smaller `ks` are the inner nodes of its bisection tree.
+    For instance, ``ks=[64, 128, 256, 512]`` costs a single call of
+    :func:`mgmetis.metis.part_graph_recursize` with 512 parts. The `ks` must
+    form a chain in which each `k` divides the next one; if a coarser `k` is
+    not a node of the bisection tree (e.g., 3 within 6, which is split into
+    3+3), the chain is split there, and the subgraphs of the coarser parts are
+    bisected independently (and concurrently), as in
+    :func:`part_graph_hierarchical`.
+
+    Parameters
+    ----------
+    ks : list of int
+        Numbers of parts, e.g., candidate process counts.
+    xadj, adjncy : np.ndarray
+        The adjacency structure (CSR)
+    nthreads : int, optional
+        Maximum number of threads for partitioning subgraphs concurrently.
+
+    Returns
+    -------
+    edgecuts : list of int
+        Edge cut of the partition for each of `ks`
+    part : np.ndarray
+        Part IDs (C index) of shape ``(nv, len(ks))``, where column ``i`` is
+        the partition into ``ks[i]`` parts. The partitions are nested, i.e.,
+        ``part[:, i] == part[:, j] // (ks[j] // ks[i])`` for ``ks[i] <= ks[j]``.
+
+    Other Parameters
+    ----------------
+    vwgt, vsize, adjwgt : np.ndarray, optional
+        Weights, which are restricted to each of the subgraphs.
+    ncon, ubvec, options : optional
+        Passed to every call of :func:`mgmetis.metis.part_graph_recursize`.
+    validate : {"off", "fast", "full"}, optional
+        Input graph validation level, see :func:`mgmetis.metis.part_graph_kway`.
+
+    Examples
+    --------
+    >>> from mgmetis.hierarchy import part_graph_multi
+    >>> ks = [64, 128, 256, 512]
+    >>> edgecuts, part = part_graph_multi(ks, xadj, adjncy)
+    >>> part64 = part[:, 0]
+    """
+    ks = _check_levels(ks)
+    chain = sorted(set(ks))
+    if any(b % a for a, b in zip(chain[:-1], chain[1:])):
+        raise ValueError("each of ks should divide the next larger one, got {}".format(chain))
+    ratios = [chain[0]] + [b // a for a, b in zip(chain[:-1], chain[1:])]
+    # NOTE: group the chain into segments, each of which is computed by a
+    # single recursive bisection of the parts of the previous segment
+    segments = [ratios[:1]]
+    for r in ratios[1:]:
+        if _is_nested(segments[-1] + [r]):
+            segments[-1].append(r)
+        else:
+            segments.append([r])
+    xadj, adjncy, nv = process_graph(xadj, adjncy)
+    weights = _get_weights(xadj, nv, kw)
+    validate_graph(xadj, adjncy, weights[2], kw.get("validate", "off"))
+    if xadj[0] == 1:
+        xadj, adjncy = xadj - 1, adjncy - 1
+    levels = [int(np.prod(seg)) for seg in segments]
+    _, seg_part = _part_levels(
+        levels, xadj, adjncy, weights, np.zeros(nv, dtype=np.int64), kw, metis.part_graph_recursize
+    )
+    parts = {}
+    for lvl, seg in enumerate(segments):
+        flat = flatten_levels(seg_part[:, : lvl + 1], levels[: lvl + 1])
+        size, k = levels[lvl], chain[sum(len(x) for x in segments[:lvl])] // seg[0]
+        for r in seg:
+            size, k = size // r, k * r
+            parts[k] = flat // size
+    part = np.stack([parts[k] for k in ks], axis=1)
+    edgecuts = [compute_edgecut(xadj, adjncy, parts[k], weights[2]) for k in ks]
+    return edgecuts, part
+
+
+def part_hierarchical_mpi(  # pylint: disable=too-many-locals
+    levels, xadj, adjncy, vtxdist=None, comm=None, **kw
+):
+    """Partition a distributed graph hierarchically
+
+    The top level is partitioned with :func:`mgmetis.parmetis.part_kway`. Then,
+    each of the top level parts is gathered on a single process (part ``p`` on
+    rank ``p % comm.size``), where the remaining levels are partitioned with
+    serial METIS, see :func:`part_graph_hierarchical`.
+
+    Parameters
+    ----------
+    levels : list of int
+        Number of parts at each level, e.g., ``[nnodes, nsockets, ncores]``.
+    xadj, adjncy : np.ndarray
+        Local CSR graph with global indices, see
+        :func:`mgmetis.parmetis.part_kway`.
+    vtxdist : np.ndarray, optional
+        Global range array, if not specified, then it's computed with MPI
+        collection.
+    comm : MPI_Comm, optional
+        MPI communicator, default is MPI_COMM_WORLD.
+
+    Returns
+    -------
+    edgecuts : list of int
+        Global edge cut of the (flattened) partition at each level
+    part : np.ndarray
+        Per-level part IDs of the local vertices with shape
+        ``(nv, len(levels))``.
+
+    Other Parameters
+    ----------------
+    vwgt, adjwgt : np.ndarray, optional
+        Weights of the local vertices and edges
+    par_options : np.ndarray, optional
+        ParMETIS control parameters for the top level
+    options, ubvec, nthreads : optional
+        See :func:`part_graph_hierarchical`.
+    """
+    from . import parmetis  # pylint: disable=import-outside-toplevel
+    from .par_utils import get_comm, build_proc_dist  # pylint: disable=import-outside-toplevel
+
+    levels = _check_levels(levels)
+    comm = get_comm(comm)
+    xadj, adjncy, nv = process_graph(xadj, adjncy)
+    vtxdist = np.asarray(
+        vtxdist if vtxdist is not None else build_proc_dist(nv, comm, xadj[0]),
+        dtype=xadj.dtype,
+    )
+    if xadj[0] == 1:
+        # NOTE: work with C index
+        xadj, adjncy, vtxdist = xadj - 1, adjncy - 1, vtxdist - 1
+    vwgt = try_get_input_array(kw, "vwgt", nv, xadj.dtype)
+    adjwgt = try_get_input_array(kw, "adjwgt", xadj[-1], xadj.dtype)
+    top_cut, top = parmetis.part_kway(
+        levels[0],
+        xadj,
+        adjncy,
+        vtxdist=vtxdist,
+        comm=comm,
+        vwgt=vwgt,
+        adjwgt=adjwgt,
+        options=kw.get("par_options", None),
+    )
+    part = np.zeros((nv, len(levels)), dtype=xadj.dtype)
+    part[:, 0] = top
+    if len(levels) == 1:
+        return [top_cut], part
+    # NOTE: ship each top level part to its owner rank
+    gids = vtxdist[comm.rank] + np.arange(nv, dtype=np.int64)
+    dest = top % comm.size
+    rows = np.repeat(np.arange(nv), np.diff(xadj))
+    send = []
+    for r in range(comm.size):
+        vmask = dest == r
+        emask = vmask[rows]
+        send.append(
+            (
+                top[vmask],
+                gids[vmask],
+                np.diff(xadj)[vmask],
+                adjncy[emask],
+                None if vwgt is None else vwgt[vmask],
+                None if adjwgt is None else adjwgt[emask],
+            )
+        )
+    recv = comm.alltoall(send)
+    rtop, rgids, rdeg, radj = (np.concatenate([x[i] for x in recv]) for i in range(4))
+    rvwgt = None if vwgt is None else np.concatenate([x[4] for x in recv])
+    radjwgt = None if adjwgt is None else np.concatenate([x[5] for x in recv])
+    # NOTE: keep the edges within the same top level part
+    order = np.argsort(rgids)
+    pos = np.minimum(np.searchsorted(rgids, radj, sorter=order), max(rgids.size - 1, 0))
+    nbrs = order[pos]
+    rrows = np.repeat(np.arange(rgids.size), rdeg)
+    keep = (rgids[nbrs] == radj) & (rtop[nbrs] == rtop[rrows])
+    sxadj = np.zeros(rgids.size + 1, dtype=xadj.dtype)
+    np.cumsum(np.bincount(rrows[keep], minlength=rgids.size), out=sxadj[1:])
+    sadjncy = np.asarray(nbrs[keep], dtype=xadj.dtype)
+    sadjwgt = None if radjwgt is None else radjwgt[keep]
+    cuts, sub_part = _part_levels(
+        levels[1:], sxadj, sadjncy, (rvwgt, None, sadjwgt), rtop.astype(np.int64), kw
+    )
+    # NOTE: send results back in the received order
+    bounds = np.cumsum([x[0].size for x in recv])[:-1]
+    back = comm.alltoall(np.split(sub_part, bounds))
+    for r in range(comm.size):
+        part[dest == r, 1:] = back[r]
+    cuts = comm.allreduce(np.asarray(cuts, dtype=np.int64))
+    return [top_cut] + [top_cut + int(x) for x in cuts], part
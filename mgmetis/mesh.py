@@ -0,0 +1,499 @@
+# -*- coding: utf-8 -*-
+"""Element-aware dual graphs of meshes
+
+:func:`mgmetis.metis.mesh_to_dual` and :func:`mgmetis.metis.part_mesh_dual`
+connect two elements if they share at least `ncommon` nodes, where a single
+value is used for the whole mesh. For mixed meshes, e.g., tetrahedra, prisms
+and hexahedra, there is no correct value: small ones connect elements through
+edges and vertices, while large ones disconnect neighbors sharing triangular
+faces.
+
+This module knows the faces of the standard element types. Each element is
+expanded into its faces, the sorted face-node tuples are hashed with vectorized
+NumPy operations, and two elements are connected if and only if they share a
+face. Optionally, the edges are weighted by the face areas. The resulting
+graph can be directly fed into :func:`mgmetis.metis.part_graph_kway`.
+
+The local node ordering follows the VTK convention, e.g., the bottom face of a
+hexahedron is ``(0, 1, 2, 3)``. High-order (P2 and P3) elements list their
+corner nodes first, which are the only ones that determine the connectivity.
+Thus, :func:`corner_mesh` reduces them to linear elements, and the mesh
+partitioners in :mod:`mgmetis.metis` accept an `etype` to partition the
+corner mesh only, see :func:`part_corner_mesh`.
+
+.. module:: mgmetis.mesh
+.. moduleauthor:: Qiao Chen, <benechiao@gmail.com>
+"""
+
+from collections import namedtuple
+
+import numpy as np
+
+from . import metis
+from .utils import process_mesh, get_or_create_workspace
+
+__all__ = [
+    "ElementType",
+    "ELEMENT_TYPES",
+    "corner_mesh",
+    "part_corner_mesh",
+    "dual_graph",
+    "part_mesh_dual",
+]
+
+
+class ElementType(namedtuple("ElementType", ["name", "dim", "nnodes", "ncorners", "faces"])):
+    """Description of an element type
+
+    Attributes
+    ----------
+    name : str
+        Name of the type, e.g., ``"tet"``
+    dim : int
+        Topological dimension
+    nnodes : int
+        Number of nodes per element
+    ncorners : int
+        Number of corner (vertex) nodes, which are the first ones of the
+        element, followed by the edge, face and interior nodes of high-order
+        elements.
+    faces : tuple
+        Local node IDs of the faces, i.e., the entities of dimension `dim-1`,
+        which are given by the corner nodes ordered cyclically.
+    """
+
+    __slots__ = ()
+
+
+_LINEAR_TYPES = (
+    ElementType("line", 1, 2, 2, ((0,), (1,))),
+    ElementType("tri", 2, 3, 3, ((0, 1), (1, 2), (2, 0))),
+    ElementType("quad", 2, 4, 4, ((0, 1), (1, 2), (2, 3), (3, 0))),
+    ElementType("tet", 3, 4, 4, ((0, 2, 1), (0, 1, 3), (1, 2, 3), (0, 3, 2))),
+    ElementType(
+        "pyramid", 3, 5, 5, ((0, 3, 2, 1), (0, 1, 4), (1, 2, 4), (2, 3, 4), (3, 0, 4))
+    ),
+    ElementType("prism", 3, 6, 6, ((0, 2, 1), (3, 4, 5), (0, 1, 4, 3), (1, 2, 5, 4), (2, 0, 3, 5))),
+    ElementType(
+        "hex",
+        3,
+        8,
+        8,
+        (
+            (0, 3, 2, 1),
+            (4, 5, 6, 7),
+            (0, 1, 5, 4),
+            (1, 2, 6, 5),
+            (2, 3, 7, 6),
+            (3, 0, 4, 7),
+        ),
+    ),
+)
+
+# NOTE: (linear type, number of nodes) of the P2 and P3 elements, where the
+# number of nodes is appended to the linear type name
+_HIGH_ORDER_TYPES = (
+    ("line", 3),
+    ("line", 4),
+    ("tri", 6),
+    ("tri", 10),
+    ("quad", 8),
+    ("quad", 9),
+    ("quad", 16),
+    ("tet", 10),
+    ("tet", 20),
+    ("pyramid", 13),
+    ("pyramid", 14),
+    ("prism", 15),
+    ("prism", 18),
+    ("hex", 20),
+    ("hex", 27),
+    ("hex", 64),
+)
+
+
+def _make_element_types():
+    # helper to create the table of element types, where the high-order types
+    # share the faces of their linear counterparts
+    types = {t.name: t for t in _LINEAR_TYPES}
+    for name, nnodes in _HIGH_ORDER_TYPES:
+        types[name + str(nnodes)] = types[name]._replace(name=name + str(nnodes), nnodes=nnodes)
+    return types
+
+
+ELEMENT_TYPES = _make_element_types()
+"""Supported element types, keyed by their names"""
+
+# NOTE: element types inferred from the numbers of nodes per dimension, where
+# "tet20" is left out as it has as many nodes as "hex20"
+_TYPES_BY_NNODES = {
+    dim: {t.nnodes: t.name for t in ELEMENT_TYPES.values() if t.dim == dim and t.name != "tet20"}
+    for dim in (1, 2, 3)
+}
+
+
+def _get_element_types(etype, counts, dim):
+    # helper to get the list of element types used in the mesh and the index
+    # of the type of each element
+    ne = counts.size
+    if etype is None or (isinstance(etype, str) and etype == "auto"):
+        try:
+            by_nnodes = _TYPES_BY_NNODES[dim]
+        except KeyError:
+            raise ValueError("invalid dimension {}".format(dim)) from None
+        nnodes = np.unique(counts)
+        bad = [n for n in nnodes if n not in by_nnodes]
+        if bad:
+            raise ValueError("cannot infer {}D element with {} nodes".format(dim, bad[0]))
+        types = [ELEMENT_TYPES[by_nnodes[n]] for n in nnodes]
+        return types, np.searchsorted(nnodes, counts)
+    if isinstance(etype, (str, ElementType)):
+        etype = [etype]
+        codes = np.zeros(ne, dtype=np.intp)
+    else:
+        etype = np.asarray(etype).reshape(-1)
+        if etype.size != ne:
+            raise ValueError("etype should be size of {}".format(ne))
+        if not np.issubdtype(etype.dtype, np.integer):
+            etype, codes = np.unique(etype, return_inverse=True)
+        else:
+            # NOTE: integer codes index the types in insertion order
+            etype, codes = list(ELEMENT_TYPES), etype
+            if ne and (codes.min() < 0 or codes.max() >= len(etype)):
+                raise ValueError("invalid element type code")
+    try:
+        types = [t if isinstance(t, ElementType) else ELEMENT_TYPES[t] for t in etype]
+    except KeyError as e:
+        raise ValueError("unknown element type {}".format(e.args[0])) from None
+    nnodes = np.asarray([t.nnodes for t in types], dtype=counts.dtype)
+    if np.any(nnodes[codes] != counts):
+        raise ValueError("numbers of element nodes don't match the element types")
+    return types, codes
+
+
+def _face_area(xyz, fnodes):
+    # helper to compute the measures of the faces given by rows of node IDs,
+    # i.e., 1 for points, lengths of edges and areas of triangles and
+    # (planar) quadrilaterals
+    k = fnodes.shape[1]
+    if k == 1:
+        return np.ones(fnodes.shape[0])
+    if k == 2:
+        return np.linalg.norm(xyz[fnodes[:, 1]] - xyz[fnodes[:, 0]], axis=1)
+    if xyz.shape[1] < 3:
+        xyz = np.pad(xyz, ((0, 0), (0, 3 - xyz.shape[1])))
+    if k == 3:
+        d1 = xyz[fnodes[:, 1]] - xyz[fnodes[:, 0]]
+        d2 = xyz[fnodes[:, 2]] - xyz[fnodes[:, 0]]
+    else:
+        d1 = xyz[fnodes[:, 2]] - xyz[fnodes[:, 0]]
+        d2 = xyz[fnodes[:, 3]] - xyz[fnodes[:, 1]]
+    return 0.5 * np.linalg.norm(np.cross(d1, d2), axis=1)
+
+
+def _hash_keys(keys, nv):
+    # helper to perfectly hash the leading columns of keys into an integer,
+    # returns the hash and the number of hashed columns
+    h = np.zeros(keys.shape[0], dtype=np.int64)
+    ncols = 0
+    while ncols < keys.shape[1] and nv ** (ncols + 1) < 2 ** 63:
+        h *= nv
+        h += keys[:, ncols]
+        ncols += 1
+    return h, ncols
+
+
+def _match_faces(fnodes, nv):
+    # helper to find the pairs of identical faces, i.e., rows of fnodes with
+    # the same set of nodes. returns the row indices of the pairs
+    keys = np.sort(fnodes, axis=1)
+    h, ncols = _hash_keys(keys, nv)
+    order = np.argsort(h)
+    same = h[order[1:]] == h[order[:-1]]
+    if ncols < keys.shape[1]:
+        # NOTE: in conforming meshes, faces sharing the hashed nodes are
+        # identical, otherwise fall back to the exact sorting
+        rest = keys[:, ncols:][order]
+        if np.any(rest[1:][same] != rest[:-1][same]):
+            order = np.lexsort(np.vstack((keys[:, ncols:].T[::-1], h)))
+            rest = keys[:, ncols:][order]
+            same = (h[order[1:]] == h[order[:-1]]) & np.all(rest[1:] == rest[:-1], axis=1)
+    if np.any(same[1:] & same[:-1]):
+        raise ValueError("non-manifold mesh, a face is shared by more than two elements")
+    first = np.flatnonzero(same)
+    return order[first], order[first + 1]
+
+
+def corner_mesh(*cells, **kw):
+    """Reduce a (high-order) mesh to the corner nodes of its elements
+
+    Parameters
+    ----------
+    *cells : positional arguments
+        Mesh, see :func:`mgmetis.metis.part_mesh_dual`
+    etype : str, ElementType or array_like, optional
+        Element types, see :func:`dual_graph`
+    dim : int, optional
+        Dimension used to infer the element types, default is 3.
+    nv : int, optional
+        Total number of vertices in mesh
+
+    Returns
+    -------
+    eptr, eind : np.ndarray
+        The corner mesh, whose nodes are renumbered contiguously (in the same
+        index system as the input).
+    cnodes : np.ndarray
+        The IDs of the corner nodes in the input mesh, i.e., node `i` of the
+        corner mesh is node `cnodes[i]` of the input mesh.
+    """
+    eptr, eind, nv = process_mesh(*cells, nv=kw.get("nv", -1))
+    counts = np.diff(eptr)
+    types, codes = _get_element_types(kw.get("etype", None), counts, kw.get("dim", 3))
+    start = int(eptr[0])
+    ncorners = np.asarray([t.ncorners for t in types], dtype=eptr.dtype)[codes]
+    ceptr = np.empty_like(eptr)
+    ceptr[0] = start
+    np.cumsum(ncorners, out=ceptr[1:])
+    ceptr[1:] += start
+    # NOTE: the corners are the leading nodes of each element, thus the j-th
+    # entry of the corner eind is shifted by eptr[e]-ceptr[e] of its element
+    shift = np.repeat(eptr[:-1] - ceptr[:-1], ncorners)
+    ceind = eind[np.arange(shift.size, dtype=eptr.dtype) + shift] - start
+    mask = np.zeros(nv, dtype=bool)
+    mask[ceind] = True
+    cnodes = np.flatnonzero(mask)
+    newid = np.cumsum(mask, dtype=eptr.dtype)
+    ceind = newid[ceind] - (1 - start)
+    return ceptr, np.asarray(ceind, dtype=eptr.dtype), np.asarray(cnodes + start, dtype=eptr.dtype)
+
+
+def part_corner_mesh(nparts, *cells, **kw):
+    """Partition a high-order mesh on its corner mesh
+
+    The elements are reduced to their corner nodes with :func:`corner_mesh`,
+    and the corner mesh is partitioned with
+    :func:`mgmetis.metis.part_mesh_dual` or
+    :func:`mgmetis.metis.part_mesh_nodal`. Afterwards, the edge, face and
+    interior nodes are assigned to the part of the last element (in the
+    element order) containing them. This is invoked by the METIS mesh
+    partitioners if `etype` is given.
+
+    Parameters
+    ----------
+    nparts : int
+        Number of partitions, must be positive
+    *cells : positional arguments
+        Mesh, see :func:`mgmetis.metis.part_mesh_dual`
+    etype : str, ElementType or array_like
+        Element types, see :func:`dual_graph`
+    dim : int, optional
+        Dimension used to infer the element types, default is 3.
+    kernel : {"dual", "nodal"}, optional
+        The METIS mesh partitioner, default is ``"dual"``.
+
+    Returns
+    -------
+    objval : int
+        Objective value of the corner mesh's partitioning
+    epart, npart : np.ndarray
+        Partition vectors of all elements and all nodes
+
+    Other Parameters
+    ----------------
+    nv, ncommon, vwgt, vsize, tpwgts, options, memory_report : optional
+        See :func:`mgmetis.metis.part_mesh_dual` and
+        :func:`mgmetis.metis.part_mesh_nodal`, where the nodal weights are
+        given for all nodes.
+    epart, npart : np.ndarray, optional
+        User workspace of output `epart` and `npart`, respectively.
+    """
+    kernel = kw.get("kernel", "dual")
+    if kernel not in ("dual", "nodal"):
+        raise ValueError("unknown kernel {}".format(kernel))
+    eptr, eind, nv = process_mesh(*cells, nv=kw.get("nv", -1))
+    ceptr, ceind, cnodes = corner_mesh(eptr, eind, **dict(kw, nv=nv))
+    start = int(eptr[0])
+    npart = get_or_create_workspace(kw, "npart", nv, eptr.dtype)
+    kw = {k: v for k, v in kw.items() if k not in ("etype", "dim", "kernel", "nv", "npart")}
+    if kernel == "nodal":
+        for name in ("vwgt", "vsize"):
+            if kw.get(name, None) is not None:
+                kw[name] = np.asarray(kw[name]).reshape(-1)[cnodes - start]
+        part_mesh = metis.part_mesh_nodal
+    else:
+        part_mesh = metis.part_mesh_dual
+    objval, epart, cpart = part_mesh(nparts, ceptr, ceind, nv=cnodes.size, **kw)
+    npart[eind[: eptr[-1] - start] - start] = np.repeat(epart, np.diff(eptr))
+    npart[cnodes - start] = cpart
+    return objval, epart, npart
+
+
+def dual_graph(*cells, **kw):  # pylint: disable=too-many-locals
+    """Build the face-adjacency dual graph of a mesh
+
+    Parameters
+    ----------
+    *cells : positional arguments
+        Mesh, see :func:`mgmetis.metis.part_mesh_dual`
+    etype : str, ElementType or array_like, optional
+        Element types, either a single type for all elements, or one per
+        element given by names or integer codes, i.e., indices into
+        :data:`ELEMENT_TYPES`. If not given (default) or ``"auto"``, then the
+        types are inferred from the numbers of nodes per element and `dim`.
+    dim : int, optional
+        Dimension used to infer the element types, default is the number of
+        columns of `xyz` or 3 if `xyz` isn't given.
+    xyz : np.ndarray, optional
+        Node coordinates, if given, then the edges are weighted by the areas
+        of the shared faces.
+    scale : float, optional
+        The largest face area is mapped to the edge weight `scale`, default is
+        1000. Weights are rounded and at least 1.
+    nv : int, optional
+        Total number of vertices in mesh
+
+    Returns
+    -------
+    xadj, adjncy : np.ndarray
+        The dual graph (CSR), in the same index system as the mesh.
+    adjwgt : np.ndarray or None
+        Face-area edge weights if `xyz` is given
+
+    Notes
+    -----
+    Two elements are connected if and only if they share a whole face, e.g.,
+    a triangle of a tetrahedron and a prism or a quadrilateral of a hexahedron
+    and a pyramid. Faces of different node counts are never matched. Faces of
+    high-order elements are matched by their corner nodes.
+
+    Examples
+    --------
+    >>> from mgmetis import metis, mesh
+    >>> xadj, adjncy, adjwgt = mesh.dual_graph(eptr, eind, xyz=xyz)
+    >>> objval, epart = metis.part_graph_kway(4, xadj, adjncy, adjwgt=adjwgt)
+    """
+    eptr, eind, nv = process_mesh(*cells, nv=kw.get("nv", -1))
+    xyz = kw.get("xyz", None)
+    if xyz is not None:
+        xyz = np.asarray(xyz, dtype=np.float64)
+        if xyz.ndim == 1:
+            xyz = xyz.reshape(-1, 1)
+        if xyz.shape[0] < nv:
+            raise ValueError("xyz should have at least {} rows".format(nv))
+    dim = kw.get("dim", None)
+    if dim is None:
+        dim = 3 if xyz is None else xyz.shape[1]
+    ne = eptr.size - 1
+    counts = np.diff(eptr)
+    types, codes = _get_element_types(kw.get("etype", None), counts, dim)
+    start = int(eptr[0])
+    # NOTE: expand the elements into faces, grouped by face sizes
+    groups = {}
+    for code, t in enumerate(types):
+        elems = np.flatnonzero(codes == code)
+        if not elems.size:
+            continue
+        conn = eind[eptr[elems, None] - start + np.arange(t.nnodes)] - start
+        for k in sorted(set(len(f) for f in t.faces)):
+            faces = np.asarray([f for f in t.faces if len(f) == k])
+            groups.setdefault(k, []).append(
+                (conn[:, faces].reshape(-1, k), np.repeat(elems, faces.shape[0]))
+            )
+    e1, e2, area = [], [], []
+    for k, group in groups.items():
+        fnodes = np.concatenate([g[0] for g in group])
+        owner = np.concatenate([g[1] for g in group])
+        i1, i2 = _match_faces(fnodes, max(int(nv), 1))
+        e1.append(owner[i1])
+        e2.append(owner[i2])
+        if xyz is not None:
+            area.append(_face_area(xyz, fnodes[i1]))
+    e1 = np.concatenate(e1) if e1 else np.zeros(0, dtype=np.intp)
+    e2 = np.concatenate(e2) if e2 else np.zeros(0, dtype=np.intp)
+    area = np.concatenate(area) if area else np.zeros(0)
+    # build CSR with sorted neighbors, where degenerated elements may share a
+    # face with themselves
+    keep = e1 != e2
+    src = np.concatenate((e1[keep], e2[keep]))
+    dst = np.concatenate((e2[keep], e1[keep]))
+    key = src.astype(np.int64) * ne + dst
+    order = np.argsort(key)
+    key = key[order]
+    dup = np.flatnonzero(key[1:] == key[:-1]) + 1
+    if dup.size:
+        # NOTE: degenerated elements may share more than one face
+        order = np.delete(order, dup)
+    src, dst = src[order], dst[order]
+    xadj = np.empty(ne + 1, dtype=eptr.dtype)
+    xadj[0] = 0
+    np.cumsum(np.bincount(src, minlength=ne), out=xadj[1:])
+    xadj += start
+    adjncy = np.asarray(dst + start, dtype=eptr.dtype)
+    adjwgt = None
+    if xyz is not None:
+        area = np.concatenate((area[keep], area[keep]))[order]
+        amax = area.max() if area.size else 0.0
+        scale = float(kw.get("scale", 1000)) / amax if amax > 0 else 0.0
+        adjwgt = np.asarray(np.maximum(np.rint(area * scale), 1), dtype=eptr.dtype)
+    return xadj, adjncy, adjwgt
+
+
+def part_mesh_dual(nparts, *cells, **kw):
+    """Partition a mesh on its face-adjacency dual graph
+
+    This is a replacement of :func:`mgmetis.metis.part_mesh_dual` for meshes
+    whose elements should be connected through faces only, in particular for
+    mixed meshes.
+
+    Parameters
+    ----------
+    nparts : int
+        Number of partitions, must be positive
+    *cells : positional arguments
+        Mesh, see :func:`mgmetis.metis.part_mesh_dual`
+    etype, dim, xyz, scale, nv : optional
+        See :func:`dual_graph`
+    kernel : {"kway", "recursive"}, optional
+        The graph partitioner, default is ``"kway"``.
+
+    Returns
+    -------
+    objval : int
+        The edge-cut (weighted by face areas if `xyz` is given) or the total
+        communication volume of the dual graph's partitioning.
+    epart : np.ndarray
+        Partition vector of the elements
+    npart : np.ndarray
+        Partition vector of the nodes, a node is assigned to the part of the
+        last element (in the element order) containing it.
+
+    Other Parameters
+    ----------------
+    vwgt, vsize, tpwgts, ubvec, options, validate, memory_report : optional
+        See :func:`mgmetis.metis.part_graph_kway`
+    epart : np.ndarray, optional
+        User workspace of output `epart`.
+
+    See Also
+    --------
+    dual_graph
+    """
+    if nparts <= 0:
+        raise ValueError("invalid nparts")
+    eptr, eind, nv = process_mesh(*cells, nv=kw.get("nv", -1))
+    xadj, adjncy, adjwgt = dual_graph(eptr, eind, **dict(kw, nv=nv))
+    kernel = kw.get("kernel", "kway")
+    if kernel not in ("kway", "recursive"):
+        raise ValueError("unknown kernel {}".format(kernel))
+    kw = {k: v for k, v in kw.items() if k not in ("etype", "dim", "xyz", "scale", "nv", "kernel")}
+    if "epart" in kw:
+        kw["part"] = kw.pop("epart")
+    if adjwgt is not None:
+        kw["adjwgt"] = adjwgt
+    part_graph = metis.part_graph_kway if kernel == "kway" else metis.part_graph_recursize
+    objval, epart = part_graph(nparts, xadj, adjncy, **kw)
+    start = int(eptr[0])
+    npart = np.zeros(nv, dtype=epart.dtype)
+    npart[eind[: eptr[-1] - start] - start] = np.repeat(epart, np.diff(eptr))
+    return objval, epart, npart
@@ -6,10 +6,12 @@
 """
 
 import ctypes as c
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor
 
 import numpy as np
 
-from .enums import OPTION
+from .enums import OPTION, CTYPE
 from .utils import (
     get_so,
     process_mesh,
@@ -17,16 +19,29 @@ from .utils import (
     as_pointer,
     get_or_create_workspace,
     try_get_input_array,
+    validate_graph,
+    MetisError,
+    MetisInputError,
     _handle_metis_ret,
+    _METIS_ERRORS,
 )
 
 __all__ = [
     "get_default_options",
     "part_graph_recursize",
     "part_graph_kway",
+    "part_graph_batch",
     "part_mesh_nodal",
     "part_mesh_dual",
     "node_nd",
+    "mmd_order",
+    "mmd_order_batch",
+    "mesh_to_dual",
+    "mesh_to_nodal",
+    "coarsen",
+    "CoarseLevel",
+    "get_memory_usage",
+    "estimate_memory",
 ]
 
 
@@ -67,6 +82,12 @@ class _LibMetisModule:
         cls.__set_metis_func(so_obj, "Free", ["v"])  # v for void*
         # SetDefaultOptions
         cls.__set_metis_func(so_obj, "SetDefaultOptions", ["i*"])
+        # GetMemoryUsage
+        cls.__set_metis_func(so_obj, "GetMemoryUsage", ["z*"] * 2)  # z for size_t
+        # Coarsen
+        cls.__set_metis_func(so_obj, "Coarsen", ["i*"] * 8 + ["i**"])
+        # NodeMMD
+        cls.__set_metis_func(so_obj, "NodeMMD", ["i*"] * 6)
         # NodeNDP
         cls.__set_metis_func(so_obj, "NodeNDP", ["i"] + ["i*"] * 3 + ["i"] + ["i*"] * 4)
         # ComputeVertexSeparator
@@ -86,6 +107,8 @@ class _LibMetisModule:
         c_args = []
         for arg in args:
             t = cls._IDX_T if arg.startswith("i") else c.c_float
+            if arg.startswith("z"):
+                t = c.c_size_t
             if arg.startswith("v"):
                 assert len(arg) == 1, "void must be point for METIS_Free"
                 t = c.c_void_p
@@ -126,6 +149,32 @@ finally:
     del sys
 
 
+try:
+    # NOTE: the compiled modules are the same shared objects as above
+    from ._cython import metis as _fast_libmetis, metis64 as _fast_libmetis64
+except ImportError:  # pragma: no cover
+    _fast_libmetis = _fast_libmetis64 = None
+
+_USE_FAST = True
+"""Use the Cython fast paths if available, otherwise always use ctypes"""
+
+
+def _get_fast_libmetis(dtype):
+    # helper to get the Cython fast path module (or None) with proper integer
+    # type, which bypasses the ctypes dispatch
+    if not _USE_FAST:
+        return None
+    if (dtype.alignment >> 2) & 1:
+        return _fast_libmetis
+    return _fast_libmetis64
+
+
+def _check_fast_ret(ret, fname):
+    # helper for handling the return of the fast paths like _handle_metis_ret
+    if ret != 1:
+        raise _METIS_ERRORS.get(ret, MetisError)("METIS_{}:{}".format(fname, ret))
+
+
 def _get_libmetis(dtype):
     # helper to get the underlying C METIS libraries with proper integer type
     if (dtype.alignment >> 2) & 1:
@@ -134,6 +183,20 @@ def _get_libmetis(dtype):
     return _libmetis64
 
 
+def _get_input_array(kw, key, n, dtype):
+    # helper to get an optional input as a flat C-contiguous array, which both
+    # the memoryviews of the fast paths and the raw ctypes pointers require,
+    # e.g., 2D vwgt of shape (nv, ncon) or strided slices
+    v = try_get_input_array(kw, key, n, dtype)
+    return v if v is None else np.ascontiguousarray(v).reshape(-1)
+
+
+def _as_writeable(*arrays):
+    # helper to copy read-only (e.g., memory-mapped) inputs with Fortran index,
+    # which METIS temporarily renumbers in place
+    return tuple(a if a.flags.writeable else a.copy() for a in arrays)
+
+
 __default_int32_options__ = -1 * np.ones(40, dtype=np.int32)
 """Raw data for default option values for 32bit METIS"""
 
@@ -225,6 +288,119 @@ def get_default_options(dtype="intc"):
     return opts
 
 
+def _report_memory(lib, kw):
+    # helper to fill the user dict memory_report with the heap statistics of
+    # the last METIS call made by this thread
+    report = kw.get("memory_report", None)
+    if report is not None:
+        cur, peak = c.c_size_t(0), c.c_size_t(0)
+        lib.GetMemoryUsage(c.byref(cur), c.byref(peak))
+        report.update(current=cur.value, peak=peak.value)
+
+
+def get_memory_usage(dtype="intc"):
+    """Get the heap memory statistics of the last METIS call
+
+    The statistics are tracked by GKlib per thread, so this must be called on
+    the same thread right after the METIS call of interest. Alternatively, pass
+    a dictionary as `memory_report` to any of the routines in this module.
+
+    Parameters
+    ----------
+    dtype : np.dtype, optional
+        Integer type of the METIS library, i.e., np.int32 or np.int64.
+
+    Returns
+    -------
+    current : int
+        Number of bytes that were still allocated when the call returned,
+        which were released by the GKlib cleanup.
+    peak : int
+        Peak number of bytes allocated by METIS during the call, excluding
+        the input and output arrays owned by Python.
+    """
+    report = {}
+    _report_memory(_get_libmetis(np.dtype(dtype)), {"memory_report": report})
+    return report["current"], report["peak"]
+
+
+# NOTE: coefficients of the peak memory model, i.e.,
+#   c0 + c1*nv + c2*nnz + c3*nparts + c4*min(nv, 30*nparts)*nnz/nv
+#      + c5*ne + c6*nind
+# where the fourth term accounts for the coarsest graph (roughly 30*nparts
+# vertices) and the last two for the mesh input. They are fitted with least
+# squares of the relative errors against get_memory_usage measurements on 2D/3D
+# structured graphs and meshes of 1e3 to 3e5 vertices and 2 to 512 parts, the
+# maximum relative error is below 20%.
+_MEMORY_MODEL = {
+    4: {
+        "kway": (86600.0, 71.9, 11.18, 88.45, 15.97, 0.0, 0.0),
+        "recursive": (108600.0, 60.53, 11.8, 46.31, 0.1811, 0.0, 0.0),
+        "nd": (105900.0, 64.29, 12.02, 0.0, 0.0, 0.0, 0.0),
+        "mesh_dual": (123400.0, 8.906, 14.37, 89.57, 15.16, 0.0, 3.705),
+        "mesh_nodal": (110800.0, 31.02, 14.45, 72.37, 15.77, 15.93, -4.186),
+    },
+    8: {
+        "kway": (120600.0, 143.8, 22.33, 138.0, 32.13, 0.0, 0.0),
+        "recursive": (162300.0, 120.2, 23.71, 60.67, 0.5758, 0.0, 0.0),
+        "nd": (154900.0, 129.2, 23.91, 0.0, 0.0, 0.0, 0.0),
+        "mesh_dual": (200000.0, 17.68, 28.68, 141.7, 30.32, 0.0, 7.591),
+        "mesh_nodal": (170500.0, 62.71, 28.77, 118.6, 31.52, 29.7, -7.717),
+    },
+}
+
+
+def estimate_memory(nv, nnz, nparts=2, kernel="kway", **kw):
+    """Predict the peak heap memory of a METIS call
+
+    The prediction is based on a linear model calibrated against the peak
+    memory reported by :func:`get_memory_usage`, which is accurate to about
+    20%. Note that the input and output arrays are not included.
+
+    Parameters
+    ----------
+    nv : int
+        Number of vertices of the graph. For mesh kernels, this is the
+        number of vertices of the graph that METIS builds internally, i.e.,
+        number of elements for ``"mesh_dual"`` and number of nodes for
+        ``"mesh_nodal"``.
+    nnz : int
+        Number of adjacency entries of the graph, i.e., ``xadj[-1]``. For mesh
+        kernels, this is the size of the adjacency of the dual or nodal graph,
+        see :func:`mesh_to_dual` and :func:`mesh_to_nodal`.
+    nparts : int, optional
+        Number of partitions, default is 2.
+    kernel : {"kway", "recursive", "nd", "mesh_dual", "mesh_nodal"}, optional
+        The METIS routine, i.e., :func:`part_graph_kway` (default),
+        :func:`part_graph_recursize`, :func:`node_nd`, :func:`part_mesh_dual`
+        and :func:`part_mesh_nodal`.
+
+    Returns
+    -------
+    int
+        Estimated peak memory in bytes
+
+    Other Parameters
+    ----------------
+    ne, nind : int, optional
+        Number of elements and size of `eind` of the mesh, required for mesh
+        kernels.
+    dtype : np.dtype, optional
+        Integer type of the METIS library, default is ``"intc"``.
+    """
+    model = _MEMORY_MODEL[np.dtype(kw.get("dtype", "intc")).itemsize]
+    if kernel not in model:
+        raise ValueError("unknown kernel {}".format(kernel))
+    if nparts <= 0:
+        raise ValueError("invalid nparts")
+    ne, nind = kw.get("ne", None), kw.get("nind", None)
+    if kernel.startswith("mesh") and (ne is None or nind is None):
+        raise ValueError("ne and nind are required for {}".format(kernel))
+    nv, nnz = max(int(nv), 1), int(nnz)
+    x = (1, nv, nnz, nparts, min(nv, 30 * nparts) * nnz / nv, ne or 0, nind or 0)
+    return int(sum(a * b for a, b in zip(model[kernel], x)))
+
+
 def _part_graph(kernel, nparts, xadj, adjncy, **kw):  # pylint: disable=too-many-locals
     # NOTE: unified implementation of graph partitioning
     if nparts <= 0:
@@ -233,19 +409,40 @@ def _part_graph(kernel, nparts, xadj, adjncy, **kw):  # pylint: disable=too-many
     if ncon < 1:
         raise ValueError("invalid ncon, should be at least 1")
     xadj, adjncy, nv = process_graph(xadj, adjncy)
-    vwgt = try_get_input_array(kw, "vwgt", nv * ncon, xadj.dtype)
-    vsize = try_get_input_array(kw, "vsize", nv, xadj.dtype)
-    adjwgt = try_get_input_array(kw, "adjwgt", xadj[-1] - xadj[0], xadj.dtype)
-    tpwgts = try_get_input_array(kw, "tpwgts", nparts * ncon, np.float32)
-    ubvec = try_get_input_array(kw, "ubvec", ncon, np.float32)
+    vwgt = _get_input_array(kw, "vwgt", nv * ncon, xadj.dtype)
+    vsize = _get_input_array(kw, "vsize", nv, xadj.dtype)
+    adjwgt = _get_input_array(kw, "adjwgt", xadj[-1] - xadj[0], xadj.dtype)
+    validate_graph(xadj, adjncy, adjwgt, kw.get("validate", "off"))
+    tpwgts = _get_input_array(kw, "tpwgts", nparts * ncon, np.float32)
+    ubvec = _get_input_array(kw, "ubvec", ncon, np.float32)
     opts = _get_default_raw_opts(kw, xadj.dtype)
     if xadj[0] == 1:
         # NOTE: fortran
         opts[OPTION.NUMBERING] = 1
+        xadj, adjncy = _as_writeable(xadj, adjncy)
+    part = get_or_create_workspace(kw, "part", nv, xadj.dtype)
     lib = _get_libmetis(xadj.dtype)
+    fast = _get_fast_libmetis(xadj.dtype)
+    if fast is not None:
+        ret, objval = fast.part_graph(
+            kernel == "PartGraphKway",
+            nparts,
+            xadj,
+            adjncy,
+            vwgt,
+            vsize,
+            adjwgt,
+            tpwgts,
+            ubvec,
+            opts,
+            part,
+            ncon,
+        )
+        _check_fast_ret(ret, kernel)
+        _report_memory(lib, kw)
+        return objval, part
     idx_t = lib._IDX_T
     nv, ncon, nparts, objval = idx_t(nv), idx_t(ncon), idx_t(nparts), idx_t(0)
-    part = get_or_create_workspace(kw, "part", nv.value, xadj.dtype)
     getattr(lib, kernel)(
         c.byref(nv),
         c.byref(ncon),
@@ -261,6 +458,7 @@ def _part_graph(kernel, nparts, xadj, adjncy, **kw):  # pylint: disable=too-many
         c.byref(objval),
         as_pointer(part),
     )
+    _report_memory(lib, kw)
     return objval.value, part
 
 
@@ -310,6 +508,14 @@ def part_graph_recursize(nparts, xadj, adjncy, **kw):
     ubvec : np.ndarray, optional
         This is an array of size ncon that specifies the allowed load imbalance
         tolerance for each constraint. See the doc.
+    validate : {"off", "fast", "full"}, optional
+        Check the input graph before calling METIS and raise
+        :class:`~mgmetis.utils.MetisInputError` upon defects. ``"fast"``
+        performs the :math:`O(nnz)` checks while ``"full"`` also checks
+        symmetry and duplicated edges. Default is ``"off"``.
+    memory_report : dict, optional
+        If given, it's updated with the heap statistics (in bytes) of the call,
+        i.e., ``"peak"`` and ``"current"``, see :func:`get_memory_usage`.
 
     See Also
     --------
@@ -364,6 +570,14 @@ def part_graph_kway(nparts, xadj, adjncy, **kw):
     ubvec : np.ndarray, optional
         This is an array of size ncon that specifies the allowed load imbalance
         tolerance for each constraint. See the doc.
+    validate : {"off", "fast", "full"}, optional
+        Check the input graph before calling METIS and raise
+        :class:`~mgmetis.utils.MetisInputError` upon defects. ``"fast"``
+        performs the :math:`O(nnz)` checks while ``"full"`` also checks
+        symmetry and duplicated edges. Default is ``"off"``.
+    memory_report : dict, optional
+        If given, it's updated with the heap statistics (in bytes) of the call,
+        i.e., ``"peak"`` and ``"current"``, see :func:`get_memory_usage`.
 
     See Also
     --------
@@ -372,6 +586,176 @@ def part_graph_kway(nparts, xadj, adjncy, **kw):
     return _part_graph("PartGraphKway", nparts, xadj, adjncy, **kw)
 
 
+def _split_batch(offsets, xadj, nthreads):
+    # helper to split the packed graphs into contiguous chunks of balanced
+    # work (estimated by the numbers of vertices and edges) for the threads
+    ng = offsets.size - 1
+    nthreads = max(min(int(nthreads), ng), 1)
+    cost = np.cumsum(np.diff(offsets) + np.diff(xadj[offsets]), dtype=np.float64)
+    if nthreads == 1 or cost[-1] == 0:
+        return [0, ng]
+    cuts = np.searchsorted(cost, cost[-1] * np.arange(1, nthreads) / nthreads)
+    return [0] + sorted(set(int(x) + 1 for x in cuts) - {ng}) + [ng]
+
+
+def _check_batch_offsets(offsets, nv, dtype):
+    # helper to check the graph offsets of the batched routines
+    offsets = np.ascontiguousarray(offsets, dtype=dtype).reshape(-1)
+    if offsets.size < 1 or offsets[0] != 0 or offsets[-1] != nv or np.any(np.diff(offsets) < 0):
+        raise ValueError("invalid graph offsets")
+    return offsets
+
+
+def _check_batch_edges(offsets, xadj, adjncy):
+    # helper to check that the adjacent vertices are within the same graph,
+    # otherwise METIS would access out of bounds; C index is assumed
+    bounds = np.repeat(np.repeat(offsets[:-1], np.diff(offsets)), np.diff(xadj))
+    sizes = np.repeat(np.repeat(np.diff(offsets), np.diff(offsets)), np.diff(xadj))
+    if np.any((adjncy[: bounds.size] - bounds).astype(np.uint64) >= sizes.astype(np.uint64)):
+        raise MetisInputError("edges between different graphs")
+
+
+def _run_batch(run, offsets, xadj, nthreads, fname):
+    # helper to run a compiled batch kernel, i.e., run(g0, g1), over chunks
+    # of graphs concurrently and check the returned (status, graph) pairs
+    ng = offsets.size - 1
+    chunks = _split_batch(offsets, xadj, nthreads)
+    if len(chunks) == 2:
+        rets = [run(0, ng)]
+    else:
+        with ThreadPoolExecutor(len(chunks) - 1) as pool:
+            rets = list(pool.map(run, chunks[:-1], chunks[1:]))
+    for ret, g in rets:
+        if ret != 1:
+            raise _METIS_ERRORS.get(ret, MetisError)("METIS_{}:{} (graph {})".format(fname, ret, g))
+
+
+def _part_graph_batch_py(fname, nparts, offsets, xadj, adjncy, vwgt, adjwgt, ncon, kw):
+    # helper of the ctypes fallback of part_graph_batch, one call per graph;
+    # kw holds the shared ubvec and options and the outputs part and objval
+    part, objval = kw["part"], kw["objval"]
+    for g in range(offsets.size - 1):
+        s, e = offsets[g], offsets[g + 1]
+        a, b = xadj[s], xadj[e]
+        if s == e or nparts[g] == 1:
+            part[s:e] = 0
+            continue
+        objval[g], _ = _part_graph(
+            fname,
+            nparts[g],
+            xadj[s : e + 1] - a,
+            adjncy[a:b] - s,
+            ncon=ncon,
+            vwgt=None if vwgt is None else vwgt[s * ncon : e * ncon],
+            adjwgt=None if adjwgt is None else adjwgt[a:b],
+            ubvec=kw["ubvec"],
+            options=kw["options"],
+            part=part[s:e],
+        )
+
+
+def part_graph_batch(nparts, offsets, xadj, adjncy, **kw):  # pylint: disable=too-many-locals
+    """Partition many small graphs with a single call
+
+    The graphs are packed into one block-diagonal graph, see
+    :func:`~mgmetis.utils.pack_graphs`, and are partitioned one by one in a
+    compiled loop that doesn't hold the GIL, so that the per-call overhead of
+    the Python interface is paid only once. This is intended for large
+    numbers of tiny graphs, e.g., element patches of local solvers.
+
+    Parameters
+    ----------
+    nparts : {int, array_like}
+        Number of partitions, either for all graphs or per graph.
+    offsets : array_like
+        Vertex offsets of the graphs, i.e., graph ``g`` consists of the
+        vertices ``offsets[g]`` to ``offsets[g+1]-1`` (always C-based).
+    xadj, adjncy : np.ndarray
+        The packed adjacency structure (CSR), where the adjacent vertices of
+        each vertex must be in the same graph.
+
+    Returns
+    -------
+    objval : np.ndarray
+        Objective values (edge-cuts by default) of the graphs
+    part : np.ndarray
+        Packed partition vector, i.e., ``part[offsets[g]:offsets[g+1]]`` is the
+        local partition of graph ``g``.
+
+    Other Parameters
+    ----------------
+    kernel : {"kway", "recursive"}, optional
+        Partitioning method, i.e., :func:`part_graph_kway` (default) or
+        :func:`part_graph_recursize`.
+    nthreads : int, optional
+        Number of threads to work on the graphs concurrently, default is 1.
+    ncon : int, optional
+        The number of balancing constraints, default is 1.
+    vwgt, adjwgt : np.ndarray, optional
+        Packed vertex and edge weights
+    ubvec : np.ndarray, optional
+        Load imbalance tolerance of each constraint
+    options : np.ndarray, optional
+        Control parameters that are shared by all graphs
+    part : np.ndarray, optional
+        Output buffer of the packed partition vector
+    validate : {"off", "fast", "full"}, optional
+        Check the packed graph, see :func:`part_graph_kway`.
+
+    Examples
+    --------
+    >>> from mgmetis import metis
+    >>> from mgmetis.utils import pack_graphs
+    >>> offsets, xadj, adjncy = pack_graphs(patches)
+    >>> objval, part = metis.part_graph_batch(4, offsets, xadj, adjncy, nthreads=4)
+
+    Notes
+    -----
+    With the compiled extensions unavailable, this falls back to one ctypes
+    call per graph.
+    """
+    kernel = kw.get("kernel", "kway")
+    if kernel not in ("kway", "recursive"):
+        raise ValueError("unknown kernel {}".format(kernel))
+    fname = "PartGraphKway" if kernel == "kway" else "PartGraphRecursive"
+    ncon = kw.get("ncon", 1)
+    if ncon < 1:
+        raise ValueError("invalid ncon, should be at least 1")
+    xadj, adjncy, nv = process_graph(xadj, adjncy)
+    dtype = xadj.dtype
+    offsets = _check_batch_offsets(offsets, nv, dtype)
+    ng = offsets.size - 1
+    nparts = np.ascontiguousarray(np.broadcast_to(np.asarray(nparts, dtype=dtype), (ng,)))
+    if np.any(nparts <= 0):
+        raise ValueError("invalid nparts")
+    vwgt = _get_input_array(kw, "vwgt", nv * ncon, dtype)
+    adjwgt = _get_input_array(kw, "adjwgt", xadj[-1] - xadj[0], dtype)
+    validate_graph(xadj, adjncy, adjwgt, kw.get("validate", "off"))
+    ubvec = _get_input_array(kw, "ubvec", ncon, np.float32)
+    opts = _get_default_raw_opts(kw, dtype).copy()
+    fortran = xadj[0] == 1
+    if fortran:
+        xadj, adjncy = xadj - 1, adjncy - 1
+    opts[OPTION.NUMBERING] = 0
+    _check_batch_edges(offsets, xadj, adjncy)
+    part = get_or_create_workspace(kw, "part", nv, dtype)
+    objval = np.zeros(ng, dtype=dtype)
+    fast = _get_fast_libmetis(dtype)
+    if fast is None:
+        outs = dict(ubvec=ubvec, options=opts, part=part, objval=objval)
+        _part_graph_batch_py(fname, nparts, offsets, xadj, adjncy, vwgt, adjwgt, ncon, outs)
+    else:
+        args = (offsets, nparts, xadj, adjncy, vwgt, adjwgt, ubvec, opts, part, objval, ncon)
+
+        def run(g0, g1):
+            return fast.part_graph_batch(kernel == "kway", g0, g1, *args)
+
+        _run_batch(run, offsets, xadj, kw.get("nthreads", 1), fname)
+    if fortran:
+        part[:nv] += 1
+    return objval, part
+
+
 def part_mesh_nodal(nparts, *cells, **kw):  # pylint: disable=too-many-locals
     """Partition a mesh based on cutting nodes
 
@@ -435,6 +819,13 @@ def part_mesh_nodal(nparts, *cells, **kw):  # pylint: disable=too-many-locals
         partitions. Also, be aware this array is real data type.
     epart, npart : np.ndarray, optional
         User workspace of output `epart` and `npart`, respectively.
+    memory_report : dict, optional
+        Heap statistics of the call, see :func:`part_graph_kway`.
+    etype : str or array_like, optional
+        Element types of a high-order mesh, e.g., ``"tet10"``, or ``"auto"`` to
+        infer them from the numbers of nodes per element (with `dim`, default
+        3). If given, then only the corner mesh is partitioned and the other
+        nodes are assigned afterwards, see :func:`mgmetis.mesh.part_corner_mesh`.
 
     See Also
     --------
@@ -443,21 +834,35 @@ def part_mesh_nodal(nparts, *cells, **kw):  # pylint: disable=too-many-locals
     """
     if nparts <= 0:
         raise ValueError("invalid nparts")
+    if kw.get("etype", None) is not None:
+        # NOTE: high-order mesh, partition its corner mesh instead
+        from .mesh import part_corner_mesh  # pylint: disable=import-outside-toplevel, cyclic-import
+
+        return part_corner_mesh(nparts, *cells, **dict(kw, kernel="nodal"))
     eptr, eind, nv = process_mesh(*cells, nv=kw.get("nv", -1))
     opts = _get_default_raw_opts(kw, eptr.dtype)
     if eptr[0] == 1:
         # NOTE: fortran
         opts[OPTION.NUMBERING] = 1
+        eptr, eind = _as_writeable(eptr, eind)
+    # outputs
+    npart = get_or_create_workspace(kw, "npart", nv, eptr.dtype)
+    epart = get_or_create_workspace(kw, "epart", eptr.size - 1, eptr.dtype)
+    # inputs
+    vwgt = _get_input_array(kw, "vwgt", nv, eptr.dtype)
+    vsize = _get_input_array(kw, "vsize", nv, eptr.dtype)
+    tpwgts = _get_input_array(kw, "tpwgts", nparts, np.float32)
     lib = _get_libmetis(eptr.dtype)
+    fast = _get_fast_libmetis(eptr.dtype)
+    if fast is not None:
+        ret, objval = fast.part_mesh(
+            False, nparts, nv, eptr, eind, vwgt, vsize, 0, tpwgts, opts, epart, npart
+        )
+        _check_fast_ret(ret, "PartMeshNodal")
+        _report_memory(lib, kw)
+        return objval, epart, npart
     idx_t = lib._IDX_T
     ne, nv, nparts, objval = (idx_t(eptr.size - 1), idx_t(nv), idx_t(nparts), idx_t(0))
-    # outputs
-    npart = get_or_create_workspace(kw, "npart", nv.value, eptr.dtype)
-    epart = get_or_create_workspace(kw, "epart", ne.value, eptr.dtype)
-    # inputs
-    vwgt = try_get_input_array(kw, "vwgt", nv.value, eptr.dtype)
-    vsize = try_get_input_array(kw, "vsize", nv.value, eptr.dtype)
-    tpwgts = try_get_input_array(kw, "tpwgts", nparts.value, np.float32)
     lib.PartMeshNodal(
         c.byref(ne),
         c.byref(nv),
@@ -472,6 +877,7 @@ def part_mesh_nodal(nparts, *cells, **kw):  # pylint: disable=too-many-locals
         as_pointer(epart),
         as_pointer(npart),
     )
+    _report_memory(lib, kw)
     return objval.value, epart, npart
 
 
@@ -553,6 +959,13 @@ def part_mesh_dual(nparts, *cells, **kw):  # pylint: disable=too-many-locals
         partitions. Also, be aware this array is real data type.
     epart, npart : np.ndarray, optional
         User workspace of output `epart` and `npart`, respectively.
+    memory_report : dict, optional
+        Heap statistics of the call, see :func:`part_graph_kway`.
+    etype : str or array_like, optional
+        Element types of a high-order mesh, e.g., ``"tet10"``, or ``"auto"`` to
+        infer them from the numbers of nodes per element (with `dim`, default
+        3). If given, then only the corner mesh is partitioned and the other
+        nodes are assigned afterwards, see :func:`mgmetis.mesh.part_corner_mesh`.
 
     See Also
     --------
@@ -561,27 +974,53 @@ def part_mesh_dual(nparts, *cells, **kw):  # pylint: disable=too-many-locals
     """
     if nparts <= 0:
         raise ValueError("invalid nparts")
+    if kw.get("etype", None) is not None:
+        # NOTE: high-order mesh, partition its corner mesh instead
+        from .mesh import part_corner_mesh  # pylint: disable=import-outside-toplevel, cyclic-import
+
+        return part_corner_mesh(nparts, *cells, **dict(kw, kernel="dual"))
     eptr, eind, nv = process_mesh(*cells, nv=kw.get("nv", -1))
     opts = _get_default_raw_opts(kw, eptr.dtype)
     if eptr[0] == 1:
         # NOTE: fortran
         opts[OPTION.NUMBERING] = 1
+        eptr, eind = _as_writeable(eptr, eind)
+    ne = eptr.size - 1
+    # outputs
+    npart = get_or_create_workspace(kw, "npart", nv, eptr.dtype)
+    epart = get_or_create_workspace(kw, "epart", ne, eptr.dtype)
+    # inputs
+    vwgt = _get_input_array(kw, "vwgt", ne, eptr.dtype)
+    vsize = _get_input_array(kw, "vsize", ne, eptr.dtype)
+    tpwgts = _get_input_array(kw, "tpwgts", nparts, np.float32)
     lib = _get_libmetis(eptr.dtype)
+    fast = _get_fast_libmetis(eptr.dtype)
+    if fast is not None:
+        ret, objval = fast.part_mesh(
+            True,
+            nparts,
+            nv,
+            eptr,
+            eind,
+            vwgt,
+            vsize,
+            kw.get("ncommon", 1),
+            tpwgts,
+            opts,
+            epart,
+            npart,
+        )
+        _check_fast_ret(ret, "PartMeshDual")
+        _report_memory(lib, kw)
+        return objval, epart, npart
     idx_t = lib._IDX_T
     ne, nv, nparts, ncommon, objval = (
-        idx_t(eptr.size - 1),
+        idx_t(ne),
         idx_t(nv),
         idx_t(nparts),
         idx_t(kw.get("ncommon", 1)),
         idx_t(0),
     )
-    # outputs
-    npart = get_or_create_workspace(kw, "npart", nv.value, eptr.dtype)
-    epart = get_or_create_workspace(kw, "epart", ne.value, eptr.dtype)
-    # inputs
-    vwgt = try_get_input_array(kw, "vwgt", ne.value, eptr.dtype)
-    vsize = try_get_input_array(kw, "vsize", ne.value, eptr.dtype)
-    tpwgts = try_get_input_array(kw, "tpwgts", nparts.value, np.float32)
     lib.PartMeshDual(
         c.byref(ne),
         c.byref(nv),
@@ -597,6 +1036,7 @@ def part_mesh_dual(nparts, *cells, **kw):  # pylint: disable=too-many-locals
         as_pointer(epart),
         as_pointer(npart),
     )
+    _report_memory(lib, kw)
     return objval.value, epart, npart
 
 
@@ -626,17 +1066,45 @@ def node_nd(xadj, adjncy, **kw):
         Vertex weights, default is None, which indicates equal weights.
     perm, iperm : np.ndarray, optional
         User input of workspace for `perm` and `iperm`
+    validate : {"off", "fast", "full"}, optional
+        Input graph validation level, see :func:`part_graph_kway`.
+    memory_report : dict, optional
+        Heap statistics of the call, see :func:`part_graph_kway`.
+    order : {"nd", "mmd", "auto"}, optional
+        Ordering algorithm, i.e., nested dissection (default) or multiple
+        minimum degree, see :func:`mmd_order`. ``"auto"`` uses MMD for
+        unweighted graphs that are small (at most `mmd_switch` vertices) or
+        dense (at least a quarter of the entries of the matrix are nonzero).
+    mmd_switch : int, optional
+        Maximum number of vertices of graphs ordered by MMD with
+        ``order="auto"``, default is :data:`MMD_SWITCH`.
     """
     xadj, adjncy, nv = process_graph(xadj, adjncy)
-    vwgt = try_get_input_array(kw, "vwgt", nv, xadj.dtype)
+    validate_graph(xadj, adjncy, level=kw.get("validate", "off"))
+    order = kw.get("order", "nd")
+    if order not in ("nd", "mmd", "auto"):
+        raise ValueError("unknown order {}".format(order))
+    if order == "auto" and kw.get("vwgt", None) is None:
+        nnz = int(xadj[-1] - xadj[0])
+        if nv <= kw.get("mmd_switch", MMD_SWITCH) or 4 * nnz >= nv * nv:
+            order = "mmd"
+    if order == "mmd":
+        return _node_mmd(xadj, adjncy, nv, kw)
+    vwgt = _get_input_array(kw, "vwgt", nv, xadj.dtype)
     opts = _get_default_raw_opts(kw, xadj.dtype)
     if xadj[0] == 1:
         # NOTE: Fortran
         opts[OPTION.NUMBERING] = 1
+        xadj, adjncy = _as_writeable(xadj, adjncy)
     # outputs
     perm = get_or_create_workspace(kw, "perm", nv, xadj.dtype)
     iperm = get_or_create_workspace(kw, "iperm", nv, xadj.dtype)
     lib = _get_libmetis(xadj.dtype)
+    fast = _get_fast_libmetis(xadj.dtype)
+    if fast is not None:
+        _check_fast_ret(fast.node_nd(xadj, adjncy, vwgt, opts, perm, iperm), "NodeND")
+        _report_memory(lib, kw)
+        return perm, iperm
     nv = lib._IDX_T(nv)
     lib.NodeND(
         c.byref(nv),
@@ -647,4 +1115,327 @@ def node_nd(xadj, adjncy, **kw):
         as_pointer(perm),
         as_pointer(iperm),
     )
+    _report_memory(lib, kw)
+    return perm, iperm
+
+
+MMD_SWITCH = 200
+"""Default maximum number of vertices ordered by MMD in ``node_nd(order="auto")``"""
+
+
+def _node_mmd(xadj, adjncy, nv, kw):
+    # helper to compute the MMD ordering of a processed graph
+    perm = get_or_create_workspace(kw, "perm", nv, xadj.dtype)
+    iperm = get_or_create_workspace(kw, "iperm", nv, xadj.dtype)
+    lib = _get_libmetis(xadj.dtype)
+    fast = _get_fast_libmetis(xadj.dtype)
+    if fast is not None:
+        _check_fast_ret(fast.node_mmd(xadj, adjncy, xadj[0], perm, iperm), "NodeMMD")
+    else:
+        idx_t = lib._IDX_T
+        lib.NodeMMD(
+            c.byref(idx_t(nv)),
+            as_pointer(xadj),
+            as_pointer(adjncy),
+            c.byref(idx_t(xadj[0])),
+            as_pointer(perm),
+            as_pointer(iperm),
+        )
+    _report_memory(lib, kw)
+    return perm, iperm
+
+
+def mmd_order(xadj, adjncy, **kw):
+    """Sparse matrix reordering with multiple minimum degree
+
+    This is the ordering that :func:`node_nd` applies to small subgraphs,
+    i.e., the MMD algorithm of SPARSPAK shipped with METIS. For small or
+    dense graphs, it's considerably faster than a full nested dissection.
+
+    Parameters
+    ----------
+    xadj, adjncy : np.ndarray
+        CSR graph representation of a CSR/CSC matrix, self-loops are ignored.
+
+    Returns
+    -------
+    perm, iperm : np.ndarray
+        Permutation and its inverse, see :func:`node_nd`.
+
+    Other Parameters
+    ----------------
+    perm, iperm : np.ndarray, optional
+        User input of workspace for `perm` and `iperm`
+    validate : {"off", "fast", "full"}, optional
+        Input graph validation level, see :func:`part_graph_kway`.
+    memory_report : dict, optional
+        Heap statistics of the call, see :func:`part_graph_kway`.
+
+    See Also
+    --------
+    node_nd
+    mmd_order_batch
+    """
+    xadj, adjncy, nv = process_graph(xadj, adjncy)
+    validate_graph(xadj, adjncy, level=kw.get("validate", "off"))
+    return _node_mmd(xadj, adjncy, nv, kw)
+
+
+def mmd_order_batch(offsets, xadj, adjncy, **kw):
+    """Order many small graphs with MMD in a single call
+
+    The graphs are packed as in :func:`part_graph_batch`, and are ordered one
+    by one in a compiled loop that doesn't hold the GIL.
+
+    Parameters
+    ----------
+    offsets : array_like
+        Vertex offsets of the graphs (always C-based)
+    xadj, adjncy : np.ndarray
+        The packed adjacency structure (CSR), where the adjacent vertices of
+        each vertex must be in the same graph.
+
+    Returns
+    -------
+    perm, iperm : np.ndarray
+        Packed local orderings, i.e., ``perm[offsets[g]:offsets[g+1]]`` is the
+        permutation of graph ``g`` in its local numbering, which is in the
+        same index system as the packed graph.
+
+    Other Parameters
+    ----------------
+    nthreads : int, optional
+        Number of threads to work on the graphs concurrently, default is 1.
+    perm, iperm : np.ndarray, optional
+        Output buffers of the packed orderings
+    validate : {"off", "fast", "full"}, optional
+        Check the packed graph, see :func:`part_graph_kway`.
+
+    Examples
+    --------
+    >>> from mgmetis import metis
+    >>> from mgmetis.utils import pack_graphs
+    >>> offsets, xadj, adjncy = pack_graphs(fronts)
+    >>> perm, iperm = metis.mmd_order_batch(offsets, xadj, adjncy)
+    """
+    xadj, adjncy, nv = process_graph(xadj, adjncy)
+    dtype = xadj.dtype
+    offsets = _check_batch_offsets(offsets, nv, dtype)
+    validate_graph(xadj, adjncy, level=kw.get("validate", "off"))
+    fortran = xadj[0] == 1
+    if fortran:
+        xadj, adjncy = xadj - 1, adjncy - 1
+    _check_batch_edges(offsets, xadj, adjncy)
+    perm = get_or_create_workspace(kw, "perm", nv, dtype)
+    iperm = get_or_create_workspace(kw, "iperm", nv, dtype)
+    fast = _get_fast_libmetis(dtype)
+    if fast is None:
+        for g in range(offsets.size - 1):
+            s, e = offsets[g], offsets[g + 1]
+            a, b = xadj[s], xadj[e]
+            if s == e:
+                continue
+            _node_mmd(xadj[s : e + 1] - a, adjncy[a:b] - s, e - s, dict(perm=perm[s:e], iperm=iperm[s:e]))
+    else:
+
+        def run(g0, g1):
+            return fast.node_mmd_batch(g0, g1, offsets, xadj, adjncy, perm, iperm)
+
+        _run_batch(run, offsets, xadj, kw.get("nthreads", 1), "NodeMMD")
+    if fortran:
+        perm[:nv] += 1
+        iperm[:nv] += 1
     return perm, iperm
+
+
+def _take_metis_array(lib, ptr, n):
+    # helper to copy an array allocated by METIS and free it
+    try:
+        return np.ctypeslib.as_array(ptr, shape=(n,)).copy()
+    finally:
+        lib.Free(ptr)
+
+
+def _mesh_to_graph(kernel, *cells, **kw):
+    # NOTE: unified implementation of mesh to graph conversions
+    eptr, eind, nv = process_mesh(*cells, nv=kw.get("nv", -1))
+    lib = _get_libmetis(eptr.dtype)
+    idx_t = lib._IDX_T
+    ne, nv, numflag = idx_t(eptr.size - 1), idx_t(nv), idx_t(eptr[0])
+    if eptr[0] == 1:
+        eptr, eind = _as_writeable(eptr, eind)
+    r_xadj, r_adjncy = c.POINTER(idx_t)(), c.POINTER(idx_t)()
+    args = [c.byref(ne), c.byref(nv), as_pointer(eptr), as_pointer(eind)]
+    if kernel == "MeshToDual":
+        args.append(c.byref(idx_t(kw.get("ncommon", 1))))
+        n = ne.value
+    else:
+        n = nv.value
+    getattr(lib, kernel)(*args, c.byref(numflag), c.byref(r_xadj), c.byref(r_adjncy))
+    _report_memory(lib, kw)
+    xadj = _take_metis_array(lib, r_xadj, n + 1)
+    adjncy = _take_metis_array(lib, r_adjncy, xadj[-1] - xadj[0])
+    return xadj, adjncy
+
+
+def mesh_to_dual(*cells, **kw):
+    """Build the dual graph of a mesh
+
+    .. note::
+        This function wraps around original ``METIS_MeshToDual``, see section
+        5.10, `Mesh-to-graph conversion routines` in the documentation.
+
+    Parameters
+    ----------
+    *cells : positional arguments
+        Mesh, see :func:`part_mesh_dual`
+    nv : int, optional
+        Total number of vertices in mesh
+    ncommon : int, optional
+        Number of common nodes that two elements must have in order to put an
+        edge between them in the dual graph, default is 1.
+
+    Returns
+    -------
+    xadj, adjncy : np.ndarray
+        The dual graph (CSR), in the same index system as the mesh.
+    """
+    return _mesh_to_graph("MeshToDual", *cells, **kw)
+
+
+def mesh_to_nodal(*cells, **kw):
+    """Build the nodal graph of a mesh
+
+    .. note::
+        This function wraps around original ``METIS_MeshToNodal``, see section
+        5.10, `Mesh-to-graph conversion routines` in the documentation.
+
+    Parameters
+    ----------
+    *cells : positional arguments
+        Mesh, see :func:`part_mesh_nodal`
+    nv : int, optional
+        Total number of vertices in mesh
+
+    Returns
+    -------
+    xadj, adjncy : np.ndarray
+        The nodal graph (CSR), in the same index system as the mesh.
+    """
+    return _mesh_to_graph("MeshToNodal", *cells, **kw)
+
+
+class CoarseLevel(namedtuple("CoarseLevel", ["cmap", "xadj", "adjncy", "vwgt", "adjwgt"])):
+    """A level of the coarsening hierarchy, see :func:`coarsen`
+
+    Attributes
+    ----------
+    cmap : np.ndarray
+        Coarse vertex of each vertex of the finer graph, i.e., the aggregates
+    xadj, adjncy : np.ndarray
+        The coarse graph (CSR)
+    vwgt : np.ndarray
+        Weights of the coarse vertices, i.e., the total weights of their
+        aggregates
+    adjwgt : np.ndarray
+        Weights of the coarse edges, i.e., the total weights of the edges
+        between the aggregates
+    """
+
+    __slots__ = ()
+
+
+def coarsen(xadj, adjncy, adjwgt=None, levels=None, ctype=CTYPE.SHEM, **kw):
+    """Compute the multilevel coarsening hierarchy of a graph
+
+    This exposes the coarsening phase of the METIS partitioning routines,
+    i.e., the vertices are repeatedly matched, either randomly or by heavy
+    edges, and each matched pair is contracted into a coarse vertex. This
+    gives pairwise aggregation hierarchies, e.g., for algebraic multigrid.
+
+    Parameters
+    ----------
+    xadj, adjncy : np.ndarray
+        The adjacency structure (CSR)
+    adjwgt : np.ndarray, optional
+        Edge weights, e.g., the strength of connections, default is None,
+        i.e., unit weights.
+    levels : int, optional
+        Maximum number of coarse levels, default is None, i.e., no limit.
+    ctype : {CTYPE.SHEM, CTYPE.RM}, optional
+        Matching scheme, i.e., sorted heavy-edge matching (default) or random
+        matching, see :class:`mgmetis.enums.CTYPE`.
+
+    Returns
+    -------
+    list of CoarseLevel
+        The coarse levels from fine to coarse, all in C-based index. The
+        coarsening stops early if a level reduces the number of vertices by
+        less than 15%.
+
+    Other Parameters
+    ----------------
+    vwgt : np.ndarray, optional
+        Vertex weights
+    coarsen_to : int, optional
+        The coarsening stops once a graph has fewer vertices, default is 20.
+        It also bounds the aggregate weights by 1.5 times the total weight
+        divided by `coarsen_to`.
+    options : np.ndarray, optional
+        METIS options, where ``OPTION.SEED`` and ``OPTION.NO2HOP`` are used.
+    validate : {"off", "fast", "full"}, optional
+        Input graph validation level, see :func:`part_graph_kway`.
+    memory_report : dict, optional
+        Heap statistics of the call, see :func:`part_graph_kway`.
+
+    Examples
+    --------
+    The aggregates of the original vertices at each level are given by the
+    composition of the maps
+
+    >>> agg = np.arange(nv)
+    >>> for level in metis.coarsen(xadj, adjncy, adjwgt):
+    ...     agg = level.cmap[agg]
+    """
+    xadj, adjncy, nv = process_graph(xadj, adjncy)
+    dtype = xadj.dtype
+    if levels is not None and levels < 0:
+        raise ValueError("invalid levels")
+    adjwgt = _get_input_array({"adjwgt": adjwgt}, "adjwgt", xadj[-1] - xadj[0], dtype)
+    validate_graph(xadj, adjncy, adjwgt, kw.get("validate", "off"))
+    vwgt = _get_input_array(kw, "vwgt", nv, dtype)
+    opts = _get_default_raw_opts(kw, dtype).copy()
+    opts[OPTION.CTYPE] = ctype
+    if xadj[0] == 1:
+        # NOTE: Fortran
+        opts[OPTION.NUMBERING] = 1
+        xadj, adjncy = _as_writeable(xadj, adjncy)
+    lib = _get_libmetis(dtype)
+    idx_t = lib._IDX_T
+    nlevels = idx_t(nv if levels is None else levels)
+    ptr = c.POINTER(idx_t)()
+    lib.Coarsen(
+        c.byref(idx_t(nv)),
+        as_pointer(xadj),
+        as_pointer(adjncy),
+        as_pointer(vwgt),
+        as_pointer(adjwgt),
+        c.byref(nlevels),
+        c.byref(idx_t(kw.get("coarsen_to", 20))),
+        as_pointer(opts),
+        c.byref(ptr),
+    )
+    _report_memory(lib, kw)
+    # NOTE: walk through the packed levels to get the total size
+    bounds, pos, n = [], 0, nv
+    for _ in range(nlevels.value):
+        cn, cm = ptr[pos + n], ptr[pos + n + 1]
+        bounds.append((pos, n, cn, cm))
+        pos += n + 2 + 2 * cn + 1 + 2 * cm
+        n = cn
+    buf = _take_metis_array(lib, ptr, pos)
+    out = []
+    for pos, n, cn, cm in bounds:
+        parts = np.split(buf[pos : pos + n + 2 + 2 * cn + 1 + 2 * cm], np.cumsum([n, 2, cn + 1, cm, cn]))
+        out.append(CoarseLevel(parts[0], parts[2], parts[3], parts[4], parts[5]))
+    return out
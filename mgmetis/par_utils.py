@@ -6,9 +6,20 @@
 """
 
 import ctypes as c
+from collections import namedtuple
 
 import numpy as np
 
+from .utils import MetisInputError, process_graph
+
+
+class DistGraphError(MetisInputError, ValueError):
+    """Exception indicates an invalid distributed graph
+
+    It's also a :class:`ValueError`, which was raised by the former checks of
+    `par_debug` in :mod:`mgmetis.parmetis`.
+    """
+
 
 def get_comm(comm):
     """Helper routine to get communicator
@@ -89,3 +100,181 @@ def determine_wgtflag(vwgt, adjwgt):
     if vwgt is None:
         return 1
     return 2 if adjwgt is None else 3
+
+
+class DistGraphReport(
+    namedtuple(
+        "DistGraphReport",
+        ["bad_vtxdist", "bad_flags", "bad_xadj", "out_of_range", "self_loops", "asymmetric", "asym_weights"],
+    )
+):
+    """Defects found by :func:`check_dist_graph`, summed over all processes
+
+    Each field is the number of offending entries, and ``None`` means the
+    corresponding check was skipped, because an earlier defect makes it
+    meaningless (e.g., edges cannot be routed with a broken `vtxdist`).
+
+    Attributes
+    ----------
+    bad_vtxdist : int
+        Number of inconsistent or invalid entries of `vtxdist`, including
+        local sizes that don't match `xadj`
+    bad_flags : int
+        Number of flags (``numflag`` and ``wgtflag``) that differ across
+        processes
+    bad_xadj : int
+        Number of decreasing entries in `xadj`
+    out_of_range : int
+        Number of entries in `adjncy` that are not valid global vertex IDs
+    self_loops : int
+        Number of edges :math:`(i,i)`
+    asymmetric : int
+        Number of edges :math:`(i,j)` whose reverse :math:`(j,i)` is missing
+        on the owner of :math:`j`
+    asym_weights : int
+        Number of edges whose weight differs from its reverse edge
+    """
+
+    __slots__ = ()
+
+    @property
+    def ok(self):
+        """bool: True if no defects were found"""
+        return not any(self)
+
+
+def _match_edges(rows, cols, wgts, queries):
+    # helper to count the queried edges (rows of [row, col, wgt]) that are
+    # missing among the local edges or have different weights
+    n = rows.size
+    r = np.concatenate((rows, queries[:, 0]))
+    col = np.concatenate((cols, queries[:, 1]))
+    tag = np.repeat([0, 1], [n, queries.shape[0]])
+    order = np.lexsort((tag, col, r))
+    # NOTE: the last local edge at or before each position
+    pos = np.arange(order.size)
+    last = np.maximum.accumulate(np.where(tag[order] == 0, pos, -1))
+    q = pos[tag[order] == 1]
+    prev = order[last[q]]
+    found = (last[q] >= 0) & (r[prev] == r[order[q]]) & (col[prev] == col[order[q]])
+    w = np.concatenate((wgts, queries[:, 2]))
+    missing = int(np.count_nonzero(~found))
+    wrong = int(np.count_nonzero(found & (w[prev] != w[order[q]])))
+    return missing, wrong
+
+
+def check_dist_graph(xadj, adjncy, vtxdist=None, comm=None, adjwgt=None, wgtflag=None):
+    """Check a distributed CSR graph for the defects that crash ParMETIS
+
+    This is collective, and only buffer-based collectives on NumPy arrays
+    are used, i.e., three small ``Allreduce`` calls for the consistency of
+    `vtxdist`, the flags and the local checks, and an
+    ``Alltoall``/``Alltoallv`` pair that sends each edge :math:`(i,j)` to the
+    owner of :math:`j`, which looks for :math:`(j,i)`. So the cost is about
+    that of a single halo exchange.
+
+    Parameters
+    ----------
+    xadj : np.ndarray
+        Local range of CSR graph starting position array
+    adjncy : np.ndarray
+        Local potion of CSR adjacent list with global indices
+    vtxdist : np.ndarray, optional
+        Global range array, if not specified then will compute using MPI
+        collection
+    comm : MPI_Comm, optional
+        MPI communicator, if not specified, then will use MPI_COMM_WORLD.
+    adjwgt : np.ndarray, optional
+        Edge weights, if given, then they are checked for symmetry as well.
+    wgtflag : int, optional
+        Weight flag passed to ParMETIS, which is checked for consistency.
+
+    Returns
+    -------
+    DistGraphReport
+        Number of defects of each type across all processes, which is the
+        same on every process.
+    """
+    from mpi4py import MPI  # pylint: disable=import-outside-toplevel
+
+    comm = get_comm(comm)
+    xadj, adjncy, nv = process_graph(xadj, adjncy)
+    base = int(xadj[0])
+    if vtxdist is None:
+        vtxdist = build_proc_dist(nv, comm, base)
+    vtxdist = np.asarray(vtxdist, dtype=np.int64).reshape(-1)
+    # NOTE: the max of [x, -x] gives both max and min of x
+    wgtflag = -1 if wgtflag is None else int(wgtflag)
+    head = np.asarray([vtxdist.size, base, wgtflag], dtype=np.int64)
+    buf = np.concatenate((head, -head))
+    comm.Allreduce(MPI.IN_PLACE, buf, op=MPI.MAX)
+    diff = buf[:3] != -buf[3:]
+    bad_flags = int(np.count_nonzero(diff[1:]))
+    if diff[0] or buf[0] != comm.size + 1:
+        return DistGraphReport(1, bad_flags, None, None, None, None, None)
+    buf = np.concatenate((vtxdist, -vtxdist))
+    comm.Allreduce(MPI.IN_PLACE, buf, op=MPI.MAX)
+    bad_vtxdist = int(np.count_nonzero(buf[: vtxdist.size] != -buf[vtxdist.size :]))
+    # local checks
+    rank = comm.rank
+    local = [
+        int(vtxdist[rank + 1] - vtxdist[rank] != nv)
+        + int(np.count_nonzero(np.diff(vtxdist) < 0))
+        + int(vtxdist[0] != base),
+        int(np.count_nonzero(np.diff(xadj) < 0)),
+        0,
+        0,
+    ]
+    if not local[1]:
+        rows = np.repeat(np.arange(nv, dtype=np.int64), np.diff(xadj)) + vtxdist[rank]
+        cols = np.asarray(adjncy[: rows.size], dtype=np.int64)
+        local[2] = int(np.count_nonzero((cols < base) | (cols >= vtxdist[-1])))
+        local[3] = int(np.count_nonzero(rows == cols))
+    buf = np.asarray(local, dtype=np.int64)
+    comm.Allreduce(MPI.IN_PLACE, buf, op=MPI.SUM)
+    bad_vtxdist += int(buf[0])
+    bad_xadj, out_of_range, self_loops = (int(x) for x in buf[1:])
+    if bad_vtxdist or bad_xadj or out_of_range:
+        return DistGraphReport(bad_vtxdist, bad_flags, bad_xadj, out_of_range, self_loops, None, None)
+    # symmetry, route each reversed edge to the owner of its row
+    wgts = np.zeros(rows.size, dtype=np.int64)
+    if adjwgt is not None:
+        wgts = np.asarray(adjwgt, dtype=np.int64).reshape(-1)[: rows.size]
+    owner = np.searchsorted(vtxdist, cols, side="right") - 1
+    order = np.argsort(owner, kind="stable")
+    send = np.stack((cols, rows, wgts), axis=1)[order].reshape(-1)
+    scounts = np.bincount(owner, minlength=comm.size).astype(np.int64) * 3
+    rcounts = np.empty_like(scounts)
+    comm.Alltoall(scounts, rcounts)
+    sdispls = np.cumsum(scounts) - scounts
+    rdispls = np.cumsum(rcounts) - rcounts
+    recv = np.empty(int(rcounts.sum()), dtype=np.int64)
+    comm.Alltoallv(
+        [send, (scounts.tolist(), sdispls.tolist())], [recv, (rcounts.tolist(), rdispls.tolist())]
+    )
+    missing, wrong = _match_edges(rows, cols, wgts, recv.reshape(-1, 3))
+    buf = np.asarray([missing, wrong], dtype=np.int64)
+    comm.Allreduce(MPI.IN_PLACE, buf, op=MPI.SUM)
+    asym_weights = None if adjwgt is None else int(buf[1])
+    return DistGraphReport(bad_vtxdist, bad_flags, bad_xadj, out_of_range, self_loops, int(buf[0]), asym_weights)
+
+
+def validate_dist_graph(xadj, adjncy, vtxdist=None, comm=None, adjwgt=None, wgtflag=None):
+    """Validate a distributed graph before passing it to ParMETIS
+
+    This is collective, and the same exception is raised on every process.
+    See :func:`check_dist_graph` for the parameters.
+
+    Raises
+    ------
+    DistGraphError
+        If any defect is detected, which is both
+        :class:`~mgmetis.utils.MetisInputError` and :class:`ValueError`
+    """
+    report = check_dist_graph(xadj, adjncy, vtxdist, comm, adjwgt, wgtflag)
+    if not report.ok:
+        raise DistGraphError(
+            "invalid distributed graph: {}".format(
+                ", ".join("{}={}".format(k, v) for k, v in report._asdict().items() if v)
+            )
+        )
@@ -6,10 +6,11 @@
 """
 
 import ctypes as c
+from collections import namedtuple
 
 import numpy as np
 
-from .par_utils import get_comm, determine_wgtflag, build_proc_dist, is_par, comm_ptr
+from .par_utils import get_comm, determine_wgtflag, build_proc_dist, comm_ptr, validate_dist_graph
 from .utils import (
     get_so,
     _handle_metis_ret,
@@ -163,6 +164,66 @@ def _get_default_raw_opts(kw, dtype):
     return opts
 
 
+_ParGraph = namedtuple(
+    "_ParGraph",
+    "xadj adjncy nv comm vtxdist vwgt adjwgt wgtflag numflag ncon nparts tpwgts ubvec opts lib edgecut",
+)
+
+
+def _process_par_graph(nparts, xadj, adjncy, vtxdist, comm, kw):
+    # helper to process the inputs shared by the graph routines, the scalars
+    # are converted to ctypes idx_t for passing by reference
+    if nparts <= 0:
+        raise ValueError("invalid partition number")
+    xadj, adjncy, nv = process_graph(xadj, adjncy)
+    comm = get_comm(comm)  # NOTE: we initialize MPI here (if needed)
+    vtxdist = np.asarray(
+        vtxdist if vtxdist is not None else build_proc_dist(nv, comm, xadj[0]),
+        dtype=xadj.dtype,
+    )
+    if vtxdist.size <= comm.size:
+        raise ValueError("invalid vtxdist size, must be comm.size+1")
+    vwgt = try_get_input_array(kw, "vwgt", nv, xadj.dtype)
+    adjwgt = try_get_input_array(kw, "adjwgt", xadj[-1] - xadj[0], xadj.dtype)
+    wgtflag = determine_wgtflag(vwgt, adjwgt)
+    numflag = xadj[0]
+    if kw.get("par_debug", False):
+        validate_dist_graph(xadj, adjncy, vtxdist, comm, adjwgt, wgtflag)
+    ncon = kw.get("ncon", 1)
+    assert ncon >= 1
+    tpwgts = try_get_input_array(kw, "tpwgts", ncon * nparts, np.float32)
+    if tpwgts is None:
+        tpwgts = np.ones(ncon * nparts, dtype=np.float32) / nparts
+    ubvec = try_get_input_array(kw, "ubvec", ncon, np.float32)
+    if ubvec is None or isinstance(ubvec, float):
+        try:
+            ubvec = float(ubvec)
+        except TypeError:
+            ubvec = 1.05
+        ubvec = np.asarray([ubvec] * ncon, dtype=np.float32)
+    opts = _get_default_raw_opts(kw, xadj.dtype)
+    lib = _get_libparmetis(xadj.dtype)
+    idx_t = lib._IDX_T
+    return _ParGraph(
+        xadj,
+        adjncy,
+        nv,
+        comm,
+        vtxdist,
+        vwgt,
+        adjwgt,
+        idx_t(wgtflag),
+        idx_t(numflag),
+        idx_t(ncon),
+        idx_t(nparts),
+        tpwgts,
+        ubvec,
+        opts,
+        lib,
+        idx_t(0),
+    )
+
+
 def part_kway(nparts, xadj, adjncy, vtxdist=None, comm=None, **kw):
     """Parallel partition with Kway and potentially geometry support
 
@@ -205,9 +266,12 @@ def part_kway(nparts, xadj, adjncy, vtxdist=None, comm=None, **kw):
     tpwgts, ubvec : np.ndarray, optional
         See the manual
     par_debug : bool, optional
-        Flag controling whether or not to perform a collection debugging
-        actions to ensure the consistencies between weighting and numbering.
-        Default is False.
+        Flag controling whether or not to validate the distributed graph with
+        :func:`mgmetis.par_utils.validate_dist_graph`, i.e., the consistency
+        of `vtxdist`, numbering and weighting, the global ID ranges and the
+        edge symmetry across processes; defects raise
+        :class:`~mgmetis.par_utils.DistGraphError`, which is a
+        :class:`ValueError`. Default is False.
     xyz : np.ndarray, optional
         If provided, then it's must be 2D array of coordinates, which are stored
         in a point-by-point fashion. The second dimension must be either 2 (2D)
@@ -216,100 +280,57 @@ def part_kway(nparts, xadj, adjncy, vtxdist=None, comm=None, **kw):
     part : np.ndarray, optional
         User buffer for `part`.
     """
-    if nparts <= 0:
-        raise ValueError("invalid partition number")
-    xadj, adjncy, nv = process_graph(xadj, adjncy)
-    comm = get_comm(comm)  # NOTE: we initialize MPI here (if needed)
-    vtxdist = np.asarray(
-        vtxdist if vtxdist is not None else build_proc_dist(nv, comm, xadj[0]),
-        dtype=xadj.dtype,
-    )
-    if vtxdist.size <= comm.size:
-        raise ValueError("invalid vtxdist size, must be comm.size+1")
-    vwgt = try_get_input_array(kw, "vwgt", nv, xadj.dtype)
-    adjwgt = try_get_input_array(kw, "adjwgt", xadj[-1] - xadj[0], xadj.dtype)
-    wgtflag = determine_wgtflag(vwgt, adjwgt)
-    numflag = xadj[0]
-    if kw.get("par_debug", False) and is_par(comm):
-        # debug numflags
-        flags = comm.allgather(numflag)
-        if not np.all([x == xadj[0] for x in flags]):
-            raise ValueError("inconsistent numflags {} across processes".format(flags))
-        flags = comm.allgather(wgtflag)
-        if not np.all([x == wgtflag for x in flags]):
-            raise ValueError("inconsistent wgtflags {} accross processes".format(flags))
-    ncon = kw.get("ncon", 1)
-    assert ncon >= 1
-    tpwgts = try_get_input_array(kw, "tpwgts", ncon * nparts, np.float32)
-    if tpwgts is None:
-        tpwgts = np.ones(ncon * nparts, dtype=np.float32) / nparts
-    ubvec = try_get_input_array(kw, "ubvec", ncon, np.float32)
-    if ubvec is None or isinstance(ubvec, float):
-        try:
-            ubvec = float(ubvec)
-        except TypeError:
-            ubvec = 1.05
-        ubvec = np.asarray([ubvec] * ncon, dtype=np.float32)
-    opts = _get_default_raw_opts(kw, xadj.dtype)
+    g = _process_par_graph(nparts, xadj, adjncy, vtxdist, comm, kw)
     # NOTE: handle geometry partition, assume 2D for the helper
-    xyz = try_get_input_array(kw, "xyz", nv * 2, np.float32)
-    # check size of xzy
-    lib = _get_libparmetis(xadj.dtype)
-    idx_t = lib._IDX_T
-    nparts, ncon, numflag, wgtflag, edgecut = (
-        idx_t(nparts),
-        idx_t(ncon),
-        idx_t(numflag),
-        idx_t(wgtflag),
-        idx_t(0),
-    )
-    part = get_or_create_workspace(kw, "part", nv, xadj.dtype)
+    xyz = try_get_input_array(kw, "xyz", g.nv * 2, np.float32)
+    part = get_or_create_workspace(kw, "part", g.nv, g.xadj.dtype)
     if xyz is None:
         # regular Kway
-        lib.PartKway(
-            as_pointer(vtxdist),
-            as_pointer(xadj),
-            as_pointer(adjncy),
-            as_pointer(vwgt),
-            as_pointer(adjwgt),
-            c.byref(wgtflag),
-            c.byref(numflag),
-            c.byref(ncon),
-            c.byref(nparts),
-            as_pointer(tpwgts),
-            as_pointer(ubvec),
-            as_pointer(opts),
-            c.byref(edgecut),
+        g.lib.PartKway(
+            as_pointer(g.vtxdist),
+            as_pointer(g.xadj),
+            as_pointer(g.adjncy),
+            as_pointer(g.vwgt),
+            as_pointer(g.adjwgt),
+            c.byref(g.wgtflag),
+            c.byref(g.numflag),
+            c.byref(g.ncon),
+            c.byref(g.nparts),
+            as_pointer(g.tpwgts),
+            as_pointer(g.ubvec),
+            as_pointer(g.opts),
+            c.byref(g.edgecut),
             as_pointer(part),
-            comm_ptr(comm),
+            comm_ptr(g.comm),
         )
     else:
         # NOTE: geometric Kway
         if xyz.ndim != 2:
             raise ValueError("coordinate must be 2D array")
-        if len(xyz) < nv:
+        if len(xyz) < g.nv:
             raise ValueError("not enough coordinates")
-        ndims = idx_t(xyz.shape[1])
-        lib.PartGeomKway(
-            as_pointer(vtxdist),
-            as_pointer(xadj),
-            as_pointer(adjncy),
-            as_pointer(vwgt),
-            as_pointer(adjwgt),
-            c.byref(wgtflag),
-            c.byref(numflag),
+        ndims = g.lib._IDX_T(xyz.shape[1])
+        g.lib.PartGeomKway(
+            as_pointer(g.vtxdist),
+            as_pointer(g.xadj),
+            as_pointer(g.adjncy),
+            as_pointer(g.vwgt),
+            as_pointer(g.adjwgt),
+            c.byref(g.wgtflag),
+            c.byref(g.numflag),
             c.byref(ndims),
             as_pointer(xyz),
-            c.byref(ncon),
-            c.byref(nparts),
-            as_pointer(tpwgts),
-            as_pointer(ubvec),
-            as_pointer(opts),
-            c.byref(edgecut),
+            c.byref(g.ncon),
+            c.byref(g.nparts),
+            as_pointer(g.tpwgts),
+            as_pointer(g.ubvec),
+            as_pointer(g.opts),
+            c.byref(g.edgecut),
             as_pointer(part),
-            comm_ptr(comm),
+            comm_ptr(g.comm),
         )
-    return edgecut.value, part
+    return g.edgecut.value, part
+
 
 def adaptive_repart_kway(nparts, xadj, adjncy, part, vtxdist=None, vsize=None, itr=1000.0, comm=None, **kw):
     """ This function is the entry point of the parallel multilevel local diffusion
@@ -366,9 +387,12 @@ def adaptive_repart_kway(nparts, xadj, adjncy, part, vtxdist=None, vsize=None, i
     tpwgts, ubvec : np.ndarray, optional
         See the manual
     par_debug : bool, optional
-        Flag controling whether or not to perform a collection debugging
-        actions to ensure the consistencies between weighting and numbering.
-        Default is False.
+        Flag controling whether or not to validate the distributed graph with
+        :func:`mgmetis.par_utils.validate_dist_graph`, i.e., the consistency
+        of `vtxdist`, numbering and weighting, the global ID ranges and the
+        edge symmetry across processes; defects raise
+        :class:`~mgmetis.par_utils.DistGraphError`, which is a
+        :class:`ValueError`. Default is False.
     xyz : np.ndarray, optional
         If provided, then it's must be 2D array of coordinates, which are stored
         in a point-by-point fashion. The second dimension must be either 2 (2D)
@@ -377,106 +401,138 @@ def adaptive_repart_kway(nparts, xadj, adjncy, part, vtxdist=None, vsize=None, i
     part : np.ndarray, optional
         User buffer for `part`.
     """
-    if nparts <= 0:
-        raise ValueError("invalid partition number")
-    xadj, adjncy, nv = process_graph(xadj, adjncy)
-    comm = get_comm(comm)  # NOTE: we initialize MPI here (if needed)
-    vtxdist = np.asarray(
-        vtxdist if vtxdist is not None else build_proc_dist(nv, comm, xadj[0]),
-        dtype=xadj.dtype,
-    )
-    if vtxdist.size <= comm.size:
-        raise ValueError("invalid vtxdist size, must be comm.size+1")
-    vwgt = try_get_input_array(kw, "vwgt", nv, xadj.dtype)
-    vsize = try_get_input_array(kw, "vsize", nv, xadj.dtype)
-    adjwgt = try_get_input_array(kw, "adjwgt", xadj[-1] - xadj[0], xadj.dtype)
-    wgtflag = determine_wgtflag(vwgt, adjwgt)
-    numflag = xadj[0]
-    if kw.get("par_debug", False) and is_par(comm):
-        # debug numflags
-        flags = comm.allgather(numflag)
-        if not np.all([x == xadj[0] for x in flags]):
-            raise ValueError("inconsistent numflags {} across processes".format(flags))
-        flags = comm.allgather(wgtflag)
-        if not np.all([x == wgtflag for x in flags]):
-            raise ValueError("inconsistent wgtflags {} accross processes".format(flags))
-    ncon = kw.get("ncon", 1)
-    assert ncon >= 1
-    tpwgts = try_get_input_array(kw, "tpwgts", ncon * nparts, np.float32)
-    if tpwgts is None:
-        tpwgts = np.ones(ncon * nparts, dtype=np.float32) / nparts
-    ubvec = try_get_input_array(kw, "ubvec", ncon, np.float32)
-    if ubvec is None or isinstance(ubvec, float):
-        try:
-            ubvec = float(ubvec)
-        except TypeError:
-            ubvec = 1.05
-        ubvec = np.asarray([ubvec] * ncon, dtype=np.float32)
-    opts = _get_default_raw_opts(kw, xadj.dtype)
+    g = _process_par_graph(nparts, xadj, adjncy, vtxdist, comm, kw)
+    # NOTE: vsize is an explicit argument, which is never in kw
+    vsize = try_get_input_array({"vsize": vsize}, "vsize", g.nv, g.xadj.dtype)
+    # NOTE: the previous partition is updated in place, so it must be idx_t
+    part = get_or_create_workspace({"part": part}, "part", g.nv, g.xadj.dtype)
     # NOTE: handle geometry partition, assume 2D for the helper
-    xyz = try_get_input_array(kw, "xyz", nv * 2, np.float32)
-    # check size of xzy
-    lib = _get_libparmetis(xadj.dtype)
-    idx_t = lib._IDX_T
-    nparts, ncon, numflag, wgtflag, edgecut = (
-        idx_t(nparts),
-        idx_t(ncon),
-        idx_t(numflag),
-        idx_t(wgtflag),
-        idx_t(0),
-    )
-
-    itr = lib._REAL_T(itr)
-    # part = get_or_create_workspace(kw, "part", nv, xadj.dtype)
+    xyz = try_get_input_array(kw, "xyz", g.nv * 2, np.float32)
+    itr = g.lib._REAL_T(itr)
     if xyz is None:
         # regular Kway
-        lib.AdaptiveRepart(
-            as_pointer(vtxdist), #1
-            as_pointer(xadj), #2
-            as_pointer(adjncy), #3
-            as_pointer(vwgt), #4
-            as_pointer(vsize), #5
-            as_pointer(adjwgt), #6
-            c.byref(wgtflag), #7
-            c.byref(numflag), #8
-            c.byref(ncon), #9
-            c.byref(nparts), #10
-            as_pointer(tpwgts), #11
-            as_pointer(ubvec), #12
-            c.byref(itr), #13
-            as_pointer(opts), #14
-            c.byref(edgecut), #15 
-            as_pointer(part), #16
-            comm_ptr(comm), #17
+        g.lib.AdaptiveRepart(
+            as_pointer(g.vtxdist),
+            as_pointer(g.xadj),
+            as_pointer(g.adjncy),
+            as_pointer(g.vwgt),
+            as_pointer(vsize),
+            as_pointer(g.adjwgt),
+            c.byref(g.wgtflag),
+            c.byref(g.numflag),
+            c.byref(g.ncon),
+            c.byref(g.nparts),
+            as_pointer(g.tpwgts),
+            as_pointer(g.ubvec),
+            c.byref(itr),
+            as_pointer(g.opts),
+            c.byref(g.edgecut),
+            as_pointer(part),
+            comm_ptr(g.comm),
         )
     else:
         # NOTE: geometric Kway
         if xyz.ndim != 2:
             raise ValueError("coordinate must be 2D array")
-        if len(xyz) < nv:
+        if len(xyz) < g.nv:
             raise ValueError("not enough coordinates")
-        ndims = idx_t(xyz.shape[1])
-        lib.AdaptiveRepart(
-            as_pointer(vtxdist),
-            as_pointer(xadj),
-            as_pointer(adjncy),
-            as_pointer(vwgt),
+        ndims = g.lib._IDX_T(xyz.shape[1])
+        g.lib.AdaptiveRepart(
+            as_pointer(g.vtxdist),
+            as_pointer(g.xadj),
+            as_pointer(g.adjncy),
+            as_pointer(g.vwgt),
             as_pointer(vsize),
-            as_pointer(adjwgt),
-            c.byref(wgtflag),
-            c.byref(numflag),
+            as_pointer(g.adjwgt),
+            c.byref(g.wgtflag),
+            c.byref(g.numflag),
             c.byref(ndims),
             as_pointer(xyz),
-            c.byref(ncon),
-            c.byref(nparts),
-            as_pointer(tpwgts),
-            as_pointer(ubvec),
-            as_pointer(opts),
-            c.byref(edgecut),
+            c.byref(g.ncon),
+            c.byref(g.nparts),
+            as_pointer(g.tpwgts),
+            as_pointer(g.ubvec),
+            as_pointer(g.opts),
+            c.byref(g.edgecut),
             as_pointer(part),
-            comm_ptr(comm),
+            comm_ptr(g.comm),
         )
-    return edgecut.value, part
+    return g.edgecut.value, part
+
+
+def refine_kway(nparts, xadj, adjncy, part, vtxdist=None, comm=None, **kw):
+    """Improve the quality of an existing partition
+
+    This routine wraps ``ParMETIS_V3_RefineKway``, which is much cheaper than
+    :func:`adaptive_repart_kway` and is suitable if the partition is only
+    slightly imbalanced or its edge cut has degraded, e.g., after the graph
+    has been changed a little.
+
+    Parameters
+    ----------
+    nparts : int
+        Number of partitions
+    xadj : np.ndarray
+        Local range of CSR graph starting position array
+    adjncy : np.ndarray
+        Local potion of CSR adjacent list with global indices
+    part : np.ndarray
+        Previous partition, which is updated in place if it's in ``idx_t``.
+    vtxdist : np.ndarray, optional
+        Global range array, see ParMETIS manual section 4.2.1, if not specified
+        then will compute using MPI collection
+    comm : MPI_Comm, optional
+        MPI communicator, if not specified, then will use MPI_COMM_WORLD and
+        try to initialize MPI via `mpi4py`.
+    options : np.ndarray
+        Control parameter array, see the manual 4.2.4
+
+    Returns
+    -------
+    edgecuts : int
+        Number of edge cuts for this process
+    part : np.ndarray
+        Local partition array of the local graph.
+
+    Other Parameters
+    -----------------
+    vwgt, adjwgt : np.ndarray, optional
+        Weighting for nodes and edges, see manual 4.2.1
+    ncon : int, optional
+        This is used to specify the number of weights that each vertex has. It
+        is also the number of balance constraints that must be satisfied. The
+        default value is 1
+    tpwgts, ubvec : np.ndarray, optional
+        See the manual
+    par_debug : bool, optional
+        Flag controling whether or not to validate the distributed graph with
+        :func:`mgmetis.par_utils.validate_dist_graph`, i.e., the consistency
+        of `vtxdist`, numbering and weighting, the global ID ranges and the
+        edge symmetry across processes; defects raise
+        :class:`~mgmetis.par_utils.DistGraphError`, which is a
+        :class:`ValueError`. Default is False.
+    """
+    g = _process_par_graph(nparts, xadj, adjncy, vtxdist, comm, kw)
+    part = get_or_create_workspace({"part": part}, "part", g.nv, g.xadj.dtype)
+    g.lib.RefineKway(
+        as_pointer(g.vtxdist),
+        as_pointer(g.xadj),
+        as_pointer(g.adjncy),
+        as_pointer(g.vwgt),
+        as_pointer(g.adjwgt),
+        c.byref(g.wgtflag),
+        c.byref(g.numflag),
+        c.byref(g.ncon),
+        c.byref(g.nparts),
+        as_pointer(g.tpwgts),
+        as_pointer(g.ubvec),
+        as_pointer(g.opts),
+        c.byref(g.edgecut),
+        as_pointer(part),
+        comm_ptr(g.comm),
+    )
+    return g.edgecut.value, part
+
 
 def part_geom(xyz, vtxdist=None, comm=None, **kw):
     """Pure geometry based partitioning, not recommended
@@ -590,7 +646,7 @@ def part_mesh_kway(nparts, *cells, **kw):
         idx_t(ncon),
         idx_t(eptr[0]),
         idx_t(0 if elmwgt is None else 2),
-        idx_t(1),
+        idx_t(kw.get("ncommonnodes", 1)),
         idx_t(0),
     )
     part = get_or_create_workspace(kw, "part", eptr.size - 1, eptr.dtype)
@@ -0,0 +1,297 @@
+# -*- coding: utf-8 -*-
+"""Incremental tracking of partition quality
+
+In adaptive simulations (e.g., AMR), the vertex weights, the partition and
+even the graph change a little every step, and deciding whether to
+repartition (e.g., with :func:`mgmetis.parmetis.adaptive_repart_kway`) by
+recomputing the part weights and the edge cut over the whole graph costs
+:math:`O(nnz)` per step. :class:`QualityTracker` computes them once, and then
+updates them with sparse changes, i.e., changed vertex weights, moved
+vertices and inserted or deleted edges, in time proportional to the changes
+(and the degrees of the touched vertices).
+
+Edges are kept in the input CSR arrays, whose weights are zeroed on
+deletion, plus a small overlay of the inserted edges, so that the graph
+isn't rebuilt either.
+
+.. module:: mgmetis.quality
+.. moduleauthor:: Qiao Chen, <benechiao@gmail.com>
+"""
+
+import numpy as np
+
+from .utils import process_graph, try_get_input_array
+
+__all__ = ["QualityTracker"]
+
+
+def _as_vertices(vertices, base, nv, name="vertices"):
+    # helper to convert user vertex IDs into C-based int64 array
+    v = np.asarray(vertices, dtype=np.int64).reshape(-1) - base
+    if v.size and (v.min() < 0 or v.max() >= nv):
+        raise ValueError("{} out of range".format(name))
+    return v
+
+
+class QualityTracker:
+    """Part weights, imbalance and edge cut of a partition under sparse updates
+
+    Parameters
+    ----------
+    xadj, adjncy : np.ndarray
+        The adjacency structure (CSR), both C and Fortran indices are
+        supported; the arrays are not modified.
+    part : np.ndarray
+        Partition array of size `nv`, in the same index system as `adjncy`.
+
+    Other Parameters
+    ----------------
+    vwgt : np.ndarray, optional
+        Vertex weights of size ``nv*ncon``, default is unit weights.
+    adjwgt : np.ndarray, optional
+        Edge weights, default is unit weights.
+    ncon : int, optional
+        Number of balancing constraints, default is 1.
+    nparts : int, optional
+        Number of parts, default is the largest part ID plus one.
+    tpwgts : np.ndarray, optional
+        Target part weights of size ``nparts*ncon``, default is uniform.
+
+    Attributes
+    ----------
+    pwgts : np.ndarray
+        Part weights of shape ``(nparts, ncon)``
+    edgecut : int
+        Total weight of the cut edges
+    edgecut0 : int
+        The edge cut at construction or the last :meth:`reset`
+
+    Notes
+    -----
+    All vertex IDs and part IDs passed to the methods are in the same index
+    system as the graph. If a vertex appears multiple times in a single
+    update, then the last occurrence wins.
+
+    Examples
+    --------
+    >>> from mgmetis import parmetis
+    >>> from mgmetis.quality import QualityTracker
+    >>> tracker = QualityTracker(xadj, adjncy, part, vwgt=vwgt)
+    >>> # every step
+    >>> tracker.set_weights(refined, vwgt[refined])
+    >>> if tracker.should_repartition(1.05, cut_ratio=1.5):
+    ...     _, part = parmetis.adaptive_repart_kway(tracker.nparts, xadj, adjncy, part, vwgt=vwgt)
+    ...     tracker.reset(part)
+    """
+
+    def __init__(self, xadj, adjncy, part, **kw):
+        self._xadj, self._adjncy, self.nv = process_graph(xadj, adjncy)
+        self.base = int(self._xadj[0])
+        self.ncon = int(kw.get("ncon", 1))
+        if self.ncon < 1:
+            raise ValueError("invalid ncon, should be at least 1")
+        nnz = int(self._xadj[-1]) - self.base
+        adjwgt = try_get_input_array(kw, "adjwgt", nnz, np.int64)
+        self._ew = np.ones(nnz, dtype=np.int64) if adjwgt is None else adjwgt.reshape(-1)[:nnz].copy()
+        vwgt = try_get_input_array(kw, "vwgt", self.nv * self.ncon, np.int64)
+        if vwgt is None:
+            self._w = np.ones((self.nv, self.ncon), dtype=np.int64)
+        else:
+            self._w = vwgt.reshape(-1)[: self.nv * self.ncon].reshape(self.nv, self.ncon).copy()
+        part = np.asarray(part, dtype=np.int64).reshape(-1)
+        if part.size != self.nv:
+            raise ValueError("part should be size of {}".format(self.nv))
+        nparts = kw.get("nparts", None)
+        self.nparts = int(part.max()) + 1 - self.base if nparts is None else int(nparts)
+        if self.nparts <= 0:
+            raise ValueError("invalid nparts")
+        tpwgts = try_get_input_array(kw, "tpwgts", self.nparts * self.ncon, np.float64)
+        if tpwgts is None:
+            self._tpwgts = np.full((self.nparts, self.ncon), 1.0 / self.nparts)
+        else:
+            self._tpwgts = tpwgts.reshape(-1)[: self.nparts * self.ncon].reshape(self.nparts, self.ncon)
+        # NOTE: inserted edges, {u: {v: w}}, stored in both directions
+        self._extra = {}
+        self.reset(part)
+
+    def reset(self, part=None):
+        """Recompute everything from scratch, i.e., :math:`O(nnz)`
+
+        Parameters
+        ----------
+        part : np.ndarray, optional
+            New partition, e.g., after repartitioning; default is to keep the
+            current one.
+        """
+        if part is not None:
+            part = _as_vertices(part, self.base, self.nparts, "part")
+            if part.size != self.nv:
+                raise ValueError("part should be size of {}".format(self.nv))
+            self._part = part
+        self.pwgts = np.zeros((self.nparts, self.ncon), dtype=np.int64)
+        np.add.at(self.pwgts, self._part, self._w)
+        rows = np.repeat(np.arange(self.nv), np.diff(self._xadj))
+        cut = self._part[rows] != self._part[self._adjncy[: rows.size] - self.base]
+        edgecut = int(self._ew[cut].sum()) // 2
+        for u, nbrs in self._extra.items():
+            edgecut += sum(w for v, w in nbrs.items() if u < v and self._part[u] != self._part[v])
+        self.edgecut = self.edgecut0 = edgecut
+
+    @property
+    def part(self):
+        """np.ndarray: copy of the current partition"""
+        return self._part + self.base
+
+    @property
+    def imbalances(self):
+        """np.ndarray: load imbalance of each constraint, i.e., the largest
+        ratio of part weight to target part weight"""
+        total = self.pwgts.sum(axis=0).astype(np.float64)
+        target = self._tpwgts * np.where(total > 0, total, 1.0)
+        return np.max(self.pwgts / np.where(target > 0, target, 1.0), axis=0)
+
+    @property
+    def imbalance(self):
+        """float: the largest load imbalance among all constraints"""
+        return float(self.imbalances.max())
+
+    def should_repartition(self, ubvec=1.05, cut_ratio=None):
+        """Check whether the partition has degraded
+
+        Parameters
+        ----------
+        ubvec : {float, np.ndarray}, optional
+            Tolerance of the load imbalance (per constraint), default is 1.05.
+        cut_ratio : float, optional
+            If given, then an edge cut larger than ``cut_ratio*edgecut0`` also
+            triggers repartitioning.
+
+        Returns
+        -------
+        bool
+        """
+        if np.any(self.imbalances > np.asarray(ubvec, dtype=np.float64)):
+            return True
+        return cut_ratio is not None and self.edgecut > cut_ratio * self.edgecut0
+
+    def _incident(self, vs):
+        # helper to get all (alive) edges incident to the unique vertices vs,
+        # returns source, destination and weight
+        starts, ends = self._xadj[vs] - self.base, self._xadj[vs + 1] - self.base
+        lens = ends - starts
+        pos = np.repeat(starts - np.cumsum(lens) + lens, lens) + np.arange(lens.sum())
+        src, dst, ew = np.repeat(vs, lens), self._adjncy[pos] - self.base, self._ew[pos]
+        extra = [(u, v, w) for u in vs.tolist() for v, w in self._extra.get(u, {}).items()]
+        if extra:
+            extra = np.asarray(extra, dtype=np.int64)
+            src, dst, ew = (np.concatenate((x, extra[:, i])) for i, x in enumerate((src, dst, ew)))
+        return src, dst, ew
+
+    def set_weights(self, vertices, vwgt):
+        """Update the weights of some vertices
+
+        Parameters
+        ----------
+        vertices : array_like
+            Vertices whose weights have changed
+        vwgt : array_like
+            New weights of size ``len(vertices)*ncon``
+        """
+        vs = _as_vertices(vertices, self.base, self.nv)
+        vwgt = np.asarray(vwgt, dtype=np.int64).reshape(vs.size, self.ncon)
+        vs, idx = np.unique(vs[::-1], return_index=True)
+        vwgt = vwgt[::-1][idx]
+        p = self._part[vs]
+        np.add.at(self.pwgts, p, vwgt - self._w[vs])
+        self._w[vs] = vwgt
+
+    def move(self, vertices, parts):
+        """Move some vertices to other parts
+
+        Parameters
+        ----------
+        vertices : array_like
+            Vertices to be moved
+        parts : array_like
+            Their new parts
+        """
+        vs = _as_vertices(vertices, self.base, self.nv)
+        parts = _as_vertices(parts, self.base, self.nparts, "parts")
+        if parts.size != vs.size:
+            raise ValueError("vertices and parts should be of the same size")
+        vs, idx = np.unique(vs[::-1], return_index=True)
+        parts = parts[::-1][idx]
+        src, dst, ew = self._incident(vs)
+        # NOTE: the edges between two moved vertices show up twice
+        keep = ~np.isin(dst, vs) | (src < dst)
+        src, dst, ew = src[keep], dst[keep], ew[keep]
+        before = int(ew[self._part[src] != self._part[dst]].sum())
+        np.subtract.at(self.pwgts, self._part[vs], self._w[vs])
+        self._part[vs] = parts
+        np.add.at(self.pwgts, parts, self._w[vs])
+        self.edgecut += int(ew[self._part[src] != self._part[dst]].sum()) - before
+
+    def _find(self, u, v):
+        # helper to find the CSR position of edge (u, v), -1 if not found
+        s, e = self._xadj[u] - self.base, self._xadj[u + 1] - self.base
+        hits = np.flatnonzero(self._adjncy[s:e] == v + self.base)
+        return s + int(hits[0]) if hits.size else -1
+
+    def _edge_pairs(self, u, v):
+        # helper to convert edge end points
+        u = _as_vertices(u, self.base, self.nv, "u")
+        v = _as_vertices(v, self.base, self.nv, "v")
+        if u.size != v.size:
+            raise ValueError("u and v should be of the same size")
+        return u.tolist(), v.tolist()
+
+    def insert_edges(self, u, v, adjwgt=None):
+        """Insert undirected edges
+
+        Parameters
+        ----------
+        u, v : array_like
+            End points of the new edges
+        adjwgt : array_like, optional
+            Edge weights, default is unit weights.
+        """
+        u, v = self._edge_pairs(u, v)
+        ws = [1] * len(u) if adjwgt is None else np.asarray(adjwgt, dtype=np.int64).reshape(-1).tolist()
+        for a, b, w in zip(u, v, ws):
+            if a == b:
+                raise ValueError("self-loop ({}, {})".format(a + self.base, b + self.base))
+            pa, pb = self._find(a, b), self._find(b, a)
+            if (pa >= 0 and self._ew[pa]) or b in self._extra.get(a, ()):
+                raise ValueError("edge ({}, {}) exists".format(a + self.base, b + self.base))
+            if pa >= 0 and pb >= 0:
+                # NOTE: revive a deleted edge of the input graph
+                self._ew[pa] = self._ew[pb] = w
+            else:
+                self._extra.setdefault(a, {})[b] = w
+                self._extra.setdefault(b, {})[a] = w
+            if self._part[a] != self._part[b]:
+                self.edgecut += w
+
+    def delete_edges(self, u, v):
+        """Delete undirected edges
+
+        Parameters
+        ----------
+        u, v : array_like
+            End points of the edges to be deleted
+        """
+        u, v = self._edge_pairs(u, v)
+        for a, b in zip(u, v):
+            if b in self._extra.get(a, ()):
+                w = self._extra[a].pop(b)
+                self._extra[b].pop(a)
+            else:
+                pa, pb = self._find(a, b), self._find(b, a)
+                if pa < 0 or not self._ew[pa]:
+                    raise ValueError("edge ({}, {}) doesn't exist".format(a + self.base, b + self.base))
+                w = int(self._ew[pa])
+                self._ew[pa] = 0
+                if pb >= 0:
+                    self._ew[pb] = 0
+            if self._part[a] != self._part[b]:
+                self.edgecut -= w
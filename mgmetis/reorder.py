@@ -0,0 +1,465 @@
+# -*- coding: utf-8 -*-
+"""Locality-improving reordering within partitions
+
+After partitioning, the numbering inside each subdomain still follows the
+original (e.g., mesh generator) order. The routines in this module compute
+permutations that make each part contiguous and order the vertices within a
+part by reverse Cuthill-McKee (RCM) or nested dissection, and apply them to
+CSR matrices, meshes and field arrays. For substructuring (Schur complement)
+solvers, :func:`schur_order` and :func:`schur_csr` additionally move the
+interface vertices of all parts to the end.
+
+All permutations follow the conventions of :func:`mgmetis.metis.node_nd`,
+i.e., ``perm[i]`` is the old ID of the new vertex ``i``, and ``iperm[i]`` is
+the new ID of the old vertex ``i``.
+
+.. module:: mgmetis.reorder
+.. moduleauthor:: Qiao Chen, <benechiao@gmail.com>
+"""
+
+import numpy as np
+
+from . import metis
+from .utils import process_graph, extract_subgraph
+
+__all__ = [
+    "rcm",
+    "part_order",
+    "part_order_mesh",
+    "permute_csr",
+    "permute_fields",
+    "reorder_csr",
+    "schur_order",
+    "schur_csr",
+]
+
+
+def _inverse(perm):
+    # helper to invert a permutation
+    iperm = np.empty_like(perm)
+    iperm[perm] = np.arange(perm.size, dtype=perm.dtype)
+    return iperm
+
+
+def _cm_levels(xadj, adjncy, deg, start, seen, stamp):
+    # helper to compute the BFS levels from start in Cuthill-McKee order, i.e.,
+    # vertices of a level are sorted by the position of their first visited
+    # parent and then by degree; seen is marked with stamp
+    seen[start] = stamp
+    frontier = np.asarray([start])
+    levels = []
+    while frontier.size:
+        levels.append(frontier)
+        counts = deg[frontier]
+        offsets = np.cumsum(counts) - counts
+        idx = np.repeat(xadj[frontier] - offsets, counts) + np.arange(counts.sum())
+        nbrs = adjncy[idx]
+        parents = np.repeat(np.arange(frontier.size), counts)
+        mask = seen[nbrs] != stamp
+        nbrs, parents = nbrs[mask], parents[mask]
+        # NOTE: unique neighbors with their first parents
+        order = np.lexsort((parents, nbrs))
+        nbrs, parents = nbrs[order], parents[order]
+        first = np.append(True, nbrs[1:] != nbrs[:-1]) if nbrs.size else nbrs.astype(bool)
+        nbrs, parents = nbrs[first], parents[first]
+        frontier = nbrs[np.lexsort((deg[nbrs], parents))]
+        seen[frontier] = stamp
+    return levels
+
+
+def rcm(xadj, adjncy):
+    """Reverse Cuthill-McKee ordering
+
+    Each connected component is ordered by BFS levels starting from a
+    pseudo-peripheral vertex, where each level is processed at once with
+    vectorized operations.
+
+    Parameters
+    ----------
+    xadj, adjncy : array_like
+        The adjacency structure (CSR), both C and Fortran indices are
+        supported.
+
+    Returns
+    -------
+    perm, iperm : np.ndarray
+        The permutation and its inverse, in C index.
+    """
+    xadj, adjncy, nv = process_graph(xadj, adjncy)
+    if xadj[0] == 1:
+        xadj, adjncy = xadj - 1, adjncy - 1
+    deg = np.diff(xadj)
+    seen = np.zeros(nv, dtype=np.int64)
+    stamp = 0
+    # NOTE: isolated vertices first, then components from min degree vertices
+    order = [np.flatnonzero(deg == 0)]
+    seen[order[0]] = -1
+    for v in np.argsort(deg, kind="stable")[order[0].size :]:
+        if seen[v]:
+            continue
+        stamp += 1
+        levels = _cm_levels(xadj, adjncy, deg, v, seen, stamp)
+        for _ in range(3):
+            # NOTE: pseudo-peripheral vertex by George-Liu iterations
+            last = levels[-1]
+            u = last[np.argmin(deg[last])]
+            stamp += 1
+            candidate = _cm_levels(xadj, adjncy, deg, u, seen, stamp)
+            if len(candidate) <= len(levels):
+                break
+            levels = candidate
+        # NOTE: stamp the component with the final ordering
+        stamp += 1
+        levels = _cm_levels(xadj, adjncy, deg, levels[0][0], seen, stamp)
+        order.extend(levels)
+    perm = np.asarray(np.concatenate(order)[::-1], dtype=xadj.dtype)
+    return perm, _inverse(perm)
+
+
+def _local_order(method, xadj, adjncy, vertices, kw):
+    # helper to order the subgraph induced by vertices (in C index)
+    if method is None or vertices.size <= 2:
+        return vertices
+    sxadj, sadjncy, _ = extract_subgraph(xadj, adjncy, vertices)
+    if method == "rcm":
+        return vertices[rcm(sxadj, sadjncy)[0]]
+    if method == "nd":
+        return vertices[metis.node_nd(sxadj, sadjncy, **kw)[0]]
+    raise ValueError("unknown method {}".format(method))
+
+
+def part_order(part, xadj=None, adjncy=None, method="rcm", **kw):
+    """Compute a permutation that groups each part contiguously
+
+    Parts are ordered by their IDs, and the vertices within a part are ordered
+    with `method` on the subgraph induced by the part.
+
+    Parameters
+    ----------
+    part : array_like
+        Partition array
+    xadj, adjncy : array_like, optional
+        The adjacency structure (CSR), required unless `method` is None.
+    method : {"rcm", "nd", None}, optional
+        Ordering within each part, i.e., reverse Cuthill-McKee (default),
+        nested dissection with :func:`mgmetis.metis.node_nd` or keeping the
+        original order (None).
+
+    Returns
+    -------
+    perm, iperm : np.ndarray
+        The permutation and its inverse, in C index.
+    offsets : np.ndarray
+        Starting position of each part in the new numbering, i.e., part ``p``
+        (in the sorted order of part IDs) is ``perm[offsets[p]:offsets[p+1]]``.
+
+    Other Parameters
+    ----------------
+    options : np.ndarray, optional
+        METIS options for ``method="nd"``
+    """
+    part = np.asarray(part).reshape(-1)
+    dtype = part.dtype if xadj is None else np.asarray(xadj).dtype
+    perm = np.asarray(np.argsort(part, kind="stable"), dtype=dtype)
+    offsets = np.concatenate(([0], np.flatnonzero(np.diff(part[perm])) + 1, [part.size]))
+    if method is not None:
+        if xadj is None or adjncy is None:
+            raise ValueError("graph is required for method {}".format(method))
+        xadj, adjncy, _ = process_graph(xadj, adjncy)
+        if xadj[0] == 1:
+            xadj, adjncy = xadj - 1, adjncy - 1
+        nd_kw = {"options": kw["options"]} if kw.get("options", None) is not None else {}
+        for s, e in zip(offsets[:-1], offsets[1:]):
+            perm[s:e] = _local_order(method, xadj, adjncy, perm[s:e], nd_kw)
+    return perm, _inverse(perm), np.asarray(offsets, dtype=dtype)
+
+
+def part_order_mesh(epart, npart, *cells, method="rcm", **kw):
+    """Compute partition-grouped orderings of elements and nodes of a mesh
+
+    Elements are ordered on the dual graph and nodes on the nodal graph, see
+    :func:`part_order`.
+
+    Parameters
+    ----------
+    epart, npart : array_like
+        Element and node partition arrays, e.g., from
+        :func:`mgmetis.metis.part_mesh_dual`.
+    *cells : positional arguments
+        Mesh, see :func:`mgmetis.metis.part_mesh_dual`
+    method : {"rcm", "nd", None}, optional
+        Ordering within each part, see :func:`part_order`.
+    ncommon : int, optional
+        Number of common nodes for the dual graph, default is 1.
+    nv : int, optional
+        Total number of vertices in mesh
+
+    Returns
+    -------
+    eperm, eiperm : np.ndarray
+        Element permutation and its inverse
+    nperm, niperm : np.ndarray
+        Node permutation and its inverse
+    """
+    graphs = (None, None), (None, None)
+    if method is not None:
+        graphs = (
+            metis.mesh_to_dual(*cells, ncommon=kw.get("ncommon", 1), nv=kw.get("nv", -1)),
+            metis.mesh_to_nodal(*cells, nv=kw.get("nv", -1)),
+        )
+    eperm, eiperm, _ = part_order(epart, *graphs[0], method=method)
+    nperm, niperm, _ = part_order(npart, *graphs[1], method=method)
+    return eperm, eiperm, nperm, niperm
+
+
+def permute_csr(perm, indptr, indices, data=None, col_iperm=None, sort_indices=True):
+    """Permute a CSR matrix in a single pass
+
+    Computes :math:`PAQ^T`, where rows are taken in the order of `perm` and
+    column indices are mapped with `col_iperm`.
+
+    Parameters
+    ----------
+    perm : array_like
+        Row permutation, i.e., new row ``i`` is the old row ``perm[i]``.
+    indptr, indices : array_like
+        CSR structure, both C and Fortran indices are supported.
+    data : array_like, optional
+        CSR values, can be multi-dimensional along the first axis (e.g., BSR
+        blocks).
+    col_iperm : array_like, optional
+        Inverse column permutation, default is the inverse of `perm`, i.e.,
+        symmetric permutation :math:`PAP^T`. Use, e.g., the inverse node
+        permutation for renumbering a mesh (``eptr``, ``eind``).
+    sort_indices : bool, optional
+        Sort column indices within each row, default is True.
+
+    Returns
+    -------
+    indptr, indices : np.ndarray
+        Permuted CSR structure in the input index system
+    data : {np.ndarray, None}
+        Permuted values, None if `data` is not given.
+    """
+    indptr, indices, _ = process_graph(indptr, indices)
+    base = indptr[0]
+    perm = np.asarray(perm).reshape(-1)
+    col_iperm = _inverse(perm) if col_iperm is None else np.asarray(col_iperm).reshape(-1)
+    counts = np.diff(indptr)[perm]
+    new_indptr = np.empty(perm.size + 1, dtype=indptr.dtype)
+    new_indptr[0] = base
+    np.cumsum(counts, out=new_indptr[1:])
+    new_indptr[1:] += base
+    offsets = new_indptr[:-1] - base
+    src = np.repeat(indptr[perm] - base - offsets, counts) + np.arange(counts.sum())
+    new_indices = np.asarray(col_iperm[indices[src] - base] + base, dtype=indptr.dtype)
+    if sort_indices and src.size:
+        order = np.lexsort((new_indices, np.repeat(np.arange(perm.size), counts)))
+        src, new_indices = src[order], new_indices[order]
+    if data is not None:
+        data = np.take(np.asarray(data), src, axis=0)
+    return new_indptr, new_indices, data
+
+
+def permute_fields(perm, *fields):
+    """Permute field arrays along their first axes
+
+    Parameters
+    ----------
+    perm : array_like
+        Permutation, i.e., new entry ``i`` is the old entry ``perm[i]``.
+    *fields : array_like
+        Field arrays
+
+    Returns
+    -------
+    {np.ndarray, tuple}
+        The permuted field if a single field is given, otherwise a tuple of
+        the permuted fields.
+    """
+    out = tuple(np.take(np.asarray(f), perm, axis=0) for f in fields)
+    return out[0] if len(out) == 1 else out
+
+
+def reorder_csr(part, indptr, indices, data=None, method="rcm", **kw):
+    """Renumber a CSR matrix so that each part is contiguous and local
+
+    This combines :func:`part_order` on the matrix graph (diagonal dropped)
+    and :func:`permute_csr`.
+
+    Parameters
+    ----------
+    part : array_like
+        Partition array of the rows
+    indptr, indices : array_like
+        CSR structure of a structurally symmetric matrix
+    data : array_like, optional
+        CSR values
+    method : {"rcm", "nd", None}, optional
+        Ordering within each part, see :func:`part_order`.
+
+    Returns
+    -------
+    perm, iperm : np.ndarray
+        The permutation and its inverse
+    offsets : np.ndarray
+        Starting row of each part in the new numbering
+    indptr, indices, data : np.ndarray
+        The permuted matrix, see :func:`permute_csr`.
+    """
+    indptr, indices, _ = process_graph(indptr, indices)
+    xadj, adjncy = indptr, indices
+    if method is not None:
+        xadj, adjncy = _offdiag_graph(indptr, indices)
+    perm, iperm, offsets = part_order(part, xadj, adjncy, method=method, **kw)
+    return (perm, iperm, offsets) + permute_csr(perm, indptr, indices, data)
+
+
+def _offdiag_graph(indptr, indices):
+    # helper to get the C-index graph of a CSR matrix with the diagonal dropped
+    n = indptr.size - 1
+    base = indptr[0]
+    rows = np.repeat(np.arange(n), np.diff(indptr))
+    mask = indices[: rows.size] - base != rows
+    xadj = np.zeros(n + 1, dtype=indptr.dtype)
+    np.cumsum(np.bincount(rows[mask], minlength=n), out=xadj[1:])
+    return xadj, np.asarray(indices[: rows.size][mask] - base, dtype=indptr.dtype)
+
+
+def _interface_mask(part, xadj, adjncy, interface):
+    # helper to determine the interface vertices as a boolean mask, which is
+    # either given (label, mask or indices) or the vertices with at least one
+    # neighbor in a different part
+    if interface is None:
+        if xadj is None or adjncy is None:
+            raise ValueError("graph is required to detect the interface")
+        rows = np.repeat(np.arange(part.size), np.diff(xadj))
+        mask = np.zeros(part.size, dtype=bool)
+        mask[rows[part[rows] != part[adjncy]]] = True
+        return mask
+    if np.ndim(interface) == 0:
+        return part == interface
+    interface = np.asarray(interface).reshape(-1)
+    if interface.dtype == bool:
+        if interface.size != part.size:
+            raise ValueError("interface mask should be size of {}".format(part.size))
+        return interface
+    mask = np.zeros(part.size, dtype=bool)
+    mask[interface] = True
+    return mask
+
+
+def schur_order(part, xadj=None, adjncy=None, interface=None, method="rcm", **kw):
+    """Compute an interior/interface block ordering for Schur complement solvers
+
+    The interior vertices of each part are grouped contiguously (ordered by
+    part IDs), followed by all interface vertices, i.e., the permuted matrix
+    has the bordered block diagonal form, in which the interior blocks are
+    only coupled through the interface block (the Schur complement).
+
+    Parameters
+    ----------
+    part : array_like
+        Partition array, e.g., from :func:`mgmetis.metis.part_graph_kway`, or
+        a vertex separator labeling (see `interface`).
+    xadj, adjncy : array_like, optional
+        The adjacency structure (CSR), required unless `interface` is given
+        and `method` is None.
+    interface : {int, array_like}, optional
+        The interface vertices as a part label (e.g., 2 for the separator of
+        ``METIS_ComputeVertexSeparator``), a boolean mask or indices (C index).
+        By default, the interface consists of all vertices that have at least
+        one neighbor in a different part, so that the interior blocks are
+        decoupled.
+    method : {"rcm", "nd", None}, optional
+        Ordering within each block, see :func:`part_order`.
+
+    Returns
+    -------
+    perm, iperm : np.ndarray
+        The permutation and its inverse, in C index.
+    offsets : np.ndarray
+        Block boundaries in the new numbering, i.e., the interior of part ``p``
+        (in the sorted order of part IDs excluding an interface label) is
+        ``perm[offsets[p]:offsets[p+1]]`` (which may be empty), and the
+        interface is ``perm[offsets[-2]:]``.
+
+    Other Parameters
+    ----------------
+    options : np.ndarray, optional
+        METIS options for ``method="nd"``
+
+    Examples
+    --------
+    >>> from mgmetis import metis, reorder
+    >>> _, part = metis.part_graph_kway(4, xadj, adjncy)
+    >>> perm, iperm, offsets = reorder.schur_order(part, xadj, adjncy)
+    >>> interface = perm[offsets[-2]:]
+    """
+    part = np.asarray(part).reshape(-1)
+    if xadj is not None and adjncy is not None:
+        xadj, adjncy, nv = process_graph(xadj, adjncy)
+        if nv != part.size:
+            raise ValueError("part should be size of {}".format(nv))
+        if xadj[0] == 1:
+            xadj, adjncy = xadj - 1, adjncy - 1
+    elif method is not None:
+        raise ValueError("graph is required for method {}".format(method))
+    dtype = part.dtype if xadj is None else xadj.dtype
+    iface = _interface_mask(part, xadj, adjncy, interface)
+    is_label = interface is not None and np.ndim(interface) == 0
+    ids = np.unique(part[part != interface] if is_label else part)
+    # NOTE: block key of each vertex, the interface is the last block
+    key = np.searchsorted(ids, part)
+    key[iface] = ids.size
+    perm = np.asarray(np.argsort(key, kind="stable"), dtype=dtype)
+    offsets = np.zeros(ids.size + 2, dtype=dtype)
+    np.cumsum(np.bincount(key, minlength=ids.size + 1), out=offsets[1:])
+    if method is not None:
+        nd_kw = {"options": kw["options"]} if kw.get("options", None) is not None else {}
+        for s, e in zip(offsets[:-1], offsets[1:]):
+            perm[s:e] = _local_order(method, xadj, adjncy, perm[s:e], nd_kw)
+    return perm, _inverse(perm), offsets
+
+
+def schur_csr(part, indptr, indices, data=None, interface=None, method="rcm", **kw):
+    """Permute a CSR matrix into interior blocks followed by the interface
+
+    This combines :func:`schur_order` on the matrix graph (diagonal dropped)
+    and :func:`permute_csr`, i.e., the matrix is permuted in a single pass.
+
+    Parameters
+    ----------
+    part : array_like
+        Partition array of the rows
+    indptr, indices : array_like
+        CSR structure of a structurally symmetric matrix
+    data : array_like, optional
+        CSR values
+    interface : {int, array_like}, optional
+        The interface rows, see :func:`schur_order`.
+    method : {"rcm", "nd", None}, optional
+        Ordering within each block, see :func:`part_order`.
+
+    Returns
+    -------
+    perm, iperm : np.ndarray
+        The permutation and its inverse
+    offsets : np.ndarray
+        Block boundaries in the new numbering, the last block is the interface.
+    indptr, indices, data : np.ndarray
+        The permuted matrix, see :func:`permute_csr`.
+
+    Examples
+    --------
+    >>> import scipy.sparse as sp
+    >>> from mgmetis.reorder import schur_csr
+    >>> perm, _, offsets, *csr = schur_csr(part, A.indptr, A.indices, A.data)
+    >>> B = sp.csr_matrix(tuple(csr[::-1]), shape=A.shape)
+    >>> n_i = offsets[-2]
+    >>> A_II, A_IG, A_GG = B[:n_i, :n_i], B[:n_i, n_i:], B[n_i:, n_i:]
+    """
+    indptr, indices, _ = process_graph(indptr, indices)
+    xadj, adjncy = _offdiag_graph(indptr, indices)
+    perm, iperm, offsets = schur_order(part, xadj, adjncy, interface=interface, method=method, **kw)
+    return (perm, iperm, offsets) + permute_csr(perm, indptr, indices, data)
@@ -95,6 +95,7 @@ void  *gk_realloc(void *oldptr, size_t nbytes, char *msg);
 void   gk_free(void **ptr1,...);
 size_t gk_GetCurMemoryUsed();
 size_t gk_GetMaxMemoryUsed();
+void   gk_GetLastMemoryUsed(size_t *r_cur, size_t *r_max);
 
 
 
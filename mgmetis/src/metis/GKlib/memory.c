@@ -18,6 +18,10 @@ can be used to define other memory allocation routines.
 /* This is for the global mcore that tracks all heap allocations */
 static __thread gk_mcore_t *gkmcore = NULL;
 
+/* These are the heap statistics of the last completed tracking session */
+static __thread size_t gklast_cur_hallocs = 0;
+static __thread size_t gklast_max_hallocs = 0;
+
 
 /*************************************************************************/
 /*! Define the set of memory allocation routines for each data type */
@@ -120,6 +124,8 @@ void gk_malloc_cleanup(int showstats)
   if (gkmcore != NULL) {
     gk_gkmcorePop(gkmcore);
     if (gkmcore->cmop == 0) {
+      gklast_cur_hallocs = gkmcore->cur_hallocs;
+      gklast_max_hallocs = gkmcore->max_hallocs;
       gk_gkmcoreDestroy(&gkmcore, showstats);
       gkmcore = NULL;
     }
@@ -250,3 +256,16 @@ size_t gk_GetMaxMemoryUsed()
   else
     return gkmcore->max_hallocs;
 }
+
+
+/*************************************************************************
+* This function returns the current and maximum ammount of dynamically
+* allocated memory of the last completed gk_malloc_init()/gk_malloc_cleanup()
+* session of the calling thread, i.e., the memory that was not freed before
+* the cleanup and the peak memory
+**************************************************************************/
+void gk_GetLastMemoryUsed(size_t *r_cur, size_t *r_max)
+{
+  *r_cur = gklast_cur_hallocs;
+  *r_max = gklast_max_hallocs;
+}
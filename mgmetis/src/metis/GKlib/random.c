@@ -61,10 +61,20 @@ GK_MKRANDOM(gk_z,   size_t, ssize_t)
 #define LM 0x7FFFFFFFULL /* Least significant 31 bits */
 
 
-/* The array for the state vector */
-static uint64_t mt[NN]; 
+/* Portable thread-local storage, C11 or the compiler extensions */
+#if defined(_MSC_VER)
+#define GK_THREAD_LOCAL __declspec(thread)
+#elif defined(__STDC_VERSION__) && __STDC_VERSION__ >= 201112L
+#define GK_THREAD_LOCAL _Thread_local
+#else
+#define GK_THREAD_LOCAL __thread
+#endif
+
+/* The array for the state vector, per thread so that concurrent METIS calls
+   are independent and reproducible */
+static GK_THREAD_LOCAL uint64_t mt[NN]; 
 /* mti==NN+1 means mt[NN] is not initialized */
-static int mti=NN+1; 
+static GK_THREAD_LOCAL int mti=NN+1; 
 #endif /* USE_GKRAND */
 
 /* initializes mt[NN] with a seed */
@@ -216,6 +216,15 @@ METIS_API(int) METIS_Free(void *ptr);
 
 METIS_API(int) METIS_SetDefaultOptions(idx_t *options);
 
+METIS_API(int) METIS_GetMemoryUsage(size_t *cur, size_t *max);
+
+METIS_API(int) METIS_Coarsen(idx_t *nvtxs, idx_t *xadj, idx_t *adjncy, idx_t *vwgt,
+                  idx_t *adjwgt, idx_t *nlevels, idx_t *coarsento, idx_t *options,
+                  idx_t **r_hierarchy);
+
+METIS_API(int) METIS_NodeMMD(idx_t *nvtxs, idx_t *xadj, idx_t *adjncy, idx_t *numflag,
+                  idx_t *perm, idx_t *iperm);
+
 
 /* These functions are used by ParMETIS */
 
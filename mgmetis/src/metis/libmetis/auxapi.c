@@ -41,3 +41,18 @@ int METIS_SetDefaultOptions(idx_t *options)
 }
 
 
+/*************************************************************************/
+/*! This function returns the heap memory statistics of the last METIS API
+    call made by the calling thread.
+
+    \param cur is set to the number of bytes that were still allocated when
+           the call returned (and were freed by the cleanup).
+    \param max is set to the peak number of bytes allocated during the call.
+*/
+/*************************************************************************/
+int METIS_GetMemoryUsage(size_t *cur, size_t *max)
+{
+  gk_GetLastMemoryUsed(cur, max);
+  return METIS_OK;
+}
+
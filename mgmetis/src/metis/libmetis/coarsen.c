@@ -1130,3 +1130,117 @@ void ReAdjustMemory(ctrl_t *ctrl, graph_t *graph, graph_t *cgraph)
     cgraph->adjwgt = irealloc(cgraph->adjwgt, cgraph->nedges, "ReAdjustMemory: adjwgt");
   }
 }
+
+
+/*************************************************************************/
+/*! This function is the entry point of exporting the multilevel coarsening
+    hierarchy of a graph, which is otherwise discarded by the partitioning
+    routines.
+
+    \param nvtxs, xadj, adjncy, vwgt, adjwgt is the input graph, where the
+           weights can be NULL.
+    \param nlevels is the maximum number of coarsening levels on input, and
+           upon return the number of coarse graphs.
+    \param coarsento is the number of vertices below which the coarsening
+           stops. It also bounds the vertex weights of the coarse graphs as
+           in the partitioning routines.
+    \param options uses METIS_OPTION_CTYPE, METIS_OPTION_NO2HOP,
+           METIS_OPTION_SEED and METIS_OPTION_NUMBERING.
+    \param r_hierarchy is the packed hierarchy, i.e., for each level, the
+           cmap of the finer graph followed by cnvtxs, cnedges, cxadj[cnvtxs+1],
+           cadjncy[cnedges], cvwgt[cnvtxs] and cadjwgt[cnedges] of the coarse
+           graph, all in C numbering. The memory is allocated by this routine
+           and it can be freed by calling METIS_Free().
+*/
+/*************************************************************************/
+int METIS_Coarsen(idx_t *nvtxs, idx_t *xadj, idx_t *adjncy, idx_t *vwgt,
+          idx_t *adjwgt, idx_t *nlevels, idx_t *coarsento, idx_t *options,
+          idx_t **r_hierarchy)
+{
+  int sigrval=0, renumber=0;
+  idx_t level, n;
+  size_t size;
+  idx_t *ptr;
+  graph_t *graph, *cgraph;
+  ctrl_t *ctrl;
+
+  /* set up malloc cleaning code and signal catchers */
+  if (!gk_malloc_init()) 
+    return METIS_ERROR_MEMORY;
+
+  gk_sigtrap();
+
+  *r_hierarchy = NULL;
+  if ((sigrval = gk_sigcatch()) != 0)
+    goto SIGTHROW;
+
+  /* set up the run parameters */
+  ctrl = SetupCtrl(METIS_OP_KMETIS, options, 1, 2, NULL, NULL);
+  if (!ctrl) {
+    gk_siguntrap();
+    gk_malloc_cleanup(0);
+    return METIS_ERROR_INPUT;
+  }
+
+  /* if required, change the numbering to 0 */
+  if (ctrl->numflag == 1) {
+    Change2CNumbering(*nvtxs, xadj, adjncy);
+    renumber = 1;
+  }
+
+  graph = SetupGraph(ctrl, *nvtxs, 1, xadj, adjncy, vwgt, NULL, adjwgt);
+  ctrl->CoarsenTo = gk_max(*coarsento, 1);
+
+  AllocateWorkSpace(ctrl, graph);
+
+  if (*nlevels > 0 && graph->nvtxs > ctrl->CoarsenTo)
+    CoarsenGraphNlevels(ctrl, graph, *nlevels);
+
+  /* pack the levels */
+  for (level=0, size=0, cgraph=graph; cgraph->coarser; cgraph=cgraph->coarser, level++) 
+    size += cgraph->nvtxs + 3 + 2*cgraph->coarser->nvtxs + 2*cgraph->coarser->nedges;
+  *nlevels = level;
+
+  *r_hierarchy = ptr = (idx_t *)malloc(sizeof(idx_t)*gk_max(size, 1));
+  if (ptr == NULL)
+    gk_errexit(SIGMEM, "METIS_Coarsen: Failed to allocate the hierarchy.\n");
+
+  for (cgraph=graph; cgraph->coarser; cgraph=cgraph->coarser) {
+    icopy(cgraph->nvtxs, cgraph->cmap, ptr);
+    ptr += cgraph->nvtxs;
+    n = cgraph->coarser->nvtxs;
+    *ptr++ = n;
+    *ptr++ = cgraph->coarser->nedges;
+    icopy(n+1, cgraph->coarser->xadj, ptr);
+    ptr += n+1;
+    icopy(cgraph->coarser->nedges, cgraph->coarser->adjncy, ptr);
+    ptr += cgraph->coarser->nedges;
+    icopy(n, cgraph->coarser->vwgt, ptr);
+    ptr += n;
+    icopy(cgraph->coarser->nedges, cgraph->coarser->adjwgt, ptr);
+    ptr += cgraph->coarser->nedges;
+  }
+
+  /* clean up */
+  while (graph) {
+    cgraph = graph->coarser;
+    FreeGraph(&graph);
+    graph = cgraph;
+  }
+  FreeCtrl(&ctrl);
+
+SIGTHROW:
+  /* if required, change the numbering back to 1 */
+  if (renumber)
+    Change2FNumbering2(*nvtxs, xadj, adjncy);
+
+  gk_siguntrap();
+  gk_malloc_cleanup(0);
+
+  if (sigrval != 0 && *r_hierarchy != NULL) {
+    free(*r_hierarchy);
+    *r_hierarchy = NULL;
+  }
+
+  return metis_rcode(sigrval);
+}
@@ -38,6 +38,7 @@ int METIS_PartGraphKway(idx_t *nvtxs, idx_t *ncon, idx_t *xadj, idx_t *adjncy,
   ctrl = SetupCtrl(METIS_OP_KMETIS, options, *ncon, *nparts, tpwgts, ubvec);
   if (!ctrl) {
     gk_siguntrap();
+    gk_malloc_cleanup(0);
     return METIS_ERROR_INPUT;
   }
 
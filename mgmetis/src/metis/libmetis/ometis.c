@@ -64,6 +64,7 @@ int METIS_NodeND(idx_t *nvtxs, idx_t *xadj, idx_t *adjncy, idx_t *vwgt,
   ctrl = SetupCtrl(METIS_OP_OMETIS, options, 1, 3, NULL, NULL);
   if (!ctrl) {
     gk_siguntrap();
+    gk_malloc_cleanup(0);
     return METIS_ERROR_INPUT;
   }
 
@@ -699,3 +700,74 @@ void MMDOrder(ctrl_t *ctrl, graph_t *graph, idx_t *order, idx_t lastvtx)
 
 
 
+
+
+/*************************************************************************/
+/*! This function computes the multiple minimum degree ordering of a graph,
+    i.e., the ordering that METIS_NodeND uses for the small subgraphs.
+
+    \param nvtxs is the number of vertices in the graph.
+    \param xadj, adjncy is the adjacency structure of the graph, where
+           self-loops are ignored. The graph is not modified.
+    \param numflag is the numbering (0 or 1) of the graph and the outputs.
+    \param perm, iperm are the ordering and its inverse as in METIS_NodeND.
+*/
+/*************************************************************************/
+int METIS_NodeMMD(idx_t *nvtxs, idx_t *xadj, idx_t *adjncy, idx_t *numflag,
+          idx_t *perm, idx_t *iperm)
+{
+  int sigrval=0;
+  idx_t i, j, k, n, nf, nofsub;
+  idx_t *cxadj, *cadjncy, *cperm, *ciperm, *head, *qsize, *list, *marker;
+
+  if (*numflag != 0 && *numflag != 1)
+    return METIS_ERROR_INPUT;
+
+  /* set up malloc cleaning code and signal catchers */
+  if (!gk_malloc_init()) 
+    return METIS_ERROR_MEMORY;
+
+  gk_sigtrap();
+
+  if ((sigrval = gk_sigcatch()) != 0)
+    goto SIGTHROW;
+
+  n  = *nvtxs;
+  nf = *numflag;
+
+  cxadj   = imalloc(n+2, "METIS_NodeMMD: cxadj");
+  cadjncy = imalloc(gk_max(xadj[n]-xadj[0], 1), "METIS_NodeMMD: cadjncy");
+  cperm   = imalloc(n+5, "METIS_NodeMMD: cperm");
+  ciperm  = imalloc(n+5, "METIS_NodeMMD: ciperm");
+  head    = imalloc(n+5, "METIS_NodeMMD: head");
+  qsize   = imalloc(n+5, "METIS_NodeMMD: qsize");
+  list    = imalloc(n+5, "METIS_NodeMMD: list");
+  marker  = imalloc(n+5, "METIS_NodeMMD: marker");
+
+  /* copy the graph with 1-based numbering, as genmmd destroys adjncy */
+  cxadj[0] = 1;
+  for (j=0, i=0; i<n; i++) {
+    for (k=xadj[i]-nf; k<xadj[i+1]-nf; k++) {
+      if (adjncy[k]-nf != i)
+        cadjncy[j++] = adjncy[k]-nf+1;
+    }
+    cxadj[i+1] = j+1;
+  }
+
+  genmmd(n, cxadj, cadjncy, ciperm, cperm, 1, head, qsize, list, marker, 
+      IDX_MAX, &nofsub);
+
+  for (i=0; i<n; i++) {
+    perm[i]  = cperm[i]-1+nf;
+    iperm[i] = ciperm[i]-1+nf;
+  }
+
+  gk_free((void **)&cxadj, &cadjncy, &cperm, &ciperm, &head, &qsize, &list, 
+      &marker, LTERM);
+
+SIGTHROW:
+  gk_siguntrap();
+  gk_malloc_cleanup(0);
+
+  return metis_rcode(sigrval);
+}
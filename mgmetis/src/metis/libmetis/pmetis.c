@@ -111,6 +111,7 @@ int METIS_PartGraphRecursive(idx_t *nvtxs, idx_t *ncon, idx_t *xadj,
   ctrl = SetupCtrl(METIS_OP_PMETIS, options, *ncon, *nparts, tpwgts, ubvec);
   if (!ctrl) {
     gk_siguntrap();
+    gk_malloc_cleanup(0);
     return METIS_ERROR_INPUT;
   }
 
@@ -0,0 +1,272 @@
+# -*- coding: utf-8 -*-
+"""Symbolic Cholesky analysis of fill-reducing orderings
+
+Judging an ordering from :func:`mgmetis.metis.node_nd` (or different settings
+of, e.g., ``OPTION.NSEPS``, ``OPTION.CCORDER`` and ``OPTION.PFACTOR``) doesn't
+require a numerical factorization. Given the graph of a symmetric matrix and
+a permutation, :func:`analyze` computes the elimination tree, the column
+counts of the Cholesky factor :math:`L`, and thus the predicted
+:math:`nnz(L)` and flop count, in near-linear time in :math:`nnz(A)`, i.e.,
+with the algorithms of Liu (elimination tree) and Gilbert, Ng and Peyton
+(column counts) as in CSparse. :func:`best_ordering` evaluates several option
+sets of :func:`mgmetis.metis.node_nd` concurrently and returns the cheapest
+ordering.
+
+The analysis runs in the compiled extension (without the GIL) if available,
+otherwise a much slower pure Python implementation is used.
+
+.. module:: mgmetis.symbolic
+.. moduleauthor:: Qiao Chen, <benechiao@gmail.com>
+"""
+
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+from . import metis
+from .enums import OPTION
+from .utils import process_graph
+
+__all__ = ["SymbolicStats", "analyze", "best_ordering"]
+
+
+class SymbolicStats(namedtuple("SymbolicStats", ["parent", "post", "colcount", "nnz", "flops"])):
+    """Statistics of the Cholesky factor of a permuted matrix
+
+    Attributes
+    ----------
+    parent : np.ndarray
+        Elimination tree in the new numbering (C index), i.e., `parent[j]` is
+        the parent of column `j` or -1 for roots.
+    post : np.ndarray
+        A postorder of the elimination tree
+    colcount : np.ndarray
+        Numbers of nonzeros in the columns of :math:`L` including the diagonal
+    nnz : int
+        Predicted number of nonzeros in :math:`L`, i.e., ``sum(colcount)``
+    flops : float
+        Predicted flop count of the factorization, i.e., ``sum(colcount**2)``
+    """
+
+    __slots__ = ()
+
+
+def _etree_py(xadj, adjncy, perm, iperm):
+    # helper to compute the elimination tree with path compression (Liu)
+    n = len(perm)
+    parent, ancestor = [-1] * n, [-1] * n
+    for k in range(n):
+        v = perm[k]
+        for p in range(xadj[v], xadj[v + 1]):
+            i = iperm[adjncy[p]]
+            while i != -1 and i < k:
+                inext = ancestor[i]
+                ancestor[i] = k
+                if inext == -1:
+                    parent[i] = k
+                i = inext
+    return parent
+
+
+def _postorder_py(parent):
+    # helper to compute a postorder of a forest by depth-first search
+    n = len(parent)
+    children = [[] for _ in range(n)]
+    for j in range(n - 1, -1, -1):
+        if parent[j] != -1:
+            children[parent[j]].append(j)
+    post = []
+    for j in range(n):
+        if parent[j] == -1:
+            stack = [j]
+            while stack:
+                p = stack[-1]
+                if children[p]:
+                    stack.append(children[p].pop())
+                else:
+                    post.append(stack.pop())
+    return post
+
+
+def _first_descendants_py(parent, post):
+    # helper to compute the first descendants in postorder and the initial
+    # deltas of the leaves
+    n = len(parent)
+    first, delta = [-1] * n, [0] * n
+    for k, j in enumerate(post):
+        delta[j] = 1 if first[j] == -1 else 0
+        while j != -1 and first[j] == -1:
+            first[j] = k
+            j = parent[j]
+    return first, delta
+
+
+def _find_py(ancestor, q):
+    # helper to find the root of a disjoint set with path compression
+    root = q
+    while root != ancestor[root]:
+        root = ancestor[root]
+    while q != root:
+        ancestor[q], q = root, ancestor[q]
+    return root
+
+
+def _colcounts_py(xadj, adjncy, perm, iperm, parent, post):
+    # helper to compute the column counts (Gilbert, Ng and Peyton)
+    n = len(perm)
+    first, delta = _first_descendants_py(parent, post)
+    ancestor = list(range(n))
+    maxfirst, prevleaf = [-1] * n, [-1] * n
+    for j in post:
+        if parent[j] != -1:
+            delta[parent[j]] -= 1
+        v = perm[j]
+        for p in range(xadj[v], xadj[v + 1]):
+            i = iperm[adjncy[p]]
+            if i <= j or first[j] <= maxfirst[i]:
+                continue
+            maxfirst[i] = first[j]
+            jprev, prevleaf[i] = prevleaf[i], j
+            delta[j] += 1
+            if jprev != -1:
+                delta[_find_py(ancestor, jprev)] -= 1
+        if parent[j] != -1:
+            ancestor[j] = parent[j]
+    for j in range(n):
+        if parent[j] != -1:
+            delta[parent[j]] += delta[j]
+    return delta
+
+
+def _symbolic_py(xadj, adjncy, perm, iperm):
+    # helper of the pure Python symbolic analysis, same as the fast path
+    xadj, adjncy, perm, iperm = (x.tolist() for x in (xadj, adjncy, perm, iperm))
+    parent = _etree_py(xadj, adjncy, perm, iperm)
+    post = _postorder_py(parent)
+    return parent, post, _colcounts_py(xadj, adjncy, perm, iperm, parent, post)
+
+
+def analyze(xadj, adjncy, perm=None, iperm=None):
+    """Symbolic Cholesky analysis of a permuted symmetric matrix
+
+    Parameters
+    ----------
+    xadj, adjncy : np.ndarray
+        CSR graph of the (structurally symmetric) matrix, the diagonal entries
+        may or may not present.
+    perm, iperm : np.ndarray, optional
+        Permutation and its inverse as returned by
+        :func:`mgmetis.metis.node_nd`, in the same index system as the graph.
+        Only one of them is needed; if neither is given, then the natural
+        ordering is analyzed.
+
+    Returns
+    -------
+    SymbolicStats
+        Elimination tree, column counts and predicted costs
+
+    Examples
+    --------
+    >>> from mgmetis import metis, symbolic
+    >>> perm, iperm = metis.node_nd(xadj, adjncy)
+    >>> stats = symbolic.analyze(xadj, adjncy, perm, iperm)
+    >>> stats.nnz, stats.flops
+    """
+    xadj, adjncy, nv = process_graph(xadj, adjncy)
+    dtype = xadj.dtype
+    start = int(xadj[0])
+    if start:
+        xadj, adjncy = xadj - start, adjncy - start
+    if perm is None and iperm is None:
+        perm = iperm = np.arange(nv, dtype=dtype)
+    else:
+        perm, iperm = (None if x is None else np.asarray(x, dtype=dtype).reshape(-1) - start for x in (perm, iperm))
+        for x in (perm, iperm):
+            # NOTE: the fast path doesn't check bounds
+            if x is not None and (x.size != nv or (nv and (x.min() < 0 or x.max() >= nv))):
+                raise ValueError("perm and iperm should be permutations of {} vertices".format(nv))
+        if perm is None:
+            perm = np.empty_like(iperm)
+            perm[iperm] = np.arange(nv, dtype=dtype)
+        elif iperm is None:
+            iperm = np.empty_like(perm)
+            iperm[perm] = np.arange(nv, dtype=dtype)
+        if not np.array_equal(iperm[perm], np.arange(nv)):
+            raise ValueError("perm and iperm are not inverse permutations")
+    fast = metis._get_fast_libmetis(dtype)  # pylint: disable=protected-access
+    if fast is not None:
+        parent, post, colcount = (np.empty(nv, dtype=dtype) for _ in range(3))
+        fast.symbolic(xadj, adjncy, perm, iperm, parent, post, colcount)
+    else:
+        parent, post, colcount = (
+            np.asarray(x, dtype=dtype) for x in _symbolic_py(xadj, adjncy, perm, iperm)
+        )
+    cc = colcount.astype(np.float64)
+    return SymbolicStats(parent, post, colcount, int(colcount.sum(dtype=np.int64)), float(cc @ cc))
+
+
+def _make_options(candidate, dtype):
+    # helper to create the option array of a candidate, which is either an
+    # option array or a dict of {OPTION (or its name): value}
+    if not isinstance(candidate, dict):
+        return np.asarray(candidate, dtype=dtype)
+    opts = metis.get_default_options(dtype)
+    for key, value in candidate.items():
+        opts[OPTION[key] if isinstance(key, str) else key] = value
+    return opts
+
+
+def best_ordering(xadj, adjncy, candidates, key="flops", nthreads=None, **kw):
+    """Compute nested dissection orderings with several option sets concurrently
+    and return the cheapest one
+
+    Parameters
+    ----------
+    xadj, adjncy : np.ndarray
+        CSR graph of the (structurally symmetric) matrix
+    candidates : list
+        Option sets of :func:`mgmetis.metis.node_nd`, each of which is either
+        an option array or a dict like ``{"NSEPS": 2, OPTION.CCORDER: 1}``.
+    key : {"flops", "nnz"}, optional
+        The cost to be minimized, default is ``"flops"``.
+    nthreads : int, optional
+        Number of threads, default is the number of candidates.
+
+    Returns
+    -------
+    best : int
+        Index of the cheapest candidate
+    perm, iperm : np.ndarray
+        The cheapest ordering
+    stats : list
+        :class:`SymbolicStats` of all candidates
+
+    Other Parameters
+    ----------------
+    vwgt : np.ndarray, optional
+        Vertex weights passed to :func:`mgmetis.metis.node_nd`
+
+    Examples
+    --------
+    >>> from mgmetis.symbolic import best_ordering
+    >>> candidates = [{}, {"NSEPS": 4}, {"CCORDER": 1}, {"PFACTOR": 100}]
+    >>> best, perm, iperm, stats = best_ordering(xadj, adjncy, candidates)
+    """
+    if key not in ("flops", "nnz"):
+        raise ValueError("unknown key {}".format(key))
+    if not candidates:
+        raise ValueError("no candidates")
+    xadj, adjncy, _ = process_graph(xadj, adjncy)
+    vwgt = kw.get("vwgt", None)
+
+    def run(candidate):
+        opts = _make_options(candidate, xadj.dtype)
+        perm, iperm = metis.node_nd(xadj, adjncy, options=opts, vwgt=vwgt)
+        return perm, iperm, analyze(xadj, adjncy, perm, iperm)
+
+    with ThreadPoolExecutor(nthreads or len(candidates)) as pool:
+        results = list(pool.map(run, candidates))
+    stats = [r[2] for r in results]
+    best = min(range(len(stats)), key=lambda i: getattr(stats[i], key))
+    return best, results[best][0], results[best][1], stats
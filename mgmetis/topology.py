@@ -0,0 +1,352 @@
+# -*- coding: utf-8 -*-
+"""Topology-aware mapping of parts to ranks
+
+The part IDs of :func:`mgmetis.parmetis.part_kway` (or any other partitioning
+routine) are usually used as ranks directly, regardless of which parts
+communicate heavily with each other. This module computes a part-to-rank
+mapping that minimizes the hop-weighted communication volume, i.e.,
+:math:`\\sum_{p<q} W_{pq} D_{m(p) m(q)}`, where :math:`W` is the communication
+graph of the parts (see :func:`comm_graph`) and :math:`D` is the distance
+matrix of the ranks, given either explicitly or by a machine hierarchy (see
+:func:`level_distances`), e.g., ``levels=[nnodes, 2, 32]`` for 2 sockets and
+32 ranks per socket. Weighting the inter-node level only minimizes the
+inter-node volume.
+
+The mapping is computed in two stages:
+
+1. Dual recursive partitioning: the ranks are split into groups of equal
+   distance (e.g., machine nodes), and the communication graph is
+   partitioned with ``METIS_PartGraphRecursive`` into groups of the same
+   sizes, which are then mapped recursively; if the distances of the
+   ranks have no such structure, then both are bisected.
+2. Pairwise swaps of the ranks of two parts, as long as the cost decreases.
+
+.. module:: mgmetis.topology
+.. moduleauthor:: Qiao Chen, <benechiao@gmail.com>
+"""
+
+import numpy as np
+
+from . import metis
+from .utils import process_graph, try_get_input_array, extract_subgraph
+
+__all__ = ["level_distances", "comm_graph", "mapping_cost", "map_graph", "map_parts"]
+
+
+def level_distances(levels, costs=None):
+    """Distance matrix of the ranks of a machine hierarchy
+
+    Parameters
+    ----------
+    levels : list of int
+        Number of children at each level from the top, e.g.,
+        ``[nnodes, sockets_per_node, ranks_per_socket]``; ranks are numbered
+        contiguously within each level.
+    costs : list of float, optional
+        The distance between two ranks that are first separated at level `i`
+        is ``costs[i]``. Default is ``2**(len(levels)-1-i)``, e.g., 4, 2 and 1
+        for crossing nodes, sockets and cores, respectively. Use, e.g.,
+        ``[1, 0, 0]`` to count the inter-node volume only.
+
+    Returns
+    -------
+    np.ndarray
+        Distance matrix of shape ``(prod(levels), prod(levels))``
+    """
+    levels = [int(k) for k in levels]
+    if not levels or min(levels) <= 0:
+        raise ValueError("invalid levels {}".format(levels))
+    if costs is None:
+        costs = [2.0 ** (len(levels) - 1 - i) for i in range(len(levels))]
+    if len(costs) != len(levels):
+        raise ValueError("costs should be size of {}".format(len(levels)))
+    n = int(np.prod(levels))
+    dist = np.zeros((n, n))
+    ranks = np.arange(n)
+    # NOTE: from the bottom, so that the top levels overwrite
+    block = 1
+    for k, cost in zip(reversed(levels), reversed(costs)):
+        group = ranks // block
+        sep = group[:, None] // k != group[None, :] // k
+        dist[(group[:, None] != group[None, :]) & ~sep] = cost
+        block *= k
+    return dist
+
+
+def comm_graph(xadj, adjncy, part, vsize=None, nparts=None):
+    """Communication graph of the parts of a partition
+
+    The volume sent from part `p` to part `q` is the total size of the
+    vertices of `p` that have neighbors in `q`, i.e., the halo of `q`; the edge
+    weight between `p` and `q` is the sum of both directions.
+
+    Parameters
+    ----------
+    xadj, adjncy : array_like
+        The adjacency structure (CSR), both C and Fortran indices are
+        supported.
+    part : array_like
+        Partition array of size `nv`, in the same index system as `adjncy`.
+    vsize : array_like, optional
+        Communication sizes of the vertices, default is one.
+    nparts : int, optional
+        Number of parts, default is the largest part ID plus one.
+
+    Returns
+    -------
+    xadj, adjncy, adjwgt : np.ndarray
+        The communication graph with C-based index and sorted neighbors, in
+        the same data type as the input `xadj`
+    """
+    xadj, adjncy, nv = process_graph(xadj, adjncy)
+    base = xadj[0]
+    part = np.asarray(part, dtype=np.int64).reshape(-1) - base
+    if part.size != nv:
+        raise ValueError("part should be size of {}".format(nv))
+    nparts = int(part.max()) + 1 if nparts is None else int(nparts)
+    vsize = try_get_input_array({"vsize": vsize}, "vsize", nv, np.int64)
+    rows = np.repeat(np.arange(nv), np.diff(xadj))
+    dst = part[adjncy[: rows.size] - base]
+    cut = part[rows] != dst
+    # NOTE: each vertex is sent once to each of its neighbor parts
+    halo = np.unique(rows[cut] * nparts + dst[cut])
+    src = halo // nparts
+    size = np.ones(src.size, dtype=np.int64) if vsize is None else vsize[src]
+    p, q = part[src], halo % nparts
+    keys, inv = np.unique(np.concatenate((p * nparts + q, q * nparts + p)), return_inverse=True)
+    wgt = np.bincount(inv, weights=np.concatenate((size, size)), minlength=keys.size)
+    c_xadj = np.zeros(nparts + 1, dtype=xadj.dtype)
+    np.cumsum(np.bincount(keys // nparts, minlength=nparts), out=c_xadj[1:])
+    return c_xadj, np.asarray(keys % nparts, dtype=xadj.dtype), np.asarray(wgt, dtype=xadj.dtype)
+
+
+def _cost(rows, cadjncy, cadjwgt, mapping, dist):
+    # helper to compute the hop-weighted volume of a mapping
+    return float(np.dot(cadjwgt, dist[mapping[rows], mapping[cadjncy]])) / 2
+
+
+def mapping_cost(xadj, adjncy, part, distances, vsize=None):
+    """Hop-weighted communication volume of a partition, whose part IDs are
+    ranks
+
+    Parameters
+    ----------
+    xadj, adjncy, part : array_like
+        The graph and its partition, see :func:`comm_graph`
+    distances : np.ndarray
+        Distance matrix of the ranks
+    vsize : array_like, optional
+        Communication sizes of the vertices, default is one.
+
+    Returns
+    -------
+    float
+        :math:`\\sum_{p<q} W_{pq} D_{pq}`
+    """
+    distances = np.asarray(distances, dtype=np.float64)
+    cxadj, cadjncy, cadjwgt = comm_graph(xadj, adjncy, part, vsize, distances.shape[0])
+    rows = np.repeat(np.arange(cxadj.size - 1), np.diff(cxadj))
+    return _cost(rows, cadjncy, cadjwgt, np.arange(cxadj.size - 1), distances)
+
+
+def _rank_groups(dist, ranks):
+    # helper to split the ranks into the connected components of the ranks
+    # closer than the largest distance, e.g., machine nodes, or bisect them
+    # with the farthest pair as seeds if there is only one component
+    sub = dist[np.ix_(ranks, ranks)]
+    near = sub < sub.max()
+    label = np.arange(ranks.size)
+    while True:
+        new = np.min(np.where(near, label[None, :], ranks.size), axis=1)
+        new = np.minimum(new, label)
+        new = np.minimum(new, new[new])
+        if np.array_equal(new, label):
+            break
+        label = new
+    if np.unique(label).size > 1:
+        return [ranks[label == lbl] for lbl in np.unique(label)]
+    a, b = np.unravel_index(np.argmax(sub), sub.shape)
+    order = np.argsort(sub[:, a] - sub[:, b], kind="stable")
+    half = ranks.size // 2
+    return [ranks[order[:half]], ranks[order[half:]]]
+
+
+def _fix_sizes(group, sizes, xadj, adjncy, adjwgt):
+    # helper to move vertices between groups until their sizes are exact,
+    # choosing the moves of the least cut increase
+    ng = len(sizes)
+    nv = group.size
+    rows = np.repeat(np.arange(nv), np.diff(xadj))
+    conn = np.zeros((nv, ng))
+    np.add.at(conn, (rows, group[adjncy]), adjwgt)
+    count = np.bincount(group, minlength=ng)
+    while True:
+        over = count > sizes
+        if not over.any():
+            return group
+        under = np.flatnonzero(count < sizes)
+        cand = np.flatnonzero(over[group])
+        gain = conn[np.ix_(cand, under)] - conn[cand, group[cand]][:, None]
+        i, j = np.unravel_index(np.argmax(gain), gain.shape)
+        v, old, new = cand[i], group[cand[i]], under[j]
+        group[v] = new
+        count[old] -= 1
+        count[new] += 1
+        nbrs = adjncy[xadj[v] : xadj[v + 1]]
+        np.subtract.at(conn, (nbrs, old), adjwgt[xadj[v] : xadj[v + 1]])
+        np.add.at(conn, (nbrs, new), adjwgt[xadj[v] : xadj[v + 1]])
+
+
+def _map_recursive(cxadj, cadjncy, cadjwgt, parts, ranks, dist, mapping):
+    # helper of the dual recursive partitioning
+    if parts.size == 1:
+        mapping[parts[0]] = ranks[0]
+        return
+    groups = _rank_groups(dist, ranks)
+    sizes = np.asarray([g.size for g in groups])
+    if parts.size == len(groups):
+        group = np.arange(parts.size)
+    else:
+        sxadj, sadjncy, sadjwgt = extract_subgraph(cxadj, cadjncy, parts, cadjwgt)
+        if sadjncy.size:
+            tpwgts = np.asarray(sizes / sizes.sum(), dtype=np.float32)
+            _, group = metis.part_graph_recursize(len(groups), sxadj, sadjncy, adjwgt=sadjwgt, tpwgts=tpwgts)
+            group = np.asarray(group, dtype=np.int64)
+        else:
+            group = np.repeat(np.arange(len(groups)), sizes)
+        group = _fix_sizes(group, sizes, sxadj, sadjncy, sadjwgt)
+    for g, sub_ranks in enumerate(groups):
+        _map_recursive(cxadj, cadjncy, cadjwgt, parts[group == g], sub_ranks, dist, mapping)
+
+
+def _swap_refine(rows, cadjncy, cadjwgt, mapping, dist, niter):
+    # helper to improve a mapping by swapping the ranks of two parts; with
+    # M = W*Dm, where Dm[p, q] is the distance of the ranks of p and q, the
+    # cost change of swapping a and b is M[a,b]+M[b,a]-M[a,a]-M[b,b]+2W[a,b]Dm[a,b]
+    n = mapping.size
+    dm = dist[np.ix_(mapping, mapping)]
+    xadj = np.zeros(n + 1, dtype=np.int64)
+    np.cumsum(np.bincount(rows, minlength=n), out=xadj[1:])
+    w = np.asarray(cadjwgt, dtype=np.float64)
+    tol = 1e-12 * max(float(w.sum()) * float(dist.max()), 1.0)
+    for _ in range(niter):
+        improved = False
+        diag = np.bincount(rows, weights=w * dm[cadjncy, rows], minlength=n)
+        for a in range(n):
+            nbrs, wa = cadjncy[xadj[a] : xadj[a + 1]], w[xadj[a] : xadj[a + 1]]
+            row = wa @ dm[nbrs]
+            col = np.bincount(rows, weights=w * dm[cadjncy, a], minlength=n)
+            wab = np.zeros(n)
+            wab[nbrs] = wa
+            delta = row + col - diag[a] - diag + 2 * wab * dm[a]
+            delta[a] = 0.0
+            b = int(np.argmin(delta))
+            if delta[b] < -tol:
+                mapping[[a, b]] = mapping[[b, a]]
+                dm[[a, b]] = dm[[b, a]]
+                dm[:, [a, b]] = dm[:, [b, a]]
+                diag = np.bincount(rows, weights=w * dm[cadjncy, rows], minlength=n)
+                improved = True
+        if not improved:
+            break
+    return mapping
+
+
+def map_graph(cxadj, cadjncy, cadjwgt, distances, niter=10):
+    """Map the vertices of a communication graph to ranks
+
+    This is the core of :func:`map_parts`, which is useful if the
+    communication graph is assembled otherwise, e.g., in parallel.
+
+    Parameters
+    ----------
+    cxadj, cadjncy, cadjwgt : np.ndarray
+        The (C-based) communication graph of the parts, see :func:`comm_graph`
+    distances : np.ndarray
+        Distance matrix of the ranks, whose size must be the number of parts
+    niter : int, optional
+        Maximum number of passes of swap refinement, default is 10.
+
+    Returns
+    -------
+    cost : float
+        Hop-weighted volume of the mapping
+    mapping : np.ndarray
+        `mapping[p]` is the rank of part `p`.
+    """
+    cxadj, cadjncy, n = process_graph(cxadj, cadjncy)
+    if cxadj[0] != 0:
+        raise ValueError("the communication graph must be C index")
+    dist = np.asarray(distances, dtype=np.float64)
+    if dist.shape != (n, n):
+        raise ValueError("distances should be of shape ({0}, {0})".format(n))
+    cadjwgt = np.asarray(cadjwgt).reshape(-1)[: cadjncy.size]
+    mapping = np.zeros(n, dtype=np.int64)
+    _map_recursive(cxadj, cadjncy, cadjwgt, np.arange(n), np.arange(n), dist, mapping)
+    rows = np.repeat(np.arange(n), np.diff(cxadj))
+    # NOTE: never worse than the identity
+    identity = np.arange(n)
+    if _cost(rows, cadjncy, cadjwgt, identity, dist) < _cost(rows, cadjncy, cadjwgt, mapping, dist):
+        mapping = identity
+    mapping = _swap_refine(rows, cadjncy, cadjwgt, mapping, dist, niter)
+    return _cost(rows, cadjncy, cadjwgt, mapping, dist), mapping
+
+
+def map_parts(xadj, adjncy, part, levels=None, distances=None, **kw):
+    """Relabel a partition so that its part IDs are topology-aware ranks
+
+    Parameters
+    ----------
+    xadj, adjncy : array_like
+        The adjacency structure (CSR), both C and Fortran indices are
+        supported.
+    part : array_like
+        Partition array of size `nv`, in the same index system as `adjncy`,
+        with one part per rank.
+    levels : list of int, optional
+        Machine hierarchy, see :func:`level_distances`
+    distances : np.ndarray, optional
+        Distance matrix of the ranks, which is required if `levels` is not
+        given.
+
+    Returns
+    -------
+    cost : float
+        Hop-weighted communication volume after mapping
+    part : np.ndarray
+        The relabeled partition, i.e., the rank of each vertex, in the same
+        index system as the input
+    mapping : np.ndarray
+        `mapping[p]` is the (C-based) rank of the (C-based) part `p`.
+
+    Other Parameters
+    ----------------
+    costs : list of float, optional
+        Level costs, see :func:`level_distances`
+    vsize : array_like, optional
+        Communication sizes of the vertices, default is one.
+    niter : int, optional
+        Maximum number of passes of swap refinement, default is 10.
+
+    Examples
+    --------
+    >>> from mgmetis import metis
+    >>> from mgmetis.topology import map_parts
+    >>> _, part = metis.part_graph_kway(128, xadj, adjncy)
+    >>> cost, rank, _ = map_parts(xadj, adjncy, part, levels=[4, 2, 16])
+    """
+    if (levels is None) == (distances is None):
+        raise ValueError("either levels or distances must be given")
+    if levels is not None:
+        distances = level_distances(levels, kw.get("costs", None))
+    distances = np.asarray(distances, dtype=np.float64)
+    xadj, adjncy, _ = process_graph(xadj, adjncy)
+    base = xadj[0]
+    part = np.asarray(part).reshape(-1)
+    nparts = distances.shape[0]
+    if part.size and (part.min() < base or part.max() - base >= nparts):
+        raise ValueError("part IDs must be in range of the {} ranks".format(nparts))
+    cxadj, cadjncy, cadjwgt = comm_graph(xadj, adjncy, part, kw.get("vsize", None), nparts)
+    cost, mapping = map_graph(cxadj, cadjncy, cadjwgt, distances, kw.get("niter", 10))
+    new = np.asarray(mapping[part - base] + base, dtype=xadj.dtype)
+    return cost, new, mapping
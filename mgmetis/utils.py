@@ -6,6 +6,7 @@
 """
 
 import ctypes as c
+from collections import namedtuple
 
 import numpy as np
 
@@ -190,12 +191,14 @@ def process_graph(xadj, adjncy):
     process_mesh
     """
     xadj = np.asarray(xadj).reshape(-1)
-    if not np.issubdtype(xadj.dtype, np.integer):
+    if xadj.dtype.kind not in "iu":
         xadj = np.asarray(xadj, dtype=int)
-    if xadj[0] not in (0, 1):
+    # NOTE: Python integers for cheap scalar checks
+    first, last = int(xadj[0]), int(xadj[-1])
+    if first not in (0, 1):
         raise ValueError("the first value of xadj must be 0 (C) or 1 (Fortran)")
     adjncy = np.asarray(adjncy, dtype=xadj.dtype).reshape(-1)
-    total_len = xadj[-1] - xadj[0]
+    total_len = last - first
     if total_len < adjncy.size:
         raise ValueError("fatal mesh adjncy length issue")
     if total_len > adjncy.size:
@@ -205,6 +208,369 @@ def process_graph(xadj, adjncy):
     return xadj, adjncy, xadj.size - 1
 
 
+class GraphReport(
+    namedtuple(
+        "GraphReport",
+        ["bad_xadj", "out_of_range", "self_loops", "duplicates", "asymmetric", "asym_weights"],
+    )
+):
+    """Defects found by :func:`check_graph`
+
+    Each field is the number of offending entries, and ``None`` means the
+    corresponding check was not performed (e.g., the symmetry checks are
+    skipped with ``full=False``).
+
+    Attributes
+    ----------
+    bad_xadj : int
+        Number of decreasing entries in `xadj`
+    out_of_range : int
+        Number of entries in `adjncy` that are not valid vertex IDs
+    self_loops : int
+        Number of edges :math:`(i,i)`
+    duplicates : int
+        Number of repeated edges :math:`(i,j)` within a row
+    asymmetric : int
+        Number of edges :math:`(i,j)` whose reverse :math:`(j,i)` is missing
+    asym_weights : int
+        Number of edges whose weight differs from its reverse edge
+    """
+
+    __slots__ = ()
+
+    @property
+    def ok(self):
+        """bool: True if no defects were found"""
+        return not any(self)
+
+
+def _edge_keys(xadj, adjncy, nv):
+    # helper to expand a CSR graph into 0-based edges and their int64 keys
+    base = int(xadj[0])
+    rows = np.repeat(np.arange(nv, dtype=np.int64), np.diff(xadj))
+    cols = np.asarray(adjncy[: rows.size], dtype=np.int64) - base
+    return rows, cols
+
+
+def check_graph(xadj, adjncy, adjwgt=None, full=True):
+    """Check a CSR graph for the defects that METIS cannot handle
+
+    METIS assumes the input graph is undirected, i.e., for each edge
+    :math:`(i,j)` the edge :math:`(j,i)` is also present with the same weight,
+    and that there are neither self-loops nor duplicated edges. This routine
+    detects these defects with vectorized sorting over the edges, i.e.,
+    :math:`O(nnz\\log nnz)` time.
+
+    Parameters
+    ----------
+    xadj, adjncy : array_like
+        The adjacency structure (CSR), both C and Fortran indices are
+        supported.
+    adjwgt : array_like, optional
+        Edge weights, if given, then they are checked for symmetry as well.
+    full : bool, optional
+        If False, then only the :math:`O(nnz)` checks (`xadj` monotonicity,
+        index range and self-loops) are performed. Default is True.
+
+    Returns
+    -------
+    GraphReport
+        Number of defects of each type, use ``GraphReport.ok`` to determine
+        whether the graph is valid.
+
+    See Also
+    --------
+    symmetrize_graph : fix the defects
+    """
+    xadj, adjncy, nv = process_graph(xadj, adjncy)
+    bad_xadj = int(np.count_nonzero(np.diff(xadj) < 0))
+    if bad_xadj:
+        return GraphReport(bad_xadj, None, None, None, None, None)
+    rows, cols = _edge_keys(xadj, adjncy, nv)
+    out_of_range = int(np.count_nonzero((cols < 0) | (cols >= nv)))
+    if out_of_range:
+        return GraphReport(0, out_of_range, None, None, None, None)
+    self_loops = int(np.count_nonzero(rows == cols))
+    if not full:
+        return GraphReport(0, 0, self_loops, None, None, None)
+    keys = rows * nv + cols
+    order = np.argsort(keys, kind="stable")
+    skeys = keys[order]
+    dup_mask = skeys[1:] == skeys[:-1]
+    duplicates = int(np.count_nonzero(dup_mask))
+    ukeys = skeys[np.append(True, ~dup_mask)] if skeys.size else skeys
+    tkeys = np.unique(cols * nv + rows)
+    asymmetric = int(ukeys.size - np.count_nonzero(np.isin(ukeys, tkeys, assume_unique=True)))
+    asym_weights = None
+    if adjwgt is not None:
+        asym_weights = 0
+        if not duplicates and not asymmetric:
+            # NOTE: both orderings enumerate the same edge set, so the
+            # weights must match position by position
+            adjwgt = np.asarray(adjwgt).reshape(-1)[: keys.size]
+            torder = np.argsort(cols * nv + rows, kind="stable")
+            asym_weights = int(np.count_nonzero(adjwgt[order] != adjwgt[torder]))
+    return GraphReport(0, 0, self_loops, duplicates, asymmetric, asym_weights)
+
+
+def symmetrize_graph(xadj, adjncy, adjwgt=None):
+    """Fix a CSR graph so that it becomes a valid METIS input
+
+    Self-loops are removed, duplicated edges are merged and missing reverse
+    edges are added, i.e., the result is the pattern of :math:`A+A^T` without
+    the diagonal. If edge weights are given, then the weight of an edge is
+    the maximum over all of its copies in either direction, so that applying
+    this routine to a valid graph is an identity operation.
+
+    Parameters
+    ----------
+    xadj, adjncy : array_like
+        The adjacency structure (CSR), both C and Fortran indices are
+        supported.
+    adjwgt : array_like, optional
+        Edge weights
+
+    Returns
+    -------
+    xadj, adjncy : np.ndarray
+        Symmetrized graph with sorted adjacent lists, in the same data type
+        and index system as the input.
+    adjwgt : {np.ndarray, None}
+        Symmetrized edge weights, None if `adjwgt` is not given.
+
+    Raises
+    ------
+    ValueError
+        If `xadj` is not monotone or `adjncy` contains invalid vertex IDs.
+
+    See Also
+    --------
+    check_graph
+    """
+    xadj, adjncy, nv = process_graph(xadj, adjncy)
+    if np.any(np.diff(xadj) < 0):
+        raise ValueError("xadj must be monotonically increasing")
+    base = xadj[0]
+    rows, cols = _edge_keys(xadj, adjncy, nv)
+    if np.any((cols < 0) | (cols >= nv)):
+        raise ValueError("adjncy contains out-of-range vertex IDs")
+    mask = rows != cols
+    rows, cols = rows[mask], cols[mask]
+    keys = np.concatenate((rows * nv + cols, cols * nv + rows))
+    if adjwgt is None:
+        keys = np.unique(keys)
+    else:
+        adjwgt = np.asarray(adjwgt).reshape(-1)[: mask.size][mask]
+        wgts = np.concatenate((adjwgt, adjwgt))
+        # NOTE: sort by keys then weights, and take the last of each run
+        order = np.lexsort((wgts, keys))
+        keys, wgts = keys[order], wgts[order]
+        last = np.append(keys[1:] != keys[:-1], True) if keys.size else keys
+        keys, adjwgt = keys[last], wgts[last]
+    rows, cols = np.divmod(keys, nv) if nv else (keys, keys)
+    new_xadj = np.empty(nv + 1, dtype=xadj.dtype)
+    new_xadj[0] = 0
+    np.cumsum(np.bincount(rows, minlength=nv), out=new_xadj[1:])
+    new_xadj += base
+    return new_xadj, np.asarray(cols + base, dtype=xadj.dtype), adjwgt
+
+
+def validate_graph(xadj, adjncy, adjwgt=None, level="fast"):
+    """Validate a graph before passing it to METIS
+
+    Parameters
+    ----------
+    xadj, adjncy : np.ndarray
+        The adjacency structure (CSR)
+    adjwgt : np.ndarray, optional
+        Edge weights
+    level : {"off", "fast", "full"}, optional
+        Validation level; ``"off"`` does nothing, ``"fast"`` performs the
+        :math:`O(nnz)` checks and ``"full"`` adds symmetry and duplication
+        checks. Default is ``"fast"``.
+
+    Raises
+    ------
+    MetisInputError
+        If any defect is detected
+
+    See Also
+    --------
+    check_graph
+    """
+    if level in ("off", None, False):
+        return
+    if level not in ("fast", "full"):
+        raise ValueError("unknown validation level {}".format(level))
+    report = check_graph(xadj, adjncy, adjwgt, full=level == "full")
+    if not report.ok:
+        raise MetisInputError(
+            "invalid graph: {}".format(
+                ", ".join("{}={}".format(k, v) for k, v in report._asdict().items() if v)
+            )
+        )
+
+
+def extract_subgraph(xadj, adjncy, vertices, adjwgt=None):
+    """Extract the subgraph induced by a set of vertices
+
+    Parameters
+    ----------
+    xadj, adjncy : array_like
+        The adjacency structure (CSR), both C and Fortran indices are
+        supported.
+    vertices : array_like
+        Vertex IDs (in the same index system as `adjncy`) of the subgraph;
+        the i-th vertex becomes the local vertex i.
+    adjwgt : array_like, optional
+        Edge weights
+
+    Returns
+    -------
+    xadj, adjncy : np.ndarray
+        The induced subgraph with C-based index in the same data type as the
+        input `xadj`.
+    adjwgt : {np.ndarray, None}
+        Edge weights of the subgraph, None if `adjwgt` is not given.
+    """
+    xadj, adjncy, nv = process_graph(xadj, adjncy)
+    base = xadj[0]
+    vertices = np.asarray(vertices, dtype=np.int64).reshape(-1) - base
+    local = np.full(nv, -1, dtype=np.int64)
+    local[vertices] = np.arange(vertices.size)
+    counts = np.asarray(xadj[vertices + 1] - xadj[vertices], dtype=np.int64)
+    # NOTE: gather the adjacent lists of the vertices
+    offsets = np.cumsum(counts) - counts
+    idx = np.repeat(xadj[vertices] - base - offsets, counts) + np.arange(counts.sum())
+    nbrs = local[adjncy[idx] - base]
+    keep = nbrs >= 0
+    rows = np.repeat(np.arange(vertices.size), counts)[keep]
+    sub_xadj = np.zeros(vertices.size + 1, dtype=xadj.dtype)
+    np.cumsum(np.bincount(rows, minlength=vertices.size), out=sub_xadj[1:])
+    if adjwgt is not None:
+        adjwgt = np.asarray(adjwgt).reshape(-1)[idx][keep]
+    return sub_xadj, np.asarray(nbrs[keep], dtype=xadj.dtype), adjwgt
+
+
+def pack_graphs(graphs):
+    """Pack graphs into a single block-diagonal graph
+
+    This is the input representation of
+    :func:`mgmetis.metis.part_graph_batch`.
+
+    Parameters
+    ----------
+    graphs : iterable of tuple
+        The adjacency structures ``(xadj, adjncy)``, both C and Fortran
+        indices are supported.
+
+    Returns
+    -------
+    offsets : np.ndarray
+        Vertex offsets of the graphs, i.e., graph ``g`` consists of the
+        vertices ``offsets[g]`` to ``offsets[g+1]-1``.
+    xadj, adjncy : np.ndarray
+        The packed adjacency structure with C-based index, whose data type is
+        the one of the first graph.
+    """
+    graphs = [process_graph(*graph)[:2] for graph in graphs]
+    if not graphs:
+        raise ValueError("no graphs to pack")
+    dtype = graphs[0][0].dtype
+    sizes = [x.size - 1 for x, _ in graphs]
+    offsets = np.zeros(len(graphs) + 1, dtype=dtype)
+    np.cumsum(sizes, out=offsets[1:])
+    xadj = np.empty(offsets[-1] + 1, dtype=dtype)
+    xadj[0] = 0
+    nnz = 0
+    adjncy = []
+    for (x, a), s, e in zip(graphs, offsets[:-1], offsets[1:]):
+        base = x[0]
+        xadj[s + 1 : e + 1] = x[1:] - base + nnz
+        nnz += x[-1] - base
+        adjncy.append(a[: x[-1] - base] - base + s)
+    return offsets, xadj, np.asarray(np.concatenate(adjncy), dtype=dtype)
+
+
+def compute_edgecut(xadj, adjncy, part, adjwgt=None):
+    """Compute the edge cut of a partition
+
+    Parameters
+    ----------
+    xadj, adjncy : array_like
+        The adjacency structure (CSR), both C and Fortran indices are
+        supported.
+    part : array_like
+        Partition array of size `nv`
+    adjwgt : array_like, optional
+        Edge weights, if not given, then all edges have unit weight.
+
+    Returns
+    -------
+    int
+        Total weight of the edges whose endpoints are in different parts, each
+        undirected edge is counted once.
+    """
+    xadj, adjncy, nv = process_graph(xadj, adjncy)
+    part = np.asarray(part).reshape(-1)
+    base = xadj[0]
+    rows = np.repeat(np.arange(nv), np.diff(xadj))
+    cut = part[rows] != part[adjncy[: rows.size] - base]
+    if adjwgt is None:
+        return int(np.count_nonzero(cut)) // 2
+    return int(np.sum(np.asarray(adjwgt).reshape(-1)[: rows.size][cut])) // 2
+
+
+def quotient_graph(xadj, adjncy, part, vwgt=None, adjwgt=None, nparts=None):
+    """Compute the quotient graph of a partition
+
+    Each part becomes a vertex, whose weight is the total weight of its
+    vertices, and two parts are adjacent if any of their vertices are; the
+    edge weight is the total weight of the cut edges between them.
+
+    Parameters
+    ----------
+    xadj, adjncy : array_like
+        The adjacency structure (CSR), both C and Fortran indices are
+        supported.
+    part : array_like
+        Partition array of size `nv`, in the same index system as `adjncy`.
+    vwgt, adjwgt : array_like, optional
+        Vertex (single constraint) and edge weights, default is unit weights.
+    nparts : int, optional
+        Number of parts, default is the largest part ID plus one.
+
+    Returns
+    -------
+    xadj, adjncy : np.ndarray
+        The quotient graph with C-based index in the same data type as the
+        input `xadj`, with sorted neighbors.
+    vwgt, adjwgt : np.ndarray
+        Part weights and cut weights between adjacent parts
+    """
+    xadj, adjncy, nv = process_graph(xadj, adjncy)
+    base = xadj[0]
+    part = np.asarray(part, dtype=np.int64).reshape(-1) - base
+    if part.size != nv:
+        raise ValueError("part should be size of {}".format(nv))
+    nparts = int(part.max()) + 1 if nparts is None else int(nparts)
+    rows = np.repeat(np.arange(nv), np.diff(xadj))
+    src, dst = part[rows], part[adjncy[: rows.size] - base]
+    cut = src != dst
+    keys, inv = np.unique(src[cut] * nparts + dst[cut], return_inverse=True)
+    wgt = None if adjwgt is None else np.asarray(adjwgt).reshape(-1)[: rows.size][cut]
+    q_xadj = np.zeros(nparts + 1, dtype=xadj.dtype)
+    np.cumsum(np.bincount(keys // nparts, minlength=nparts), out=q_xadj[1:])
+    q_adjwgt = np.bincount(inv, weights=wgt, minlength=keys.size)
+    q_vwgt = np.bincount(part, weights=None if vwgt is None else np.asarray(vwgt).reshape(-1), minlength=nparts)
+    return (
+        q_xadj,
+        np.asarray(keys % nparts, dtype=xadj.dtype),
+        np.asarray(q_vwgt, dtype=xadj.dtype),
+        np.asarray(q_adjwgt, dtype=xadj.dtype),
+    )
+
+
 def as_pointer(ar):
     """Helper function to get the array starting memory address
 
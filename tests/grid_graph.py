@@ -0,0 +1,15 @@
+# -*- coding: utf-8 -*-
+import numpy as np
+
+
+def create_grid(nx, ny=None, dtype="int32"):
+    # NOTE: nx-by-ny (nx-by-nx by default) 2D grid graph with 5-point stencil,
+    # vertices are numbered row by row, i.e., x is the fastest
+    ny = nx if ny is None else ny
+    idx = np.arange(nx * ny).reshape(ny, nx)
+    rows = np.concatenate((idx[:, :-1].ravel(), idx[:, 1:].ravel(), idx[:-1].ravel(), idx[1:].ravel()))
+    cols = np.concatenate((idx[:, 1:].ravel(), idx[:, :-1].ravel(), idx[1:].ravel(), idx[:-1].ravel()))
+    order = np.lexsort((cols, rows))
+    xadj = np.zeros(nx * ny + 1, dtype=dtype)
+    np.cumsum(np.bincount(rows, minlength=nx * ny), out=xadj[1:])
+    return xadj, np.asarray(cols[order], dtype=dtype)
@@ -0,0 +1,72 @@
+# -*- coding: utf-8 -*-
+import asyncio
+import numpy as np
+import pytest
+from mgmetis import aio, metis
+from grid_graph import create_grid
+
+
+def create_graph(dtype=None):
+    # NOTE: test the example in the documentation
+    xadj = [int(x) for x in "0 2 5 8 11 13 16 20 24 28 31 33 36 39 42 44".split()]
+    adjncy = [
+        int(x)
+        for x in "1 5 0 2 6 1 3 7 2 4 8 3 9 0 6 10 1 5 7 11 2 6 8 12 3 7 9 13 4 8 14 5 11 6 10 12 7 11 13 8 12 14 9 13".split()
+    ]
+    if dtype is None:
+        return xadj, adjncy
+    return np.asarray(xadj, dtype=dtype), np.asarray(adjncy, dtype=dtype)
+
+
+def test_module_functions():
+    xadj, adjncy = create_graph("int32")
+
+    async def main():
+        return await asyncio.gather(
+            aio.part_graph_kway(3, xadj, adjncy),
+            aio.node_nd(xadj, adjncy),
+            aio.part_mesh_dual(2, np.arange(0, 9, 4), [0, 1, 4, 3, 1, 2, 5, 4]),
+        )
+
+    (objval, part), (perm, _), _ = asyncio.run(main())
+    objval2, part2 = metis.part_graph_kway(3, xadj, adjncy)
+    assert objval == objval2 and np.all(part == part2)
+    assert sorted(perm) == list(range(15))
+
+
+def test_limits():
+    xadj, adjncy = create_graph("int32")
+
+    async def main():
+        async with aio.Partitioner(1, max_pending=2) as pool:
+            tasks = [asyncio.ensure_future(pool.node_nd(xadj, adjncy)) for _ in range(3)]
+            await asyncio.sleep(0)
+            assert pool.metrics()["pending"] == 2
+            with pytest.raises(asyncio.QueueFull):
+                await pool.node_nd(xadj, adjncy)
+            # NOTE: cancel a queued call
+            tasks[-1].cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+            with pytest.raises(ValueError):
+                await pool.part_graph_kway(0, xadj, adjncy)
+            return pool.metrics()
+
+    m = asyncio.run(main())
+    assert m["pending"] == 0 and m["running"] == 0
+    assert m["completed"] == 2 and m["rejected"] == 1
+    assert m["cancelled"] == 1 and m["failed"] == 1
+
+
+def test_process_timeout():
+    xadj, adjncy = create_grid(300)
+
+    async def main():
+        async with aio.Partitioner(1, mode="process") as pool:
+            with pytest.raises(asyncio.TimeoutError):
+                await pool.part_graph_kway(64, xadj, adjncy, timeout=1e-3)
+            # NOTE: the killed worker is replaced
+            objval, _ = await pool.part_graph_kway(2, *create_graph("int32"), part=None)
+            return objval, pool.metrics()
+
+    objval, m = asyncio.run(main())
+    assert objval > 0 and m["timeouts"] == 1 and m["completed"] == 1
@@ -0,0 +1,104 @@
+# -*- coding: utf-8 -*-
+import numpy as np
+import pytest
+from mgmetis.balance import LoadBalancer, ThroughputEstimator
+from mgmetis.metis import part_graph_kway
+from grid_graph import create_grid
+
+
+def test_decide():
+    lb = LoadBalancer(repart_cost=1.0)
+    # NOTE: balanced steps never pay off
+    for _ in range(5):
+        lb.record([1.0, 1.0, 1.0, 1.0], 0.125)
+        assert lb.decide().action == "none"
+    assert lb.metrics["loss"] == 0.0
+    # 0.3s lost per step, rebalancing pays off after 4 steps
+    actions = []
+    for _ in range(4):
+        lb.record([1.0, 1.0, 1.0, 1.4], 0.125)
+        actions.append(lb.decide())
+    assert [d.action for d in actions] == ["none", "none", "none", "repart"]
+    assert actions[-1].loss == pytest.approx(1.2)
+    assert actions[-1].imbalance == pytest.approx(1.4 / 1.1)
+    assert actions[-1].cost == 1.0
+    assert actions[-1].itr == 1000.0
+    lb.reset("repart", 0.2)
+    lb.record_migration(0.4)
+    assert lb.cost == pytest.approx(0.6)
+    # NOTE: halo of 0.125s over a horizon of 100 steps against 0.4s migration
+    assert lb.itr == pytest.approx(0.125 * 100 / 0.4)
+    m = lb.metrics
+    assert m["steps"] == 9
+    assert m["decisions"] == {"none": 8, "refine": 0, "repart": 1}
+    assert m["partition_time"] == 0.2 and m["migration_time"] == 0.4
+    assert m["lost_time"] == pytest.approx(1.2)
+
+
+def test_refine():
+    lb = LoadBalancer(repart_cost=0.5, min_interval=3)
+    # NOTE: balanced compute, but the halo exchange has become slower
+    lb.record([1.0, 1.0], [0.1, 0.1])
+    assert lb.decide().action == "none"
+    lb.record([1.0, 1.05], [0.5, 0.5])
+    assert lb.decide().action == "none"
+    lb.record([1.0, 1.05], [0.5, 0.5])
+    d = lb.decide()
+    assert d.action == "refine"
+    assert d.loss == pytest.approx(2 * (1.55 - 1.025 - 0.1))
+    lb.reset("refine", 0.1)
+    # NOTE: the interval is measured
+    for _ in range(2):
+        lb.record([1.0, 1.0], 0.5)
+    lb.reset("repart", 0.3)
+    assert lb.metrics["interval"] == pytest.approx(0.5 * 100 + 0.5 * 2)
+    assert lb.metrics["refine_time"] == 0.1 and lb.metrics["repart_time"] == 0.3
+    with pytest.raises(ValueError):
+        lb.reset("foo")
+
+
+def test_errors():
+    with pytest.raises(ValueError):
+        LoadBalancer(smoothing=0.0)
+    lb = LoadBalancer()
+    lb.record(np.full(3, 2.0))
+    # NOTE: default cost is the first step
+    assert lb.cost == 2.0
+
+
+def test_throughput():
+    est = ThroughputEstimator(4)
+    assert np.allclose(est.tpwgts, 0.25)
+    tpwgts = est.update([1.0, 1.0, 2.0, 4.0])
+    assert tpwgts.dtype == np.float32
+    assert np.allclose(tpwgts, [0.125, 0.125, 0.25, 0.5])
+    # NOTE: smoothing, and only the relative speeds matter
+    tpwgts = est.update([20.0, 20.0, 20.0, 20.0])
+    assert np.allclose(tpwgts, [0.1875, 0.1875, 0.25, 0.375])
+    # NOTE: heterogeneous part weights
+    xadj, adjncy = create_grid(20)
+    _, part = part_graph_kway(4, xadj, adjncy, **est.as_kw())
+    sizes = np.bincount(part, minlength=4) / 400.0
+    assert np.allclose(sizes, tpwgts, atol=0.02)
+
+
+def test_throughput_ncon():
+    est = ThroughputEstimator(2, ncon=2, smoothing=1.0)
+    tpwgts = est.update([[1.0, 3.0], [3.0, 1.0]])
+    assert np.allclose(tpwgts, [0.25, 0.75, 0.75, 0.25])
+    # NOTE: the same throughput for all constraints
+    assert np.allclose(est.update([1.0, 4.0]), [0.2, 0.2, 0.8, 0.8])
+    assert est.as_kw()["ncon"] == 2
+    with pytest.raises(ValueError):
+        est.update([1.0, 2.0, 3.0])
+    with pytest.raises(ValueError):
+        est.update([1.0, 0.0])
+    with pytest.raises(ValueError):
+        ThroughputEstimator(0)
+
+
+def test_measure():
+    data = np.random.rand(1000)
+    thr = ThroughputEstimator.measure(np.sort, data, work=[1000, 2000])
+    assert thr.shape == (2,)
+    assert thr[0] > 0.0 and thr[1] == pytest.approx(2 * thr[0])
@@ -0,0 +1,55 @@
+# -*- coding: utf-8 -*-
+import numpy as np
+import pytest
+from mgmetis import metis
+from mgmetis.utils import pack_graphs, MetisInputError
+from grid_graph import create_grid
+
+
+def create_patches(dtype, n=50):
+    rng = np.random.default_rng(1)
+    return [create_grid(*rng.integers(2, 12, size=2), dtype) for _ in range(n)]
+
+
+@pytest.mark.parametrize("dtype", [np.int32, np.int64])
+def test_batch(dtype, monkeypatch):
+    graphs = create_patches(dtype)
+    offsets, xadj, adjncy = pack_graphs(graphs)
+    nparts = np.arange(len(graphs)) % 4 + 1
+    objval, part = metis.part_graph_batch(nparts, offsets, xadj, adjncy)
+    assert part.dtype == dtype and objval.size == len(graphs)
+    for g, (x, a) in enumerate(graphs):
+        expected = np.zeros(x.size - 1)
+        cut = 0
+        if nparts[g] > 1:
+            cut, expected = metis.part_graph_kway(nparts[g], x, a)
+        assert objval[g] == cut
+        assert np.all(part[offsets[g] : offsets[g + 1]] == expected)
+    # NOTE: threads and the ctypes fallback give the same results
+    objval2, part2 = metis.part_graph_batch(nparts, offsets, xadj, adjncy, nthreads=4)
+    assert np.all(objval2 == objval) and np.all(part2 == part)
+    monkeypatch.setattr(metis, "_USE_FAST", False)
+    objval2, part2 = metis.part_graph_batch(nparts, offsets, xadj + 1, adjncy + 1)
+    assert np.all(objval2 == objval) and np.all(part2 == part + 1)
+
+
+def test_batch_recursive():
+    offsets, xadj, adjncy = pack_graphs(create_patches(np.int32, 10))
+    vwgt = np.ones(xadj.size - 1, dtype=np.int32)
+    objval, part = metis.part_graph_batch(
+        2, offsets, xadj, adjncy, kernel="recursive", vwgt=vwgt, nthreads=2
+    )
+    assert np.all(objval > 0) and np.all((part == 0) | (part == 1))
+
+
+def test_batch_errors():
+    offsets, xadj, adjncy = pack_graphs(create_patches(np.int32, 3))
+    with pytest.raises(ValueError):
+        metis.part_graph_batch(0, offsets, xadj, adjncy)
+    with pytest.raises(ValueError):
+        metis.part_graph_batch(2, offsets[:-1], xadj, adjncy)
+    with pytest.raises(MetisInputError):
+        metis.part_graph_batch(2, [0, xadj.size - 1], xadj, np.full_like(adjncy, 1000))
+    merged = np.asarray([0, offsets[1] - 1, offsets[-1]], dtype=np.int32)
+    with pytest.raises(MetisInputError):
+        metis.part_graph_batch(2, merged, xadj, adjncy)
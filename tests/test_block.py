@@ -0,0 +1,66 @@
+# -*- coding: utf-8 -*-
+import numpy as np
+from mgmetis.block import contract_blocks, part_graph_block, node_nd_block
+
+
+def create_graph(dtype=None):
+    # NOTE: test the example in the documentation
+    xadj = [int(x) for x in "0 2 5 8 11 13 16 20 24 28 31 33 36 39 42 44".split()]
+    adjncy = [
+        int(x)
+        for x in "1 5 0 2 6 1 3 7 2 4 8 3 9 0 6 10 1 5 7 11 2 6 8 12 3 7 9 13 4 8 14 5 11 6 10 12 7 11 13 8 12 14 9 13".split()
+    ]
+    if dtype is None:
+        return xadj, adjncy
+    return np.asarray(xadj, dtype=dtype), np.asarray(adjncy, dtype=dtype)
+
+
+def create_block_matrix(bs, dtype="int32"):
+    # NOTE: expand the graph with diagonal into a bs-by-bs block matrix
+    xadj, adjncy = create_graph(dtype)
+    nv = xadj.size - 1
+    rows = np.repeat(np.arange(nv), np.diff(xadj))
+    rows = np.append(rows, np.arange(nv))
+    cols = np.append(adjncy, np.arange(nv))
+    shape = (rows.size, bs, bs)
+    r = np.broadcast_to(rows[:, None, None] * bs + np.arange(bs)[:, None], shape)
+    c = np.broadcast_to(cols[:, None, None] * bs + np.arange(bs), shape)
+    r, c = r.reshape(-1), c.reshape(-1)
+    order = np.lexsort((c, r))
+    r, c = r[order], c[order]
+    indptr = np.zeros(nv * bs + 1, dtype=dtype)
+    np.cumsum(np.bincount(r, minlength=nv * bs), out=indptr[1:])
+    return indptr, np.asarray(c, dtype=dtype)
+
+
+def test_contract():
+    xadj, adjncy = create_graph("int32")
+    indptr, indices = create_block_matrix(3)
+    xadj2, adjncy2, dof_map = contract_blocks(indptr, indices, blocksize=3)
+    assert np.all(xadj2 == xadj)
+    assert np.all(adjncy2 == adjncy)
+    assert xadj2.dtype == np.int32
+    assert np.all(dof_map == np.arange(45) // 3)
+    # NOTE: variable DOF map gives the same graph
+    xadj3, adjncy3, _ = contract_blocks(indptr, indices, dof_map=np.arange(45) // 3)
+    assert np.all(xadj3 == xadj)
+    assert np.all(adjncy3 == adjncy)
+
+
+def test_part():
+    indptr, indices = create_block_matrix(3)
+    _, part = part_graph_block(4, indptr, indices, blocksize=3)
+    assert part.size == 45
+    assert np.all(part.reshape(-1, 3) == part[::3, None])
+    assert set(part) == set(range(4))
+    _, part = part_graph_block(2, indptr, indices, blocksize=3, recursive=True)
+    assert set(part) == set(range(2))
+
+
+def test_node_nd():
+    indptr, indices = create_block_matrix(2)
+    perm, iperm = node_nd_block(indptr, indices, blocksize=2)
+    assert np.all(np.sort(perm) == np.arange(30))
+    assert np.all(perm[iperm] == np.arange(30))
+    # DOFs of a node are consecutive
+    assert np.all(perm[1::2] == perm[::2] + 1)
@@ -0,0 +1,82 @@
+# -*- coding: utf-8 -*-
+import os
+import numpy as np
+import pytest
+from mgmetis.cache import PartitionCache
+from mgmetis.metis import part_graph_kway
+
+
+def create_graph(dtype=None):
+    # NOTE: test the example in the documentation
+    xadj = [int(x) for x in "0 2 5 8 11 13 16 20 24 28 31 33 36 39 42 44".split()]
+    adjncy = [
+        int(x)
+        for x in "1 5 0 2 6 1 3 7 2 4 8 3 9 0 6 10 1 5 7 11 2 6 8 12 3 7 9 13 4 8 14 5 11 6 10 12 7 11 13 8 12 14 9 13".split()
+    ]
+    if dtype is None:
+        return xadj, adjncy
+    return np.asarray(xadj, dtype=dtype), np.asarray(adjncy, dtype=dtype)
+
+
+def test_cache_graph(tmp_path):
+    cache = PartitionCache(str(tmp_path))
+    xadj, adjncy = create_graph("int32")
+    objval, part = cache.part_graph_kway(3, xadj, adjncy)
+    objval2, part2 = cache.part_graph_kway(3, xadj, adjncy)
+    assert (cache.hits, cache.misses) == (1, 1)
+    assert objval == objval2 and isinstance(objval2, int)
+    assert part2.dtype == np.int32 and np.all(part == part2)
+    assert isinstance(part2, np.memmap)
+    assert np.all(part2 == part_graph_kway(3, xadj, adjncy)[1])
+    # NOTE: different inputs give different keys
+    cache.part_graph_kway(2, xadj, adjncy)
+    cache.part_graph_recursize(3, xadj, adjncy)
+    cache.part_graph_kway(3, xadj.astype(np.int64), adjncy.astype(np.int64))
+    assert cache.misses == 4
+    perm, iperm = cache.node_nd(xadj, adjncy)
+    perm2, iperm2 = cache.node_nd(xadj, adjncy)
+    assert np.all(perm == perm2) and np.all(iperm == iperm2)
+
+
+def test_cache_mesh(tmp_path):
+    cache = PartitionCache(str(tmp_path))
+    cells = [[0, 1, 2], [0, 2, 3], [0, 3, 4], [0, 4, 1]]
+    res = cache.part_mesh_dual(2, cells)
+    res2 = cache.part_mesh_dual(2, cells)
+    assert cache.hits == 1 and res[0] == res2[0]
+    assert np.all(res[1] == res2[1]) and np.all(res[2] == res2[2])
+    cache.part_mesh_nodal(2, cells)
+    assert cache.misses == 2
+
+
+def test_evict(tmp_path):
+    cache = PartitionCache(str(tmp_path), max_bytes=1)
+    xadj, adjncy = create_graph("int32")
+    cache.part_graph_kway(2, xadj, adjncy)
+    # NOTE: single entries larger than the bound are evicted immediately
+    assert not [f for f in os.listdir(str(tmp_path)) if f.endswith(".npy")]
+    cache.max_bytes = 1 << 20
+    cache.part_graph_kway(2, xadj, adjncy)
+    cache.part_graph_kway(3, xadj, adjncy)
+    assert len([f for f in os.listdir(str(tmp_path)) if f.endswith(".npy")]) == 2
+    cache.clear()
+    assert not [f for f in os.listdir(str(tmp_path)) if f.endswith(".npy")]
+
+
+def test_cache_outputs(tmp_path):
+    cache = PartitionCache(str(tmp_path))
+    xadj, adjncy = create_graph("int32")
+    report = {}
+    _, part = cache.part_graph_kway(3, xadj, adjncy, memory_report=report)
+    assert report
+    buf = np.full(xadj.size - 1, -1, dtype=np.int32)
+    _, part2 = cache.part_graph_kway(3, xadj, adjncy, part=buf, memory_report=report)
+    assert cache.hits == 1 and not report
+    assert part2 is buf and np.all(buf == part)
+    perm, iperm = cache.node_nd(xadj, adjncy)
+    bufs = [np.empty_like(perm) for _ in range(2)]
+    res = cache.node_nd(xadj, adjncy, perm=bufs[0], iperm=bufs[1])
+    assert all(x is y for x, y in zip(res, bufs))
+    assert np.all(bufs[0] == perm) and np.all(bufs[1] == iperm)
+    with pytest.raises(TypeError):
+        cache.part_graph_kway(3, xadj, adjncy, vwgt=np.array([None] * 15))
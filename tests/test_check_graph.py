@@ -0,0 +1,69 @@
+# -*- coding: utf-8 -*-
+import numpy as np
+import pytest
+from mgmetis.metis import part_graph_kway
+from mgmetis.utils import check_graph, symmetrize_graph, MetisInputError
+
+
+def create_graph(dtype=None):
+    # NOTE: test the example in the documentation
+    xadj = [int(x) for x in "0 2 5 8 11 13 16 20 24 28 31 33 36 39 42 44".split()]
+    adjncy = [
+        int(x)
+        for x in "1 5 0 2 6 1 3 7 2 4 8 3 9 0 6 10 1 5 7 11 2 6 8 12 3 7 9 13 4 8 14 5 11 6 10 12 7 11 13 8 12 14 9 13".split()
+    ]
+    if dtype is None:
+        return xadj, adjncy
+    return np.asarray(xadj, dtype=dtype), np.asarray(adjncy, dtype=dtype)
+
+
+def test_valid():
+    xadj, adjncy = create_graph("int32")
+    assert check_graph(xadj, adjncy, np.ones(adjncy.size)).ok
+    assert check_graph(xadj + 1, adjncy + 1).ok
+    # NOTE: symmetrizing a valid graph is an identity operation
+    xadj2, adjncy2, adjwgt2 = symmetrize_graph(xadj, adjncy, np.ones(adjncy.size))
+    assert np.all(xadj2 == xadj)
+    assert np.all(adjncy2 == adjncy)
+    assert np.all(adjwgt2 == 1)
+    assert xadj2.dtype == np.int32
+
+
+def test_defects():
+    # 0->1 (no reverse), self-loop on 1, duplicated 2->0
+    xadj = [0, 1, 2, 4]
+    adjncy = [1, 1, 0, 0]
+    report = check_graph(xadj, adjncy)
+    assert report.self_loops == 1
+    assert report.duplicates == 1
+    assert report.asymmetric == 2
+    assert not report.ok
+    fast = check_graph(xadj, adjncy, full=False)
+    assert fast.self_loops == 1 and fast.duplicates is None
+    assert check_graph([0, 1, 2], [5, 0]).out_of_range == 1
+    assert check_graph([0, 2, 1, 2], [1, 0]).bad_xadj == 1
+    report = check_graph([0, 1, 2], [1, 0], adjwgt=[1, 2])
+    assert report.asym_weights == 2
+
+
+def test_symmetrize():
+    xadj, adjncy, adjwgt = symmetrize_graph(
+        [1, 2, 3, 5], [2, 2, 1, 1], adjwgt=[3, 7, 1, 4]
+    )
+    # NOTE: Fortran index is preserved
+    assert list(xadj) == [1, 3, 4, 5]
+    assert list(adjncy) == [2, 3, 1, 1]
+    assert list(adjwgt) == [3, 4, 3, 4]
+    assert check_graph(xadj, adjncy, adjwgt).ok
+
+
+def test_validate():
+    xadj, adjncy = [0, 1, 2, 4], [1, 1, 0, 0]
+    with pytest.raises(MetisInputError):
+        part_graph_kway(2, xadj, adjncy, validate="full")
+    with pytest.raises(MetisInputError):
+        part_graph_kway(2, xadj, adjncy, validate="fast")
+    with pytest.raises(ValueError):
+        part_graph_kway(2, *create_graph(), validate="meh")
+    _, part = part_graph_kway(2, *create_graph(), validate="full")
+    assert part.size == 15
@@ -0,0 +1,125 @@
+# -*- coding: utf-8 -*-
+import json
+import numpy as np
+import pytest
+from mgmetis import metis
+from mgmetis.cli import main
+
+
+def create_graph(dtype=None):
+    # NOTE: test the example in the documentation
+    xadj = [int(x) for x in "0 2 5 8 11 13 16 20 24 28 31 33 36 39 42 44".split()]
+    adjncy = [
+        int(x)
+        for x in "1 5 0 2 6 1 3 7 2 4 8 3 9 0 6 10 1 5 7 11 2 6 8 12 3 7 9 13 4 8 14 5 11 6 10 12 7 11 13 8 12 14 9 13".split()
+    ]
+    if dtype is None:
+        return xadj, adjncy
+    return np.asarray(xadj, dtype=dtype), np.asarray(adjncy, dtype=dtype)
+
+
+def write_graph(fn, xadj, adjncy, vwgt=None, adjwgt=None):
+    fmt = "{}{}".format(int(vwgt is not None), int(adjwgt is not None))
+    with open(fn, "w") as f:
+        f.write("% comment\n{} {} {}\n".format(xadj.size - 1, xadj[-1] // 2, fmt))
+        for v in range(xadj.size - 1):
+            items = [] if vwgt is None else [vwgt[v]]
+            for j in range(xadj[v], xadj[v + 1]):
+                items.append(adjncy[j] + 1)
+                if adjwgt is not None:
+                    items.append(adjwgt[j])
+            f.write(" ".join(map(str, items)) + "\n")
+
+
+def test_graph(tmp_path, capsys):
+    xadj, adjncy = create_graph("int32")
+    vwgt = np.arange(15, dtype=np.int32) + 1
+    adjwgt = np.arange(adjncy.size, dtype=np.int32) % 3 + 1
+    fn = str(tmp_path / "g.graph")
+    write_graph(fn, xadj, adjncy, vwgt, adjwgt)
+    assert main(["graph", fn, "3", "-O", "ctype=rm", "-O", "ufactor=50", "--json"]) == 0
+    report = json.loads(capsys.readouterr().out)
+    assert set(report["timing"]) == {"load", "convert", "validate", "kernel", "write", "total"}
+    assert report["peak_rss"] > 0 and report["nedges"] == 22
+    opts = metis.get_default_options()
+    opts[2], opts[16] = 0, 50
+    objval, part = metis.part_graph_kway(3, xadj, adjncy, vwgt=vwgt, adjwgt=adjwgt, options=opts)
+    assert report["objval"] == objval
+    assert np.all(np.loadtxt(fn + ".part.3", dtype=int) == part)
+
+
+def test_formats(tmp_path, capsys):
+    xadj, adjncy = create_graph("int64")
+    _, expected = metis.part_graph_recursize(2, xadj, adjncy)
+    # NOTE: GKlib binary CSR, the layout of gk_csr_Write with GK_CSR_FMT_BINROW
+    fn = str(tmp_path / "g.bin")
+    header = np.asarray([15, 15], dtype=np.int32).tobytes() + xadj.tobytes()
+    with open(fn, "wb") as f:
+        f.write(header + adjncy.astype(np.int32).tobytes())
+    out = str(tmp_path / "part")
+    assert main(["graph", fn, "2", "--ptype", "rb", "-o", out, "--output-format", "npy"]) == 0
+    assert np.all(np.load(out + ".npy") == expected)
+    # NOTE: with float32 values, which are the edge weights
+    rows = np.repeat(np.arange(15), np.diff(xadj))
+    adjwgt = (rows + adjncy) % 3 + 1
+    with open(fn, "wb") as f:
+        f.write(header + adjncy.astype(np.int32).tobytes() + adjwgt.astype(np.float32).tobytes())
+    assert main(["graph", fn, "2", "--ptype", "rb", "-o", out, "--output-format", "npy"]) == 0
+    _, expected2 = metis.part_graph_recursize(
+        2, xadj.astype(np.int32), adjncy.astype(np.int32), adjwgt=adjwgt.astype(np.int32)
+    )
+    assert np.all(np.load(out + ".npy") == expected2)
+    with open(fn, "wb") as f:
+        f.write(header + adjncy.astype(np.int32).tobytes()[:-4])
+    assert main(["graph", fn, "2"]) == 1
+    assert "not a valid binary CSR file" in capsys.readouterr().err
+    # NOTE: directory of .npy files with int64 and Fortran index
+    d = tmp_path / "g"
+    d.mkdir()
+    np.save(str(d / "xadj.npy"), xadj + 1)
+    np.save(str(d / "adjncy.npy"), adjncy + 1)
+    assert main(["nd", str(d), "--dtype", "int64", "-o", out]) == 0
+    assert "kernel:" in capsys.readouterr().out
+    assert np.all(np.loadtxt(out, dtype=int) == metis.node_nd(xadj + 1, adjncy + 1)[1])
+
+
+def test_mesh(tmp_path):
+    fn = str(tmp_path / "m.mesh")
+    with open(fn, "w") as f:
+        f.write("4\n1 2 5 4\n2 3 6 5\n4 5 8 7\n5 6 9 8\n")
+    assert main(["mesh", fn, "2", "--ncommon", "2"]) == 0
+    eptr = np.arange(0, 17, 4)
+    eind = np.asarray([0, 1, 4, 3, 1, 2, 5, 4, 3, 4, 7, 6, 4, 5, 8, 7])
+    _, epart, npart = metis.part_mesh_dual(2, eptr, eind, ncommon=2)
+    assert np.all(np.loadtxt(fn + ".epart.2", dtype=int) == epart)
+    assert np.all(np.loadtxt(fn + ".npart.2", dtype=int) == npart)
+    with open(fn, "w") as f:
+        f.write("4 1\n1 1 2 5 4\n3 2 3 6 5\n1 4 5 8 7\n3 5 6 9 8\n")
+    assert main(["mesh", fn, "2", "--ncommon", "2"]) == 0
+    vwgt = np.asarray([1, 3, 1, 3])
+    _, epart, _ = metis.part_mesh_dual(2, eptr, eind, ncommon=2, vwgt=vwgt)
+    assert np.all(np.loadtxt(fn + ".epart.2", dtype=int) == epart)
+
+
+def test_errors(tmp_path, capsys):
+    fn = str(tmp_path / "bad.graph")
+    with open(fn, "w") as f:
+        f.write("3 2\n2\n1 3\n")
+    assert main(["graph", fn, "2"]) == 1
+    with open(fn, "w") as f:
+        f.write("2 1\n2\n1\n")
+    assert main(["graph", fn, "2", "-O", "ctype=unknown"]) == 1
+    assert main(["graph", fn, "2", "-O", "nothing=1"]) == 1
+    assert "error" in capsys.readouterr().err
+    # NOTE: multiple element weights, and element weights of the nodal graph
+    fn = str(tmp_path / "bad.mesh")
+    with open(fn, "w") as f:
+        f.write("2 2\n1 1 1 2 3\n1 1 2 3 4\n")
+    assert main(["mesh", fn, "2"]) == 1
+    assert "2 weights per element" in capsys.readouterr().err
+    with open(fn, "w") as f:
+        f.write("2 1\n1 1 2 3\n1 2 3 4\n")
+    assert main(["mesh", fn, "2", "--gtype", "nodal"]) == 1
+    assert "dual" in capsys.readouterr().err
+    with pytest.raises(SystemExit):
+        main(["graph"])
@@ -0,0 +1,56 @@
+# -*- coding: utf-8 -*-
+import numpy as np
+import pytest
+from mgmetis import metis
+from mgmetis.enums import CTYPE
+from grid_graph import create_grid
+
+
+def contract(xadj, adjncy, adjwgt, cmap, cn):
+    # reference contraction as a dense matrix
+    rows = cmap[np.repeat(np.arange(xadj.size - 1), np.diff(xadj))]
+    cols = cmap[adjncy]
+    a = np.zeros((cn, cn))
+    np.add.at(a, (rows, cols), adjwgt)
+    np.fill_diagonal(a, 0)
+    return a
+
+
+@pytest.mark.parametrize("dtype", [np.int32, np.int64])
+def test_coarsen(dtype):
+    xadj, adjncy = create_grid(30, dtype=dtype)
+    rng = np.random.default_rng(0)
+    w = rng.integers(1, 10, size=adjncy.size)
+    # NOTE: symmetric edge weights
+    rows = np.repeat(np.arange(900), np.diff(xadj))
+    key = np.minimum(rows, adjncy) * 900 + np.maximum(rows, adjncy)
+    adjwgt = np.asarray(w[np.unique(key, return_inverse=True)[1]], dtype=dtype)
+    levels = metis.coarsen(xadj, adjncy, adjwgt)
+    assert len(levels) > 3
+    fx, fa, fw, fv = xadj, adjncy, adjwgt, np.ones(900)
+    for level in levels:
+        cn = level.xadj.size - 1
+        assert level.cmap.dtype == dtype and level.cmap.size == fx.size - 1
+        assert cn < 0.85 * (fx.size - 1) or level is levels[-1]
+        assert np.all(np.bincount(level.cmap, weights=fv, minlength=cn) == level.vwgt)
+        dense = np.zeros((cn, cn))
+        dense[np.repeat(np.arange(cn), np.diff(level.xadj)), level.adjncy] = level.adjwgt
+        assert np.all(dense == contract(fx, fa, fw, level.cmap, cn))
+        fx, fa, fw, fv = level.xadj, level.adjncy, level.adjwgt, level.vwgt
+    assert levels[-1].vwgt.sum() == 900
+
+
+def test_coarsen_options():
+    xadj, adjncy = create_grid(20, dtype=np.int32)
+    levels = metis.coarsen(xadj, adjncy, levels=2, ctype=CTYPE.RM)
+    assert len(levels) == 2
+    # NOTE: matchings have at most two vertices per aggregate
+    assert np.bincount(levels[0].cmap).max() <= 2
+    assert len(metis.coarsen(xadj, adjncy, levels=0)) == 0
+    assert len(metis.coarsen(xadj, adjncy, coarsen_to=500)) == 0
+    # NOTE: Fortran index gives the same hierarchy in C index
+    fortran = metis.coarsen(xadj + 1, adjncy + 1, levels=2, ctype=CTYPE.RM)
+    assert np.all(fortran[1].cmap == levels[1].cmap)
+    assert xadj[0] == 0 and adjncy.min() == 0
+    with pytest.raises(ValueError):
+        metis.coarsen(xadj, adjncy, levels=-1)
@@ -0,0 +1,70 @@
+# -*- coding: utf-8 -*-
+# NOTE: requires mpi4py, otherwise skipped; run with, e.g.,
+# mpiexec -n 2 python -m pytest test_dist_graph.py
+import numpy as np
+import pytest
+from grid_graph import create_grid
+
+try:
+    from mgmetis.par_utils import check_dist_graph, validate_dist_graph
+    from mgmetis.utils import MetisInputError
+    from mpi4py import MPI
+
+    comm = MPI.COMM_WORLD
+    has_mpi = True
+except (ImportError, ModuleNotFoundError):
+    has_mpi = False
+
+
+def local_graph(base=0):
+    # NOTE: block rows of an 8x8 grid, global adjacency
+    xadj, adjncy = create_grid(8)
+    vtxdist = np.linspace(0, 64, comm.size + 1).astype(np.int32)
+    s, e = vtxdist[comm.rank], vtxdist[comm.rank + 1]
+    x = xadj[s : e + 1] - xadj[s]
+    a = adjncy[xadj[s] : xadj[e]]
+    return x + base, a + base, vtxdist + base
+
+
+@pytest.mark.skipif(not has_mpi, reason="invalid parallel env")
+@pytest.mark.parametrize("base", [0, 1])
+def test_valid(base):
+    xadj, adjncy, vtxdist = local_graph(base)
+    adjwgt = np.ones(adjncy.size, dtype=np.int32)
+    report = check_dist_graph(xadj, adjncy, vtxdist, comm, adjwgt, wgtflag=1)
+    assert report.ok and report.asym_weights == 0
+    assert check_dist_graph(xadj, adjncy, comm=comm).asym_weights is None
+    validate_dist_graph(xadj, adjncy, vtxdist, comm)
+
+
+@pytest.mark.skipif(not has_mpi or comm.size != 2, reason="invalid parallel env")
+def test_defects():
+    xadj, adjncy, vtxdist = local_graph()
+    adjwgt = np.ones(adjncy.size, dtype=np.int32)
+    # NOTE: a cross-rank edge without its reverse
+    bad = adjncy.copy()
+    if comm.rank == 1:
+        bad[0] = 63 if bad[0] != 63 else 62
+    assert check_dist_graph(xadj, bad, vtxdist, comm).asymmetric == 2
+    # weights
+    w = adjwgt.copy()
+    if comm.rank == 0:
+        w[-1] = 5
+    assert check_dist_graph(xadj, adjncy, vtxdist, comm, w).asym_weights == 2
+    # global IDs
+    bad = adjncy.copy()
+    if comm.rank == 0:
+        bad[0] = 64
+    report = check_dist_graph(xadj, bad, vtxdist, comm)
+    assert report.out_of_range == 1 and report.asymmetric is None
+    # inconsistent vtxdist and flags
+    vd = vtxdist.copy()
+    if comm.rank == 0:
+        vd[1] += 1
+    assert check_dist_graph(xadj, adjncy, vd, comm).bad_vtxdist > 0
+    report = check_dist_graph(xadj, adjncy, vtxdist, comm, wgtflag=comm.rank)
+    assert report.bad_flags == 1
+    with pytest.raises(MetisInputError):
+        validate_dist_graph(xadj, adjncy, vd, comm)
+    with pytest.raises(ValueError):
+        validate_dist_graph(xadj, adjncy, vd, comm)
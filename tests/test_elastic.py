@@ -0,0 +1,58 @@
+# -*- coding: utf-8 -*-
+import numpy as np
+import pytest
+from mgmetis.elastic import repart_graph_elastic
+from mgmetis.metis import part_graph_kway
+from mgmetis.utils import compute_edgecut, quotient_graph
+from grid_graph import create_grid
+
+
+def test_quotient_graph():
+    xadj, adjncy = create_grid(4)
+    # NOTE: 2x2 blocks of the 4x4 grid
+    part = (np.arange(16) // 8) * 2 + (np.arange(16) % 4) // 2
+    q_xadj, q_adjncy, q_vwgt, q_adjwgt = quotient_graph(xadj, adjncy, part)
+    assert q_xadj.tolist() == [0, 2, 4, 6, 8]
+    assert q_adjncy.tolist() == [1, 2, 0, 3, 0, 3, 1, 2]
+    assert q_vwgt.tolist() == [4] * 4 and q_adjwgt.tolist() == [2] * 8
+    assert q_adjwgt.sum() // 2 == compute_edgecut(xadj, adjncy, part)
+    # NOTE: fortran and weights
+    adjwgt = np.full(adjncy.size, 3)
+    _, _, q_vwgt, q_adjwgt = quotient_graph(xadj + 1, adjncy + 1, part + 1, vwgt=np.arange(16), adjwgt=adjwgt)
+    assert q_vwgt.tolist() == [10, 18, 42, 50] and q_adjwgt.tolist() == [6] * 8
+
+
+@pytest.mark.parametrize("k0, k1", [(4, 8), (8, 4), (4, 3), (6, 10), (5, 1), (16, 15), (6, 6)])
+def test_elastic(k0, k1):
+    xadj, adjncy = create_grid(40)
+    _, part = part_graph_kway(k0, xadj, adjncy)
+    vsize = np.arange(1600) % 3 + 1
+    edgecut, new, migration = repart_graph_elastic(k1, xadj, adjncy, part, vsize=vsize)
+    assert new.dtype == xadj.dtype
+    assert set(new.tolist()) == set(range(k1))
+    assert np.bincount(new).max() <= 1.03 * 1600 / k1 + 1
+    assert edgecut == compute_edgecut(xadj, adjncy, new)
+    assert migration == vsize[new != part].sum()
+    # NOTE: much less migration than partitioning from scratch
+    if k1 > 1:
+        _, scratch = part_graph_kway(k1, xadj, adjncy)
+        assert migration <= vsize[scratch != part].sum()
+    if k1 == 2 * k0:
+        assert migration < 0.55 * vsize.sum()
+    if k1 == k0 - 1 and k0 >= 8:
+        # NOTE: e.g., losing one node out of many
+        assert migration < 0.2 * vsize.sum()
+    if k1 == k0:
+        assert migration < 0.05 * vsize.sum()
+
+
+def test_fortran():
+    xadj, adjncy = create_grid(20)
+    _, part = part_graph_kway(3, xadj, adjncy)
+    _, new, migration = repart_graph_elastic(5, xadj, adjncy, part)
+    _, new1, migration1 = repart_graph_elastic(5, xadj + 1, adjncy + 1, part + 1)
+    assert np.array_equal(new1, new + 1) and migration1 == migration
+    with pytest.raises(ValueError):
+        repart_graph_elastic(0, xadj, adjncy, part)
+    with pytest.raises(ValueError):
+        repart_graph_elastic(2, xadj, adjncy, part[:-1])
@@ -0,0 +1,105 @@
+# -*- coding: utf-8 -*-
+import numpy as np
+import pytest
+from mgmetis import metis
+from mgmetis.enums import OPTION
+from mgmetis.utils import MetisInputError
+
+
+def create_graph(dtype=None):
+    # NOTE: test the example in the documentation
+    xadj = [int(x) for x in "0 2 5 8 11 13 16 20 24 28 31 33 36 39 42 44".split()]
+    adjncy = [
+        int(x)
+        for x in "1 5 0 2 6 1 3 7 2 4 8 3 9 0 6 10 1 5 7 11 2 6 8 12 3 7 9 13 4 8 14 5 11 6 10 12 7 11 13 8 12 14 9 13".split()
+    ]
+    if dtype is None:
+        return xadj, adjncy
+    return np.asarray(xadj, dtype=dtype), np.asarray(adjncy, dtype=dtype)
+
+
+def run_all(xadj, adjncy):
+    eptr = np.arange(0, 17, 4, dtype=xadj.dtype)
+    eind = np.asarray([0, 1, 4, 3, 1, 2, 5, 4, 3, 4, 7, 6, 4, 5, 8, 7], dtype=xadj.dtype)
+    return (
+        metis.part_graph_kway(3, xadj, adjncy, vwgt=np.arange(15) + 1),
+        metis.part_graph_recursize(3, xadj, adjncy, tpwgts=[0.2, 0.3, 0.5]),
+        metis.node_nd(xadj, adjncy),
+        metis.part_mesh_dual(2, eptr, eind, ncommon=2),
+        metis.part_mesh_nodal(2, eptr, eind),
+    )
+
+
+@pytest.mark.parametrize("dtype", ["int32", "int64"])
+def test_fast_vs_ctypes(dtype, monkeypatch):
+    assert metis._get_fast_libmetis(np.dtype(dtype)) is not None
+    xadj, adjncy = create_graph(dtype)
+    for base in (0, 1):
+        fast = run_all(xadj + base, adjncy + base)
+        monkeypatch.setattr(metis, "_USE_FAST", False)
+        slow = run_all(xadj + base, adjncy + base)
+        monkeypatch.setattr(metis, "_USE_FAST", True)
+        for a, b in zip(fast, slow):
+            for x, y in zip(a, b):
+                assert np.all(x == y)
+        assert isinstance(fast[0][0], int)
+
+
+def test_fast_errors():
+    xadj, adjncy = create_graph("int32")
+    opts = metis.get_default_options()
+    opts[OPTION.UFACTOR] = 0
+    opts[OPTION.CTYPE] = 100
+    with pytest.raises(MetisInputError):
+        metis.part_graph_kway(3, xadj, adjncy, options=opts)
+    # NOTE: read-only inputs are accepted
+    xadj.flags.writeable = False
+    adjncy.flags.writeable = False
+    part = np.empty(15, dtype=np.int32)
+    _, part2 = metis.part_graph_kway(3, xadj, adjncy, part=part)
+    assert part2 is part or np.shares_memory(part, part2)
+
+
+def test_readonly_fortran():
+    # NOTE: METIS renumbers Fortran inputs in place, which must not touch
+    # read-only (e.g., memory-mapped) arrays
+    xadj, adjncy = create_graph("int64")
+    _, expected = metis.part_graph_kway(3, xadj + 1, adjncy + 1)
+    xadj, adjncy = xadj + 1, adjncy + 1
+    xadj.flags.writeable = False
+    adjncy.flags.writeable = False
+    _, part = metis.part_graph_kway(3, xadj, adjncy)
+    assert np.all(part == expected)
+    assert metis.node_nd(xadj, adjncy)[0].min() == 1
+    eptr = np.arange(1, 10, 4)
+    eind = np.asarray([1, 2, 5, 4, 2, 3, 6, 5])
+    eptr.flags.writeable = False
+    eind.flags.writeable = False
+    assert metis.part_mesh_dual(2, eptr, eind)[1].min() == 1
+    assert metis.mesh_to_nodal(eptr, eind)[0].size == 7
+
+
+@pytest.mark.parametrize("dtype", ["int32", "int64"])
+def test_fast_input_shapes(dtype, monkeypatch):
+    # NOTE: 2D and strided weights are flattened like the ctypes path
+    xadj, adjncy = create_graph(dtype)
+    vwgt = np.stack((np.arange(15) + 1, 16 - np.arange(15)), axis=1)
+    tpwgts = np.asarray([[0.2, 0.3], [0.3, 0.3], [0.5, 0.4]])
+    w = np.arange(30) + 1
+    res = []
+    for use_fast in (True, False):
+        monkeypatch.setattr(metis, "_USE_FAST", use_fast)
+        res.append(
+            (
+                metis.part_graph_kway(3, xadj, adjncy, ncon=2, vwgt=vwgt),
+                metis.part_graph_recursize(3, xadj, adjncy, ncon=2, vwgt=vwgt, tpwgts=tpwgts),
+                metis.part_graph_kway(3, xadj, adjncy, vwgt=w[::2]),
+                metis.node_nd(xadj, adjncy, vwgt=w[::2]),
+            )
+        )
+    for a, b in zip(*res):
+        for x, y in zip(a, b):
+            assert np.all(x == y)
+    _, part = res[0][2]
+    monkeypatch.setattr(metis, "_USE_FAST", True)
+    assert np.all(part == metis.part_graph_kway(3, xadj, adjncy, vwgt=w[::2].copy())[1])
@@ -0,0 +1,42 @@
+# -*- coding: utf-8 -*-
+import numpy as np
+import pytest
+from mgmetis.geom import morton_keys, hilbert_keys, part_sfc, part_rcb
+
+
+def test_keys():
+    # NOTE: 2x2 grid, Morton is Z-order and Hilbert is U-order
+    xy = [[0, 0], [0, 1], [1, 0], [1, 1]]
+    assert list(morton_keys(xy, bits=1)) == [0, 1, 2, 3]
+    assert sorted(hilbert_keys(xy, bits=1)) == [0, 1, 2, 3]
+    # Hilbert curve moves to an adjacent cell in each step
+    g = np.stack(np.meshgrid(np.arange(8), np.arange(8), np.arange(8)), -1).reshape(-1, 3)
+    order = np.argsort(hilbert_keys(g, bits=3))
+    assert np.all(np.abs(np.diff(g[order], axis=0)).sum(axis=1) == 1)
+    with pytest.raises(ValueError):
+        morton_keys(np.zeros((3, 4)))
+
+
+@pytest.mark.parametrize("curve", ["hilbert", "morton"])
+def test_sfc(curve):
+    xyz = np.random.rand(1000, 3)
+    part = part_sfc(7, xyz, curve=curve)
+    assert part.dtype == np.int32
+    counts = np.bincount(part, minlength=7)
+    assert counts.max() - counts.min() <= 1
+    vwgt = np.where(xyz[:, 0] > 0.5, 3.0, 1.0)
+    part = part_sfc(4, xyz, vwgt=vwgt, curve=curve, dtype=np.int64)
+    loads = np.bincount(part, weights=vwgt, minlength=4)
+    assert loads.max() / loads.mean() < 1.05
+
+
+def test_rcb():
+    xyz = np.random.rand(1000, 2)
+    part = part_rcb(6, xyz)
+    counts = np.bincount(part, minlength=6)
+    assert counts.max() - counts.min() <= 2
+    vwgt = np.where(xyz[:, 1] > 0.5, 5.0, 1.0)
+    part = part_rcb(8, xyz, vwgt=vwgt)
+    loads = np.bincount(part, weights=vwgt, minlength=8)
+    assert loads.max() / loads.mean() < 1.05
+    assert np.all(part_rcb(1, xyz) == 0)
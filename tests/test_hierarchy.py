@@ -0,0 +1,76 @@
+# -*- coding: utf-8 -*-
+import numpy as np
+import pytest
+from mgmetis.hierarchy import part_graph_hierarchical, part_graph_multi, flatten_levels
+from mgmetis.metis import part_graph_recursize
+from mgmetis.utils import compute_edgecut
+from grid_graph import create_grid
+
+
+def test_hierarchical():
+    xadj, adjncy = create_grid(20)
+    levels = [2, 2, 4]
+    edgecuts, part = part_graph_hierarchical(levels, xadj, adjncy, nthreads=4)
+    assert part.shape == (400, 3)
+    assert len(edgecuts) == 3
+    assert edgecuts[0] <= edgecuts[1] <= edgecuts[2]
+    flat = flatten_levels(part, levels)
+    assert set(flat) == set(range(16))
+    assert compute_edgecut(xadj, adjncy, flat) == edgecuts[-1]
+    # NOTE: lower levels never cross upper level parts
+    assert np.all(flat // 8 == part[:, 0])
+
+
+def test_fortran():
+    xadj, adjncy = create_grid(10)
+    edgecuts, part = part_graph_hierarchical([2, 3], xadj + 1, adjncy + 1)
+    assert set(flatten_levels(part, [2, 3])) == set(range(6))
+    assert edgecuts[-1] == compute_edgecut(xadj + 1, adjncy + 1, part[:, 0] * 3 + part[:, 1])
+
+
+def test_multi():
+    xadj, adjncy = create_grid(32)
+    ks = [16, 2, 4, 8]
+    edgecuts, part = part_graph_multi(ks, xadj, adjncy)
+    assert part.shape == (1024, 4)
+    for i, k in enumerate(ks):
+        assert set(part[:, i]) == set(range(k))
+        assert np.bincount(part[:, i]).max() <= 1.1 * 1024 / k
+        assert compute_edgecut(xadj, adjncy, part[:, i]) == edgecuts[i]
+        assert np.all(part[:, i] == part[:, 0] // (16 // k))
+    # NOTE: a single recursive bisection for powers of two
+    _, ref = part_graph_recursize(16, xadj, adjncy)
+    assert np.array_equal(part[:, 0], ref)
+
+
+def test_multi_chain():
+    xadj, adjncy = create_grid(24)
+    # NOTE: 3 is not a node of the bisection tree of 6 or 12 parts
+    ks = [3, 6, 12, 1]
+    edgecuts, part = part_graph_multi(ks, xadj + 1, adjncy + 1, nthreads=2)
+    assert np.all(part[:, 3] == 0) and edgecuts[3] == 0
+    assert edgecuts[0] <= edgecuts[1] <= edgecuts[2]
+    for i, k in enumerate(ks[:3]):
+        assert set(part[:, i]) == set(range(k))
+        assert np.all(part[:, i] == part[:, 2] // (12 // k))
+    with pytest.raises(ValueError):
+        part_graph_multi([2, 3], xadj, adjncy)
+
+
+def test_weighted():
+    xadj, adjncy = create_grid(16)
+    vwgt = np.where(np.arange(256) < 128, 1, 3).astype(np.int32)
+    edgecuts, part = part_graph_hierarchical([2, 4], xadj, adjncy, vwgt=vwgt)
+    flat = flatten_levels(part, [2, 4])
+    loads = np.bincount(flat, weights=vwgt)
+    assert loads.max() <= 1.1 * vwgt.sum() / 8
+    assert edgecuts[-1] == compute_edgecut(xadj, adjncy, flat)
+    # NOTE: multi-constraint weights of shape (nv, ncon)
+    vwgt2 = np.stack((vwgt, np.ones_like(vwgt)), axis=1)
+    _, part = part_graph_hierarchical([2, 4], xadj, adjncy, vwgt=vwgt2, ncon=2)
+    assert set(flatten_levels(part, [2, 4])) == set(range(8))
+    ks = [2, 4, 8]
+    edgecuts, part = part_graph_multi(ks, xadj, adjncy, vwgt=vwgt)
+    for i, k in enumerate(ks):
+        assert np.bincount(part[:, i], weights=vwgt).max() <= 1.1 * vwgt.sum() / k
+        assert compute_edgecut(xadj, adjncy, part[:, i]) == edgecuts[i]
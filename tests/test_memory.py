@@ -0,0 +1,40 @@
+# -*- coding: utf-8 -*-
+import numpy as np
+import pytest
+from mgmetis.metis import (
+    part_graph_kway,
+    part_mesh_dual,
+    node_nd,
+    get_memory_usage,
+    estimate_memory,
+)
+from grid_graph import create_grid
+
+
+@pytest.mark.parametrize("dtype", [np.int32, np.int64])
+def test_memory_report(dtype):
+    xadj, adjncy = create_grid(100, dtype=dtype)
+    report = {}
+    part_graph_kway(8, xadj, adjncy, memory_report=report)
+    assert report["peak"] > 0 and report["current"] >= 0
+    assert get_memory_usage(dtype) == (report["current"], report["peak"])
+    # NOTE: the measurement agrees with the calibrated model
+    est = estimate_memory(xadj.size - 1, adjncy.size, 8, dtype=dtype)
+    assert abs(est - report["peak"]) < 0.3 * report["peak"]
+    node_nd(xadj, adjncy, memory_report=report)
+    est = estimate_memory(xadj.size - 1, adjncy.size, kernel="nd", dtype=dtype)
+    assert abs(est - report["peak"]) < 0.3 * report["peak"]
+
+
+def test_estimate_mesh():
+    report = {}
+    eptr = np.arange(0, 17, 4)
+    eind = np.asarray([0, 1, 4, 3, 1, 2, 5, 4, 3, 4, 7, 6, 4, 5, 8, 7])
+    part_mesh_dual(2, eptr, eind, memory_report=report)
+    assert report["peak"] > 0
+    est = estimate_memory(4, 12, 2, "mesh_dual", ne=4, nind=16)
+    assert est > 0
+    with pytest.raises(ValueError):
+        estimate_memory(4, 12, 2, "mesh_dual")
+    with pytest.raises(ValueError):
+        estimate_memory(4, 12, 2, "meh")
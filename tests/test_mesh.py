@@ -0,0 +1,185 @@
+# -*- coding: utf-8 -*-
+import numpy as np
+import pytest
+from load_mesh import load_mesh
+from mgmetis.metis import mesh_to_dual, part_mesh_nodal
+from mgmetis.metis import part_mesh_dual as part_mesh_dual_metis
+from mgmetis.mesh import ELEMENT_TYPES, corner_mesh, dual_graph, part_mesh_dual
+
+
+def create_hex_grid(nx, ny, nz, prisms=False):
+    # hexahedral grid, in which the cells with x>=nx//2 are split into prisms
+    # if prisms is True
+    ids = np.arange((nx + 1) * (ny + 1) * (nz + 1)).reshape(nz + 1, ny + 1, nx + 1)
+    cells = []
+    for k in range(nz):
+        for j in range(ny):
+            for i in range(nx):
+                h = [
+                    ids[k, j, i],
+                    ids[k, j, i + 1],
+                    ids[k, j + 1, i + 1],
+                    ids[k, j + 1, i],
+                    ids[k + 1, j, i],
+                    ids[k + 1, j, i + 1],
+                    ids[k + 1, j + 1, i + 1],
+                    ids[k + 1, j + 1, i],
+                ]
+                if prisms and i >= nx // 2:
+                    cells.append([h[0], h[1], h[2], h[4], h[5], h[6]])
+                    cells.append([h[0], h[2], h[3], h[4], h[6], h[7]])
+                else:
+                    cells.append(h)
+    z, y, x = np.meshgrid(np.arange(nz + 1), np.arange(ny + 1), np.arange(nx + 1), indexing="ij")
+    return cells, np.c_[x.ravel(), y.ravel(), z.ravel()].astype(float)
+
+
+def brute_force_dual(cells, etypes):
+    # reference face adjacency
+    owners = {}
+    for e, (cell, t) in enumerate(zip(cells, etypes)):
+        for f in ELEMENT_TYPES[t].faces:
+            owners.setdefault(frozenset(cell[x] for x in f), []).append(e)
+    adj = [set() for _ in cells]
+    for es in owners.values():
+        if len(es) == 2:
+            adj[es[0]].add(es[1])
+            adj[es[1]].add(es[0])
+    return adj
+
+
+def to_sets(xadj, adjncy):
+    return [set(adjncy[xadj[i] : xadj[i + 1]]) for i in range(xadj.size - 1)]
+
+
+def test_tet_matches_metis():
+    nv, _, eptr, eind = load_mesh()
+    xadj, adjncy, adjwgt = dual_graph(eptr, eind, nv=nv)
+    assert adjwgt is None
+    assert xadj.dtype == eptr.dtype and adjncy.dtype == eptr.dtype
+    xadj0, adjncy0 = mesh_to_dual(eptr, eind, nv=nv, ncommon=3)
+    assert np.array_equal(xadj, xadj0)
+    assert to_sets(xadj, adjncy) == to_sets(xadj0, adjncy0)
+    # NOTE: neighbors are sorted
+    for i in range(xadj.size - 1):
+        assert np.all(np.diff(adjncy[xadj[i] : xadj[i + 1]]) > 0)
+    # NOTE: a huge nv, for which only a single node is hashed
+    xadj2, adjncy2, _ = dual_graph(eptr, eind, nv=1 << 40)
+    assert np.array_equal(xadj, xadj2) and np.array_equal(adjncy, adjncy2)
+
+
+def test_mixed():
+    cells, xyz = create_hex_grid(4, 3, 2, prisms=True)
+    etypes = ["hex" if len(c) == 8 else "prism" for c in cells]
+    xadj, adjncy, _ = dual_graph(cells)
+    assert to_sets(xadj, adjncy) == brute_force_dual(cells, etypes)
+    # NOTE: explicit types
+    xadj2, adjncy2, _ = dual_graph(cells, etype=etypes)
+    assert np.array_equal(xadj, xadj2) and np.array_equal(adjncy, adjncy2)
+    codes = [list(ELEMENT_TYPES).index(t) for t in etypes]
+    xadj2, adjncy2, _ = dual_graph(cells, etype=codes)
+    assert np.array_equal(xadj, xadj2) and np.array_equal(adjncy, adjncy2)
+    # NOTE: ncommon=1 connects elements through edges and vertices
+    assert adjncy.size < mesh_to_dual(cells, ncommon=1)[1].size
+
+
+def test_fortran():
+    cells, _ = create_hex_grid(3, 3, 3)
+    xadj, adjncy, _ = dual_graph(cells)
+    xadj1, adjncy1, _ = dual_graph(np.asarray(cells) + 1)
+    assert np.array_equal(xadj + 1, xadj1)
+    assert np.array_equal(adjncy + 1, adjncy1)
+
+
+def test_area_weights():
+    cells, xyz = create_hex_grid(3, 2, 2, prisms=True)
+    xadj, adjncy, adjwgt = dual_graph(cells, xyz=xyz, scale=100)
+    assert adjwgt.size == adjncy.size
+    # NOTE: the diagonal quads of the split hexes are the largest, and the
+    # stacked prisms share triangles
+    assert set(adjwgt.tolist()) == {35, 71, 100}
+    # 2D quads
+    quads = np.asarray([[0, 1, 4, 3], [1, 2, 5, 4]])
+    xy = np.asarray([[0, 0], [1, 0], [3, 0], [0, 1], [1, 1], [3, 1]], dtype=float)
+    xadj, adjncy, adjwgt = dual_graph(quads, xyz=xy)
+    assert adjncy.tolist() == [1, 0]
+    assert adjwgt.tolist() == [1000, 1000]
+
+
+def test_errors():
+    cells, _ = create_hex_grid(2, 1, 1)
+    with pytest.raises(ValueError):
+        dual_graph(cells, etype="tet")
+    with pytest.raises(ValueError):
+        dual_graph(cells, etype="foo")
+    with pytest.raises(ValueError):
+        dual_graph(cells, dim=1)
+    # NOTE: three triangles sharing an edge
+    with pytest.raises(ValueError):
+        dual_graph([[0, 1, 2], [1, 0, 3], [0, 1, 4]], dim=2)
+
+
+def test_part():
+    cells, xyz = create_hex_grid(8, 8, 4, prisms=True)
+    objval, epart, npart = part_mesh_dual(4, cells, xyz=xyz)
+    assert epart.size == len(cells)
+    assert npart.size == xyz.shape[0]
+    assert set(epart.tolist()) == set(range(4))
+    assert objval > 0
+    _, epart2, _ = part_mesh_dual(4, cells, kernel="recursive", epart=epart)
+    assert epart2 is epart
+
+
+def create_tet10():
+    # P2 tetrahedra by adding the edge midpoints of the test mesh
+    nv, ne, _, eind = load_mesh()
+    tets = eind.reshape(-1, 4)
+    local = [(0, 1), (1, 2), (0, 2), (0, 3), (1, 3), (2, 3)]
+    edges = np.sort(np.stack([tets[:, [i, j]] for i, j in local], axis=1), axis=2)
+    _, mid = np.unique(edges.reshape(-1, 2), axis=0, return_inverse=True)
+    mid = mid.reshape(ne, 6) + nv
+    return tets, np.concatenate((tets, mid), axis=1).astype(np.int32)
+
+
+def test_corner_mesh():
+    tets, tet10 = create_tet10()
+    eptr, eind, cnodes = corner_mesh(tet10, etype="tet10")
+    assert np.array_equal(eptr, np.arange(0, tets.size + 1, 4))
+    assert np.array_equal(cnodes[eind], tets.ravel())
+    assert cnodes.size == tets.max() + 1
+    # NOTE: inferred types and mixed orders
+    cells = [list(c) for c in tet10[:5]] + [list(c) for c in tets[5:]]
+    eptr2, eind2, cnodes2 = corner_mesh(cells, etype="auto")
+    assert np.array_equal(eptr, eptr2)
+    assert np.array_equal(cnodes2[eind2], tets.ravel())
+
+
+@pytest.mark.parametrize("kernel", ["dual", "nodal"])
+def test_part_high_order(kernel):
+    tets, tet10 = create_tet10()
+    part_mesh = part_mesh_dual_metis if kernel == "dual" else part_mesh_nodal
+    _, epart0, npart0 = part_mesh(4, tets, ncommon=3)
+    objval, epart, npart = part_mesh(4, tet10, etype="tet10", ncommon=3)
+    assert np.array_equal(epart, epart0)
+    assert npart.size == tet10.max() + 1
+    assert np.array_equal(npart[: npart0.size], npart0)
+    # NOTE: each mid-edge node belongs to the part of one of its elements
+    owners = {}
+    for e, cell in enumerate(tet10):
+        for node in cell[4:]:
+            owners.setdefault(node, set()).add(epart[e])
+    assert all(npart[node] in parts for node, parts in owners.items())
+    # NOTE: fortran
+    _, epart1, npart1 = part_mesh(4, tet10 + 1, etype="tet10", ncommon=3)
+    assert np.array_equal(epart1, epart + 1)
+    assert np.array_equal(npart1, npart + 1)
+
+
+def test_dual_graph_high_order():
+    cells, _ = create_hex_grid(3, 2, 2)
+    cells = np.asarray(cells)
+    # NOTE: the extra nodes don't matter for the connectivity
+    extra = np.arange(cells.shape[0] * 19).reshape(-1, 19) + cells.max() + 1
+    xadj, adjncy, _ = dual_graph(cells)
+    xadj2, adjncy2, _ = dual_graph(np.concatenate((cells, extra), axis=1))
+    assert np.array_equal(xadj, xadj2) and np.array_equal(adjncy, adjncy2)
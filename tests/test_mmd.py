@@ -0,0 +1,80 @@
+# -*- coding: utf-8 -*-
+import numpy as np
+import pytest
+from mgmetis import metis
+from mgmetis.symbolic import analyze
+from mgmetis.utils import MetisInputError, pack_graphs
+from grid_graph import create_grid
+
+
+def check_perm(perm, iperm, n):
+    assert np.array_equal(np.sort(perm), np.arange(n))
+    assert np.array_equal(iperm[perm], np.arange(n))
+
+
+@pytest.mark.parametrize("dtype", ["int32", "int64"])
+def test_mmd(dtype, monkeypatch):
+    xadj, adjncy = create_grid(12, dtype=dtype)
+    xadj0, adjncy0 = xadj.copy(), adjncy.copy()
+    perm, iperm = metis.mmd_order(xadj, adjncy)
+    assert perm.dtype == xadj.dtype
+    check_perm(perm, iperm, 144)
+    # NOTE: the input graph is untouched
+    assert np.array_equal(xadj, xadj0) and np.array_equal(adjncy, adjncy0)
+    assert analyze(xadj, adjncy, perm, iperm).nnz < analyze(xadj, adjncy).nnz
+    # NOTE: fortran
+    perm1, iperm1 = metis.mmd_order(xadj + 1, adjncy + 1)
+    assert np.array_equal(perm1, perm + 1) and np.array_equal(iperm1, iperm + 1)
+    # NOTE: self-loops are ignored
+    n = xadj.size - 1
+    rows = np.repeat(np.arange(n), np.diff(xadj))
+    rows = np.concatenate((rows, np.arange(n)))
+    cols = np.concatenate((adjncy, np.arange(n)))
+    order = np.lexsort((cols, rows))
+    xadj2 = np.zeros_like(xadj)
+    np.cumsum(np.bincount(rows, minlength=n), out=xadj2[1:])
+    perm2, _ = metis.mmd_order(xadj2, np.asarray(cols[order], dtype=dtype))
+    assert np.array_equal(perm2, perm)
+    # NOTE: ctypes
+    monkeypatch.setattr(metis, "_USE_FAST", False)
+    perm3, iperm3 = metis.mmd_order(xadj, adjncy)
+    assert np.array_equal(perm3, perm) and np.array_equal(iperm3, iperm)
+
+
+def test_node_nd_order():
+    xadj, adjncy = create_grid(10, dtype="int32")
+    perm, _ = metis.mmd_order(xadj, adjncy)
+    assert np.array_equal(metis.node_nd(xadj, adjncy, order="mmd")[0], perm)
+    assert np.array_equal(metis.node_nd(xadj, adjncy, order="auto")[0], perm)
+    nd, _ = metis.node_nd(xadj, adjncy)
+    assert np.array_equal(metis.node_nd(xadj, adjncy, order="auto", mmd_switch=10)[0], nd)
+    # NOTE: vertex weights are only supported by nested dissection
+    vwgt = np.ones(100, dtype=np.int32)
+    assert np.array_equal(metis.node_nd(xadj, adjncy, order="auto", vwgt=vwgt)[0], nd)
+    with pytest.raises(ValueError):
+        metis.node_nd(xadj, adjncy, order="foo")
+
+
+@pytest.mark.parametrize("nthreads", [1, 3])
+def test_batch(nthreads, monkeypatch):
+    graphs = [create_grid(n, dtype="int32") for n in (3, 1, 7, 5, 4, 6)]
+    offsets, xadj, adjncy = pack_graphs(graphs)
+    perm, iperm = metis.mmd_order_batch(offsets, xadj, adjncy, nthreads=nthreads)
+    for g, (gx, ga) in enumerate(graphs):
+        s, e = offsets[g], offsets[g + 1]
+        ref, iref = metis.mmd_order(gx, ga)
+        assert np.array_equal(perm[s:e], ref) and np.array_equal(iperm[s:e], iref)
+    perm1, iperm1 = metis.mmd_order_batch(offsets, xadj + 1, adjncy + 1)
+    assert np.array_equal(perm1, perm + 1) and np.array_equal(iperm1, iperm + 1)
+    monkeypatch.setattr(metis, "_USE_FAST", False)
+    perm2, iperm2 = metis.mmd_order_batch(offsets, xadj, adjncy)
+    assert np.array_equal(perm2, perm) and np.array_equal(iperm2, iperm)
+
+
+def test_batch_errors():
+    offsets, xadj, adjncy = pack_graphs([create_grid(3, dtype="int32")] * 2)
+    adjncy[0] = 10
+    with pytest.raises(MetisInputError):
+        metis.mmd_order_batch(offsets, xadj, adjncy)
+    with pytest.raises(ValueError):
+        metis.mmd_order_batch([0, 5], xadj, adjncy)
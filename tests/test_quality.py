@@ -0,0 +1,115 @@
+# -*- coding: utf-8 -*-
+import numpy as np
+import pytest
+from mgmetis.metis import part_graph_kway
+from mgmetis.quality import QualityTracker
+from mgmetis.utils import compute_edgecut
+from grid_graph import create_grid
+
+
+def to_csr(edges, nv):
+    # reference CSR of a set of (u, v, w) undirected edges
+    rows = [u for u, v, _ in edges] + [v for u, v, _ in edges]
+    cols = [v for u, v, _ in edges] + [u for u, v, _ in edges]
+    ws = [w for _, _, w in edges] * 2
+    order = np.lexsort((cols, rows))
+    xadj = np.zeros(nv + 1, dtype=np.int64)
+    np.cumsum(np.bincount(rows, minlength=nv), out=xadj[1:])
+    return xadj, np.asarray(cols)[order], np.asarray(ws)[order]
+
+
+def test_tracker():
+    n, ncon = 12, 2
+    xadj, adjncy = create_grid(n)
+    nv = n * n
+    rng = np.random.RandomState(0)
+    vwgt = rng.randint(1, 5, nv * ncon)
+    adjwgt = np.ones(adjncy.size, dtype=np.int64)
+    _, part = part_graph_kway(4, xadj, adjncy)
+    tracker = QualityTracker(xadj, adjncy, part, vwgt=vwgt, adjwgt=adjwgt, ncon=ncon)
+    assert tracker.edgecut == tracker.edgecut0 == compute_edgecut(xadj, adjncy, part)
+    edges = {(u, v): 1 for u in range(nv) for v in adjncy[xadj[u] : xadj[u + 1]].tolist() if u < v}
+    w = vwgt.reshape(nv, ncon).copy()
+    part = part.astype(np.int64)
+    for _ in range(30):
+        vs = rng.randint(0, nv, 5)
+        tracker.move(vs, rng.randint(0, 4, 5))
+        part = tracker.part
+        vs = rng.randint(0, nv, 3)
+        new_w = rng.randint(1, 9, (3, ncon))
+        tracker.set_weights(vs, new_w)
+        for v, x in zip(vs, new_w):
+            w[v] = x
+        a, b = rng.randint(0, nv, 2)
+        key = (min(a, b), max(a, b))
+        if a != b and key not in edges:
+            tracker.insert_edges([a], [b], [3])
+            edges[key] = 3
+        key = list(edges)[rng.randint(len(edges))]
+        tracker.delete_edges([key[1]], [key[0]])
+        del edges[key]
+        # compare against recomputing from scratch
+        rx, ra, rw = to_csr([(u, v, x) for (u, v), x in edges.items()], nv)
+        assert tracker.edgecut == compute_edgecut(rx, ra, part, rw)
+        pwgts = np.zeros((4, ncon), dtype=np.int64)
+        np.add.at(pwgts, part, w)
+        assert np.array_equal(tracker.pwgts, pwgts)
+        assert np.allclose(tracker.imbalances, pwgts.max(axis=0) * 4 / pwgts.sum(axis=0))
+    # NOTE: reset recomputes the same values
+    edgecut, pwgts = tracker.edgecut, tracker.pwgts.copy()
+    tracker.reset()
+    assert tracker.edgecut == tracker.edgecut0 == edgecut
+    assert np.array_equal(tracker.pwgts, pwgts)
+
+
+def test_should_repartition():
+    xadj, adjncy = create_grid(10)
+    _, part = part_graph_kway(4, xadj, adjncy)
+    tracker = QualityTracker(xadj, adjncy, part)
+    assert not tracker.should_repartition(1.05)
+    heavy = np.flatnonzero(part == 0)[:5]
+    tracker.set_weights(heavy, np.full(heavy.size, 10))
+    assert tracker.imbalance > 1.05
+    assert tracker.should_repartition(1.05)
+    tracker.reset(part)
+    assert not tracker.should_repartition(2.0, cut_ratio=1.5)
+    tracker.move(np.arange(0, 100, 7), np.arange(0, 100, 7) % 4)
+    assert tracker.should_repartition(2.0, cut_ratio=1.5)
+    # NOTE: target part weights
+    tracker = QualityTracker(xadj, adjncy, np.arange(100) // 50, tpwgts=[0.25, 0.75])
+    assert tracker.imbalance == 2.0
+
+
+def test_fortran():
+    xadj, adjncy = create_grid(6)
+    _, part = part_graph_kway(3, xadj, adjncy)
+    t0 = QualityTracker(xadj, adjncy, part)
+    t1 = QualityTracker(xadj + 1, adjncy + 1, part + 1)
+    assert t0.nparts == t1.nparts == 3
+    for t, b in ((t0, 0), (t1, 1)):
+        t.move([5 + b, 20 + b], [b, 2 + b])
+        t.insert_edges([0 + b], [35 + b])
+        t.delete_edges([0 + b], [1 + b])
+        t.delete_edges([0 + b], [35 + b])
+        t.insert_edges([1 + b], [0 + b], [4])
+    assert np.array_equal(t1.part, t0.part + 1)
+    assert t0.edgecut == t1.edgecut
+    assert np.array_equal(t0.pwgts, t1.pwgts)
+
+
+def test_errors():
+    xadj, adjncy = create_grid(4)
+    part = np.arange(16) % 2
+    tracker = QualityTracker(xadj, adjncy, part)
+    with pytest.raises(ValueError):
+        tracker.insert_edges([0], [1])
+    with pytest.raises(ValueError):
+        tracker.insert_edges([3], [3])
+    with pytest.raises(ValueError):
+        tracker.delete_edges([0], [5])
+    with pytest.raises(ValueError):
+        tracker.move([0], [2])
+    with pytest.raises(ValueError):
+        tracker.move([16], [0])
+    with pytest.raises(ValueError):
+        QualityTracker(xadj, adjncy, part[:10])
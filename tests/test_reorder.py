@@ -0,0 +1,165 @@
+# -*- coding: utf-8 -*-
+import numpy as np
+import pytest
+from mgmetis.metis import part_graph_kway, part_mesh_dual
+from mgmetis.reorder import (
+    rcm,
+    part_order,
+    part_order_mesh,
+    permute_csr,
+    permute_fields,
+    reorder_csr,
+    schur_order,
+    schur_csr,
+)
+
+
+def create_graph(dtype=None):
+    # NOTE: test the example in the documentation
+    xadj = [int(x) for x in "0 2 5 8 11 13 16 20 24 28 31 33 36 39 42 44".split()]
+    adjncy = [
+        int(x)
+        for x in "1 5 0 2 6 1 3 7 2 4 8 3 9 0 6 10 1 5 7 11 2 6 8 12 3 7 9 13 4 8 14 5 11 6 10 12 7 11 13 8 12 14 9 13".split()
+    ]
+    if dtype is None:
+        return xadj, adjncy
+    return np.asarray(xadj, dtype=dtype), np.asarray(adjncy, dtype=dtype)
+
+
+def bandwidth(xadj, adjncy, iperm):
+    rows = np.repeat(np.arange(xadj.size - 1), np.diff(xadj))
+    return np.max(np.abs(iperm[rows] - iperm[adjncy]))
+
+
+def test_rcm():
+    xadj, adjncy = create_graph("int32")
+    # NOTE: scramble the 3x5 grid
+    rng = np.random.default_rng(0)
+    p = rng.permutation(15).astype(np.int32)
+    xadj2, adjncy2, _ = permute_csr(p, xadj, adjncy)
+    perm, iperm = rcm(xadj2, adjncy2)
+    assert perm.dtype == np.int32
+    assert np.all(np.sort(perm) == np.arange(15))
+    assert np.all(perm[iperm] == np.arange(15))
+    assert bandwidth(xadj2, adjncy2, iperm) <= 4
+    # NOTE: Fortran index and disconnected graphs
+    perm, _ = rcm([1, 2, 3, 3, 4, 5], [2, 1, 5, 4])
+    assert sorted(perm) == list(range(5))
+
+
+def test_part_order():
+    xadj, adjncy = create_graph("int32")
+    _, part = part_graph_kway(3, xadj, adjncy)
+    for method in ("rcm", "nd", None):
+        perm, iperm, offsets = part_order(part, xadj, adjncy, method=method)
+        assert np.all(perm[iperm] == np.arange(15))
+        assert np.all(np.diff(part[perm]) >= 0)
+        assert offsets[0] == 0 and offsets[-1] == 15
+        for p, (s, e) in enumerate(zip(offsets[:-1], offsets[1:])):
+            assert np.all(part[perm[s:e]] == p)
+
+
+def test_permute_csr():
+    xadj, adjncy = create_graph("int64")
+    data = np.arange(adjncy.size, dtype=float)
+    perm = np.arange(15)[::-1].copy()
+    indptr, indices, values = permute_csr(perm, xadj, adjncy, data)
+    dense = np.zeros((15, 15))
+    dense[np.repeat(np.arange(15), np.diff(xadj)), adjncy] = data
+    new = np.zeros((15, 15))
+    new[np.repeat(np.arange(15), np.diff(indptr)), indices] = values
+    assert np.all(new == dense[np.ix_(perm, perm)])
+    # NOTE: Fortran index is preserved
+    indptr, indices, _ = permute_csr(perm, xadj + 1, adjncy + 1)
+    assert indptr[0] == 1 and indices.min() == 1
+    x, y = permute_fields(perm, np.arange(15), np.ones((15, 3)))
+    assert np.all(x == perm) and y.shape == (15, 3)
+
+
+def test_reorder_csr():
+    xadj, adjncy = create_graph("int32")
+    # NOTE: add the diagonal
+    rows = np.repeat(np.arange(15), np.diff(xadj))
+    rows = np.concatenate((rows, np.arange(15)))
+    cols = np.concatenate((adjncy, np.arange(15)))
+    order = np.lexsort((cols, rows))
+    indptr = np.zeros(16, dtype=np.int32)
+    np.cumsum(np.bincount(rows, minlength=15), out=indptr[1:])
+    indices = cols[order]
+    part = np.arange(15) % 2
+    perm, _, offsets, indptr2, indices2, _ = reorder_csr(part, indptr, indices)
+    assert list(offsets) == [0, 8, 15]
+    assert np.all(part[perm[:8]] == 0)
+    assert indptr2[-1] == indptr[-1] and indices2.size == indices.size
+
+
+def test_part_order_mesh():
+    eptr = np.arange(0, 17, 4)
+    eind = np.asarray([0, 1, 4, 3, 1, 2, 5, 4, 3, 4, 7, 6, 4, 5, 8, 7])
+    _, epart, npart = part_mesh_dual(2, eptr, eind)
+    eperm, eiperm, nperm, niperm = part_order_mesh(epart, npart, eptr, eind)
+    assert np.all(eperm[eiperm] == np.arange(4))
+    assert np.all(nperm[niperm] == np.arange(9))
+    assert np.all(np.diff(npart[nperm]) >= 0)
+    # NOTE: renumber the mesh connectivity
+    eptr2, eind2, _ = permute_csr(eperm, eptr, eind, col_iperm=niperm, sort_indices=False)
+    assert np.all(nperm[eind2[eptr2[1] : eptr2[2]]] == eind[eptr[eperm[1]] : eptr[eperm[1] + 1]])
+
+
+def check_schur(perm, iperm, offsets, xadj, adjncy, n):
+    assert np.all(perm[iperm] == np.arange(n))
+    assert offsets[0] == 0 and offsets[-1] == n
+    # NOTE: interior blocks are only coupled through the interface
+    rows = np.repeat(np.arange(n), np.diff(xadj))
+    block = np.searchsorted(offsets, iperm, side="right") - 1
+    bi, bj = block[rows], block[adjncy]
+    last = offsets.size - 2
+    assert np.all((bi == bj) | (bi == last) | (bj == last))
+
+
+def test_schur_order():
+    xadj, adjncy = create_graph("int32")
+    _, part = part_graph_kway(3, xadj, adjncy)
+    for method in ("rcm", "nd", None):
+        perm, iperm, offsets = schur_order(part, xadj, adjncy, method=method)
+        assert perm.dtype == np.int32 and offsets.size == 5
+        check_schur(perm, iperm, offsets, xadj, adjncy, 15)
+        for p in range(3):
+            assert np.all(part[perm[offsets[p] : offsets[p + 1]]] == p)
+    # NOTE: separator labeling of the 3x5 grid by the middle column
+    part = np.tile([0, 0, 2, 1, 1], 3)
+    perm, iperm, offsets = schur_order(part, xadj + 1, adjncy + 1, interface=2)
+    assert list(offsets) == [0, 6, 12, 15]
+    assert sorted(perm[12:]) == [2, 7, 12]
+    check_schur(perm, iperm, offsets, xadj, adjncy, 15)
+    # NOTE: explicit interface without graph
+    mask = part == 2
+    perm2, _, offsets2 = schur_order(part, interface=mask, method=None)
+    perm3, _, _ = schur_order(part, interface=np.flatnonzero(mask), method=None)
+    assert list(offsets2) == [0, 6, 12, 12, 15]
+    assert np.all(perm2 == perm3) and sorted(perm2[12:]) == [2, 7, 12]
+    with pytest.raises(ValueError):
+        schur_order(part)
+
+
+def test_schur_csr():
+    xadj, adjncy = create_graph("int64")
+    # NOTE: add the diagonal
+    rows = np.repeat(np.arange(15), np.diff(xadj))
+    rows = np.concatenate((rows, np.arange(15)))
+    cols = np.concatenate((adjncy, np.arange(15)))
+    order = np.lexsort((cols, rows))
+    indptr = np.zeros(16, dtype=np.int64)
+    np.cumsum(np.bincount(rows, minlength=15), out=indptr[1:])
+    indices = cols[order]
+    data = np.arange(indices.size, dtype=float)
+    _, part = part_graph_kway(2, xadj, adjncy)
+    perm, iperm, offsets, indptr2, indices2, data2 = schur_csr(part, indptr, indices, data)
+    check_schur(perm, iperm, offsets, xadj, adjncy, 15)
+    dense = np.zeros((15, 15))
+    dense[rows[order], indices] = data
+    new = np.zeros((15, 15))
+    new[np.repeat(np.arange(15), np.diff(indptr2)), indices2] = data2
+    assert np.all(new == dense[np.ix_(perm, perm)])
+    n_i = offsets[-2]
+    assert not np.any(new[offsets[0] : offsets[1], offsets[1] : n_i])
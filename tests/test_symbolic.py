@@ -0,0 +1,89 @@
+# -*- coding: utf-8 -*-
+import numpy as np
+import pytest
+from mgmetis import metis
+from mgmetis.enums import OPTION
+from mgmetis.symbolic import analyze, best_ordering
+from grid_graph import create_grid
+
+
+def dense_symbolic(xadj, adjncy, perm):
+    # reference by symbolic elimination of the dense pattern
+    n = xadj.size - 1
+    iperm = np.empty(n, dtype=int)
+    iperm[perm] = np.arange(n)
+    a = np.eye(n, dtype=bool)
+    rows = np.repeat(np.arange(n), np.diff(xadj))
+    a[iperm[rows], iperm[adjncy]] = True
+    for k in range(n):
+        nz = np.flatnonzero(a[k + 1 :, k]) + k + 1
+        a[np.ix_(nz, nz)] = True
+    low = np.tril(a)
+    parent = np.asarray([nz[1] if nz.size > 1 else -1 for nz in (np.flatnonzero(low[:, j]) for j in range(n))])
+    return parent, low.sum(axis=0)
+
+
+@pytest.mark.parametrize("dtype", ["int32", "int64"])
+def test_analyze(dtype):
+    xadj, adjncy = create_grid(7, dtype=dtype)
+    perm, iperm = metis.node_nd(xadj, adjncy)
+    parent, colcount = dense_symbolic(xadj, adjncy, perm)
+    stats = analyze(xadj, adjncy, perm, iperm)
+    assert np.array_equal(stats.parent, parent)
+    assert np.array_equal(stats.colcount, colcount)
+    assert stats.nnz == colcount.sum()
+    assert stats.flops == float((colcount.astype(float) ** 2).sum())
+    # NOTE: postorder, i.e., children before parents and contiguous subtrees
+    pos = np.empty_like(stats.post)
+    pos[stats.post] = np.arange(pos.size)
+    assert sorted(stats.post.tolist()) == list(range(pos.size))
+    assert all(pos[j] < pos[p] for j, p in enumerate(stats.parent) if p != -1)
+    # NOTE: either perm or iperm
+    assert np.array_equal(analyze(xadj, adjncy, perm=perm).colcount, colcount)
+    assert np.array_equal(analyze(xadj, adjncy, iperm=iperm).colcount, colcount)
+    # NOTE: fortran
+    stats1 = analyze(xadj + 1, adjncy + 1, perm + 1, iperm + 1)
+    assert np.array_equal(stats1.colcount, colcount)
+    # NOTE: nested dissection beats the natural ordering
+    assert analyze(xadj, adjncy).nnz > stats.nnz
+
+
+def test_invalid_perm():
+    xadj, adjncy = create_grid(3, dtype="int32")
+    perm = np.arange(9)
+    rest = list(range(3, 9))
+    for bad in ([0, 1, 100000000] + rest, [0, 1, 1] + rest, [-1, 1, 2] + rest, perm[:5]):
+        with pytest.raises(ValueError):
+            analyze(xadj, adjncy, perm=bad, iperm=perm)
+        with pytest.raises(ValueError):
+            analyze(xadj, adjncy, perm=bad)
+        with pytest.raises(ValueError):
+            analyze(xadj, adjncy, iperm=bad)
+    # NOTE: valid permutations, but not inverse of each other
+    with pytest.raises(ValueError):
+        analyze(xadj, adjncy, perm=np.roll(perm, 1), iperm=np.roll(perm, 1))
+
+
+def test_pure_python(monkeypatch):
+    xadj, adjncy = create_grid(9, dtype="int32")
+    perm, iperm = metis.node_nd(xadj, adjncy)
+    stats = analyze(xadj, adjncy, perm, iperm)
+    monkeypatch.setattr(metis, "_USE_FAST", False)
+    stats_py = analyze(xadj, adjncy, perm, iperm)
+    for x, y in zip(stats, stats_py):
+        assert np.array_equal(x, y)
+
+
+def test_best_ordering():
+    xadj, adjncy = create_grid(20, dtype="int32")
+    opts = metis.get_default_options()
+    opts[OPTION.NSEPS] = 3
+    candidates = [{}, {"NSEPS": 4}, {OPTION.CCORDER: 1}, opts]
+    best, perm, iperm, stats = best_ordering(xadj, adjncy, candidates, nthreads=2)
+    assert len(stats) == len(candidates)
+    assert stats[best].flops == min(s.flops for s in stats)
+    assert np.array_equal(analyze(xadj, adjncy, perm, iperm).colcount, stats[best].colcount)
+    best, _, _, stats = best_ordering(xadj, adjncy, candidates, key="nnz")
+    assert stats[best].nnz == min(s.nnz for s in stats)
+    with pytest.raises(ValueError):
+        best_ordering(xadj, adjncy, candidates, key="foo")
@@ -0,0 +1,105 @@
+# -*- coding: utf-8 -*-
+import itertools
+
+import numpy as np
+import pytest
+from mgmetis.metis import part_graph_kway
+from mgmetis.topology import comm_graph, level_distances, map_graph, map_parts, mapping_cost
+from grid_graph import create_grid
+
+
+def test_level_distances():
+    dist = level_distances([2, 2, 3])
+    assert dist.shape == (12, 12)
+    assert np.array_equal(dist, dist.T) and not dist.diagonal().any()
+    assert dist[0, 1] == 1 and dist[0, 3] == 2 and dist[0, 6] == 4 and dist[5, 6] == 4
+    dist = level_distances([2, 4], costs=[1, 0])
+    assert dist[0, 3] == 0 and dist[3, 4] == 1
+    with pytest.raises(ValueError):
+        level_distances([2, 0])
+    with pytest.raises(ValueError):
+        level_distances([2, 2], costs=[1])
+
+
+def test_comm_graph():
+    xadj, adjncy = create_grid(4, 4)
+    part = np.arange(16) % 4 // 2
+    cxadj, cadjncy, cadjwgt = comm_graph(xadj, adjncy, part)
+    assert cxadj.tolist() == [0, 1, 2] and cadjncy.tolist() == [1, 0]
+    # NOTE: 4 vertices on each side of the interface
+    assert cadjwgt.tolist() == [8, 8]
+    # brute force
+    rng = np.random.RandomState(1)
+    part = rng.randint(0, 5, 16)
+    vsize = rng.randint(1, 4, 16)
+    cxadj, cadjncy, cadjwgt = comm_graph(xadj, adjncy, part, vsize=vsize)
+    ref = np.zeros((5, 5), dtype=int)
+    for v in range(16):
+        for q in set(part[adjncy[xadj[v] : xadj[v + 1]]].tolist()) - {part[v]}:
+            ref[part[v], q] += vsize[v]
+            ref[q, part[v]] += vsize[v]
+    dense = np.zeros((5, 5), dtype=int)
+    dense[np.repeat(np.arange(5), np.diff(cxadj)), cadjncy] = cadjwgt
+    assert np.array_equal(dense, ref)
+
+
+def test_swap_optimal():
+    # NOTE: no single swap improves the refined mapping
+    xadj, adjncy = create_grid(24, 24)
+    _, part = part_graph_kway(8, xadj, adjncy)
+    cxadj, cadjncy, cadjwgt = comm_graph(xadj, adjncy, part)
+    rng = np.random.RandomState(0)
+    dist = rng.randint(1, 10, (8, 8)).astype(float)
+    dist = dist + dist.T
+    np.fill_diagonal(dist, 0)
+    cost, mapping = map_graph(cxadj, cadjncy, cadjwgt, dist)
+    assert sorted(mapping.tolist()) == list(range(8))
+    assert cost == pytest.approx(mapping_cost(xadj, adjncy, mapping[part], dist))
+    for a, b in itertools.combinations(range(8), 2):
+        m = mapping.copy()
+        m[[a, b]] = m[[b, a]]
+        assert mapping_cost(xadj, adjncy, m[part], dist) >= cost - 1e-9
+
+
+def test_map_levels():
+    xadj, adjncy = create_grid(48, 48)
+    _, part = part_graph_kway(16, xadj, adjncy)
+    # NOTE: scramble the part IDs
+    part = np.random.RandomState(0).permutation(16)[part]
+    cost, new, mapping = map_parts(xadj, adjncy, part, levels=[4, 4], costs=[1, 0])
+    assert new.dtype == xadj.dtype
+    assert np.array_equal(new, mapping[part])
+    assert cost == mapping_cost(xadj, adjncy, new, level_distances([4, 4], [1, 0]))
+    # NOTE: the inter-node volume is much less than the scrambled one
+    assert cost < 0.6 * mapping_cost(xadj, adjncy, part, level_distances([4, 4], [1, 0]))
+
+
+def test_map_distances():
+    # NOTE: column slices of a strip mapped onto a line of ranks
+    xadj, adjncy = create_grid(64, 8)
+    part = np.tile(np.arange(64) // 8, 8)
+    part = np.random.RandomState(0).permutation(8)[part]
+    dist = np.abs(np.arange(8)[:, None] - np.arange(8)[None, :]).astype(float)
+    cost, new, _ = map_parts(xadj, adjncy, part, distances=dist)
+    assert cost == 7 * 16
+    assert np.all(np.abs(np.diff(new.reshape(8, 64), axis=1)) <= 1)
+
+
+def test_fortran():
+    xadj, adjncy = create_grid(16, 16)
+    _, part = part_graph_kway(4, xadj, adjncy)
+    cost, new, mapping = map_parts(xadj, adjncy, part, levels=[2, 2])
+    cost1, new1, mapping1 = map_parts(xadj + 1, adjncy + 1, part + 1, levels=[2, 2])
+    assert cost == cost1
+    assert np.array_equal(new + 1, new1) and np.array_equal(mapping, mapping1)
+
+
+def test_errors():
+    xadj, adjncy = create_grid(4, 4)
+    part = np.arange(16) % 4
+    with pytest.raises(ValueError):
+        map_parts(xadj, adjncy, part)
+    with pytest.raises(ValueError):
+        map_parts(xadj, adjncy, part, levels=[2, 2], distances=np.zeros((4, 4)))
+    with pytest.raises(ValueError):
+        map_parts(xadj, adjncy, part, levels=[3])